@@ -65,11 +65,24 @@ from tkinter import filedialog, messagebox, ttk
 from openpyxl import Workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 from scipy.optimize import differential_evolution
-import numpy as np
 import time
-import json
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
+from motor_analisis import (ParametrosAnalisis, evaluar, funcion_objetivo, refinar_optimo,
+                            calcular_estadisticas, formatear_resultado, CONFIG_DE, CACHE_EVALUACIONES,
+                            MODO_KERNEL)
+from optimizador import (optimizar_paralelo, optimizar_lote, ejecutar_combinaciones, procesos_disponibles,
+                         periodos_desde_texto, RANGOS_BUSQUEDA)
+from resultados_json import extraer_ticker_symbol
+from resultados_db import abrir_repositorio, NOMBRE_DB, ESTRUCTURA_NUEVA
+from almacen_json import leer_json, escribir_json, leer_config, actualizar_config
+from tabla_virtual import TablaVirtual
+from tareas import en_segundo_plano, en_curso
+from serie_mercado import cargar_serie_csv, parse_percent_to_decimal, to_float_safe
+
+# Modo de simulación: MODO_KERNEL (arrays NumPy) o MODO_REFERENCIA (pandas fila a fila,
+# se conserva para pruebas de regresión)
+MODO_SIMULACION = MODO_KERNEL
 
 # Valores por defecto para el límite
 LIMITE_TIPO = "acciones"
@@ -79,17 +92,14 @@ COMPRA_MULTIPLE_ACCIONES = None
 text_ventas_mult = None
 text_compras_mult = None
 
-# Archivo de configuración para ubicación del JSON
-CONFIG_FILE = Path.home() / ".analisis_config.json"
+# Ubicación de los resultados (clave "ubicacion_json" de ~/.analisis_config.json)
 UBICACION_JSON = None
-ARCHIVO_JSON = None
+ARCHIVO_RESULTADOS = None       # Resultado_de_Analisis.db
+REPOSITORIO_RESULTADOS = None   # RepositorioResultados de esa carpeta
 
 # Archivo de configuración para parámetros activos
 ARCHIVO_PARAMETROS_ACTIVOS = None  # Se configura junto con UBICACION_JSON
 
-# Columnas esperadas (exactas)
-EXPECTED_COLUMNS = ["Fecha", "Último", "Apertura", "Máximo", "Mínimo", "Vol.", "% var."]
-
 # Variable global para almacenar resultados de análisis
 resultados_analisis_actuales = {}
 
@@ -98,8 +108,8 @@ scipy_evaluaciones = 0
 scipy_evaluaciones_max = 0
 scipy_inicio_tiempo = None
 
-# Variable global para detener análisis
-analisis_detenido = False
+# Análisis en curso (tareas.Tarea); detener_analisis le pide que se cancele
+tarea_analisis = None
 
 # Variable global para objetivo actual durante análisis
 OBJETIVO_ACTUAL = None
@@ -141,9 +151,7 @@ def obtener_clave_configuracion(num_filas, checks_activos):
 def cargar_historial_tiempos():
     """Carga el historial de tiempos desde el archivo JSON"""
     try:
-        if ARCHIVO_HISTORIAL_TIEMPOS.exists():
-            with open(ARCHIVO_HISTORIAL_TIEMPOS, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        return leer_json(ARCHIVO_HISTORIAL_TIEMPOS, {})
     except Exception as e:
         print(f"[WARN] Error cargando historial de tiempos: {e}")
     return {}
@@ -152,8 +160,7 @@ def cargar_historial_tiempos():
 def guardar_historial_tiempos(historial):
     """Guarda el historial de tiempos en el archivo JSON"""
     try:
-        with open(ARCHIVO_HISTORIAL_TIEMPOS, 'w', encoding='utf-8') as f:
-            json.dump(historial, f, indent=2, ensure_ascii=False)
+        escribir_json(ARCHIVO_HISTORIAL_TIEMPOS, historial)
     except Exception as e:
         print(f"[WARN] Error guardando historial de tiempos: {e}")
 
@@ -209,97 +216,56 @@ def formatear_tiempo(segundos):
 
 def detener_analisis():
     """Detiene el análisis en proceso"""
-    global analisis_detenido
-    analisis_detenido = True
+    if not en_curso(tarea_analisis):
+        return
+    tarea_analisis.detener()
     print("[DEBUG] Análisis detenido por el usuario")
 
 
-def extraer_ticker_symbol(nombre_archivo):
+# =========================
+# Funciones de configuración JSON
+# =========================
+def configurar_ubicacion(carpeta):
     """
-    Extrae el símbolo del ticker de Yahoo Finance desde el nombre del archivo.
-
-    Ejemplos:
-        "Datos_META_ENE25_NOV25" → "META"
-        "Datos_AAPL_ENE25_NOV25" → "AAPL"
-        "Datos_BRK-B_ENE25_NOV25" → "BRK-B"
-        "Datos_QQQ_ENE25_NOV25" → "QQQ"
-
-    Args:
-        nombre_archivo: Nombre del archivo sin extensión (ej: "Datos_META_ENE25_NOV25")
-
-    Returns:
-        str: Símbolo del ticker (ej: "META") o None si no se puede extraer
+    Apunta los archivos de resultados a la carpeta y abre su repositorio SQLite
+    (la primera vez migra el Resultado_de_Analisis.json que haya en ella).
     """
-    import re
-
-    if not nombre_archivo:
-        return None
-
-    # Patrón: Datos_TICKER_MesAño_MesAño
-    # Donde TICKER puede contener letras, números y guiones (ej: BRK-B)
-    # Y MesAño es 3 letras + 2 dígitos (ej: ENE25, NOV25)
-    patron = r'^Datos_([A-Za-z0-9\-]+)_[A-Za-z]{3}\d{2}_[A-Za-z]{3}\d{2}$'
+    global UBICACION_JSON, ARCHIVO_RESULTADOS, REPOSITORIO_RESULTADOS, ARCHIVO_PARAMETROS_ACTIVOS
 
-    match = re.match(patron, nombre_archivo)
-    if match:
-        return match.group(1).upper()
-
-    # Patrón alternativo más flexible: Datos_TICKER_cualquier_cosa
-    patron_alternativo = r'^Datos_([A-Za-z0-9\-]+)_'
-    match_alt = re.match(patron_alternativo, nombre_archivo)
-    if match_alt:
-        return match_alt.group(1).upper()
-
-    # Si no hay patrón "Datos_", intentar extraer el primer segmento antes de "_"
-    partes = nombre_archivo.split('_')
-    if len(partes) >= 2 and partes[0].upper() == "DATOS":
-        return partes[1].upper()
-
-    return None
+    UBICACION_JSON = carpeta
+    ARCHIVO_RESULTADOS = Path(carpeta) / NOMBRE_DB
+    ARCHIVO_PARAMETROS_ACTIVOS = Path(carpeta) / "parametros_activos.json"
+    try:
+        REPOSITORIO_RESULTADOS = abrir_repositorio(carpeta)
+    except Exception as e:
+        REPOSITORIO_RESULTADOS = None
+        print(f"[ERROR] No se pudo abrir {ARCHIVO_RESULTADOS}: {e}")
+    label_json_actual.config(text=f"Resultados: {ARCHIVO_RESULTADOS}")
 
 
-# =========================
-# Funciones de configuración JSON
-# =========================
 def cargar_configuracion():
-    """Carga la ubicación del JSON desde el archivo de configuración"""
-    global UBICACION_JSON, ARCHIVO_JSON, ARCHIVO_PARAMETROS_ACTIVOS
-
-    if CONFIG_FILE.exists():
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            UBICACION_JSON = config.get("ubicacion_json", None)
-            if UBICACION_JSON:
-                ARCHIVO_JSON = Path(UBICACION_JSON) / "Resultado_de_Analisis.json"
-                ARCHIVO_PARAMETROS_ACTIVOS = Path(UBICACION_JSON) / "parametros_activos.json"
-                label_json_actual.config(text=f"JSON: {ARCHIVO_JSON}")
+    """Carga la ubicación de los resultados desde el archivo de configuración"""
+    ubicacion = leer_config().get("ubicacion_json", None)
+    if ubicacion:
+        configurar_ubicacion(ubicacion)
 
 
 def guardar_configuracion():
-    """Guarda la ubicación del JSON en el archivo de configuración"""
-    config = {"ubicacion_json": UBICACION_JSON}
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2)
+    """Guarda la ubicación del JSON en el archivo de configuración (sin borrar las demás claves)"""
+    actualizar_config(ubicacion_json=UBICACION_JSON)
 
 
 def seleccionar_ubicacion_json():
-    """Permite al usuario seleccionar dónde guardar el JSON"""
-    global UBICACION_JSON, ARCHIVO_JSON, ARCHIVO_PARAMETROS_ACTIVOS
-
+    """Permite al usuario seleccionar dónde guardar los resultados"""
     carpeta = filedialog.askdirectory(title="Selecciona carpeta para guardar resultados JSON")
     if carpeta:
-        UBICACION_JSON = carpeta
-        ARCHIVO_JSON = Path(UBICACION_JSON) / "Resultado_de_Analisis.json"
-        ARCHIVO_PARAMETROS_ACTIVOS = Path(UBICACION_JSON) / "parametros_activos.json"
+        configurar_ubicacion(carpeta)
         guardar_configuracion()
-        label_json_actual.config(text=f"JSON: {ARCHIVO_JSON}")
-        messagebox.showinfo("Ubicación guardada", f"Los resultados se guardarán en:\n{ARCHIVO_JSON}")
+        messagebox.showinfo("Ubicación guardada", f"Los resultados se guardarán en:\n{ARCHIVO_RESULTADOS}")
 
 
 def verificar_ubicacion_json():
     """Verifica si hay ubicación configurada, si no, pide al usuario"""
-    global UBICACION_JSON, ARCHIVO_JSON
-
     if UBICACION_JSON is None:
         respuesta = messagebox.askyesno(
             "Ubicación JSON no configurada",
@@ -307,7 +273,7 @@ def verificar_ubicacion_json():
         )
         if respuesta:
             seleccionar_ubicacion_json()
-            return ARCHIVO_JSON is not None
+            return REPOSITORIO_RESULTADOS is not None
         return False
     return True
 
@@ -317,13 +283,11 @@ def verificar_ubicacion_json():
 # =========================
 def cargar_parametros_activos():
     """Carga los parámetros activos desde el archivo de configuración"""
-    if ARCHIVO_PARAMETROS_ACTIVOS is None or not ARCHIVO_PARAMETROS_ACTIVOS.exists():
+    if ARCHIVO_PARAMETROS_ACTIVOS is None:
         return []
 
     try:
-        with open(ARCHIVO_PARAMETROS_ACTIVOS, 'r', encoding='utf-8') as f:
-            datos = json.load(f)
-            return datos.get("parametros_activos", [])
+        return leer_json(ARCHIVO_PARAMETROS_ACTIVOS, {}).get("parametros_activos", [])
     except Exception as e:
         print(f"[ERROR] Error cargando parámetros activos: {e}")
         return []
@@ -336,9 +300,7 @@ def guardar_parametros_activos(parametros):
         return False
 
     try:
-        datos = {"parametros_activos": parametros}
-        with open(ARCHIVO_PARAMETROS_ACTIVOS, 'w', encoding='utf-8') as f:
-            json.dump(datos, f, indent=2, ensure_ascii=False)
+        escribir_json(ARCHIVO_PARAMETROS_ACTIVOS, {"parametros_activos": parametros})
         return True
     except Exception as e:
         messagebox.showerror("Error", f"Error guardando parámetros activos:\n{e}")
@@ -436,8 +398,8 @@ def administrar_parametros_activos():
 
     def agregar_desde_json():
         """Abre ventana para seleccionar parámetros del JSON calculado"""
-        datos_json = cargar_resultados_json()
-        if not datos_json:
+        registros = REPOSITORIO_RESULTADOS.registros() if REPOSITORIO_RESULTADOS is not None else []
+        if not registros:
             messagebox.showinfo("Sin datos", "No hay parámetros calculados en el JSON")
             return
 
@@ -471,47 +433,43 @@ def administrar_parametros_activos():
         # Diccionario para mapear items a datos completos
         item_datos = {}
 
-        # Llenar con datos del JSON
-        for ticker, contenido_ticker in datos_json.items():
-            ticker_symbol = contenido_ticker.get("_ticker_symbol") or extraer_ticker_symbol(ticker) or ticker
-
-            # Estructura nueva
-            for periodo, contenido_periodo in contenido_ticker.items():
-                if periodo in ["ticker", "fecha_guardado", "periodos", "_ticker_symbol"]:
-                    continue
-
-                if isinstance(contenido_periodo, dict):
-                    for objetivo, datos in contenido_periodo.items():
-                        if isinstance(datos, dict) and "parametros_optimos" in datos:
-                            params = datos.get("parametros_optimos", {})
-                            compra_mult = params.get("compra_multiple")
-                            venta_mult = params.get("venta_multiple")
-
-                            item_id = tree_sel.insert("", "end", values=(
-                                ticker_symbol,
-                                periodo.replace("_", " ").title(),
-                                objetivo.replace("_", " ").title(),
-                                f"{params.get('compra_pct', 0):.1f}",
-                                f"{params.get('venta_pct', 0):.1f}",
-                                f"{params.get('ganancia_minima_pct', 0):.1f}",
-                                compra_mult if compra_mult else "-",
-                                venta_mult if venta_mult else "-"
-                            ))
-
-                            item_datos[item_id] = {
-                                "ticker_symbol": ticker_symbol,
-                                "origen": f"calculado ({periodo}/{objetivo})",
-                                "compra_pct": params.get("compra_pct", 0),
-                                "venta_pct": params.get("venta_pct", 0),
-                                "ganancia_min_pct": params.get("ganancia_minima_pct", 0),
-                                "compra_multiple": compra_mult,
-                                "venta_multiple": venta_mult,
-                                "limite_tipo": params.get("limite_tipo", "acciones"),
-                                "limite_valor": params.get("limite_valor", 10.0),
-                                # Condiciones para compra/venta múltiple
-                                "promedio_maximos": params.get("promedio_maximos", 0),
-                                "promedio_minimos": params.get("promedio_minimos", 0)
-                            }
+        # Llenar con los registros guardados (estructura nueva: período → objetivo)
+        for fila in registros:
+            if fila["estructura"] != ESTRUCTURA_NUEVA:
+                continue
+
+            ticker_symbol = fila["ticker_symbol"] or extraer_ticker_symbol(fila["ticker"]) or fila["ticker"]
+            periodo = fila["periodo"]
+            objetivo = fila["clave_objetivo"]
+            params = fila["registro"].get("parametros_optimos", {})
+            compra_mult = params.get("compra_multiple")
+            venta_mult = params.get("venta_multiple")
+
+            item_id = tree_sel.insert("", "end", values=(
+                ticker_symbol,
+                periodo.replace("_", " ").title(),
+                objetivo.replace("_", " ").title(),
+                f"{params.get('compra_pct', 0):.1f}",
+                f"{params.get('venta_pct', 0):.1f}",
+                f"{params.get('ganancia_minima_pct', 0):.1f}",
+                compra_mult if compra_mult else "-",
+                venta_mult if venta_mult else "-"
+            ))
+
+            item_datos[item_id] = {
+                "ticker_symbol": ticker_symbol,
+                "origen": f"calculado ({periodo}/{objetivo})",
+                "compra_pct": params.get("compra_pct", 0),
+                "venta_pct": params.get("venta_pct", 0),
+                "ganancia_min_pct": params.get("ganancia_minima_pct", 0),
+                "compra_multiple": compra_mult,
+                "venta_multiple": venta_mult,
+                "limite_tipo": params.get("limite_tipo", "acciones"),
+                "limite_valor": params.get("limite_valor", 10.0),
+                # Condiciones para compra/venta múltiple
+                "promedio_maximos": params.get("promedio_maximos", 0),
+                "promedio_minimos": params.get("promedio_minimos", 0)
+            }
 
         tree_sel.pack(fill="both", expand=True)
 
@@ -917,50 +875,10 @@ def administrar_parametros_activos():
 
 
 # =========================
-# Funciones para JSON de resultados (MODIFICADO - Estructura jerárquica)
+# Funciones para resultados guardados (repositorio SQLite, ver resultados_db.py)
 # =========================
-def cargar_resultados_json():
-    """Carga todos los resultados guardados en el JSON"""
-    if ARCHIVO_JSON is None or not ARCHIVO_JSON.exists():
-        return {}
-
-    with open(ARCHIVO_JSON, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-
-def parametros_son_iguales(params_nuevos, params_existentes, tolerancia=0.01):
-    """Compara si dos conjuntos de parámetros son iguales (con tolerancia para decimales)"""
-    claves_comparar = ["compra_pct", "venta_pct", "ganancia_minima_pct", "suave_pct",
-                       "limite_tipo", "limite_valor", "compra_multiple", "venta_multiple"]
-
-    for clave in claves_comparar:
-        val_nuevo = params_nuevos.get(clave)
-        val_existente = params_existentes.get(clave)
-
-        # Si ambos son None o iguales, continuar
-        if val_nuevo == val_existente:
-            continue
-
-        # Si uno es None y otro no, son diferentes
-        if val_nuevo is None or val_existente is None:
-            return False
-
-        # Para valores numéricos, comparar con tolerancia
-        if isinstance(val_nuevo, (int, float)) and isinstance(val_existente, (int, float)):
-            if abs(val_nuevo - val_existente) > tolerancia:
-                return False
-        else:
-            # Para strings u otros tipos, comparación exacta
-            if val_nuevo != val_existente:
-                return False
-
-    return True
-
-
 def guardar_resultados_en_json():
-    """Guarda los resultados actuales en el JSON (botón verde) - ESTRUCTURA JERÁRQUICA"""
-    global resultados_analisis_actuales, ARCHIVO_JSON
-
+    """Guarda los resultados actuales en el repositorio de resultados (botón verde)"""
     if not resultados_analisis_actuales:
         messagebox.showwarning("Sin resultados", "No hay resultados de análisis para guardar.")
         return
@@ -968,19 +886,12 @@ def guardar_resultados_en_json():
     if not verificar_ubicacion_json():
         return
 
-    # Verificar que ARCHIVO_JSON esté configurado
-    if ARCHIVO_JSON is None:
-        messagebox.showerror("Error", "La ruta del archivo JSON no está configurada.")
+    # Verificar que el repositorio esté abierto
+    if REPOSITORIO_RESULTADOS is None:
+        messagebox.showerror("Error", "No se pudo abrir la base de resultados de la carpeta configurada.")
         return
 
     try:
-        # Cargar JSON existente
-        if ARCHIVO_JSON.exists():
-            with open(ARCHIVO_JSON, 'r', encoding='utf-8') as f:
-                datos_json = json.load(f)
-        else:
-            datos_json = {}
-
         # Obtener ticker del archivo actual
         ticker = resultados_analisis_actuales.get("ticker", "UNKNOWN")
 
@@ -988,131 +899,29 @@ def guardar_resultados_en_json():
         ticker_symbol = extraer_ticker_symbol(ticker)
         print(f"[DEBUG] Ticker: {ticker} → ticker_symbol: {ticker_symbol}")
 
-        # Estructura jerárquica ticker → período → objetivo
-        if ticker not in datos_json:
-            datos_json[ticker] = {}
-
-        # Guardar ticker_symbol a nivel del ticker principal
-        if ticker_symbol:
-            datos_json[ticker]["_ticker_symbol"] = ticker_symbol
-
         # Verificar que hay periodos para guardar
         periodos = resultados_analisis_actuales.get("periodos", {})
         if not periodos:
             messagebox.showwarning("Sin períodos", "No hay datos de períodos para guardar.")
             return
 
-        registros_nuevos = 0
-        registros_actualizados = 0
-
-        for clave_periodo, datos in periodos.items():
-            # La clave tiene formato "periodo_objetivo" (ej: "completo_rentabilidad")
-            # Extraer período y objetivo
-            objetivo_base = datos.get("objetivo", "rentabilidad")
+        registros_nuevos, registros_actualizados = REPOSITORIO_RESULTADOS.guardar_periodos(
+            ticker, periodos, ticker_symbol)
 
-            # Extraer solo el nombre del período (sin el objetivo)
-            if "_rentabilidad" in clave_periodo:
-                nombre_periodo = clave_periodo.replace("_rentabilidad", "")
-            elif "_margen_prom" in clave_periodo:
-                nombre_periodo = clave_periodo.replace("_margen_prom", "")
-            else:
-                nombre_periodo = clave_periodo
-
-            if nombre_periodo not in datos_json[ticker]:
-                datos_json[ticker][nombre_periodo] = {}
-
-            # Crear el nuevo registro
-            nuevo_registro = {
-                "ticker_symbol": ticker_symbol,  # Símbolo para Yahoo Finance (ej: "META")
-                "fecha_guardado": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "fecha_inicial": datos.get("fecha_inicial", ""),
-                "fecha_final": datos.get("fecha_final", ""),
-                "parametros_optimos": {
-                    "compra_pct": datos.get("compra_pct", 0),
-                    "venta_pct": datos.get("venta_pct", 0),
-                    "ganancia_minima_pct": datos.get("ganancia_min", 0),
-                    "suave_pct": datos.get("suave_pct", 0),
-                    "limite_tipo": datos.get("limite_tipo", "acciones"),
-                    "limite_valor": datos.get("limite_valor", 10),
-                    "compra_multiple": datos.get("compra_mult"),
-                    "venta_multiple": datos.get("venta_mult"),
-                    # Condiciones para compra/venta múltiple
-                    "promedio_maximos": datos.get("promedio_maximos", 0),
-                    "promedio_minimos": datos.get("promedio_minimos", 0)
-                },
-                "metricas": {
-                    "rentabilidad_max": datos.get("rentabilidad_max", 0),
-                    "margen_promedio": datos.get("margen_promedio", 0),
-                    "rentab_promedio": datos.get("rentab_promedio", 0),
-                    "max_margen": datos.get("max_margen", 0),
-                    "max_aporte": datos.get("max_aporte", 0)
-                },
-                "estadisticas_var": {
-                    "max_var": datos.get("max_var", 0),
-                    "min_var": datos.get("min_var", 0),
-                    "fecha_max_var": datos.get("fecha_max_var", ""),
-                    "fecha_min_var": datos.get("fecha_min_var", ""),
-                    "dif_var": datos.get("dif_var", 0),
-                    "max_prom_var": datos.get("max_prom_var", 0),
-                    "min_prom_var": datos.get("min_prom_var", 0),
-                    "dif_prom_var": datos.get("dif_prom_var", 0)
-                },
-                "estadisticas_operaciones": {
-                    "opc_compra": datos.get("opc_compra", 0),
-                    "acciones_compradas": datos.get("acciones_compradas", 0),
-                    "opc_venta": datos.get("opc_venta", 0),
-                    "acciones_vendidas": datos.get("acciones_vendidas", 0),
-                    "max_acc_cartera": datos.get("max_acc_cartera", 0),
-                    "fecha_max_rentab": datos.get("fecha_max_rentab", "")
-                }
-            }
-
-            # Buscar si ya existe un registro con los mismos parámetros
-            objetivo_encontrado = None
-            for objetivo_key, registro_existente in datos_json[ticker][nombre_periodo].items():
-                if objetivo_key.startswith(objetivo_base):
-                    if isinstance(registro_existente, dict) and "parametros_optimos" in registro_existente:
-                        if parametros_son_iguales(nuevo_registro["parametros_optimos"],
-                                                   registro_existente["parametros_optimos"]):
-                            objetivo_encontrado = objetivo_key
-                            break
-
-            if objetivo_encontrado:
-                # Actualizar registro existente (mismos parámetros)
-                datos_json[ticker][nombre_periodo][objetivo_encontrado] = nuevo_registro
-                registros_actualizados += 1
-                print(f"[DEBUG] Actualizado: {ticker}/{nombre_periodo}/{objetivo_encontrado}")
-            else:
-                # Crear nuevo registro (parámetros diferentes)
-                # Buscar un nombre único para el objetivo
-                objetivo_final = objetivo_base
-                contador = 2
-                while objetivo_final in datos_json[ticker][nombre_periodo]:
-                    objetivo_final = f"{objetivo_base}_{contador}"
-                    contador += 1
-
-                datos_json[ticker][nombre_periodo][objetivo_final] = nuevo_registro
-                registros_nuevos += 1
-                print(f"[DEBUG] Nuevo registro: {ticker}/{nombre_periodo}/{objetivo_final}")
-
-        # Escribir JSON
-        with open(ARCHIVO_JSON, 'w', encoding='utf-8') as f:
-            json.dump(datos_json, f, indent=2, ensure_ascii=False)
-
-        print(f"[DEBUG] JSON guardado exitosamente en: {ARCHIVO_JSON}")
+        print(f"[DEBUG] Resultados guardados en: {ARCHIVO_RESULTADOS}")
 
         mensaje = f"Resultados guardados para {ticker}\n\n"
         if registros_nuevos > 0:
             mensaje += f"• {registros_nuevos} registro(s) nuevo(s)\n"
         if registros_actualizados > 0:
             mensaje += f"• {registros_actualizados} registro(s) actualizado(s)\n"
-        mensaje += f"\nArchivo: {ARCHIVO_JSON}"
+        mensaje += f"\nArchivo: {ARCHIVO_RESULTADOS}"
 
         messagebox.showinfo("Guardado exitoso", mensaje)
         btn_guardar_json.config(state="disabled")
 
     except Exception as e:
-        messagebox.showerror("Error al guardar", f"Error al guardar en JSON:\n{str(e)}")
+        messagebox.showerror("Error al guardar", f"Error al guardar los resultados:\n{str(e)}")
 
 
 def mostrar_info_json_ticker(ticker, csv_path=None):
@@ -1175,71 +984,41 @@ def mostrar_info_json_ticker(ticker, csv_path=None):
             tk.Label(frame_info_horizontal, text=f"DB: {fecha_db_str}",
                      font=("Arial", 8), fg="blue").pack(side="left")
 
-    # NUEVO: Cargar y mostrar tabla consolidada con datos del JSON
-    if ARCHIVO_JSON is None or not ARCHIVO_JSON.exists():
+    # NUEVO: Cargar y mostrar tabla consolidada con los resultados guardados del ticker
+    if REPOSITORIO_RESULTADOS is None:
         return
 
-    datos_json = cargar_resultados_json()
-
-    if ticker not in datos_json:
+    registros = REPOSITORIO_RESULTADOS.registros(ticker)
+    if not registros:
         return
 
-    info = datos_json[ticker]
-
     # Limpiar historial anterior de este ticker
-    if ticker not in historial_analisis_por_ticker:
-        historial_analisis_por_ticker[ticker] = []
-    else:
-        historial_analisis_por_ticker[ticker] = []
-
-    # COMPATIBILIDAD MEJORADA: Maneja estructura antigua, nueva Y MIXTA
-
-    # 1. Primero procesar estructura ANTIGUA si existe (dentro de "periodos")
-    if "periodos" in info and isinstance(info["periodos"], dict):
-        for nombre_periodo, datos_periodo in info["periodos"].items():
-            if isinstance(datos_periodo,
-                          dict) and "parametros_optimos" in datos_periodo and "metricas" in datos_periodo:
-                params = datos_periodo["parametros_optimos"]
-                metricas = datos_periodo["metricas"]
-
-                historial_analisis_por_ticker[ticker].append({
-                    "periodo": nombre_periodo.replace('_', ' ').title(),
-                    "objetivo": "Rentabilidad",
-                    "compra_pct": params.get('compra_pct', 0),
-                    "venta_pct": params.get('venta_pct', 0),
-                    "ganancia_min": params.get('ganancia_minima_pct', 0),
-                    "suave_pct": params.get('suave_pct', 0),
-                    "compra_mult": params.get('compra_multiple'),
-                    "venta_mult": params.get('venta_multiple'),
-                    "rentabilidad_max": metricas.get('rentabilidad_max', 0),
-                    "margen_promedio": metricas.get('margen_promedio', 0)
-                })
+    historial_analisis_por_ticker[ticker] = []
 
-    # 2. Luego procesar estructura NUEVA (fuera de "periodos")
-    for nombre_periodo, contenido in info.items():
-        # Saltar claves de estructura antigua
-        if nombre_periodo in ["ticker", "fecha_guardado", "periodos"]:
+    # Estructura antigua ("periodos", sin objetivo explícito) y nueva (período → objetivo)
+    for fila in registros:
+        params = fila["registro"]["parametros_optimos"]
+        metricas = fila["registro"].get("metricas")
+        if metricas is None:
             continue
 
-        # Procesar estructura nueva: periodo → objetivo → datos
-        if isinstance(contenido, dict):
-            for objetivo, datos in contenido.items():
-                if isinstance(datos, dict) and "parametros_optimos" in datos and "metricas" in datos:
-                    params = datos["parametros_optimos"]
-                    metricas = datos["metricas"]
-
-                    historial_analisis_por_ticker[ticker].append({
-                        "periodo": nombre_periodo.replace('_', ' ').title(),
-                        "objetivo": objetivo.replace('_', ' ').title(),
-                        "compra_pct": params.get('compra_pct', 0),
-                        "venta_pct": params.get('venta_pct', 0),
-                        "ganancia_min": params.get('ganancia_minima_pct', 0),
-                        "suave_pct": params.get('suave_pct', 0),
-                        "compra_mult": params.get('compra_multiple'),
-                        "venta_mult": params.get('venta_multiple'),
-                        "rentabilidad_max": metricas.get('rentabilidad_max', 0),
-                        "margen_promedio": metricas.get('margen_promedio', 0)
-                    })
+        if fila["estructura"] == ESTRUCTURA_NUEVA:
+            objetivo = fila["clave_objetivo"].replace('_', ' ').title()
+        else:
+            objetivo = "Rentabilidad"
+
+        historial_analisis_por_ticker[ticker].append({
+            "periodo": fila["periodo"].replace('_', ' ').title(),
+            "objetivo": objetivo,
+            "compra_pct": params.get('compra_pct', 0),
+            "venta_pct": params.get('venta_pct', 0),
+            "ganancia_min": params.get('ganancia_minima_pct', 0),
+            "suave_pct": params.get('suave_pct', 0),
+            "compra_mult": params.get('compra_multiple'),
+            "venta_mult": params.get('venta_multiple'),
+            "rentabilidad_max": metricas.get('rentabilidad_max', 0),
+            "margen_promedio": metricas.get('margen_promedio', 0)
+        })
 
     # Ordenar por período y luego por objetivo
     orden_periodos = {"Completo": 1, "6 Meses": 2, "3 Meses": 3}
@@ -1252,14 +1031,14 @@ def mostrar_info_json_ticker(ticker, csv_path=None):
 
 
 def administrar_json():
-    """Abre una ventana para ver y eliminar registros del JSON"""
-    if ARCHIVO_JSON is None or not ARCHIVO_JSON.exists():
-        messagebox.showinfo("Sin datos", "No hay archivo JSON configurado o no existe")
+    """Abre una ventana para ver y eliminar registros guardados"""
+    if REPOSITORIO_RESULTADOS is None:
+        messagebox.showinfo("Sin datos", "No hay carpeta de resultados configurada")
         return
 
-    datos_json = cargar_resultados_json()
-    if not datos_json:
-        messagebox.showinfo("Sin datos", "El archivo JSON está vacío")
+    registros = REPOSITORIO_RESULTADOS.registros_por_simbolo()
+    if not registros:
+        messagebox.showinfo("Sin datos", "No hay resultados guardados")
         return
 
     # Obtener ticker actual del CSV seleccionado (para actualizar tabla después de eliminar)
@@ -1285,15 +1064,6 @@ def administrar_json():
              text="Selecciona los registros que deseas eliminar (puedes seleccionar múltiples con Ctrl+clic)",
              font=("Arial", 9), fg="gray").pack(anchor="w")
 
-    # Frame para el Treeview
-    frame_tree = tk.Frame(ventana_admin)
-    frame_tree.pack(fill="both", expand=True, padx=10, pady=5)
-
-    # Scrollbars
-    scrollbar_y = tk.Scrollbar(frame_tree, orient="vertical")
-    scrollbar_x = tk.Scrollbar(frame_tree, orient="horizontal")
-
-    # Treeview con selección múltiple
     # Columnas completas incluyendo todas las estadísticas
     # ORDEN: Básicos, Parámetros, Métricas (incluyendo Prom.Max/Min%), Estadísticas var, Operaciones, Fecha
     columns = (
@@ -1309,17 +1079,10 @@ def administrar_json():
         # Fecha guardado
         "Fecha"
     )
-    tree = ttk.Treeview(frame_tree, columns=columns, show="headings",
-                        selectmode="extended",
-                        yscrollcommand=scrollbar_y.set,
-                        xscrollcommand=scrollbar_x.set)
 
-    scrollbar_y.config(command=tree.yview)
-    scrollbar_x.config(command=tree.xview)
-
-    # Configurar columnas con anchos basados en el título (caracteres * 8 + margen)
+    # Anchos basados en el título (caracteres * 8 + margen)
+    anchos = {}
     for col in columns:
-        tree.heading(col, text=col)
         # Ancho basado en longitud del título
         ancho = max(len(col) * 8 + 10, 50)  # Mínimo 50px
         # Columnas de fecha más anchas
@@ -1327,156 +1090,132 @@ def administrar_json():
             ancho = max(ancho, 90)
         elif col == "Fecha":
             ancho = 130
-        tree.column(col, width=ancho, anchor="center")
-
-    # Diccionario para mapear items del tree a rutas en el JSON
-    item_to_path = {}
-
-    # Llenar el Treeview con datos (ordenados alfabéticamente por ticker_symbol)
-    # Primero extraer y ordenar los tickers
-    tickers_ordenados = sorted(datos_json.items(),
-                                key=lambda x: (x[1].get("_ticker_symbol") or extraer_ticker_symbol(x[0]) or x[0]).upper())
-
-    for ticker, contenido_ticker in tickers_ordenados:
-        # Obtener ticker_symbol: desde el JSON o extraerlo del nombre
-        ticker_symbol = contenido_ticker.get("_ticker_symbol") or extraer_ticker_symbol(ticker) or ticker
-
-        # Manejar estructura antigua (con "periodos")
-        if "periodos" in contenido_ticker and isinstance(contenido_ticker["periodos"], dict):
-            for periodo, datos_periodo in contenido_ticker["periodos"].items():
-                if isinstance(datos_periodo, dict) and "parametros_optimos" in datos_periodo:
-                    params = datos_periodo.get("parametros_optimos", {})
-                    metricas = datos_periodo.get("metricas", {})
-                    stats_var = datos_periodo.get("estadisticas_var", {})
-                    stats_ops = datos_periodo.get("estadisticas_operaciones", {})
-                    fecha = datos_periodo.get("fecha_guardado", "")
-                    compra_mult = params.get("compra_multiple")
-                    venta_mult = params.get("venta_multiple")
-
-                    limite_tipo = params.get("limite_tipo", "acciones")
-                    limite_valor = params.get("limite_valor", 10.0)
-
-                    item_id = tree.insert("", "end", values=(
-                        ticker_symbol,
-                        periodo.replace("_", " ").title(),
-                        "Rentabilidad",  # Estructura antigua no tenía objetivo explícito
-                        # Parámetros óptimos
-                        f"{params.get('compra_pct', 0):.2f}",
-                        f"{params.get('venta_pct', 0):.2f}",
-                        f"{params.get('ganancia_minima_pct', 0):.2f}",
-                        compra_mult if compra_mult else "-",
-                        venta_mult if venta_mult else "-",
-                        limite_tipo.title(),
-                        f"{limite_valor:.0f}" if limite_tipo == "acciones" else f"${limite_valor:.0f}",
-                        # Métricas (Prom.Max% y Prom.Min% después de Margen.Prom)
-                        f"{metricas.get('rentabilidad_max', 0):.2f}%",
-                        f"{metricas.get('margen_promedio', 0):.2f}",
-                        f"{params.get('promedio_maximos', 0) / 100:.2f}%",
-                        f"{params.get('promedio_minimos', 0) / 100:.2f}%",
-                        f"{metricas.get('rentab_promedio', 0):.2f}%",
-                        f"{metricas.get('max_margen', 0):.2f}",
-                        f"{metricas.get('max_aporte', 0):.0f}",
-                        # Estadísticas % variación (con símbolos %)
-                        f"{stats_var.get('max_var', 0):.2f}%",
-                        f"{stats_var.get('min_var', 0):.2f}%",
-                        stats_var.get('fecha_max_var', '-'),
-                        stats_var.get('fecha_min_var', '-'),
-                        f"{stats_var.get('dif_var', 0):.2f}%",
-                        f"{stats_var.get('max_prom_var', 0):.2f}%",
-                        f"{stats_var.get('min_prom_var', 0):.2f}%",
-                        f"{stats_var.get('dif_prom_var', 0):.2f}%",
-                        # Estadísticas operaciones
-                        stats_ops.get('opc_compra', 0),
-                        stats_ops.get('acciones_compradas', 0),
-                        stats_ops.get('opc_venta', 0),
-                        stats_ops.get('acciones_vendidas', 0),
-                        stats_ops.get('max_acc_cartera', 0),
-                        # Fecha
-                        fecha
-                    ))
-                    item_to_path[item_id] = {"ticker": ticker, "path": ["periodos", periodo], "tipo": "antiguo"}
-
-        # Manejar estructura nueva (período → objetivo → datos)
-        for periodo, contenido_periodo in contenido_ticker.items():
-            if periodo in ["ticker", "fecha_guardado", "periodos", "_ticker_symbol"]:
-                continue
-
-            if isinstance(contenido_periodo, dict):
-                for objetivo, datos in contenido_periodo.items():
-                    if isinstance(datos, dict) and "parametros_optimos" in datos:
-                        params = datos.get("parametros_optimos", {})
-                        metricas = datos.get("metricas", {})
-                        stats_var = datos.get("estadisticas_var", {})
-                        stats_ops = datos.get("estadisticas_operaciones", {})
-                        fecha = datos.get("fecha_guardado", "")
-                        # También intentar obtener ticker_symbol del registro individual
-                        symbol_mostrar = datos.get("ticker_symbol") or ticker_symbol
-                        compra_mult = params.get("compra_multiple")
-                        venta_mult = params.get("venta_multiple")
-                        limite_tipo = params.get("limite_tipo", "acciones")
-                        limite_valor = params.get("limite_valor", 10.0)
-
-                        item_id = tree.insert("", "end", values=(
-                            symbol_mostrar,
-                            periodo.replace("_", " ").title(),
-                            objetivo.replace("_", " ").title(),
-                            # Parámetros óptimos
-                            f"{params.get('compra_pct', 0):.2f}",
-                            f"{params.get('venta_pct', 0):.2f}",
-                            f"{params.get('ganancia_minima_pct', 0):.2f}",
-                            compra_mult if compra_mult else "-",
-                            venta_mult if venta_mult else "-",
-                            limite_tipo.title(),
-                            f"{limite_valor:.0f}" if limite_tipo == "acciones" else f"${limite_valor:.0f}",
-                            # Métricas (Prom.Max% y Prom.Min% después de Margen.Prom)
-                            f"{metricas.get('rentabilidad_max', 0):.2f}%",
-                            f"{metricas.get('margen_promedio', 0):.2f}",
-                            f"{params.get('promedio_maximos', 0) / 100:.2f}%",
-                            f"{params.get('promedio_minimos', 0) / 100:.2f}%",
-                            f"{metricas.get('rentab_promedio', 0):.2f}%",
-                            f"{metricas.get('max_margen', 0):.2f}",
-                            f"{metricas.get('max_aporte', 0):.0f}",
-                            # Estadísticas % variación (con símbolos %)
-                            f"{stats_var.get('max_var', 0):.2f}%",
-                            f"{stats_var.get('min_var', 0):.2f}%",
-                            stats_var.get('fecha_max_var', '-'),
-                            stats_var.get('fecha_min_var', '-'),
-                            f"{stats_var.get('dif_var', 0):.2f}%",
-                            f"{stats_var.get('max_prom_var', 0):.2f}%",
-                            f"{stats_var.get('min_prom_var', 0):.2f}%",
-                            f"{stats_var.get('dif_prom_var', 0):.2f}%",
-                            # Estadísticas operaciones
-                            stats_ops.get('opc_compra', 0),
-                            stats_ops.get('acciones_compradas', 0),
-                            stats_ops.get('opc_venta', 0),
-                            stats_ops.get('acciones_vendidas', 0),
-                            stats_ops.get('max_acc_cartera', 0),
-                            # Fecha
-                            fecha
-                        ))
-                        item_to_path[item_id] = {"ticker": ticker, "path": [periodo, objetivo], "tipo": "nuevo"}
-
-    # Empaquetar Treeview y scrollbars
-    scrollbar_y.pack(side="right", fill="y")
-    scrollbar_x.pack(side="bottom", fill="x")
-    tree.pack(fill="both", expand=True)
+        anchos[col] = ancho
+
+    def formatear_registro(fila):
+        """Valores a mostrar de una fila cruda (solo se llama para las filas visibles)"""
+        (symbol_mostrar, periodo, objetivo, compra_pct, venta_pct, ganancia_minima_pct,
+         compra_mult, venta_mult, limite_tipo, limite_valor,
+         rentabilidad_max, margen_promedio, promedio_maximos, promedio_minimos, rentab_promedio,
+         max_margen, max_aporte,
+         max_var, min_var, fecha_max_var, fecha_min_var, dif_var, max_prom_var, min_prom_var, dif_prom_var,
+         opc_compra, acciones_compradas, opc_venta, acciones_vendidas, max_acc_cartera, fecha) = fila
+        return (
+            symbol_mostrar,
+            periodo,
+            objetivo,
+            # Parámetros óptimos
+            f"{compra_pct:.2f}",
+            f"{venta_pct:.2f}",
+            f"{ganancia_minima_pct:.2f}",
+            compra_mult if compra_mult else "-",
+            venta_mult if venta_mult else "-",
+            limite_tipo.title(),
+            f"{limite_valor:.0f}" if limite_tipo == "acciones" else f"${limite_valor:.0f}",
+            # Métricas (Prom.Max% y Prom.Min% después de Margen.Prom)
+            f"{rentabilidad_max:.2f}%",
+            f"{margen_promedio:.2f}",
+            f"{promedio_maximos / 100:.2f}%",
+            f"{promedio_minimos / 100:.2f}%",
+            f"{rentab_promedio:.2f}%",
+            f"{max_margen:.2f}",
+            f"{max_aporte:.0f}",
+            # Estadísticas % variación (con símbolos %)
+            f"{max_var:.2f}%",
+            f"{min_var:.2f}%",
+            fecha_max_var,
+            fecha_min_var,
+            f"{dif_var:.2f}%",
+            f"{max_prom_var:.2f}%",
+            f"{min_prom_var:.2f}%",
+            f"{dif_prom_var:.2f}%",
+            # Estadísticas operaciones
+            opc_compra,
+            acciones_compradas,
+            opc_venta,
+            acciones_vendidas,
+            max_acc_cartera,
+            # Fecha
+            fecha
+        )
 
-    # Frame inferior con botones
+    # Frame inferior con botones (se crea antes para que la tabla pueda actualizar el contador)
     frame_botones = tk.Frame(ventana_admin, pady=10)
-    frame_botones.pack(fill="x", padx=10)
 
     # Label para mostrar cantidad seleccionada
     label_seleccion = tk.Label(frame_botones, text="0 registros seleccionados", font=("Arial", 9))
     label_seleccion.pack(side="left")
 
-    def actualizar_contador(event=None):
-        cantidad = len(tree.selection())
+    def actualizar_contador():
+        cantidad = tabla.cantidad_seleccionada()
         label_seleccion.config(text=f"{cantidad} registro(s) seleccionado(s)")
 
-    tree.bind("<<TreeviewSelect>>", actualizar_contador)
+    # Tabla con selección múltiple (solo se dibujan y formatean las filas visibles)
+    tabla = TablaVirtual(ventana_admin, columns, anchos=anchos, formatear=formatear_registro,
+                         selectmode="extended", con_filtro=True, al_seleccionar=actualizar_contador)
+
+    # Filas crudas (ordenadas alfabéticamente por ticker_symbol) y el id de cada
+    # registro en la base
+    filas = []
+    ids = []
+    for fila in registros:
+        datos = fila["registro"]
+        params = datos.get("parametros_optimos", {})
+        metricas = datos.get("metricas", {})
+        stats_var = datos.get("estadisticas_var", {})
+        stats_ops = datos.get("estadisticas_operaciones", {})
+
+        # ticker_symbol: el del ticker o extraído del nombre; en la estructura
+        # nueva tiene prioridad el guardado en el propio registro
+        ticker_symbol = fila["ticker_symbol"] or extraer_ticker_symbol(fila["ticker"]) or fila["ticker"]
+        if fila["estructura"] == ESTRUCTURA_NUEVA:
+            symbol_mostrar = datos.get("ticker_symbol") or ticker_symbol
+            objetivo = fila["clave_objetivo"].replace("_", " ").title()
+        else:
+            symbol_mostrar = ticker_symbol
+            objetivo = "Rentabilidad"  # Estructura antigua no tenía objetivo explícito
+
+        filas.append((
+            symbol_mostrar,
+            fila["periodo"].replace("_", " ").title(),
+            objetivo,
+            params.get('compra_pct', 0),
+            params.get('venta_pct', 0),
+            params.get('ganancia_minima_pct', 0),
+            params.get("compra_multiple"),
+            params.get("venta_multiple"),
+            params.get("limite_tipo", "acciones"),
+            params.get("limite_valor", 10.0),
+            metricas.get('rentabilidad_max', 0),
+            metricas.get('margen_promedio', 0),
+            params.get('promedio_maximos', 0),
+            params.get('promedio_minimos', 0),
+            metricas.get('rentab_promedio', 0),
+            metricas.get('max_margen', 0),
+            metricas.get('max_aporte', 0),
+            stats_var.get('max_var', 0),
+            stats_var.get('min_var', 0),
+            stats_var.get('fecha_max_var', '-'),
+            stats_var.get('fecha_min_var', '-'),
+            stats_var.get('dif_var', 0),
+            stats_var.get('max_prom_var', 0),
+            stats_var.get('min_prom_var', 0),
+            stats_var.get('dif_prom_var', 0),
+            stats_ops.get('opc_compra', 0),
+            stats_ops.get('acciones_compradas', 0),
+            stats_ops.get('opc_venta', 0),
+            stats_ops.get('acciones_vendidas', 0),
+            stats_ops.get('max_acc_cartera', 0),
+            datos.get("fecha_guardado", "")
+        ))
+        ids.append(fila["id"])
+    tabla.establecer_filas(filas, ids)
+
+    tabla.pack(fill="both", expand=True, padx=10, pady=5)
+    frame_botones.pack(fill="x", padx=10)
 
     def eliminar_seleccionados():
-        seleccionados = tree.selection()
+        seleccionados = tabla.seleccion()
         if not seleccionados:
             messagebox.showwarning("Sin selección", "No has seleccionado ningún registro")
             return
@@ -1487,52 +1226,12 @@ def administrar_json():
                                     f"¿Estás seguro de eliminar {cantidad} registro(s)?\n\nEsta acción no se puede deshacer."):
             return
 
-        # Cargar JSON actual
-        with open(ARCHIVO_JSON, 'r', encoding='utf-8') as f:
-            datos = json.load(f)
-
-        # Eliminar cada registro seleccionado
-        eliminados = 0
-        for item_id in seleccionados:
-            if item_id in item_to_path:
-                info = item_to_path[item_id]
-                ticker = info["ticker"]
-                path = info["path"]
-                tipo = info["tipo"]
-
-                try:
-                    if tipo == "antiguo":
-                        # Estructura: ticker → periodos → periodo
-                        if ticker in datos and "periodos" in datos[ticker]:
-                            if path[1] in datos[ticker]["periodos"]:
-                                del datos[ticker]["periodos"][path[1]]
-                                eliminados += 1
-                                # Si periodos queda vacío, eliminarlo
-                                if not datos[ticker]["periodos"]:
-                                    del datos[ticker]["periodos"]
-                    else:
-                        # Estructura nueva: ticker → periodo → objetivo
-                        if ticker in datos and path[0] in datos[ticker]:
-                            if path[1] in datos[ticker][path[0]]:
-                                del datos[ticker][path[0]][path[1]]
-                                eliminados += 1
-                                # Si periodo queda vacío, eliminarlo
-                                if not datos[ticker][path[0]]:
-                                    del datos[ticker][path[0]]
-
-                    # Si ticker queda vacío (solo con claves vacías), eliminarlo
-                    if ticker in datos:
-                        claves_restantes = [k for k in datos[ticker].keys()
-                                           if k not in ["ticker", "fecha_guardado"] and datos[ticker][k]]
-                        if not claves_restantes:
-                            del datos[ticker]
-
-                except Exception as e:
-                    print(f"Error eliminando {item_id}: {e}")
-
-        # Guardar JSON actualizado
-        with open(ARCHIVO_JSON, 'w', encoding='utf-8') as f:
-            json.dump(datos, f, indent=2, ensure_ascii=False)
+        # Eliminar los registros seleccionados (y los tickers que quedan vacíos)
+        try:
+            eliminados = REPOSITORIO_RESULTADOS.eliminar(seleccionados)
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudieron eliminar los registros:\n{e}")
+            return
 
         messagebox.showinfo("Eliminación completada", f"Se eliminaron {eliminados} registro(s)")
 
@@ -1547,19 +1246,15 @@ def administrar_json():
         administrar_json()
 
     def seleccionar_todos():
-        for item in tree.get_children():
-            tree.selection_add(item)
-        actualizar_contador()
+        tabla.seleccionar_todo()
 
     def deseleccionar_todos():
-        tree.selection_remove(tree.get_children())
-        actualizar_contador()
+        tabla.deseleccionar_todo()
 
     def exportar_a_excel():
         """Exporta los datos del JSON a un archivo Excel"""
-        # Obtener todos los items del treeview
-        items = tree.get_children()
-        if not items:
+        # Exportar las filas de la tabla (las que pasan el filtro, en el orden mostrado)
+        if not tabla.cantidad():
             messagebox.showwarning("Sin datos", "No hay datos para exportar")
             return
 
@@ -1577,8 +1272,7 @@ def administrar_json():
         try:
             # Crear DataFrame con los datos (todas las columnas en nuevo orden)
             datos_export = []
-            for item in items:
-                v = tree.item(item, "values")
+            for v in tabla.filas_formateadas():
                 datos_export.append({
                     "Symbol": v[0],
                     "Período": v[1],
@@ -1785,42 +1479,6 @@ def mostrar_tabla_consolidada_desde_json(ticker):
 # =========================
 # Funciones auxiliares
 # =========================
-def parse_percent_to_decimal(x):
-    """Convierte valores de porcentaje a decimal"""
-    try:
-        if pd.isna(x):
-            return float("nan")
-        s = str(x).strip().replace(",", ".")
-        if s.endswith("%"):
-            s = s[:-1].strip()
-            if s == "":
-                return float("nan")
-            return float(s) / 100.0
-        try:
-            f = float(s)
-            if abs(f) <= 1:
-                return f
-            else:
-                return f / 100.0
-        except:
-            return float("nan")
-    except Exception:
-        return float("nan")
-
-
-def to_float_safe(x):
-    """Convierte cadenas numéricas con coma/punto a float, devuelve NaN si falla."""
-    try:
-        if pd.isna(x):
-            return float("nan")
-        s = str(x).strip().replace('"', '').replace(",", ".")
-        if s == "":
-            return float("nan")
-        return float(s)
-    except:
-        return float("nan")
-
-
 def create_sqlite_from_df(folder, name, df):
     """Crea una base sqlite con la tabla 'precios' a partir del DataFrame."""
     db = os.path.join(folder, name)
@@ -1878,363 +1536,367 @@ def create_sqlite_from_df(folder, name, df):
     return db
 
 
-def filtrar_ultimos_dias(csv_path, dias):
-    """Lee el CSV y devuelve un DataFrame con solo los últimos N días"""
-    df = pd.read_csv(csv_path, sep=";", engine='python', dtype=str)
-    df.columns = [c.strip() for c in df.columns]
-
-    # Procesar fechas
-    def parse_mixed_dates(date_str):
-        for fmt in ("%d/%m/%Y", "%m/%d/%Y"):
-            try:
-                return pd.to_datetime(date_str, format=fmt)
-            except:
-                continue
-        return pd.NaT
-
-    df['Fecha'] = df['Fecha'].apply(parse_mixed_dates)
-    df = df.dropna(subset=['Fecha'])
-    df = df.sort_values('Fecha').reset_index(drop=True)
-
-    # Obtener fecha más reciente y calcular fecha de corte
-    fecha_max = df['Fecha'].max()
-    fecha_corte = fecha_max - timedelta(days=dias)
+def filtrar_periodo(serie, definicion):
+    """
+    Devuelve la SerieMercado del período (últimos N días o rango de fechas) como
+    vista de la serie ya cargada, sin releer el CSV ni copiar los datos.
+    """
+    serie_filtrada = serie.periodo(definicion)
 
-    # Filtrar
-    df_filtrado = df[df['Fecha'] >= fecha_corte].copy()
+    if len(serie_filtrada) > 0:
+        print(f"  → Período: {serie_filtrada.fecha_inicial.strftime('%d/%m/%Y')} a "
+              f"{serie_filtrada.fecha_final.strftime('%d/%m/%Y')}")
+    else:
+        print(f"  → Período sin datos")
+    print(f"  → Registros: {len(serie_filtrada)} de {len(serie)}")
 
-    print(f"  → Período: {fecha_corte.strftime('%d/%m/%Y')} a {fecha_max.strftime('%d/%m/%Y')}")
-    print(f"  → Registros: {len(df_filtrado)} de {len(df)}")
+    return serie_filtrada
 
-    return df_filtrado
 
+# La interfaz solo se construye al ejecutar el script: los procesos worker del
+# optimizador paralelo (multiprocessing "spawn") reimportan este archivo como
+# __mp_main__ y no deben abrir ventanas.
+if __name__ == "__main__":
+    # =========================
+    # Interfaz Gráfica
+    # =========================
+    ventana = tk.Tk()
+    ventana.title("Parámetros del análisis")
+    ventana.geometry("1100x700")  # Tamaño inicial de la ventana
 
-# =========================
-# Interfaz Gráfica
-# =========================
-ventana = tk.Tk()
-ventana.title("Parámetros del análisis")
-ventana.geometry("1100x700")  # Tamaño inicial de la ventana
+    # =========================================================
+    # Crear Canvas con Scrollbar vertical para toda la interfaz
+    # =========================================================
+    canvas_principal = tk.Canvas(ventana)
+    scrollbar_vertical = tk.Scrollbar(ventana, orient="vertical", command=canvas_principal.yview)
+    canvas_principal.configure(yscrollcommand=scrollbar_vertical.set)
 
-# =========================================================
-# Crear Canvas con Scrollbar vertical para toda la interfaz
-# =========================================================
-canvas_principal = tk.Canvas(ventana)
-scrollbar_vertical = tk.Scrollbar(ventana, orient="vertical", command=canvas_principal.yview)
-canvas_principal.configure(yscrollcommand=scrollbar_vertical.set)
+    scrollbar_vertical.pack(side="right", fill="y")
+    canvas_principal.pack(side="left", fill="both", expand=True)
 
-scrollbar_vertical.pack(side="right", fill="y")
-canvas_principal.pack(side="left", fill="both", expand=True)
+    # Frame principal dentro del canvas (aquí van todos los widgets)
+    frame_principal = tk.Frame(canvas_principal)
+    canvas_window = canvas_principal.create_window((0, 0), window=frame_principal, anchor="nw")
 
-# Frame principal dentro del canvas (aquí van todos los widgets)
-frame_principal = tk.Frame(canvas_principal)
-canvas_window = canvas_principal.create_window((0, 0), window=frame_principal, anchor="nw")
+    # Configurar el scroll para que funcione con la rueda del mouse
+    def on_mousewheel(event):
+        canvas_principal.yview_scroll(int(-1*(event.delta/120)), "units")
 
-# Configurar el scroll para que funcione con la rueda del mouse
-def on_mousewheel(event):
-    canvas_principal.yview_scroll(int(-1*(event.delta/120)), "units")
+    canvas_principal.bind_all("<MouseWheel>", on_mousewheel)
 
-canvas_principal.bind_all("<MouseWheel>", on_mousewheel)
+    # Actualizar el tamaño del canvas cuando cambie el frame
+    def configurar_scroll(event):
+        canvas_principal.configure(scrollregion=canvas_principal.bbox("all"))
+        # Ajustar el ancho del canvas al frame
+        canvas_principal.itemconfig(canvas_window, width=event.width if event.width > 1000 else 1000)
 
-# Actualizar el tamaño del canvas cuando cambie el frame
-def configurar_scroll(event):
-    canvas_principal.configure(scrollregion=canvas_principal.bbox("all"))
-    # Ajustar el ancho del canvas al frame
-    canvas_principal.itemconfig(canvas_window, width=event.width if event.width > 1000 else 1000)
+    frame_principal.bind("<Configure>", configurar_scroll)
 
-frame_principal.bind("<Configure>", configurar_scroll)
+    # Ajustar el ancho del frame cuando cambie el canvas
+    def on_canvas_configure(event):
+        canvas_principal.itemconfig(canvas_window, width=event.width)
 
-# Ajustar el ancho del frame cuando cambie el canvas
-def on_canvas_configure(event):
-    canvas_principal.itemconfig(canvas_window, width=event.width)
+    canvas_principal.bind("<Configure>", on_canvas_configure)
 
-canvas_principal.bind("<Configure>", on_canvas_configure)
+    # Configuración del grid del frame principal
+    frame_principal.grid_columnconfigure(1, weight=1)
+    frame_principal.grid_columnconfigure(0, weight=0)
+    frame_principal.grid_columnconfigure(2, weight=0)
+    frame_principal.grid_columnconfigure(3, weight=1)
 
-# Configuración del grid del frame principal
-frame_principal.grid_columnconfigure(1, weight=1)
-frame_principal.grid_columnconfigure(0, weight=0)
-frame_principal.grid_columnconfigure(2, weight=0)
-frame_principal.grid_columnconfigure(3, weight=1)
+    tk.Label(frame_principal, text="Ruta del CSV (TAB):").grid(row=0, column=0, sticky="w")
+    entry_ruta = tk.Entry(frame_principal, width=55)
+    entry_ruta.grid(row=0, column=1, sticky="we")
 
-tk.Label(frame_principal, text="Ruta del CSV (TAB):").grid(row=0, column=0, sticky="w")
-entry_ruta = tk.Entry(frame_principal, width=55)
-entry_ruta.grid(row=0, column=1, sticky="we")
 
+    def seleccionar_csv():
+        global ticker_actual
 
-def seleccionar_csv():
-    global ticker_actual
+        ruta = filedialog.askopenfilename(
+            title="Selecciona el archivo CSV (guardado desde Excel, separado por TAB)",
+            filetypes=[("CSV files", "*.csv;*.txt"), ("Todos los archivos", "*.*")]
+        )
+        entry_ruta.delete(0, tk.END)
+        entry_ruta.insert(0, ruta)
+
+        # Mostrar info del JSON si existe
+        if ruta:
+            nombre_archivo = os.path.splitext(os.path.basename(ruta))[0]
+            ticker_actual = nombre_archivo  # Guardar ticker actual
+            mostrar_info_json_ticker(nombre_archivo, ruta)  # CORREGIDO: Pasar ruta del CSV
+
+
+    tk.Button(frame_principal, text="Seleccionar", command=seleccionar_csv).grid(row=0, column=2, sticky="w", padx=(6, 0))
+
+    # Botón para seleccionar ubicación JSON (row=1, pegado a row=0)
+    frame_json_config = tk.Frame(frame_principal)
+    frame_json_config.grid(row=1, column=0, columnspan=3, sticky="w", pady=(1, 0))
+
+    tk.Button(frame_json_config, text="Configurar ubicación JSON",
+              command=seleccionar_ubicacion_json, bg="lightblue").pack(side="left")
+
+    tk.Button(frame_json_config, text="Administrar JSON",
+              command=administrar_json, bg="#ffcc80").pack(side="left", padx=(10, 0))
+
+    tk.Button(frame_json_config, text="Params Activos",
+              command=administrar_parametros_activos, bg="#90EE90").pack(side="left", padx=(10, 0))
+
+    label_json_actual = tk.Label(frame_json_config, text="JSON: No configurado", fg="gray")
+    label_json_actual.pack(side="left", padx=(10, 0))
+
+    # AHORA sí cargar configuración (después de crear label_json_actual)
+    cargar_configuracion()
+
+    # Frame para mostrar info JSON del ticker seleccionado (DEBAJO en row=2, ancho completo)
+    frame_info_json = tk.Frame(frame_principal, relief="groove", borderwidth=2, padx=5, pady=3)
+    frame_info_json.grid(row=2, column=0, columnspan=4, sticky="ew", pady=(1, 0))
+
+    # ------------------------------------------------
+    # CHECKBOXES: Objetivo de optimización (múltiple selección)
+    # ------------------------------------------------
+    tk.Label(frame_principal, text="Objetivo optimización:").grid(row=3, column=0, sticky="w")
+    # Variables para checkboxes de objetivos
+    objetivo_rentabilidad_var = tk.IntVar(value=1)  # Por defecto marcado
+    objetivo_margen_var = tk.IntVar(value=0)
+    frame_objetivo = tk.Frame(frame_principal)
+    frame_objetivo.grid(row=3, column=1, sticky="w")
+    tk.Checkbutton(frame_objetivo, text="Rentabilidad máx", variable=objetivo_rentabilidad_var).pack(side="left")
+    tk.Checkbutton(frame_objetivo, text="Margen promedio máx", variable=objetivo_margen_var).pack(side="left", padx=(10, 0))
+
+    # Función helper para obtener objetivos seleccionados
+    def obtener_objetivos_seleccionados():
+        """Retorna lista de objetivos seleccionados"""
+        objetivos = []
+        if objetivo_rentabilidad_var.get() == 1:
+            objetivos.append("rentabilidad")
+        if objetivo_margen_var.get() == 1:
+            objetivos.append("margen_prom")
+        return objetivos
+
+    # CHECKBOX: Usar optimización SciPy
+    frame_scipy = tk.Frame(frame_principal)
+    frame_scipy.grid(row=3, column=2, sticky="w", padx=(10, 0))
+
+    usar_scipy_var = tk.IntVar(value=0)
+    chk_scipy = tk.Checkbutton(frame_scipy, text="Usar optimización avanzada (SciPy)", variable=usar_scipy_var)
+    chk_scipy.pack(side="left")
+
+    # Procesos para evaluar cada generación de SciPy en paralelo (1 = secuencial)
+    tk.Label(frame_scipy, text="Procesos:").pack(side="left", padx=(10, 0))
+    procesos_var = tk.IntVar(value=1)
+    tk.Spinbox(frame_scipy, from_=1, to=procesos_disponibles(), width=3,
+               textvariable=procesos_var).pack(side="left", padx=(5, 0))
+
+    # Con 1 proceso: simular cada generación completa en una pasada vectorizada
+    lote_var = tk.IntVar(value=1)
+    tk.Checkbutton(frame_scipy, text="Lote", variable=lote_var).pack(side="left", padx=(5, 0))
+
+    # ------------------------------------------------
+    # CAMPO Compra (%) + CHECKBOX DE OPTIMIZACIÓN
+    # ------------------------------------------------
+    tk.Label(frame_principal, text="Compra (%):").grid(row=4, column=0, sticky="w")
+
+    frame_compra = tk.Frame(frame_principal)
+    frame_compra.grid(row=4, column=1, sticky="w")
+
+    entry_compra = tk.Entry(frame_compra, width=6)
+    entry_compra.insert(0, "-1.6")
+    entry_compra.pack(side="left")
+
+    auto_compra_var = tk.IntVar(value=0)
+    chk_auto = tk.Checkbutton(frame_compra, text="Auto", variable=auto_compra_var)
+    chk_auto.pack(side="left", padx=(5, 0))
+
+    # Frame para botones de análisis
+    frame_botones_analisis = tk.Frame(frame_principal)
+    frame_botones_analisis.grid(row=4, column=2, sticky="w", padx=(10, 0))
+
+    btn_iniciar_analisis = tk.Button(frame_botones_analisis, text="▶ Iniciar análisis",
+                                      command=lambda: iniciar_proceso(), bg="#90EE90")
+    btn_iniciar_analisis.pack(side="left")
+
+    btn_detener_analisis = tk.Button(frame_botones_analisis, text="⏹ Detener",
+                                      command=lambda: detener_analisis(), bg="#ff6b6b", fg="white", state="disabled")
+    btn_detener_analisis.pack(side="left", padx=(5, 0))
+
+    # ------------------------------------------------
+    # CAMPO Venta (%) + CHECKBOX DE OPTIMIZACIÓN
+    # ------------------------------------------------
+    tk.Label(frame_principal, text="Venta (%):").grid(row=5, column=0, sticky="w")
+
+    frame_venta = tk.Frame(frame_principal)
+    frame_venta.grid(row=5, column=1, sticky="w")
+
+    entry_venta = tk.Entry(frame_venta, width=6)
+    entry_venta.insert(0, "1.6")
+    entry_venta.pack(side="left")
+
+    auto_venta_var = tk.IntVar(value=0)
+    chk_auto_venta = tk.Checkbutton(frame_venta, text="Auto", variable=auto_venta_var)
+    chk_auto_venta.pack(side="left", padx=(5, 0))
+
+    # Botón "Generar DB y Excel" al lado de Venta (azul con letras negras)
+    btn_generar_db_excel = tk.Button(frame_principal, text="Generar DB y Excel", command=lambda: generar_db_excel(),
+                                     bg="#1E90FF", fg="black", font=("Arial", 9, "bold"), width=18)
+    btn_generar_db_excel.grid(row=5, column=2, sticky="w", padx=(10, 0))
+
+    # ------------------------------------------------
+    # CAMPO: Ganancia mínima (%) + CHECKBOX
+    # ------------------------------------------------
+    tk.Label(frame_principal, text="Ganancia mínima (%):").grid(row=6, column=0, sticky="w")
+
+    frame_ganancia = tk.Frame(frame_principal)
+    frame_ganancia.grid(row=6, column=1, sticky="w")
+
+    entry_ganancia_minima = tk.Entry(frame_ganancia, width=6)
+    entry_ganancia_minima.insert(0, "0")
+    entry_ganancia_minima.pack(side="left")
+
+    auto_ganancia_var = tk.IntVar(value=0)
+    chk_auto_ganancia = tk.Checkbutton(frame_ganancia, text="Auto", variable=auto_ganancia_var)
+    chk_auto_ganancia.pack(side="left", padx=(5, 0))
+
+    tk.Label(frame_principal, text="Suave (%):").grid(row=7, column=0, sticky="w")
+    entry_suave = tk.Entry(frame_principal, width=6)
+    entry_suave.insert(0, "0.5")
+    entry_suave.grid(row=7, column=1, sticky="w")
+
+    tipo_limite_var = tk.StringVar(value="acciones")
+    opciones_limite = ["acciones", "aporte"]
+    selector_limite = tk.OptionMenu(frame_principal, tipo_limite_var, *opciones_limite)
+    selector_limite.grid(row=8, column=0, sticky="w")
+
+    frame_limite = tk.Frame(frame_principal)
+    frame_limite.grid(row=8, column=1, sticky="w")
+    entry_limite = tk.Entry(frame_limite, width=10)
+    entry_limite.insert(0, "10")
+    entry_limite.pack(side="left")
+    tk.Label(frame_limite, text="Valor límite").pack(side="left", padx=(5, 0))
+
+    # =========================================================
+    # Frame para Compra múltiple
+    # =========================================================
+    frame_compra_multiple = tk.Frame(frame_principal)
+    frame_compra_multiple.grid(row=9, column=0, columnspan=2, sticky="w", pady=(5, 0))
+
+    tk.Label(frame_compra_multiple, text="Compra de N acciones:").pack(side="left")
+
+    entry_compra_multiple = tk.Entry(frame_compra_multiple, width=6)
+    entry_compra_multiple.pack(side="left", padx=(5, 0))
+    entry_compra_multiple.insert(0, "")
+
+    auto_compra_mult_var = tk.IntVar(value=0)
+    chk_auto_compra_mult = tk.Checkbutton(frame_compra_multiple, text="Auto", variable=auto_compra_mult_var)
+    chk_auto_compra_mult.pack(side="left", padx=(5, 0))
+
+    # =========================================================
+    # Frame para Venta múltiple
+    # =========================================================
+    frame_venta_multiple = tk.Frame(frame_principal)
+    frame_venta_multiple.grid(row=10, column=0, columnspan=2, sticky="w", pady=(5, 0))
+
+    tk.Label(frame_venta_multiple, text="Venta de N acciones:").pack(side="left")
+
+    entry_venta_multiple = tk.Entry(frame_venta_multiple, width=6)
+    entry_venta_multiple.pack(side="left", padx=(5, 0))
+    entry_venta_multiple.insert(0, "")
+
+    auto_venta_mult_var = tk.IntVar(value=0)
+    chk_auto_venta_mult = tk.Checkbutton(frame_venta_multiple, text="Auto", variable=auto_venta_mult_var)
+    chk_auto_venta_mult.pack(side="left", padx=(5, 0))
+
+    # =========================================================
+    # Frame para mostrar fechas de compras/ventas múltiples
+    # =========================================================
+    frame_fechas_multiples = tk.Frame(frame_principal)
+    frame_fechas_multiples.grid(row=9, column=2, rowspan=2, sticky="nw", padx=(10, 0))
+
+    # Cuadro de fechas de compras múltiples
+    tk.Label(frame_fechas_multiples, text="Fechas compras múltiples:", font=("Arial", 8)).grid(row=0, column=0, sticky="w")
+    text_compras_mult = tk.Text(frame_fechas_multiples, width=15, height=4, font=("Arial", 7))
+    text_compras_mult.grid(row=1, column=0, sticky="w", padx=(0, 10))
+
+    # Cuadro de fechas de ventas múltiples
+    tk.Label(frame_fechas_multiples, text="Fechas ventas múltiples:", font=("Arial", 8)).grid(row=0, column=1, sticky="w")
+    text_ventas_mult = tk.Text(frame_fechas_multiples, width=15, height=4, font=("Arial", 7))
+    text_ventas_mult.grid(row=1, column=1, sticky="w")
+
+    # =========================================================
+    # Frame para selección de períodos a analizar
+    # =========================================================
+    frame_periodos = tk.Frame(frame_principal, relief="ridge", borderwidth=2, padx=10, pady=5)
+    frame_periodos.grid(row=11, column=0, columnspan=3, sticky="w", pady=(10, 0))
+
+    tk.Label(frame_periodos, text="Analizar períodos:", font=("Arial", 10, "bold")).pack(side="left", padx=(0, 10))
+
+    analizar_completo_var = tk.IntVar(value=1)
+    analizar_6meses_var = tk.IntVar(value=0)
+    analizar_3meses_var = tk.IntVar(value=0)
+
+    tk.Checkbutton(frame_periodos, text="Completo", variable=analizar_completo_var).pack(side="left", padx=5)
+    tk.Checkbutton(frame_periodos, text="Últimos 6 meses", variable=analizar_6meses_var).pack(side="left", padx=5)
+    tk.Checkbutton(frame_periodos, text="Últimos 3 meses", variable=analizar_3meses_var).pack(side="left", padx=5)
+
+    # Otros períodos: días (30, 365) o rangos dd/mm/aaaa-dd/mm/aaaa separados por comas
+    tk.Label(frame_periodos, text="Otros:").pack(side="left", padx=(10, 2))
+    entry_otros_periodos = tk.Entry(frame_periodos, width=22)
+    entry_otros_periodos.pack(side="left")
+
+    # Botón verde para guardar en JSON
+    btn_guardar_json = tk.Button(frame_periodos, text="💾 Guardar resultados en JSON",
+                                 command=guardar_resultados_en_json, bg="lightgreen",
+                                 font=("Arial", 10, "bold"), state="disabled")
+    btn_guardar_json.pack(side="left", padx=(20, 0))
+
+    # =========================================================
+    # Frame de estadísticas
+    # =========================================================
+    ventana.frame_stats = tk.Frame(frame_principal, padx=10, pady=2)
+    ventana.frame_stats.grid(row=12, column=0, columnspan=3, sticky="w")
+
+    # =========================================================
+    # Barra de progreso para optimización
+    # =========================================================
+    frame_progreso = tk.Frame(frame_principal, padx=10, pady=2)
+    frame_progreso.grid(row=13, column=0, columnspan=3, sticky="we")
+
+    ventana.progress_bar = ttk.Progressbar(frame_progreso, length=600, mode='determinate')
+    ventana.label_progreso = tk.Label(frame_progreso, text="", font=("Arial", 10))
+
+    # Label para mostrar resultado de optimización
+    ventana.label_resultado_opt = tk.Label(frame_principal, text="", font=("Arial", 10, "bold"), fg="darkgreen")
+
+    ultimo_df = None
+    ultima_ruta_excel = ""
+    ultimo_folder = ""
+    ultimo_base_name = ""
+
+    # Diccionario para almacenar DataFrames por período
+    resultados_dfs_por_periodo = {}
 
-    ruta = filedialog.askopenfilename(
-        title="Selecciona el archivo CSV (guardado desde Excel, separado por TAB)",
-        filetypes=[("CSV files", "*.csv;*.txt"), ("Todos los archivos", "*.*")]
-    )
-    entry_ruta.delete(0, tk.END)
-    entry_ruta.insert(0, ruta)
-
-    # Mostrar info del JSON si existe
-    if ruta:
-        nombre_archivo = os.path.splitext(os.path.basename(ruta))[0]
-        ticker_actual = nombre_archivo  # Guardar ticker actual
-        mostrar_info_json_ticker(nombre_archivo, ruta)  # CORREGIDO: Pasar ruta del CSV
-
-
-tk.Button(frame_principal, text="Seleccionar", command=seleccionar_csv).grid(row=0, column=2, sticky="w", padx=(6, 0))
-
-# Botón para seleccionar ubicación JSON (row=1, pegado a row=0)
-frame_json_config = tk.Frame(frame_principal)
-frame_json_config.grid(row=1, column=0, columnspan=3, sticky="w", pady=(1, 0))
-
-tk.Button(frame_json_config, text="Configurar ubicación JSON",
-          command=seleccionar_ubicacion_json, bg="lightblue").pack(side="left")
-
-tk.Button(frame_json_config, text="Administrar JSON",
-          command=administrar_json, bg="#ffcc80").pack(side="left", padx=(10, 0))
-
-tk.Button(frame_json_config, text="Params Activos",
-          command=administrar_parametros_activos, bg="#90EE90").pack(side="left", padx=(10, 0))
-
-label_json_actual = tk.Label(frame_json_config, text="JSON: No configurado", fg="gray")
-label_json_actual.pack(side="left", padx=(10, 0))
-
-# AHORA sí cargar configuración (después de crear label_json_actual)
-cargar_configuracion()
-
-# Frame para mostrar info JSON del ticker seleccionado (DEBAJO en row=2, ancho completo)
-frame_info_json = tk.Frame(frame_principal, relief="groove", borderwidth=2, padx=5, pady=3)
-frame_info_json.grid(row=2, column=0, columnspan=4, sticky="ew", pady=(1, 0))
-
-# ------------------------------------------------
-# CHECKBOXES: Objetivo de optimización (múltiple selección)
-# ------------------------------------------------
-tk.Label(frame_principal, text="Objetivo optimización:").grid(row=3, column=0, sticky="w")
-# Variables para checkboxes de objetivos
-objetivo_rentabilidad_var = tk.IntVar(value=1)  # Por defecto marcado
-objetivo_margen_var = tk.IntVar(value=0)
-frame_objetivo = tk.Frame(frame_principal)
-frame_objetivo.grid(row=3, column=1, sticky="w")
-tk.Checkbutton(frame_objetivo, text="Rentabilidad máx", variable=objetivo_rentabilidad_var).pack(side="left")
-tk.Checkbutton(frame_objetivo, text="Margen promedio máx", variable=objetivo_margen_var).pack(side="left", padx=(10, 0))
-
-# Función helper para obtener objetivos seleccionados
-def obtener_objetivos_seleccionados():
-    """Retorna lista de objetivos seleccionados"""
-    objetivos = []
-    if objetivo_rentabilidad_var.get() == 1:
-        objetivos.append("rentabilidad")
-    if objetivo_margen_var.get() == 1:
-        objetivos.append("margen_prom")
-    return objetivos
-
-# CHECKBOX: Usar optimización SciPy
-usar_scipy_var = tk.IntVar(value=0)
-chk_scipy = tk.Checkbutton(frame_principal, text="Usar optimización avanzada (SciPy)", variable=usar_scipy_var)
-chk_scipy.grid(row=3, column=2, sticky="w", padx=(10, 0))
-
-# ------------------------------------------------
-# CAMPO Compra (%) + CHECKBOX DE OPTIMIZACIÓN
-# ------------------------------------------------
-tk.Label(frame_principal, text="Compra (%):").grid(row=4, column=0, sticky="w")
-
-frame_compra = tk.Frame(frame_principal)
-frame_compra.grid(row=4, column=1, sticky="w")
-
-entry_compra = tk.Entry(frame_compra, width=6)
-entry_compra.insert(0, "-1.6")
-entry_compra.pack(side="left")
-
-auto_compra_var = tk.IntVar(value=0)
-chk_auto = tk.Checkbutton(frame_compra, text="Auto", variable=auto_compra_var)
-chk_auto.pack(side="left", padx=(5, 0))
-
-# Frame para botones de análisis
-frame_botones_analisis = tk.Frame(frame_principal)
-frame_botones_analisis.grid(row=4, column=2, sticky="w", padx=(10, 0))
-
-btn_iniciar_analisis = tk.Button(frame_botones_analisis, text="▶ Iniciar análisis",
-                                  command=lambda: iniciar_proceso(), bg="#90EE90")
-btn_iniciar_analisis.pack(side="left")
-
-btn_detener_analisis = tk.Button(frame_botones_analisis, text="⏹ Detener",
-                                  command=lambda: detener_analisis(), bg="#ff6b6b", fg="white", state="disabled")
-btn_detener_analisis.pack(side="left", padx=(5, 0))
-
-# ------------------------------------------------
-# CAMPO Venta (%) + CHECKBOX DE OPTIMIZACIÓN
-# ------------------------------------------------
-tk.Label(frame_principal, text="Venta (%):").grid(row=5, column=0, sticky="w")
-
-frame_venta = tk.Frame(frame_principal)
-frame_venta.grid(row=5, column=1, sticky="w")
-
-entry_venta = tk.Entry(frame_venta, width=6)
-entry_venta.insert(0, "1.6")
-entry_venta.pack(side="left")
-
-auto_venta_var = tk.IntVar(value=0)
-chk_auto_venta = tk.Checkbutton(frame_venta, text="Auto", variable=auto_venta_var)
-chk_auto_venta.pack(side="left", padx=(5, 0))
-
-# Botón "Generar DB y Excel" al lado de Venta (azul con letras negras)
-btn_generar_db_excel = tk.Button(frame_principal, text="Generar DB y Excel", command=lambda: generar_db_excel(),
-                                 bg="#1E90FF", fg="black", font=("Arial", 9, "bold"), width=18)
-btn_generar_db_excel.grid(row=5, column=2, sticky="w", padx=(10, 0))
-
-# ------------------------------------------------
-# CAMPO: Ganancia mínima (%) + CHECKBOX
-# ------------------------------------------------
-tk.Label(frame_principal, text="Ganancia mínima (%):").grid(row=6, column=0, sticky="w")
-
-frame_ganancia = tk.Frame(frame_principal)
-frame_ganancia.grid(row=6, column=1, sticky="w")
-
-entry_ganancia_minima = tk.Entry(frame_ganancia, width=6)
-entry_ganancia_minima.insert(0, "0")
-entry_ganancia_minima.pack(side="left")
-
-auto_ganancia_var = tk.IntVar(value=0)
-chk_auto_ganancia = tk.Checkbutton(frame_ganancia, text="Auto", variable=auto_ganancia_var)
-chk_auto_ganancia.pack(side="left", padx=(5, 0))
-
-tk.Label(frame_principal, text="Suave (%):").grid(row=7, column=0, sticky="w")
-entry_suave = tk.Entry(frame_principal, width=6)
-entry_suave.insert(0, "0.5")
-entry_suave.grid(row=7, column=1, sticky="w")
-
-tipo_limite_var = tk.StringVar(value="acciones")
-opciones_limite = ["acciones", "aporte"]
-selector_limite = tk.OptionMenu(frame_principal, tipo_limite_var, *opciones_limite)
-selector_limite.grid(row=8, column=0, sticky="w")
-
-frame_limite = tk.Frame(frame_principal)
-frame_limite.grid(row=8, column=1, sticky="w")
-entry_limite = tk.Entry(frame_limite, width=10)
-entry_limite.insert(0, "10")
-entry_limite.pack(side="left")
-tk.Label(frame_limite, text="Valor límite").pack(side="left", padx=(5, 0))
-
-# =========================================================
-# Frame para Compra múltiple
-# =========================================================
-frame_compra_multiple = tk.Frame(frame_principal)
-frame_compra_multiple.grid(row=9, column=0, columnspan=2, sticky="w", pady=(5, 0))
-
-tk.Label(frame_compra_multiple, text="Compra de N acciones:").pack(side="left")
-
-entry_compra_multiple = tk.Entry(frame_compra_multiple, width=6)
-entry_compra_multiple.pack(side="left", padx=(5, 0))
-entry_compra_multiple.insert(0, "")
-
-auto_compra_mult_var = tk.IntVar(value=0)
-chk_auto_compra_mult = tk.Checkbutton(frame_compra_multiple, text="Auto", variable=auto_compra_mult_var)
-chk_auto_compra_mult.pack(side="left", padx=(5, 0))
-
-# =========================================================
-# Frame para Venta múltiple
-# =========================================================
-frame_venta_multiple = tk.Frame(frame_principal)
-frame_venta_multiple.grid(row=10, column=0, columnspan=2, sticky="w", pady=(5, 0))
-
-tk.Label(frame_venta_multiple, text="Venta de N acciones:").pack(side="left")
-
-entry_venta_multiple = tk.Entry(frame_venta_multiple, width=6)
-entry_venta_multiple.pack(side="left", padx=(5, 0))
-entry_venta_multiple.insert(0, "")
-
-auto_venta_mult_var = tk.IntVar(value=0)
-chk_auto_venta_mult = tk.Checkbutton(frame_venta_multiple, text="Auto", variable=auto_venta_mult_var)
-chk_auto_venta_mult.pack(side="left", padx=(5, 0))
-
-# =========================================================
-# Frame para mostrar fechas de compras/ventas múltiples
-# =========================================================
-frame_fechas_multiples = tk.Frame(frame_principal)
-frame_fechas_multiples.grid(row=9, column=2, rowspan=2, sticky="nw", padx=(10, 0))
-
-# Cuadro de fechas de compras múltiples
-tk.Label(frame_fechas_multiples, text="Fechas compras múltiples:", font=("Arial", 8)).grid(row=0, column=0, sticky="w")
-text_compras_mult = tk.Text(frame_fechas_multiples, width=15, height=4, font=("Arial", 7))
-text_compras_mult.grid(row=1, column=0, sticky="w", padx=(0, 10))
-
-# Cuadro de fechas de ventas múltiples
-tk.Label(frame_fechas_multiples, text="Fechas ventas múltiples:", font=("Arial", 8)).grid(row=0, column=1, sticky="w")
-text_ventas_mult = tk.Text(frame_fechas_multiples, width=15, height=4, font=("Arial", 7))
-text_ventas_mult.grid(row=1, column=1, sticky="w")
-
-# =========================================================
-# Frame para selección de períodos a analizar
-# =========================================================
-frame_periodos = tk.Frame(frame_principal, relief="ridge", borderwidth=2, padx=10, pady=5)
-frame_periodos.grid(row=11, column=0, columnspan=3, sticky="w", pady=(10, 0))
-
-tk.Label(frame_periodos, text="Analizar períodos:", font=("Arial", 10, "bold")).pack(side="left", padx=(0, 10))
-
-analizar_completo_var = tk.IntVar(value=1)
-analizar_6meses_var = tk.IntVar(value=0)
-analizar_3meses_var = tk.IntVar(value=0)
-
-tk.Checkbutton(frame_periodos, text="Completo", variable=analizar_completo_var).pack(side="left", padx=5)
-tk.Checkbutton(frame_periodos, text="Últimos 6 meses", variable=analizar_6meses_var).pack(side="left", padx=5)
-tk.Checkbutton(frame_periodos, text="Últimos 3 meses", variable=analizar_3meses_var).pack(side="left", padx=5)
-
-# Botón verde para guardar en JSON
-btn_guardar_json = tk.Button(frame_periodos, text="💾 Guardar resultados en JSON",
-                             command=guardar_resultados_en_json, bg="lightgreen",
-                             font=("Arial", 10, "bold"), state="disabled")
-btn_guardar_json.pack(side="left", padx=(20, 0))
-
-# =========================================================
-# Frame de estadísticas
-# =========================================================
-ventana.frame_stats = tk.Frame(frame_principal, padx=10, pady=2)
-ventana.frame_stats.grid(row=12, column=0, columnspan=3, sticky="w")
-
-# =========================================================
-# Barra de progreso para optimización
-# =========================================================
-frame_progreso = tk.Frame(frame_principal, padx=10, pady=2)
-frame_progreso.grid(row=13, column=0, columnspan=3, sticky="we")
-
-ventana.progress_bar = ttk.Progressbar(frame_progreso, length=600, mode='determinate')
-ventana.label_progreso = tk.Label(frame_progreso, text="", font=("Arial", 10))
-
-# Label para mostrar resultado de optimización
-ventana.label_resultado_opt = tk.Label(frame_principal, text="", font=("Arial", 10, "bold"), fg="darkgreen")
-
-ultimo_df = None
-ultima_ruta_excel = ""
-ultimo_folder = ""
-ultimo_base_name = ""
-
-# Diccionario para almacenar DataFrames por período
-resultados_dfs_por_periodo = {}
-
-# Variable global para acumular análisis POR TICKER (no mezclar tickers)
-historial_analisis_por_ticker = {}
-ticker_actual = None
+    # Variable global para acumular análisis POR TICKER (no mezclar tickers)
+    historial_analisis_por_ticker = {}
+    ticker_actual = None
 
 
 # =========================
 # CAMBIO 1 y 2: Función generar DB y Excel (botón)
 # =========================
-def generar_db_excel():
-    global resultados_dfs_por_periodo, ultimo_folder, ultimo_base_name
-
-    if not resultados_dfs_por_periodo:
-        messagebox.showerror("Error", "No hay análisis previo. Ejecuta primero 'Iniciar análisis'.")
-        return
-
-    # Cambiar estado del botón
-    btn_generar_db_excel.config(state="disabled", bg="gray", text="Generando...")
-    ventana.update()
+def exportar_db_excel(carpeta, base_name, dfs_por_periodo, objetivo):
+    """
+    Escribe <base_name>_analizado.xlsx (una pestaña por período) y
+    <base_name>_analizado.db (una tabla por período). Corre fuera del hilo
+    de Tk.
 
-    mensajes_resultado = []
+    Returns:
+        (lista de archivos generados, lista de errores)
+    """
     archivos_generados = []
     errores = []
 
     try:
         # CAMBIO 1: Excel que ACUMULA pestañas (no sobrescribe)
-        ruta_excel = os.path.join(ultimo_folder, f"{ultimo_base_name}_analizado.xlsx")
-        objetivo = OBJETIVO_ACTUAL
+        ruta_excel = os.path.join(carpeta, f"{base_name}_analizado.xlsx")
 
         # Si el archivo existe, cargar y agregar nuevas pestañas
         if os.path.exists(ruta_excel):
@@ -2252,7 +1914,10 @@ def generar_db_excel():
                 wb.remove(wb["Sheet"])
 
         if wb is not None:
-            for nombre_periodo, df in resultados_dfs_por_periodo.items():
+            for nombre_periodo, df in dfs_por_periodo.items():
+                # Porcentajes como texto "x%" (mismo formato que se muestra)
+                df = formatear_resultado(df)
+
                 # Crear nombre de pestaña descriptivo
                 nombre_hoja = f"{nombre_periodo}_{objetivo}"[:31]
 
@@ -2270,7 +1935,7 @@ def generar_db_excel():
 
             wb.save(ruta_excel)
             archivos_generados.append(
-                f"✓ Excel: {os.path.basename(ruta_excel)} ({len(resultados_dfs_por_periodo)} pestañas)")
+                f"✓ Excel: {os.path.basename(ruta_excel)} ({len(dfs_por_periodo)} pestañas)")
 
     except PermissionError:
         errores.append(f"❌ Excel: El archivo está abierto, ciérralo primero")
@@ -2279,13 +1944,12 @@ def generar_db_excel():
 
     try:
         # CAMBIO 2: SQLite unificado con múltiples tablas
-        db_path = os.path.join(ultimo_folder, f"{ultimo_base_name}_analizado.db")
+        db_path = os.path.join(carpeta, f"{base_name}_analizado.db")
 
         conn = sqlite3.connect(db_path)
 
-        for nombre_periodo, df in resultados_dfs_por_periodo.items():
+        for nombre_periodo, df in dfs_por_periodo.items():
             # Nombre de tabla: periodo_objetivo
-            objetivo = OBJETIVO_ACTUAL
             tabla_nombre = f"{nombre_periodo}_{objetivo}"
 
             # Eliminar tabla si existe (con comillas)
@@ -2316,30 +1980,29 @@ def generar_db_excel():
                 )
             """)
 
-            # Insertar datos
-            rows = []
-            for _, r in df.iterrows():
-                rows.append((
-                    r.get("Fecha", ""),
-                    to_float_safe(r.get("Último", 0)),
-                    to_float_safe(r.get("Apertura", 0)),
-                    to_float_safe(r.get("Máximo", 0)),
-                    to_float_safe(r.get("Mínimo", 0)),
-                    to_float_safe(r.get("Vol.", 0)),
-                    str(r.get("% var.", "")),
-                    str(r.get("% acumulado", "")),
-                    str(r.get("Opción", "")),
-                    int(r.get("Movimiento de acciones", 0)) if pd.notna(r.get("Movimiento de acciones", 0)) else 0,
-                    int(r.get("Acciones en cartera", 0)) if pd.notna(r.get("Acciones en cartera", 0)) else 0,
-                    to_float_safe(r.get("Precio de compra", 0)),
-                    to_float_safe(r.get("Capital en bolsa", 0)),
-                    to_float_safe(r.get("Capital en acciones", 0)),
-                    to_float_safe(r.get("Capital total", 0)),
-                    to_float_safe(r.get("Aporte", 0)),
-                    to_float_safe(r.get("Aporte acumulado", 0)),
-                    to_float_safe(r.get("Margen", 0)),
-                    str(r.get("Rentabilidad", ""))
-                ))
+            # Insertar datos: columnas numéricas tal cual, porcentajes como texto "x%"
+            formateado = formatear_resultado(df)
+            rows = list(zip(
+                df["Fecha"].tolist(),
+                df["Último"].astype(float).tolist(),
+                df["Apertura"].astype(float).tolist(),
+                df["Máximo"].astype(float).tolist(),
+                df["Mínimo"].astype(float).tolist(),
+                df["Vol."].astype(float).tolist(),
+                formateado["% var."].tolist(),
+                formateado["% acumulado"].tolist(),
+                df["Opción"].astype(str).tolist(),
+                df["Movimiento de acciones"].astype(int).tolist(),
+                df["Acciones en cartera"].astype(int).tolist(),
+                df["Precio de compra"].astype(float).tolist(),
+                df["Capital en bolsa"].astype(float).tolist(),
+                df["Capital en acciones"].astype(float).tolist(),
+                df["Capital total"].astype(float).tolist(),
+                df["Aporte"].astype(float).tolist(),
+                df["Aporte acumulado"].astype(float).tolist(),
+                df["Margen"].astype(float).tolist(),
+                formateado["Rentabilidad"].tolist()
+            ))
 
             placeholders = ",".join(["?"] * 19)
             conn.executemany(f'INSERT INTO "{tabla_nombre}" VALUES ({placeholders})', rows)
@@ -2347,341 +2010,143 @@ def generar_db_excel():
         conn.commit()
         conn.close()
 
-        archivos_generados.append(f"✓ SQLite: {os.path.basename(db_path)} ({len(resultados_dfs_por_periodo)} tablas)")
+        archivos_generados.append(f"✓ SQLite: {os.path.basename(db_path)} ({len(dfs_por_periodo)} tablas)")
 
     except Exception as e:
         errores.append(f"❌ SQLite: {str(e)}")
 
-    # MEJORA: Una sola ventana de diálogo con todos los resultados
-    mensaje_final = ""
-
-    if archivos_generados:
-        mensaje_final += "ARCHIVOS GENERADOS:\n\n" + "\n".join(archivos_generados)
-
-    if errores:
-        if mensaje_final:
-            mensaje_final += "\n\n"
-        mensaje_final += "ERRORES:\n\n" + "\n".join(errores)
-
-    # Si todo fue exitoso, deshabilitar botón (como el de JSON)
-    if not errores and archivos_generados:
-        btn_generar_db_excel.config(state="disabled", bg="lightgray", fg="gray", text="Generar DB y Excel")
-    else:
-        # Si hubo errores, restaurar botón para reintentar
-        btn_generar_db_excel.config(state="normal", bg="#1E90FF", fg="black", text="Generar DB y Excel")
-
-    if errores:
-        messagebox.showwarning("Generación completada con errores", mensaje_final)
-    else:
-        messagebox.showinfo("Generación exitosa", mensaje_final)
-
-
-# =========================
-# Función que ejecuta TODO el análisis con un UMBRAL_COMPRA dado
-# =========================
-def ejecutar_analisis_con_umbral(umbral_compra_decimal, csv_filtrado=None):
-    global text_ventas_mult, text_compras_mult, INPUT_FILE
-
-    try:
-        local_venta = float(entry_venta.get().replace(",", ".")) / 100
-        local_suave = float(entry_suave.get().replace(",", ".")) / 100
-        ganancia_minima = float(entry_ganancia_minima.get().replace(",", ".")) / 100
-    except:
-        messagebox.showerror("Error", "Valores numéricos inválidos en Venta / Suave / Ganancia mínima.")
-        return None, -999999, -999999
-
-    # Si se proporciona un CSV filtrado, usarlo; si no, cargar el original
-    if csv_filtrado is not None:
-        df = csv_filtrado.copy()
-    else:
-        try:
-            df = pd.read_csv(INPUT_FILE, sep=";", engine='python', dtype=str)
-            df.columns = [c.strip() for c in df.columns]
-            df['Fecha'] = df['Fecha'].astype(str).str.strip()
-
-            def parse_mixed_dates(date_str):
-                for fmt in ("%d/%m/%Y", "%m/%d/%Y"):
-                    try:
-                        return pd.to_datetime(date_str, format=fmt)
-                    except:
-                        continue
-                return pd.NaT
-
-            df['Fecha'] = df['Fecha'].apply(parse_mixed_dates)
-            df = df.dropna(subset=['Fecha'])
-            df = df.sort_values('Fecha').reset_index(drop=True)
-
-        except Exception as e:
-            messagebox.showerror("Error al leer CSV", str(e))
-            return None, -999999, -999999
-
-    # Verificar columnas
-    missing = [c for c in EXPECTED_COLUMNS if c not in df.columns]
-    if missing:
-        return None, -999999, -999999
-
-    df = df[EXPECTED_COLUMNS].copy()
+    return archivos_generados, errores
 
-    # Procesar fechas
-    df['Fecha'] = pd.to_datetime(df['Fecha'], dayfirst=True, errors='coerce')
-    df = df.dropna(subset=['Fecha'])
-    df = df.sort_values("Fecha").reset_index(drop=True)
 
-    # Guardar fechas antes de convertir a string
-    fecha_inicial = df['Fecha'].min()
-    fecha_final = df['Fecha'].max()
+def generar_db_excel():
+    if not resultados_dfs_por_periodo:
+        messagebox.showerror("Error", "No hay análisis previo. Ejecuta primero 'Iniciar análisis'.")
+        return
 
-    df['Fecha'] = df['Fecha'].dt.strftime("%d/%m/%Y")
+    # Cambiar estado del botón
+    btn_generar_db_excel.config(state="disabled", bg="gray", text="Generando...")
 
-    # Convertir numéricos
-    for col in ['Último', 'Apertura', 'Máximo', 'Mínimo', 'Vol.']:
-        df[col] = df[col].apply(to_float_safe)
+    def al_terminar(resultado, error):
+        if error is not None:
+            archivos_generados, errores = [], [f"❌ {error}"]
+        else:
+            archivos_generados, errores = resultado
 
-    df['% var.'] = df['% var.'].apply(parse_percent_to_decimal)
+        # MEJORA: Una sola ventana de diálogo con todos los resultados
+        mensaje_final = ""
 
-    for col in ['Último', 'Apertura', 'Máximo', 'Mínimo', 'Vol.']:
-        df[col] = df[col].apply(lambda x: float(x) if pd.notna(x) else 0.0)
+        if archivos_generados:
+            mensaje_final += "ARCHIVOS GENERADOS:\n\n" + "\n".join(archivos_generados)
 
-    df['% var.'] = df['% var.'].apply(lambda x: float(x) if pd.notna(x) else 0.0)
+        if errores:
+            if mensaje_final:
+                mensaje_final += "\n\n"
+            mensaje_final += "ERRORES:\n\n" + "\n".join(errores)
 
-    # Calcular % acumulado por signos consecutivos
-    acum = 0
-    prev = 0
-    lst = []
-    for v in df['% var.']:
-        sign = 1 if v > 0 else -1 if v < 0 else 0
-        if sign == prev:
-            acum += v
+        # Si todo fue exitoso, deshabilitar botón (como el de JSON)
+        if not errores and archivos_generados:
+            btn_generar_db_excel.config(state="disabled", bg="lightgray", fg="gray", text="Generar DB y Excel")
         else:
-            acum = v
-        lst.append(acum)
-        prev = sign
-    df['% acumulado'] = lst
-
-    acum_decimal = df['% acumulado'].astype(float)
+            # Si hubo errores, restaurar botón para reintentar
+            btn_generar_db_excel.config(state="normal", bg="#1E90FF", fg="black", text="Generar DB y Excel")
 
-    valores_seleccionados = []
-    seq = []
-    indices_seq = []
-
-    for idx, v in enumerate(acum_decimal):
-        if v > 0:
-            seq.append(v)
-            indices_seq.append(idx)
+        if errores:
+            messagebox.showwarning("Generación completada con errores", mensaje_final)
         else:
-            if len(seq) >= 2:
-                valores_seleccionados.append(seq[-1] * 100.0)
-            seq = []
-            indices_seq = []
-    if len(seq) >= 2:
-        valores_seleccionados.append(seq[-1] * 100.0)
+            messagebox.showinfo("Generación exitosa", mensaje_final)
 
-    promedio_maximos = sum(valores_seleccionados) / len(valores_seleccionados) if valores_seleccionados else 0.0
+    # Excel y SQLite se escriben fuera del hilo de Tk
+    argumentos = (ultimo_folder, ultimo_base_name, dict(resultados_dfs_por_periodo), OBJETIVO_ACTUAL)
+    en_segundo_plano(ventana, lambda tarea: exportar_db_excel(*argumentos), al_terminar)
 
-    valores_minimos = []
-    seq_neg = []
 
-    for idx, v in enumerate(acum_decimal):
-        if v < 0:
-            seq_neg.append(v)
-        else:
-            if len(seq_neg) >= 2:
-                valores_minimos.append(seq_neg[-1] * 100.0)
-            seq_neg = []
-    if len(seq_neg) >= 2:
-        valores_minimos.append(seq_neg[-1] * 100.0)
-
-    promedio_minimos = sum(valores_minimos) / len(valores_minimos) if valores_minimos else 0.0
-
-    def determinar_opcion(v, a):
-        if v >= local_venta:
-            return "Venta"
-        if v <= umbral_compra_decimal:
-            return "Compra"
-        if a >= local_venta and v >= local_suave:
-            return "Venta"
-        if a <= umbral_compra_decimal and v <= -local_suave:
-            return "Compra"
-        return "N/A"
-
-    df['Opción'] = df.apply(lambda r: determinar_opcion(r['% var.'], r['% acumulado']), axis=1)
+# =========================
+# Parámetros desde la interfaz
+# =========================
+def parametros_desde_interfaz():
+    """
+    Lee los campos de la interfaz y devuelve un ParametrosAnalisis (o None si hay
+    valores inválidos). Solo se llama una vez por período, nunca por evaluación.
+    """
+    try:
+        compra_pct = float(entry_compra.get().replace(",", "."))
+    except:
+        compra_pct = -1.6
 
     try:
-        if LIMITE_TIPO == "acciones":
-            MAX_ACCIONES = int(LIMITE_VALOR)
-            MAX_APORTE = float("inf")
-        else:
-            MAX_ACCIONES = 10
-            MAX_APORTE = float(LIMITE_VALOR)
+        venta_pct = float(entry_venta.get().replace(",", "."))
+        suave_pct = float(entry_suave.get().replace(",", "."))
+        ganancia_pct = float(entry_ganancia_minima.get().replace(",", "."))
     except:
-        MAX_ACCIONES = 10
-        MAX_APORTE = float("inf")
+        messagebox.showerror("Error", "Valores numéricos inválidos en Venta / Suave / Ganancia mínima.")
+        return None
 
-    acciones = 0
-    capital_bolsa = 0
-    aporte_acumulado = 0
+    return ParametrosAnalisis(
+        compra_pct=compra_pct,
+        venta_pct=venta_pct,
+        ganancia_minima_pct=ganancia_pct,
+        suave_pct=suave_pct,
+        compra_multiple=COMPRA_MULTIPLE_ACCIONES,
+        venta_multiple=VENTA_MULTIPLE_ACCIONES,
+        limite_tipo=LIMITE_TIPO,
+        limite_valor=LIMITE_VALOR
+    )
 
-    movs, acts, cap_b, cap_acc, cap_tot, aport, aport_acum, precios_compra = [], [], [], [], [], [], [], []
 
-    precios_en_cartera = []
+# =========================
+# Función que ejecuta TODO el análisis con unos parámetros dados
+# =========================
+def ejecutar_analisis_con_umbral(params, serie=None, modo=None, tarea=None):
+    """
+    Ejecuta el motor con DataFrame de resultados y actualiza los cuadros de
+    fechas múltiples (a través de `tarea` si se llama desde el hilo del análisis)
+    """
+    global text_ventas_mult, text_compras_mult, INPUT_FILE
 
-    acum_pct = df['% acumulado'].astype(float) * 100.0
-    comprar_multiple = [False] * len(df)
+    # Usar la serie ya parseada; solo se lee el CSV si no se proporcionó
+    if serie is None:
+        try:
+            serie = cargar_serie_csv(INPUT_FILE)
+        except ValueError:
+            return None, -999999, -999999
+        except Exception as e:
+            messagebox.showerror("Error al leer CSV", str(e))
+            return None, -999999, -999999
 
-    seq_idxs_neg = []
-    all_negative_sequences = []
-    for idx, v in enumerate(acum_pct):
-        if v < 0:
-            seq_idxs_neg.append(idx)
-        else:
-            if len(seq_idxs_neg) >= 2:
-                all_negative_sequences.append(seq_idxs_neg.copy())
-            seq_idxs_neg = []
-    if len(seq_idxs_neg) >= 2:
-        all_negative_sequences.append(seq_idxs_neg.copy())
-
-    if promedio_minimos < 0.0:
-        for s in all_negative_sequences:
-            for i in s:
-                if acum_pct.iloc[i] <= promedio_minimos:
-                    comprar_multiple[i] = True
-
-    vender_doble = [False] * len(df)
-
-    seq_idxs = []
-    all_positive_sequences = []
-    for idx, v in enumerate(acum_pct):
-        if v > 0:
-            seq_idxs.append(idx)
-        else:
-            if len(seq_idxs) >= 2:
-                all_positive_sequences.append(seq_idxs.copy())
-            seq_idxs = []
-    if len(seq_idxs) >= 2:
-        all_positive_sequences.append(seq_idxs.copy())
-
-    if promedio_maximos > 0.0:
-        for s in all_positive_sequences:
-            for i in s:
-                if acum_pct.iloc[i] >= promedio_maximos:
-                    vender_doble[i] = True
-
-    for idx, row in df.iterrows():
-        opcion = row["Opción"]
-        precio = row["Último"]
-        movimiento = 0
-        aporte = 0.0
-        precio_operacion = 0.0
-
-        if opcion == "Compra":
-            n_compra = 1
-            if COMPRA_MULTIPLE_ACCIONES is not None and comprar_multiple[idx]:
-                n_compra = COMPRA_MULTIPLE_ACCIONES
-
-            acciones_a_comprar = 0
-            for _ in range(n_compra):
-                puede_comprar = False
-                if LIMITE_TIPO == "acciones" and acciones < MAX_ACCIONES:
-                    puede_comprar = True
-                elif LIMITE_TIPO == "aporte" and (aporte_acumulado + precio) <= MAX_APORTE:
-                    puede_comprar = True
-
-                if puede_comprar:
-                    acciones_a_comprar += 1
-                    if capital_bolsa >= precio:
-                        capital_bolsa -= precio
-                    else:
-                        aporte += precio
-                        aporte_acumulado += precio
-                        capital_bolsa += precio
-                        capital_bolsa -= precio
-                    acciones += 1
-                    precios_en_cartera.append(precio)
-                    precios_en_cartera.sort()
-                else:
-                    break
+    resultado = evaluar(serie, params, con_df=True, modo=modo or MODO_SIMULACION)
+    if resultado is None:
+        return None, -999999, -999999
 
-            movimiento = acciones_a_comprar
-            if movimiento > 0:
-                precio_operacion = -precio
+    df = resultado["df"]
+    if tarea is not None:
+        tarea.en_interfaz(mostrar_fechas_multiples, df, params)
+    else:
+        mostrar_fechas_multiples(df, params)
 
-        elif opcion == "Venta" and acciones > 0:
-            acciones_vendibles = 0
-            for precio_compra in precios_en_cartera:
-                ganancia_porcentual = (precio - precio_compra) / precio_compra
-                if ganancia_porcentual >= ganancia_minima:
-                    acciones_vendibles += 1
-                else:
-                    break
+    return df, resultado["rentab_max"], resultado["margen_prom"], resultado["fecha_inicial"], resultado["fecha_final"]
 
-            if acciones_vendibles > 0:
-                n_venta = 1
-                if VENTA_MULTIPLE_ACCIONES is not None and vender_doble[idx] and acciones >= VENTA_MULTIPLE_ACCIONES:
-                    n_venta = VENTA_MULTIPLE_ACCIONES
-
-                n_venta = min(n_venta, acciones_vendibles, acciones)
-
-                capital_bolsa += precio * n_venta
-                acciones -= n_venta
-                movimiento = -n_venta
-
-                for _ in range(n_venta):
-                    if precios_en_cartera:
-                        precios_en_cartera.pop(0)
-
-                if movimiento < 0:
-                    precio_operacion = precio
-
-        movs.append(movimiento)
-        acts.append(acciones)
-        cap_b.append(round(capital_bolsa, 2))
-        cap_acc.append(round(acciones * precio, 2))
-        cap_tot.append(round(capital_bolsa + acciones * precio, 2))
-        aport.append(round(aporte, 2))
-        aport_acum.append(round(aporte_acumulado, 2))
-        precios_compra.append(precio_operacion)
-
-    df["Movimiento de acciones"] = movs
-    df["Acciones en cartera"] = acts
-    df["Precio de compra"] = precios_compra
-    df["Capital en bolsa"] = cap_b
-    df["Capital en acciones"] = cap_acc
-    df["Capital total"] = cap_tot
-    df["Aporte"] = aport
-    df["Aporte acumulado"] = aport_acum
 
+def mostrar_fechas_multiples(df, params):
+    """Llena los cuadros con las fechas de compras/ventas múltiples del DataFrame de resultados"""
     if text_compras_mult is not None:
         text_compras_mult.delete("1.0", tk.END)
 
-        if COMPRA_MULTIPLE_ACCIONES is not None:
-            fechas_compra_multiple = df[df['Movimiento de acciones'] == COMPRA_MULTIPLE_ACCIONES]['Fecha'].tolist()
+        if params.compra_multiple is not None:
+            fechas_compra_multiple = df[df['Movimiento de acciones'] == params.compra_multiple]['Fecha'].tolist()
             if fechas_compra_multiple:
                 text_compras_mult.insert(tk.END, "\n".join(fechas_compra_multiple))
             else:
-                text_compras_mult.insert(tk.END, f"No hay compras de {COMPRA_MULTIPLE_ACCIONES} acciones")
+                text_compras_mult.insert(tk.END, f"No hay compras de {params.compra_multiple} acciones")
 
     if text_ventas_mult is not None:
         text_ventas_mult.delete("1.0", tk.END)
 
-        if VENTA_MULTIPLE_ACCIONES is not None:
-            fechas_venta_multiple = df[df['Movimiento de acciones'] == -VENTA_MULTIPLE_ACCIONES]['Fecha'].tolist()
+        if params.venta_multiple is not None:
+            fechas_venta_multiple = df[df['Movimiento de acciones'] == -params.venta_multiple]['Fecha'].tolist()
             if fechas_venta_multiple:
                 text_ventas_mult.insert(tk.END, "\n".join(fechas_venta_multiple))
             else:
-                text_ventas_mult.insert(tk.END, f"No hay ventas de {VENTA_MULTIPLE_ACCIONES} acciones")
-
-    df["Margen"] = df["Capital total"] - df["Aporte acumulado"]
-    df["Rentabilidad"] = df.apply(
-        lambda r: (r["Margen"] / r["Aporte acumulado"] * 100) if r["Aporte acumulado"] > 0 else 0, axis=1)
-
-    rentab_max = df["Rentabilidad"].max()
-    margen_prom = df["Margen"].mean()
-
-    df["Rentabilidad"] = df["Rentabilidad"].round(2).astype(str) + "%"
-    df["% var."] = (df["% var."] * 100).round(2).astype(str) + "%"
-    df["% acumulado"] = (df["% acumulado"] * 100).round(2).astype(str) + "%"
-
-    return df, rentab_max, margen_prom, fecha_inicial.strftime("%d/%m/%Y"), fecha_final.strftime("%d/%m/%Y")
+                text_ventas_mult.insert(tk.END, f"No hay ventas de {params.venta_multiple} acciones")
 
 
 # =========================
@@ -2693,227 +2158,203 @@ scipy_inicio_tiempo = None
 
 
 # =========================
-# Función para refinar el óptimo (encontrar centro del rango)
+# Función objetivo para optimización con SciPy
 # =========================
-def refinar_optimo(params_optimos, bounds, csv_filtrado=None, n_muestras=30, umbral_similitud=0.95):
+def funcion_objetivo_scipy(params, serie, base, tarea):
     """
-    Muestrea alrededor del óptimo encontrado para hallar el centro del rango
-    que produce resultados similares.
-
-    Args:
-        params_optimos: Lista con los parámetros óptimos encontrados [compra, venta, ganancia, compra_mult, venta_mult]
-        bounds: Límites de cada parámetro [(min, max), ...]
-        csv_filtrado: DataFrame filtrado o None para usar el completo
-        n_muestras: Número de puntos a muestrear alrededor del óptimo
-        umbral_similitud: Porcentaje mínimo del resultado óptimo para considerar similar (0.95 = 95%)
-
-    Returns:
-        Lista con los parámetros promediados
+    Envuelve motor_analisis.funcion_objetivo con el progreso y la detención.
+    Corre en el hilo del análisis: el progreso solo se encola en `tarea` y la
+    interfaz lo dibuja cuando revisa la cola.
     """
-    global COMPRA_MULTIPLE_ACCIONES, VENTA_MULTIPLE_ACCIONES, analisis_detenido
+    global scipy_evaluaciones
 
-    # Si el análisis fue detenido, retornar los parámetros originales
-    if analisis_detenido:
-        return params_optimos
+    # Verificar si el usuario detuvo el análisis - retornar valor alto para terminar rápido
+    if tarea.cancelada():
+        return float('inf')
 
-    # Evaluar el resultado óptimo original
-    compra_orig = params_optimos[0]
-    COMPRA_MULTIPLE_ACCIONES = int(round(params_optimos[3])) if params_optimos[3] > 1.5 else None
-    VENTA_MULTIPLE_ACCIONES = int(round(params_optimos[4])) if params_optimos[4] > 1.5 else None
+    scipy_evaluaciones += 1
 
-    entry_compra.delete(0, tk.END)
-    entry_compra.insert(0, f"{params_optimos[0]:.1f}")
-    entry_venta.delete(0, tk.END)
-    entry_venta.insert(0, f"{params_optimos[1]:.1f}")
-    entry_ganancia_minima.delete(0, tk.END)
-    entry_ganancia_minima.insert(0, f"{params_optimos[2]:.1f}")
+    if scipy_evaluaciones % 5 == 0:
+        porcentaje = (scipy_evaluaciones / scipy_evaluaciones_max) * 100
+        texto = None
 
-    df_orig, rent_orig, margen_orig, _, _ = ejecutar_analisis_con_umbral(compra_orig / 100, csv_filtrado)
+        tiempo_transcurrido = time.time() - scipy_inicio_tiempo
+        if scipy_evaluaciones > 10:
+            tiempo_por_eval = tiempo_transcurrido / scipy_evaluaciones
+            evals_restantes = scipy_evaluaciones_max - scipy_evaluaciones
+            tiempo_restante = tiempo_por_eval * evals_restantes * 0.95
 
-    if df_orig is None:
-        return params_optimos  # Si falla, retornar los originales
+            mins_restantes = int(tiempo_restante // 60)
+            segs_restantes = int(tiempo_restante % 60)
 
-    # Determinar métrica a usar
-    usar_margen = (OBJETIVO_ACTUAL == "margen_prom")
-    metrica_optima = margen_orig if usar_margen else rent_orig
-    umbral_metrica = metrica_optima * umbral_similitud
+            texto = (f"Progreso: {scipy_evaluaciones}/{scipy_evaluaciones_max} ({porcentaje:.1f}%) - "
+                     f"Tiempo estimado restante: {mins_restantes}m {segs_restantes}s")
 
-    # Generar muestras alrededor del óptimo (±10% de cada parámetro)
-    np.random.seed(42)  # Semilla fija para reproducibilidad
+        tarea.avisar(porcentaje, texto)
 
-    params_similares = [list(params_optimos)]  # Incluir el óptimo original
+    return funcion_objetivo(params, serie, base, OBJETIVO_ACTUAL)
 
-    for _ in range(n_muestras):
-        # Verificar si el análisis fue detenido
-        if analisis_detenido:
-            break
 
-        params_muestra = []
-        for i, (p, (b_min, b_max)) in enumerate(zip(params_optimos, bounds)):
-            # Calcular rango de variación (±10% del valor o ±10% del rango total)
-            rango = max(abs(p) * 0.1, (b_max - b_min) * 0.05)
+def mostrar_progreso(valor, texto=None):
+    """Actualiza la barra y el texto de progreso (en el hilo de Tk); None deja el valor actual"""
+    if valor is not None:
+        ventana.progress_bar['value'] = min(valor, 100)
+    if texto is not None:
+        ventana.label_progreso.config(text=texto)
 
-            # Para parámetros enteros (compra_mult, venta_mult)
-            if i >= 3:
-                nuevo_val = p + np.random.uniform(-1, 1)
-                nuevo_val = max(b_min, min(b_max, nuevo_val))
-            else:
-                nuevo_val = p + np.random.uniform(-rango, rango)
-                nuevo_val = max(b_min, min(b_max, nuevo_val))
 
-            params_muestra.append(nuevo_val)
+# =========================
+# Función para optimizar un período específico
+# =========================
+def bounds_desde_interfaz():
+    """
+    Límites del optimizador [compra, venta, ganancia, compra_mult, venta_mult]:
+    rango de búsqueda para los parámetros con check activo, valor fijo de la
+    interfaz para el resto.
+    """
+    bounds = []
 
-        # Evaluar esta muestra
-        COMPRA_MULTIPLE_ACCIONES = int(round(params_muestra[3])) if params_muestra[3] > 1.5 else None
-        VENTA_MULTIPLE_ACCIONES = int(round(params_muestra[4])) if params_muestra[4] > 1.5 else None
+    if auto_compra_var.get() == 1:
+        bounds.append(RANGOS_BUSQUEDA[0])
+    else:
+        try:
+            val = float(entry_compra.get().replace(",", "."))
+            bounds.append((val, val))
+        except:
+            bounds.append((-1.6, -1.6))
 
-        entry_compra.delete(0, tk.END)
-        entry_compra.insert(0, f"{params_muestra[0]:.1f}")
-        entry_venta.delete(0, tk.END)
-        entry_venta.insert(0, f"{params_muestra[1]:.1f}")
-        entry_ganancia_minima.delete(0, tk.END)
-        entry_ganancia_minima.insert(0, f"{params_muestra[2]:.1f}")
+    if auto_venta_var.get() == 1:
+        bounds.append(RANGOS_BUSQUEDA[1])
+    else:
+        try:
+            val = float(entry_venta.get().replace(",", "."))
+            bounds.append((val, val))
+        except:
+            bounds.append((1.6, 1.6))
 
+    if auto_ganancia_var.get() == 1:
+        bounds.append(RANGOS_BUSQUEDA[2])
+    else:
         try:
-            df_test, rent_test, margen_test, _, _ = ejecutar_analisis_con_umbral(params_muestra[0] / 100, csv_filtrado)
+            val = float(entry_ganancia_minima.get().replace(",", "."))
+            bounds.append((val, val))
+        except:
+            bounds.append((0.0, 0.0))
 
-            if df_test is not None:
-                metrica_test = margen_test if usar_margen else rent_test
+    if auto_compra_mult_var.get() == 1:
+        bounds.append(RANGOS_BUSQUEDA[3])
+    else:
+        val_cm = entry_compra_multiple.get().strip()
+        if val_cm == "":
+            bounds.append((0, 0))
+        else:
+            try:
+                val = int(val_cm)
+                bounds.append((val, val))
+            except:
+                bounds.append((0, 0))
 
-                # Si el resultado es similar al óptimo, guardar estos parámetros
-                if metrica_test >= umbral_metrica:
-                    params_similares.append(params_muestra)
-        except:
-            continue
+    if auto_venta_mult_var.get() == 1:
+        bounds.append(RANGOS_BUSQUEDA[4])
+    else:
+        val_vm = entry_venta_multiple.get().strip()
+        if val_vm == "":
+            bounds.append((0, 0))
+        else:
+            try:
+                val = int(val_vm)
+                bounds.append((val, val))
+            except:
+                bounds.append((0, 0))
 
-    # Calcular promedio de todos los parámetros similares
-    if len(params_similares) > 1:
-        params_promedio = []
-        for i in range(5):
-            valores = [p[i] for p in params_similares]
-            promedio = sum(valores) / len(valores)
+    return bounds
 
-            # Redondear parámetros enteros
-            if i >= 3:
-                promedio = round(promedio)
 
-            params_promedio.append(promedio)
+def aplicar_parametros_en_interfaz(compra, venta, ganancia, compra_mult, venta_mult):
+    """Escribe los parámetros óptimos en los campos de la interfaz y en los globales de múltiplos"""
+    global COMPRA_MULTIPLE_ACCIONES, VENTA_MULTIPLE_ACCIONES
 
-        print(f"  → Refinamiento: {len(params_similares)} configuraciones similares encontradas")
-        print(f"  → Parámetros promediados: Compra={params_promedio[0]:.2f}%, Venta={params_promedio[1]:.2f}%")
+    entry_compra.delete(0, tk.END)
+    entry_compra.insert(0, f"{compra:.1f}")
 
-        return params_promedio
-    else:
-        print(f"  → Refinamiento: Solo el óptimo original cumple el umbral")
-        return params_optimos
+    entry_venta.delete(0, tk.END)
+    entry_venta.insert(0, f"{venta:.1f}")
 
-
-# =========================
-# Función objetivo para optimización con SciPy
-# =========================
-def funcion_objetivo_scipy(params, csv_filtrado=None):
-    global COMPRA_MULTIPLE_ACCIONES, VENTA_MULTIPLE_ACCIONES
-    global scipy_evaluaciones, scipy_evaluaciones_max, scipy_inicio_tiempo
-    global analisis_detenido
-
-    # Verificar si el usuario detuvo el análisis - retornar valor alto para terminar rápido
-    if analisis_detenido:
-        return float('inf')
-
-    scipy_evaluaciones += 1
-
-    compra_pct = params[0]
-    venta_pct = params[1]
-    ganancia_min = params[2]
-    compra_mult = int(round(params[3])) if params[3] > 1.5 else None
-    venta_mult = int(round(params[4])) if params[4] > 1.5 else None
-
-    entry_compra.delete(0, tk.END)
-    entry_compra.insert(0, f"{compra_pct:.1f}")
-
-    entry_venta.delete(0, tk.END)
-    entry_venta.insert(0, f"{venta_pct:.1f}")
-
-    entry_ganancia_minima.delete(0, tk.END)
-    entry_ganancia_minima.insert(0, f"{ganancia_min:.1f}")
+    entry_ganancia_minima.delete(0, tk.END)
+    entry_ganancia_minima.insert(0, f"{ganancia:.1f}")
 
     if compra_mult is None:
         entry_compra_multiple.delete(0, tk.END)
+        COMPRA_MULTIPLE_ACCIONES = None
     else:
         entry_compra_multiple.delete(0, tk.END)
         entry_compra_multiple.insert(0, str(compra_mult))
+        COMPRA_MULTIPLE_ACCIONES = compra_mult
 
     if venta_mult is None:
         entry_venta_multiple.delete(0, tk.END)
+        VENTA_MULTIPLE_ACCIONES = None
     else:
         entry_venta_multiple.delete(0, tk.END)
         entry_venta_multiple.insert(0, str(venta_mult))
+        VENTA_MULTIPLE_ACCIONES = venta_mult
 
-    COMPRA_MULTIPLE_ACCIONES = compra_mult
-    VENTA_MULTIPLE_ACCIONES = venta_mult
-
-    if scipy_evaluaciones % 5 == 0:
-        porcentaje = (scipy_evaluaciones / scipy_evaluaciones_max) * 100
-        ventana.progress_bar['value'] = porcentaje
 
-        tiempo_transcurrido = time.time() - scipy_inicio_tiempo
-        if scipy_evaluaciones > 10:
-            tiempo_por_eval = tiempo_transcurrido / scipy_evaluaciones
-            evals_restantes = scipy_evaluaciones_max - scipy_evaluaciones
-            tiempo_restante = tiempo_por_eval * evals_restantes * 0.95
-
-            mins_restantes = int(tiempo_restante // 60)
-            segs_restantes = int(tiempo_restante % 60)
-
-            ventana.label_progreso.config(
-                text=f"Progreso: {scipy_evaluaciones}/{scipy_evaluaciones_max} ({porcentaje:.1f}%) - "
-                     f"Tiempo estimado restante: {mins_restantes}m {segs_restantes}s"
-            )
+def configuracion_desde_interfaz():
+    """
+    Lee de la interfaz todo lo que necesita el análisis. Se llama en el hilo
+    de Tk antes de lanzarlo: el hilo del análisis no toca widgets ni variables
+    de Tk. Devuelve None si hay valores inválidos.
+    """
+    # Parámetros base (suave, límite y valores fijos) leídos una sola vez
+    base = parametros_desde_interfaz()
+    if base is None:
+        return None
 
-        ventana.update()
-        time.sleep(0.001)
+    # Determinar si hay optimización activa
+    usar_scipy = (usar_scipy_var.get() == 1)
+    hay_optimizacion = (auto_compra_var.get() == 1 or auto_venta_var.get() == 1 or
+                        auto_ganancia_var.get() == 1 or auto_compra_mult_var.get() == 1 or
+                        auto_venta_mult_var.get() == 1)
 
     try:
-        df, rent_tmp, margen_tmp, _, _ = ejecutar_analisis_con_umbral(compra_pct / 100, csv_filtrado)
-
-        if df is None:
-            return 999999
-
-        usar_margen = (OBJETIVO_ACTUAL == "margen_prom")
-        if usar_margen:
-            metrica = margen_tmp
-        else:
-            metrica = rent_tmp
+        procesos = max(1, int(procesos_var.get()))
+    except (tk.TclError, ValueError):
+        procesos = 1
+
+    return {
+        "base": base,
+        "usar_scipy": usar_scipy,
+        "hay_optimizacion": hay_optimizacion,
+        "bounds": bounds_desde_interfaz() if (usar_scipy and hay_optimizacion) else None,
+        "procesos": procesos,
+        "lote": lote_var.get() == 1,
+        "limite_tipo": LIMITE_TIPO,
+        "limite_valor": LIMITE_VALOR,
+    }
 
-        return -metrica
-    except:
-        return 999999
 
+def optimizar_periodo(nombre_periodo, dias, serie, config, tarea):
+    """
+    Ejecuta optimización para un período específico sobre la serie ya cargada.
 
-# =========================
-# Función para optimizar un período específico
-# =========================
-def optimizar_periodo(nombre_periodo, dias=None):
-    """Ejecuta optimización para un período específico"""
+    Corre en el hilo del análisis: la interfaz ya se leyó en `config` (ver
+    configuracion_desde_interfaz) y el progreso, los parámetros óptimos y la
+    detención pasan por `tarea` (tareas.Tarea).
+    """
     global scipy_evaluaciones, scipy_evaluaciones_max, scipy_inicio_tiempo
-    global COMPRA_MULTIPLE_ACCIONES, VENTA_MULTIPLE_ACCIONES
 
     print(f"\n{'=' * 60}")
     print(f"Optimizando período: {nombre_periodo}")
     print(f"{'=' * 60}")
 
-    # Filtrar datos si es necesario
+    # Filtrar datos si es necesario (sin releer el CSV)
     if dias is not None:
-        csv_filtrado = filtrar_ultimos_dias(INPUT_FILE, dias)
+        serie = filtrar_periodo(serie, dias)
     else:
-        csv_filtrado = None
         print(f"  → Analizando datos completos")
 
-    # Determinar si hay optimización activa
-    usar_scipy = (usar_scipy_var.get() == 1)
-    hay_optimizacion = (auto_compra_var.get() == 1 or auto_venta_var.get() == 1 or
-                        auto_ganancia_var.get() == 1 or auto_compra_mult_var.get() == 1 or
-                        auto_venta_mult_var.get() == 1)
+    base = config["base"]
 
     mejor_df = None
     mejor_compra = None
@@ -2927,64 +2368,8 @@ def optimizar_periodo(nombre_periodo, dias=None):
     # ===============================================================
     # OPTIMIZACIÓN CON SCIPY
     # ===============================================================
-    if usar_scipy and hay_optimizacion:
-        bounds = []
-
-        if auto_compra_var.get() == 1:
-            bounds.append((-3.0, 0.0))
-        else:
-            try:
-                val = float(entry_compra.get().replace(",", "."))
-                bounds.append((val, val))
-            except:
-                bounds.append((-1.6, -1.6))
-
-        if auto_venta_var.get() == 1:
-            bounds.append((0.0, 3.0))
-        else:
-            try:
-                val = float(entry_venta.get().replace(",", "."))
-                bounds.append((val, val))
-            except:
-                bounds.append((1.6, 1.6))
-
-        if auto_ganancia_var.get() == 1:
-            bounds.append((1.5, 5.0))
-        else:
-            try:
-                val = float(entry_ganancia_minima.get().replace(",", "."))
-                bounds.append((val, val))
-            except:
-                bounds.append((0.0, 0.0))
-
-        if auto_compra_mult_var.get() == 1:
-            bounds.append((0, 5))
-        else:
-            val_cm = entry_compra_multiple.get().strip()
-            if val_cm == "":
-                bounds.append((0, 0))
-            else:
-                try:
-                    val = int(val_cm)
-                    bounds.append((val, val))
-                except:
-                    bounds.append((0, 0))
-
-        if auto_venta_mult_var.get() == 1:
-            bounds.append((0, 5))
-        else:
-            val_vm = entry_venta_multiple.get().strip()
-            if val_vm == "":
-                bounds.append((0, 0))
-            else:
-                try:
-                    val = int(val_vm)
-                    bounds.append((val, val))
-                except:
-                    bounds.append((0, 0))
-
-        ventana.progress_bar.grid(row=0, column=0, columnspan=2, sticky="we", pady=2)
-        ventana.label_progreso.grid(row=1, column=0, columnspan=2, sticky="w")
+    if config["usar_scipy"] and config["hay_optimizacion"]:
+        bounds = config["bounds"]
 
         # Calcular progreso base (porcentaje de combinaciones completadas)
         if progreso_total_combinaciones > 0:
@@ -2994,23 +2379,20 @@ def optimizar_periodo(nombre_periodo, dias=None):
             progreso_base = 0
             progreso_slice = 100
 
-        ventana.progress_bar['value'] = progreso_base
-
         periodo_legible = nombre_periodo.replace("_", " ").title().replace("6 Meses", "6M").replace("3 Meses", "3M")
         obj_texto = "Rent" if OBJETIVO_ACTUAL == "rentabilidad" else "Marg"
-        ventana.label_progreso.config(
-            text=f"Optimizando {progreso_combinacion_actual}/{progreso_total_combinaciones}: {periodo_legible} - {obj_texto}..."
-        )
+        tarea.avisar(progreso_base,
+                     f"Optimizando {progreso_combinacion_actual}/{progreso_total_combinaciones}: "
+                     f"{periodo_legible} - {obj_texto}...")
 
-        maxiter = 100
-        popsize = 15
+        maxiter = CONFIG_DE["maxiter"]
+        popsize = CONFIG_DE["popsize"]
         scipy_evaluaciones_max = maxiter * popsize
         scipy_evaluaciones = 0
         scipy_inicio_tiempo = time.time()
+        CACHE_EVALUACIONES.reiniciar_contadores()
 
-        ventana.update()
-
-        # Callback para actualizar progreso y permitir detención
+        # Callback para informar progreso y permitir detención
         def callback_progreso(xk, convergence):
             global scipy_evaluaciones
             scipy_evaluaciones += 1
@@ -3021,53 +2403,72 @@ def optimizar_periodo(nombre_periodo, dias=None):
             else:
                 progreso_local = 0
 
-            progreso_total = progreso_base + progreso_local
-            ventana.progress_bar['value'] = min(progreso_total, 100)
-            ventana.update()
-
-            return analisis_detenido  # Retornar True detiene la optimización
-
-        resultado = differential_evolution(
-            lambda params: funcion_objetivo_scipy(params, csv_filtrado),
-            bounds,
-            strategy='best1bin',
-            maxiter=maxiter,
-            popsize=popsize,
-            tol=0.01,
-            mutation=(0.5, 1),
-            recombination=0.7,
-            seed=42,  # Semilla fija para resultados reproducibles
-            callback=callback_progreso,
-            disp=False,
-            polish=False,  # Desactivar polish para permitir detención limpia
-            init='latinhypercube',
-            atol=0,
-            updating='immediate',
-            workers=1
-        )
+            tarea.avisar(progreso_base + progreso_local)
 
-        ventana.progress_bar.grid_forget()
-        ventana.label_progreso.grid_forget()
+            return tarea.cancelada()  # Retornar True detiene la optimización
+
+        # Callback por generación del modo paralelo (las evaluaciones corren en los workers)
+        def callback_generacion(xk, convergence):
+            global scipy_evaluaciones
+            scipy_evaluaciones += 1
+
+            progreso_local = min(scipy_evaluaciones / maxiter, 1) * progreso_slice
+
+            tiempo_por_generacion = (time.time() - scipy_inicio_tiempo) / scipy_evaluaciones
+            tiempo_restante = tiempo_por_generacion * max(0, maxiter - scipy_evaluaciones)
+            tarea.avisar(progreso_base + progreso_local,
+                         f"Generación {scipy_evaluaciones}/{maxiter} ({modo_texto}) - "
+                         f"Tiempo estimado restante: {formatear_tiempo(tiempo_restante)}")
+
+            return tarea.cancelada()  # Retornar True detiene la optimización
+
+        procesos = config["procesos"]
+
+        if procesos > 1:
+            modo_texto = f"{procesos} procesos"
+            print(f"  → Optimización paralela con {procesos} procesos")
+            resultado = optimizar_paralelo(
+                serie, bounds, base, OBJETIVO_ACTUAL, procesos,
+                callback=callback_generacion
+            )
+        elif config["lote"]:
+            modo_texto = "lote"
+            print(f"  → Optimización por lotes (generación completa vectorizada)")
+            resultado = optimizar_lote(
+                serie, bounds, base, OBJETIVO_ACTUAL,
+                callback=callback_generacion
+            )
+        else:
+            resultado = differential_evolution(
+                lambda params: funcion_objetivo_scipy(params, serie, base, tarea),
+                bounds,
+                callback=callback_progreso,
+                updating='immediate',
+                workers=1,
+                **CONFIG_DE
+            )
 
         # Verificar si el usuario detuvo el análisis
-        if analisis_detenido:
+        if tarea.cancelada():
             return None
 
         # Refinar el óptimo encontrado (encontrar centro del rango)
         print(f"\n  → Refinando parámetros óptimos...")
-        ventana.label_progreso.config(text="Refinando parámetros óptimos...")
-        ventana.label_progreso.grid(row=1, column=0, columnspan=2, sticky="w")
-        ventana.update()
+        tarea.avisar(None, "Refinando parámetros óptimos...")
 
         params_refinados = refinar_optimo(
             params_optimos=list(resultado.x),
             bounds=bounds,
-            csv_filtrado=csv_filtrado,
+            serie=serie,
+            base=base,
+            objetivo=OBJETIVO_ACTUAL,
             n_muestras=30,
-            umbral_similitud=0.95
+            umbral_similitud=0.95,
+            detenido=tarea.cancelada
         )
 
-        ventana.label_progreso.grid_forget()
+        # En modo paralelo los workers tienen su propia caché: aquí solo cuenta el refinamiento
+        print(f"[INFO] Caché de evaluaciones ({nombre_periodo}/{OBJETIVO_ACTUAL}): {CACHE_EVALUACIONES.resumen()}")
 
         mejor_compra = params_refinados[0]
         mejor_venta = params_refinados[1]
@@ -3075,32 +2476,11 @@ def optimizar_periodo(nombre_periodo, dias=None):
         mejor_compra_mult = int(round(params_refinados[3])) if params_refinados[3] > 1.5 else None
         mejor_venta_mult = int(round(params_refinados[4])) if params_refinados[4] > 1.5 else None
 
-        entry_compra.delete(0, tk.END)
-        entry_compra.insert(0, f"{mejor_compra:.1f}")
-
-        entry_venta.delete(0, tk.END)
-        entry_venta.insert(0, f"{mejor_venta:.1f}")
-
-        entry_ganancia_minima.delete(0, tk.END)
-        entry_ganancia_minima.insert(0, f"{mejor_ganancia:.1f}")
-
-        if mejor_compra_mult is None:
-            entry_compra_multiple.delete(0, tk.END)
-            COMPRA_MULTIPLE_ACCIONES = None
-        else:
-            entry_compra_multiple.delete(0, tk.END)
-            entry_compra_multiple.insert(0, str(mejor_compra_mult))
-            COMPRA_MULTIPLE_ACCIONES = mejor_compra_mult
-
-        if mejor_venta_mult is None:
-            entry_venta_multiple.delete(0, tk.END)
-            VENTA_MULTIPLE_ACCIONES = None
-        else:
-            entry_venta_multiple.delete(0, tk.END)
-            entry_venta_multiple.insert(0, str(mejor_venta_mult))
-            VENTA_MULTIPLE_ACCIONES = mejor_venta_mult
+        tarea.en_interfaz(aplicar_parametros_en_interfaz, mejor_compra, mejor_venta, mejor_ganancia,
+                          mejor_compra_mult, mejor_venta_mult)
 
-        mejor_df, _, _, fecha_inicial, fecha_final = ejecutar_analisis_con_umbral(mejor_compra / 100, csv_filtrado)
+        params_finales = ParametrosAnalisis.desde_vector(params_refinados, base)
+        mejor_df, _, _, fecha_inicial, fecha_final = ejecutar_analisis_con_umbral(params_finales, serie, tarea=tarea)
 
     # ===============================================================
     # SIN SCIPY (bucles anidados o ejecución directa)
@@ -3108,84 +2488,18 @@ def optimizar_periodo(nombre_periodo, dias=None):
     else:
         # Aquí iría el código de optimización sin SciPy (bucles anidados)
         # Por brevedad, ejecuto directamente con los valores actuales
-        try:
-            compra_val = float(entry_compra.get().replace(",", ".")) / 100
-        except:
-            compra_val = -0.016
-
-        mejor_df, _, _, fecha_inicial, fecha_final = ejecutar_analisis_con_umbral(compra_val, csv_filtrado)
-        mejor_compra = compra_val * 100
-        mejor_venta = float(entry_venta.get().replace(",", "."))
-        mejor_ganancia = float(entry_ganancia_minima.get().replace(",", "."))
-        mejor_compra_mult = COMPRA_MULTIPLE_ACCIONES
-        mejor_venta_mult = VENTA_MULTIPLE_ACCIONES
+        mejor_df, _, _, fecha_inicial, fecha_final = ejecutar_analisis_con_umbral(base, serie, tarea=tarea)
+        mejor_compra = base.compra_pct
+        mejor_venta = base.venta_pct
+        mejor_ganancia = base.ganancia_minima_pct
+        mejor_compra_mult = base.compra_multiple
+        mejor_venta_mult = base.venta_multiple
 
     if mejor_df is None:
         return None
 
     # Calcular estadísticas completas del análisis
-    def float_col(col_name):
-        return mejor_df[col_name].astype(str).str.rstrip('%').str.replace(',', '.').astype(float)
-
-    # Calcular % acumulado y promedios de máximos/mínimos
-    acumulado_float = float_col('% acumulado') * 100.0
-
-    # Promedio de máximos (secuencias positivas)
-    valores_seleccionados = []
-    secuencia = []
-    for v in acumulado_float:
-        if v > 0:
-            secuencia.append(v)
-        else:
-            if len(secuencia) >= 2:
-                valores_seleccionados.append(secuencia[-1])
-            secuencia = []
-    if len(secuencia) >= 2:
-        valores_seleccionados.append(secuencia[-1])
-    promedio_maximos = sum(valores_seleccionados) / len(valores_seleccionados) if valores_seleccionados else 0.0
-
-    # Promedio de mínimos (secuencias negativas)
-    valores_minimos = []
-    secuencia_neg = []
-    for v in acumulado_float:
-        if v < 0:
-            secuencia_neg.append(v)
-        else:
-            if len(secuencia_neg) >= 2:
-                valores_minimos.append(secuencia_neg[-1])
-            secuencia_neg = []
-    if len(secuencia_neg) >= 2:
-        valores_minimos.append(secuencia_neg[-1])
-    promedio_minimos = sum(valores_minimos) / len(valores_minimos) if valores_minimos else 0.0
-
-    # Estadísticas de % variación
-    max_var = float_col('% var.').max()
-    min_var = float_col('% var.').min()
-    fecha_max_var = mejor_df.loc[float_col('% var.').idxmax(), 'Fecha']
-    fecha_min_var = mejor_df.loc[float_col('% var.').idxmin(), 'Fecha']
-    dif_var = max_var - min_var
-
-    prom_var = float_col('% var.')
-    subidas = prom_var[prom_var > 0]
-    max_prom = subidas.mean() if not subidas.empty else 0
-    bajadas = prom_var[prom_var < 0]
-    min_prom = bajadas.mean() if not bajadas.empty else 0
-    dif_prom = max_prom - min_prom
-
-    # Estadísticas de operaciones
-    opc_compra = int((mejor_df["Opción"] == "Compra").sum())
-    acciones_compradas = int(mejor_df.loc[mejor_df["Movimiento de acciones"] > 0, "Movimiento de acciones"].sum())
-    opc_venta = int((mejor_df["Opción"] == "Venta").sum())
-    acciones_vendidas = int(-mejor_df.loc[mejor_df["Movimiento de acciones"] < 0, "Movimiento de acciones"].sum())
-    max_acc_cartera = int(mejor_df["Acciones en cartera"].max())
-
-    # Estadísticas financieras
-    max_aporte = float(mejor_df["Aporte acumulado"].max())
-    max_margen = float(round(mejor_df["Margen"].max(), 2))
-    margen_promedio = float(round(mejor_df["Margen"].mean(), 2))
-    max_rentab = float(float_col("Rentabilidad").max())
-    rentab_promedio = float(float_col("Rentabilidad").mean())
-    fecha_max_rentab = mejor_df.loc[float_col("Rentabilidad").idxmax(), "Fecha"]
+    estadisticas = calcular_estadisticas(mejor_df, serie.perfil_rachas)
 
     # Preparar resultado con todas las estadísticas
     resultado = {
@@ -3193,57 +2507,234 @@ def optimizar_periodo(nombre_periodo, dias=None):
         "compra_pct": mejor_compra,
         "venta_pct": mejor_venta,
         "ganancia_min": mejor_ganancia,
-        "suave_pct": float(entry_suave.get().replace(",", ".")),
-        "limite_tipo": tipo_limite_var.get(),
-        "limite_valor": float(entry_limite.get().replace(",", ".")),
+        "suave_pct": base.suave_pct,
+        "limite_tipo": config["limite_tipo"],
+        "limite_valor": config["limite_valor"],
         "compra_mult": mejor_compra_mult,
         "venta_mult": mejor_venta_mult,
-        "rentabilidad_max": max_rentab,
-        "margen_promedio": margen_promedio,
         "fecha_inicial": fecha_inicial,
         "fecha_final": fecha_final,
-        # Nuevos campos de estadísticas
-        "promedio_maximos": promedio_maximos,
-        "promedio_minimos": promedio_minimos,
-        "max_var": max_var,
-        "min_var": min_var,
-        "fecha_max_var": fecha_max_var,
-        "fecha_min_var": fecha_min_var,
-        "dif_var": dif_var,
-        "max_prom_var": max_prom,
-        "min_prom_var": min_prom,
-        "dif_prom_var": dif_prom,
-        "opc_compra": opc_compra,
-        "acciones_compradas": acciones_compradas,
-        "opc_venta": opc_venta,
-        "acciones_vendidas": acciones_vendidas,
-        "max_acc_cartera": max_acc_cartera,
-        "max_aporte": max_aporte,
-        "max_margen": max_margen,
-        "rentab_promedio": rentab_promedio,
-        "fecha_max_rentab": fecha_max_rentab
     }
+    resultado.update(estadisticas)
 
     return resultado
 
 
+def analizar_combinaciones_en_paralelo(serie, combinaciones, config, clave_config,
+                                       resultados_por_periodo, tarea, tiempo_estimado_total=None):
+    """
+    Ejecuta las combinaciones (período, días, objetivo) en un pool de procesos.
+
+    Cada resultado se agrega a resultados_por_periodo y se muestra en cuanto
+    termina; el tiempo de cada combinación se registra en el historial de
+    tiempos. Al final los resultados quedan en el mismo orden que en la
+    ejecución secuencial y la interfaz muestra los parámetros de la última
+    combinación, igual que antes. Corre en el hilo del análisis (todo lo que
+    se muestra pasa por `tarea`).
+    """
+    base = config["base"]
+    bounds = config["bounds"]
+    procesos = config["procesos"]
+
+    total = len(combinaciones)
+    completadas = 0
+    inicio = time.time()
+
+    print(f"[INFO] Planificador: {total} combinaciones en {min(procesos, total)} procesos")
+    tarea.avisar(0, f"Analizando en paralelo 0/{total} ({procesos} procesos)...")
+
+    for nombre_periodo, objetivo, resultado, segundos in ejecutar_combinaciones(
+            serie, combinaciones, bounds, base, procesos,
+            detenido=tarea.cancelada):
+        completadas += 1
+        objetivo_texto = "Rentabilidad" if objetivo == "rentabilidad" else "Margen Prom"
+        periodo_legible = nombre_periodo.replace("_", " ").title().replace("6 Meses", "6M").replace("3 Meses", "3M")
+
+        if resultado is None:
+            tarea.en_interfaz(messagebox.showerror, "Error", f"No se pudo optimizar: {nombre_periodo}/{objetivo_texto}")
+            continue
+
+        progreso_tiempos_combinaciones.append(segundos)
+        registrar_tiempo_combinacion(clave_config, segundos)
+        print(f"[INFO] Combinación {completadas}/{total} completada: {periodo_legible} - {objetivo_texto} "
+              f"({formatear_tiempo(segundos)})")
+
+        clave_resultado = f"{nombre_periodo}_{objetivo}"
+        resultados_por_periodo[clave_resultado] = resultado
+        tarea.en_interfaz(mostrar_resultados_multiples_periodos, dict(resultados_por_periodo), False)
+
+        # Tiempo restante: historial si existe, si no el ritmo observado en esta sesión
+        transcurrido = time.time() - inicio
+        if tiempo_estimado_total:
+            tiempo_restante = max(0, tiempo_estimado_total - transcurrido)
+        else:
+            tiempo_restante = transcurrido / completadas * (total - completadas)
+        texto_tiempo = f" | Restante: ~{formatear_tiempo(tiempo_restante)}" if completadas < total else ""
+
+        tarea.avisar(completadas / total * 100,
+                     f"Completadas {completadas}/{total}: {periodo_legible} - {objetivo_texto}{texto_tiempo}")
+
+    # Mismo orden que la ejecución secuencial (objetivo y luego período)
+    claves = [f"{nombre_periodo}_{objetivo}" for nombre_periodo, _, objetivo in combinaciones]
+    ordenados = {clave: resultados_por_periodo[clave] for clave in claves if clave in resultados_por_periodo}
+    resultados_por_periodo.clear()
+    resultados_por_periodo.update(ordenados)
+
+    if ordenados and not tarea.cancelada():
+        ultimo = list(ordenados.values())[-1]
+        tarea.en_interfaz(aplicar_parametros_en_interfaz, ultimo["compra_pct"], ultimo["venta_pct"],
+                          ultimo["ganancia_min"], ultimo["compra_mult"], ultimo["venta_mult"])
+        tarea.en_interfaz(mostrar_fechas_multiples, ultimo["df"], ParametrosAnalisis(
+            compra_pct=ultimo["compra_pct"],
+            venta_pct=ultimo["venta_pct"],
+            ganancia_minima_pct=ultimo["ganancia_min"],
+            suave_pct=ultimo["suave_pct"],
+            compra_multiple=ultimo["compra_mult"],
+            venta_multiple=ultimo["venta_mult"]
+        ))
+
+
+def analizar_combinaciones(ruta_csv, periodos_a_analizar, objetivos_a_analizar, config, checks_activos, tarea):
+    """
+    Todo el análisis de iniciar_proceso que no es interfaz: lee el CSV y
+    optimiza cada combinación de período y objetivo. Corre en el hilo del
+    análisis; devuelve {clave "periodo_objetivo": resultado}.
+    """
+    global OBJETIVO_ACTUAL
+    global progreso_combinacion_actual, progreso_total_combinaciones
+    global progreso_tiempo_inicio_total, progreso_tiempos_combinaciones
+
+    # Leer y parsear el CSV una sola vez para todo el análisis
+    tarea.avisar(0, "Leyendo CSV...")
+    try:
+        serie_completa = cargar_serie_csv(ruta_csv)
+    except Exception as e:
+        raise ValueError(f"Error al leer CSV: {e}") from e
+
+    num_filas = len(serie_completa)
+
+    clave_config = obtener_clave_configuracion(num_filas, checks_activos)
+    print(f"[DEBUG] Clave configuración: {clave_config} ({num_filas} filas)")
+
+    # Analizar cada combinación de período y objetivo
+    resultados_por_periodo = {}
+    total_combinaciones = len(periodos_a_analizar) * len(objetivos_a_analizar)
+    combinacion_actual = 0
+
+    # Variables de progreso global
+    progreso_combinacion_actual = 0
+    progreso_total_combinaciones = total_combinaciones
+    progreso_tiempo_inicio_total = time.time()
+    progreso_tiempos_combinaciones = []
+
+    # Con varios procesos y varias combinaciones, cada combinación corre completa en su proceso
+    procesos = config["procesos"]
+    usar_planificador = procesos > 1 and total_combinaciones > 1
+
+    # Estimar tiempo total si hay historial
+    tiempo_estimado_total, hay_historial = estimar_tiempo_total(clave_config, total_combinaciones)
+
+    if hay_historial and usar_planificador:
+        tandas = -(-total_combinaciones // procesos)
+        tiempo_estimado_total = tiempo_estimado_total * tandas / total_combinaciones
+
+    if hay_historial:
+        print(f"[INFO] Tiempo estimado total: {formatear_tiempo(tiempo_estimado_total)}")
+
+    if usar_planificador:
+        combinaciones = [(nombre_periodo, dias, objetivo)
+                         for objetivo in objetivos_a_analizar
+                         for nombre_periodo, dias in periodos_a_analizar]
+        analizar_combinaciones_en_paralelo(serie_completa, combinaciones, config, clave_config,
+                                           resultados_por_periodo, tarea, tiempo_estimado_total)
+
+    else:
+        for objetivo in objetivos_a_analizar:
+            OBJETIVO_ACTUAL = objetivo
+            objetivo_texto = "Rentabilidad" if objetivo == "rentabilidad" else "Margen Prom"
+
+            for nombre_periodo, dias in periodos_a_analizar:
+                combinacion_actual += 1
+                progreso_combinacion_actual = combinacion_actual
+
+                # Verificar si el usuario detuvo el análisis
+                if tarea.cancelada():
+                    print(f"[DEBUG] Análisis detenido antes de procesar {nombre_periodo}/{objetivo}")
+                    break
+
+                # Calcular tiempo restante estimado
+                tiempo_transcurrido = time.time() - progreso_tiempo_inicio_total
+                if hay_historial and tiempo_estimado_total:
+                    tiempo_restante = max(0, tiempo_estimado_total - tiempo_transcurrido)
+                    texto_tiempo = f" | Restante: ~{formatear_tiempo(tiempo_restante)}"
+                elif len(progreso_tiempos_combinaciones) > 0:
+                    # Estimar basado en combinaciones ya completadas
+                    promedio_actual = sum(progreso_tiempos_combinaciones) / len(progreso_tiempos_combinaciones)
+                    combinaciones_restantes = total_combinaciones - combinacion_actual + 1
+                    tiempo_restante = promedio_actual * combinaciones_restantes
+                    texto_tiempo = f" | Restante: ~{formatear_tiempo(tiempo_restante)}"
+                else:
+                    texto_tiempo = ""
+
+                periodo_legible = nombre_periodo.replace("_", " ").title().replace("6 Meses", "6M").replace("3 Meses", "3M")
+                obj_corto = "Rent" if objetivo == "rentabilidad" else "Marg"
+
+                print(f"[INFO] Analizando {combinacion_actual}/{total_combinaciones}: {periodo_legible} - {obj_corto}{texto_tiempo}")
+
+                # Progreso en la interfaz: barra global (porcentaje de combinaciones)
+                progreso_global = ((combinacion_actual - 1) / total_combinaciones) * 100
+                tarea.avisar(progreso_global,
+                             f"Analizando {combinacion_actual}/{total_combinaciones}: {periodo_legible} - {objetivo_texto}{texto_tiempo}")
+
+                # Iniciar tiempo de esta combinación
+                tiempo_inicio_combinacion = time.time()
+
+                resultado = optimizar_periodo(nombre_periodo, dias, serie_completa, config, tarea)
+
+                # Registrar tiempo de esta combinación
+                tiempo_combinacion = time.time() - tiempo_inicio_combinacion
+                progreso_tiempos_combinaciones.append(tiempo_combinacion)
+
+                if resultado is None:
+                    if tarea.cancelada():
+                        # El usuario detuvo el análisis, salir del bucle
+                        break
+                    else:
+                        tarea.en_interfaz(messagebox.showerror, "Error",
+                                          f"No se pudo optimizar: {nombre_periodo}/{objetivo_texto}")
+                        continue
+
+                # Agregar el objetivo al resultado
+                resultado["objetivo"] = objetivo
+
+                # Guardar con clave que incluye período y objetivo
+                clave_resultado = f"{nombre_periodo}_{objetivo}"
+                resultados_por_periodo[clave_resultado] = resultado
+
+            if tarea.cancelada():
+                break
+
+    # Guardar tiempos en historial (promedio de esta sesión; el planificador registra cada combinación)
+    if progreso_tiempos_combinaciones and not tarea.cancelada() and not usar_planificador:
+        tiempo_promedio = sum(progreso_tiempos_combinaciones) / len(progreso_tiempos_combinaciones)
+        registrar_tiempo_combinacion(clave_config, tiempo_promedio)
+        print(f"[INFO] Tiempo promedio por combinación: {formatear_tiempo(tiempo_promedio)}")
+
+    return resultados_por_periodo
+
+
 # =========================
 # Función iniciar_proceso (principal)
 # =========================
 def iniciar_proceso():
-    global ultimo_df, ultima_ruta_excel, ultimo_folder, ultimo_base_name
+    global ultimo_df, ultima_ruta_excel
     global INPUT_FILE, FOLDER, LIMITE_TIPO, LIMITE_VALOR
     global VENTA_MULTIPLE_ACCIONES, COMPRA_MULTIPLE_ACCIONES
     global resultados_analisis_actuales, resultados_dfs_por_periodo
-    global analisis_detenido
-
-    # Resetear variable de detención
-    analisis_detenido = False
+    global tarea_analisis
 
-    # Configurar botones (deshabilitar Iniciar, habilitar Detener)
-    btn_iniciar_analisis.config(state="disabled")
-    btn_detener_analisis.config(state="normal")
-    ventana.update()
+    if en_curso(tarea_analisis):
+        return
 
     # Limpiar mensaje anterior de optimización
     ventana.label_resultado_opt.config(text="")
@@ -3316,6 +2807,16 @@ def iniciar_proceso():
     if analizar_3meses_var.get() == 1:
         periodos_a_analizar.append(("3_meses", 90))
 
+    # Períodos adicionales definidos por el usuario (días o rangos de fechas)
+    try:
+        for nombre_periodo, definicion in periodos_desde_texto(entry_otros_periodos.get()):
+            if nombre_periodo not in [nombre for nombre, _ in periodos_a_analizar]:
+                periodos_a_analizar.append((nombre_periodo, definicion))
+    except ValueError as e:
+        messagebox.showerror("Error", f"Período inválido en 'Otros': {e}\n\n"
+                                      "Usa días (30, 365) o rangos dd/mm/aaaa-dd/mm/aaaa separados por comas.")
+        return
+
     if not periodos_a_analizar:
         messagebox.showerror("Error", "Selecciona al menos un período para analizar")
         return
@@ -3327,22 +2828,10 @@ def iniciar_proceso():
         messagebox.showerror("Error", "Selecciona al menos un objetivo de optimización")
         return
 
-    # Variable global para que optimizar_periodo sepa qué objetivo usar
-    global OBJETIVO_ACTUAL
-    global progreso_combinacion_actual, progreso_total_combinaciones
-    global progreso_tiempo_inicio_total, progreso_tiempos_combinaciones
-
-    # =====================================================
-    # PROGRESO INTELIGENTE: Preparación
-    # =====================================================
-
-    # Contar filas del CSV
-    try:
-        df_temp = pd.read_csv(INPUT_FILE)
-        num_filas = len(df_temp)
-        del df_temp
-    except:
-        num_filas = 200  # Valor por defecto
+    # Todo lo que el análisis necesita de la interfaz se lee acá, en el hilo de Tk
+    config = configuracion_desde_interfaz()
+    if config is None:
+        return
 
     # Obtener configuración de checks activos
     checks_activos = {
@@ -3354,159 +2843,88 @@ def iniciar_proceso():
         'venta_mult': auto_venta_mult_var.get() == 1
     }
 
-    clave_config = obtener_clave_configuracion(num_filas, checks_activos)
-    print(f"[DEBUG] Clave configuración: {clave_config} ({num_filas} filas)")
-
-    # Analizar cada combinación de período y objetivo
-    resultados_por_periodo = {}
-    total_combinaciones = len(periodos_a_analizar) * len(objetivos_a_analizar)
-    combinacion_actual = 0
-
-    # Variables de progreso global
-    progreso_combinacion_actual = 0
-    progreso_total_combinaciones = total_combinaciones
-    progreso_tiempo_inicio_total = time.time()
-    progreso_tiempos_combinaciones = []
+    # Configurar botones (deshabilitar Iniciar, habilitar Detener)
+    btn_iniciar_analisis.config(state="disabled")
+    btn_detener_analisis.config(state="normal")
 
-    # Estimar tiempo total si hay historial
-    tiempo_estimado_total, hay_historial = estimar_tiempo_total(clave_config, total_combinaciones)
+    ventana.progress_bar['value'] = 0
+    ventana.progress_bar.grid(row=0, column=0, columnspan=2, sticky="we", pady=2)
+    ventana.label_progreso.config(text="Preparando análisis...")
+    ventana.label_progreso.grid(row=1, column=0, columnspan=2, sticky="w")
 
-    if hay_historial:
-        print(f"[INFO] Tiempo estimado total: {formatear_tiempo(tiempo_estimado_total)}")
+    def al_terminar(resultados_por_periodo, error):
+        global resultados_analisis_actuales, resultados_dfs_por_periodo
+        global ultimo_folder, ultimo_base_name
 
-    for objetivo in objetivos_a_analizar:
-        OBJETIVO_ACTUAL = objetivo
-        objetivo_texto = "Rentabilidad" if objetivo == "rentabilidad" else "Margen Prom"
+        # Ocultar barra de progreso y restaurar botones de análisis
+        ventana.progress_bar.grid_forget()
+        ventana.label_progreso.grid_forget()
+        btn_iniciar_analisis.config(state="normal")
+        btn_detener_analisis.config(state="disabled")
 
-        for nombre_periodo, dias in periodos_a_analizar:
-            combinacion_actual += 1
-            progreso_combinacion_actual = combinacion_actual
+        detenido = tarea_analisis.cancelada()
 
-            # Verificar si el usuario detuvo el análisis
-            if analisis_detenido:
-                print(f"[DEBUG] Análisis detenido antes de procesar {nombre_periodo}/{objetivo}")
-                break
+        if error is not None:
+            messagebox.showerror("Error", str(error))
+            return
 
-            # Calcular tiempo restante estimado
-            tiempo_transcurrido = time.time() - progreso_tiempo_inicio_total
-            if hay_historial and tiempo_estimado_total:
-                tiempo_restante = max(0, tiempo_estimado_total - tiempo_transcurrido)
-                texto_tiempo = f" | Restante: ~{formatear_tiempo(tiempo_restante)}"
-            elif len(progreso_tiempos_combinaciones) > 0:
-                # Estimar basado en combinaciones ya completadas
-                promedio_actual = sum(progreso_tiempos_combinaciones) / len(progreso_tiempos_combinaciones)
-                combinaciones_restantes = total_combinaciones - combinacion_actual + 1
-                tiempo_restante = promedio_actual * combinaciones_restantes
-                texto_tiempo = f" | Restante: ~{formatear_tiempo(tiempo_restante)}"
+        if not resultados_por_periodo:
+            if detenido:
+                ventana.label_resultado_opt.config(text=f"⚠ Análisis detenido por el usuario")
+                ventana.label_resultado_opt.config(fg="orange")
+                ventana.label_resultado_opt.grid(row=14, column=0, columnspan=3, sticky="w", padx=10, pady=5)
             else:
-                texto_tiempo = ""
-
-            periodo_legible = nombre_periodo.replace("_", " ").title().replace("6 Meses", "6M").replace("3 Meses", "3M")
-            obj_corto = "Rent" if objetivo == "rentabilidad" else "Marg"
-
-            print(f"[INFO] Analizando {combinacion_actual}/{total_combinaciones}: {periodo_legible} - {obj_corto}{texto_tiempo}")
-
-            # Mostrar progreso en la interfaz
-            ventana.label_progreso.config(
-                text=f"Analizando {combinacion_actual}/{total_combinaciones}: {periodo_legible} - {objetivo_texto}{texto_tiempo}"
-            )
-            ventana.label_progreso.grid(row=1, column=0, columnspan=2, sticky="w")
-
-            # Actualizar barra de progreso global (porcentaje de combinaciones)
-            progreso_global = ((combinacion_actual - 1) / total_combinaciones) * 100
-            ventana.progress_bar['value'] = progreso_global
-            ventana.progress_bar.grid(row=0, column=0, columnspan=2, sticky="we", pady=2)
-            ventana.update()
-
-            # Iniciar tiempo de esta combinación
-            tiempo_inicio_combinacion = time.time()
-
-            resultado = optimizar_periodo(nombre_periodo, dias)
-
-            # Registrar tiempo de esta combinación
-            tiempo_combinacion = time.time() - tiempo_inicio_combinacion
-            progreso_tiempos_combinaciones.append(tiempo_combinacion)
-
-            if resultado is None:
-                if analisis_detenido:
-                    # El usuario detuvo el análisis, salir del bucle
-                    break
-                else:
-                    messagebox.showerror("Error", f"No se pudo optimizar: {nombre_periodo}/{objetivo_texto}")
-                    continue
-
-            # Agregar el objetivo al resultado
-            resultado["objetivo"] = objetivo
+                messagebox.showerror("Error", "No se obtuvieron resultados válidos")
+            return
 
-            # Guardar con clave que incluye período y objetivo
-            clave_resultado = f"{nombre_periodo}_{objetivo}"
-            resultados_por_periodo[clave_resultado] = resultado
-            resultados_dfs_por_periodo[clave_resultado] = resultado["df"]
+        resultados_dfs_por_periodo = {clave: resultado["df"] for clave, resultado in resultados_por_periodo.items()}
 
-        if analisis_detenido:
-            break
+        # Guardar para JSON (con múltiples objetivos)
+        resultados_analisis_actuales = {
+            "ticker": base_name,
+            "objetivos_analizados": objetivos_a_analizar,
+            "periodos": resultados_por_periodo
+        }
 
-    # Guardar tiempos en historial (promedio de esta sesión)
-    if progreso_tiempos_combinaciones and not analisis_detenido:
-        tiempo_promedio = sum(progreso_tiempos_combinaciones) / len(progreso_tiempos_combinaciones)
-        registrar_tiempo_combinacion(clave_config, tiempo_promedio)
-        print(f"[INFO] Tiempo promedio por combinación: {formatear_tiempo(tiempo_promedio)}")
+        # Guardar variables globales
+        ultimo_folder = FOLDER
+        ultimo_base_name = base_name
 
-    # Ocultar barra de progreso y actualizar interfaz
-    ventana.progress_bar.grid_forget()
-    ventana.label_progreso.grid_forget()
-    ventana.update()
+        # Mostrar resultados en interfaz
+        mostrar_resultados_multiples_periodos(resultados_por_periodo)
 
-    if not resultados_por_periodo:
-        # Restaurar botones de análisis
-        btn_iniciar_analisis.config(state="normal")
-        btn_detener_analisis.config(state="disabled")
+        # Habilitar botones
+        btn_guardar_json.config(state="normal")
+        btn_generar_db_excel.config(state="normal", bg="#1E90FF", fg="black")  # REACTIVAR botón DB/Excel
 
-        if analisis_detenido:
+        # Mostrar mensaje de completado
+        if detenido:
             ventana.label_resultado_opt.config(text=f"⚠ Análisis detenido por el usuario")
             ventana.label_resultado_opt.config(fg="orange")
-            ventana.label_resultado_opt.grid(row=14, column=0, columnspan=3, sticky="w", padx=10, pady=5)
         else:
-            messagebox.showerror("Error", "No se obtuvieron resultados válidos")
-        return
+            ventana.label_resultado_opt.config(text=f"✓ Análisis completado para {len(periodos_a_analizar)} período(s)")
+            ventana.label_resultado_opt.config(fg="darkgreen")
+        ventana.label_resultado_opt.grid(row=14, column=0, columnspan=3, sticky="w", padx=10, pady=5)
 
-    # Guardar para JSON (con múltiples objetivos)
-    resultados_analisis_actuales = {
-        "ticker": base_name,
-        "objetivos_analizados": objetivos_a_analizar,
-        "periodos": resultados_por_periodo
-    }
-
-    # Guardar variables globales
-    ultimo_folder = FOLDER
-    ultimo_base_name = base_name
-
-    # Mostrar resultados en interfaz
-    mostrar_resultados_multiples_periodos(resultados_por_periodo)
-
-    # Habilitar botones
-    btn_guardar_json.config(state="normal")
-    btn_generar_db_excel.config(state="normal", bg="#1E90FF", fg="black")  # REACTIVAR botón DB/Excel
-
-    # Restaurar botones de análisis
-    btn_iniciar_analisis.config(state="normal")
-    btn_detener_analisis.config(state="disabled")
-
-    # Mostrar mensaje de completado
-    if analisis_detenido:
-        ventana.label_resultado_opt.config(text=f"⚠ Análisis detenido por el usuario")
-        ventana.label_resultado_opt.config(fg="orange")
-    else:
-        ventana.label_resultado_opt.config(text=f"✓ Análisis completado para {len(periodos_a_analizar)} período(s)")
-        ventana.label_resultado_opt.config(fg="darkgreen")
-    ventana.label_resultado_opt.grid(row=14, column=0, columnspan=3, sticky="w", padx=10, pady=5)
+    # La optimización corre en otro hilo; la ventana solo revisa la cola de la tarea
+    ruta_csv = INPUT_FILE
+    tarea_analisis = en_segundo_plano(
+        ventana,
+        lambda tarea: analizar_combinaciones(ruta_csv, periodos_a_analizar, objetivos_a_analizar,
+                                             config, checks_activos, tarea),
+        al_terminar, mostrar_progreso)
 
 
 # =========================
 # Función para mostrar estadísticas en la interfaz
 # =========================
-def mostrar_resultados_multiples_periodos(resultados):
-    """Muestra los resultados de todos los períodos en pestañas"""
+def mostrar_resultados_multiples_periodos(resultados, agregar_historial=True):
+    """
+    Muestra los resultados de todos los períodos en pestañas.
+
+    Con agregar_historial=False solo redibuja (se usa para mostrar resultados
+    parciales mientras el planificador sigue trabajando).
+    """
     global historial_analisis_por_ticker, ticker_actual
 
     # Inicializar historial para este ticker si no existe
@@ -3514,36 +2932,37 @@ def mostrar_resultados_multiples_periodos(resultados):
         historial_analisis_por_ticker[ticker_actual] = []
 
     # Agregar resultados actuales al historial DEL TICKER ACTUAL
-    for clave_periodo, datos in resultados.items():
-        # Obtener objetivo de cada resultado individual
-        objetivo_actual = datos.get("objetivo", "rentabilidad")
-        objetivo_texto = "Rentabilidad" if objetivo_actual == "rentabilidad" else "Margen Prom"
+    if agregar_historial:
+        for clave_periodo, datos in resultados.items():
+            # Obtener objetivo de cada resultado individual
+            objetivo_actual = datos.get("objetivo", "rentabilidad")
+            objetivo_texto = "Rentabilidad" if objetivo_actual == "rentabilidad" else "Margen Prom"
 
-        # Extraer solo el nombre del período (sin el objetivo)
-        if "_rentabilidad" in clave_periodo:
-            nombre_periodo = clave_periodo.replace("_rentabilidad", "")
-        elif "_margen_prom" in clave_periodo:
-            nombre_periodo = clave_periodo.replace("_margen_prom", "")
-        else:
-            nombre_periodo = clave_periodo
-
-        # Convertir a formato legible
-        periodo_legible = nombre_periodo.replace("_", " ").title()
-        # Corregir "Seis Meses" a "6 Meses" y "Tres Meses" a "3 Meses"
-        periodo_legible = periodo_legible.replace("Seis Meses", "6 Meses").replace("Tres Meses", "3 Meses")
-
-        historial_analisis_por_ticker[ticker_actual].append({
-            "periodo": periodo_legible,
-            "objetivo": objetivo_texto,
-            "compra_pct": datos['compra_pct'],
-            "venta_pct": datos['venta_pct'],
-            "ganancia_min": datos['ganancia_min'],
-            "suave_pct": datos['suave_pct'],
-            "compra_mult": datos['compra_mult'],
-            "venta_mult": datos['venta_mult'],
-            "rentabilidad_max": datos['rentabilidad_max'],
-            "margen_promedio": datos['margen_promedio']
-        })
+            # Extraer solo el nombre del período (sin el objetivo)
+            if "_rentabilidad" in clave_periodo:
+                nombre_periodo = clave_periodo.replace("_rentabilidad", "")
+            elif "_margen_prom" in clave_periodo:
+                nombre_periodo = clave_periodo.replace("_margen_prom", "")
+            else:
+                nombre_periodo = clave_periodo
+
+            # Convertir a formato legible
+            periodo_legible = nombre_periodo.replace("_", " ").title()
+            # Corregir "Seis Meses" a "6 Meses" y "Tres Meses" a "3 Meses"
+            periodo_legible = periodo_legible.replace("Seis Meses", "6 Meses").replace("Tres Meses", "3 Meses")
+
+            historial_analisis_por_ticker[ticker_actual].append({
+                "periodo": periodo_legible,
+                "objetivo": objetivo_texto,
+                "compra_pct": datos['compra_pct'],
+                "venta_pct": datos['venta_pct'],
+                "ganancia_min": datos['ganancia_min'],
+                "suave_pct": datos['suave_pct'],
+                "compra_mult": datos['compra_mult'],
+                "venta_mult": datos['venta_mult'],
+                "rentabilidad_max": datos['rentabilidad_max'],
+                "margen_promedio": datos['margen_promedio']
+            })
 
     # Limpiar frame de estadísticas
     for widget in ventana.frame_stats.winfo_children():
@@ -3686,63 +3105,32 @@ def mostrar_estadisticas_en_frame(frame_parent, df, datos_periodo):
     frame4 = tk.Frame(frame_parent, padx=15)
     frame4.grid(row=0, column=3, sticky="nw")
 
-    def float_col(col):
-        return df[col].astype(str).str.rstrip('%').replace('', '0').astype(float)
-
-    acumulado_float = df['% acumulado'].str.rstrip('%').astype(float)
-
-    valores_seleccionados = []
-    secuencia = []
-    for v in acumulado_float:
-        if v > 0:
-            secuencia.append(v)
-        else:
-            if len(secuencia) >= 2:
-                valores_seleccionados.append(secuencia[-1])
-            secuencia = []
-    if len(secuencia) >= 2:
-        valores_seleccionados.append(secuencia[-1])
-
-    promedio_maximos = sum(valores_seleccionados) / len(valores_seleccionados) if valores_seleccionados else 0.0
-
-    valores_minimos = []
-    secuencia_neg = []
-    for v in acumulado_float:
-        if v < 0:
-            secuencia_neg.append(v)
-        else:
-            if len(secuencia_neg) >= 2:
-                valores_minimos.append(secuencia_neg[-1])
-            secuencia_neg = []
-    if len(secuencia_neg) >= 2:
-        valores_minimos.append(secuencia_neg[-1])
-
-    promedio_minimos = sum(valores_minimos) / len(valores_minimos) if valores_minimos else 0.0
-
-    max_var = float_col('% var.').max()
-    min_var = float_col('% var.').min()
-    fecha_max_var = df.loc[float_col('% var.').idxmax(), 'Fecha']
-    fecha_min_var = df.loc[float_col('% var.').idxmin(), 'Fecha']
-    dif_var = max_var - min_var
-
-    prom_var = float_col('% var.')
-    subidas = prom_var[prom_var > 0]
-    max_prom = subidas.mean() if not subidas.empty else 0
-    bajadas = prom_var[prom_var < 0]
-    min_prom = bajadas.mean() if not bajadas.empty else 0
-    dif_prom = max_prom - min_prom
-
-    opc_compra = (df["Opción"] == "Compra").sum()
-    acciones_compradas = df.loc[df["Movimiento de acciones"] > 0, "Movimiento de acciones"].sum()
-    opc_venta = (df["Opción"] == "Venta").sum()
-    acciones_vendidas = -df.loc[df["Movimiento de acciones"] < 0, "Movimiento de acciones"].sum()
-    max_acc_cartera = df["Acciones en cartera"].max()
-    max_aporte = df["Aporte acumulado"].max()
-    max_margen = round(df["Margen"].max(), 2)
-    margen_promedio = round(df["Margen"].mean(), 2)
-    max_rentab = float_col("Rentabilidad").max()
-    rentab_promedio = float_col("Rentabilidad").mean()
-    fecha_max_rentab = df.loc[float_col("Rentabilidad").idxmax(), "Fecha"]
+    # Estadísticas ya calculadas por el motor sobre los valores numéricos
+    # (promedios de rachas guardados en % × 100)
+    promedio_maximos = datos_periodo.get("promedio_maximos", 0.0) / 100
+    promedio_minimos = datos_periodo.get("promedio_minimos", 0.0) / 100
+
+    max_var = datos_periodo["max_var"]
+    min_var = datos_periodo["min_var"]
+    fecha_max_var = datos_periodo["fecha_max_var"]
+    fecha_min_var = datos_periodo["fecha_min_var"]
+    dif_var = datos_periodo["dif_var"]
+
+    max_prom = datos_periodo["max_prom_var"]
+    min_prom = datos_periodo["min_prom_var"]
+    dif_prom = datos_periodo["dif_prom_var"]
+
+    opc_compra = datos_periodo["opc_compra"]
+    acciones_compradas = datos_periodo["acciones_compradas"]
+    opc_venta = datos_periodo["opc_venta"]
+    acciones_vendidas = datos_periodo["acciones_vendidas"]
+    max_acc_cartera = datos_periodo["max_acc_cartera"]
+    max_aporte = datos_periodo["max_aporte"]
+    max_margen = datos_periodo["max_margen"]
+    margen_promedio = datos_periodo["margen_promedio"]
+    max_rentab = datos_periodo["rentabilidad_max"]
+    rentab_promedio = datos_periodo["rentab_promedio"]
+    fecha_max_rentab = datos_periodo["fecha_max_rentab"]
 
     tk.Label(frame1, fg="blue", text=f"Max % var : {max_var:.2f}% ({fecha_max_var})", font=("Arial", 12)).pack(
         anchor="w")
@@ -3781,15 +3169,19 @@ def mostrar_estadisticas_en_frame(frame_parent, df, datos_periodo):
 # Manejo de cierre
 # -------------------------
 def on_closing():
+    # Un análisis en curso deja de lanzar evaluaciones y procesos nuevos
+    if en_curso(tarea_analisis):
+        tarea_analisis.detener()
     ventana.quit()
     ventana.destroy()
 
 
-ventana.protocol("WM_DELETE_WINDOW", on_closing)
+if __name__ == "__main__":
+    ventana.protocol("WM_DELETE_WINDOW", on_closing)
 
-try:
+    try:
 
 
-    ventana.mainloop()
-except KeyboardInterrupt:
-    pass
+        ventana.mainloop()
+    except KeyboardInterrupt:
+        pass
@@ -1,4 +1,3 @@
-import yfinance as yf
 import pandas as pd
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -6,29 +5,33 @@ import os
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 import gc
-import json
 from pathlib import Path
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.dates as mdates
 
+from almacen_json import leer_json, escribir_json, leer_config, actualizar_config
+from diario_senales import ruta_diario, agregar_senales, leer_senales, compactar
+from comparacion_senales import cruzar_senales
+from tabla_virtual import TablaVirtual
+from racha_precios import actualizar_rachas, rachas_en_fecha, pct_acumulado
+from log_precios import actualizar_log_precios
+from almacen_precios import precios_de_log
+from proveedor_precios import descargar_por_lotes
+from tareas import en_segundo_plano, en_curso
+
 # Lista de tickers
 tickers = ["AAPL","AMZN","AVGO","BRK-B","GLD","META","MSFT","NVDA","PLTR","QQQ","SPY","TSLA"]
 
-# Archivo de configuración (compartido con Analisis_singrafico.py)
-CONFIG_FILE = Path.home() / ".analisis_config.json"
-
-
 def cargar_parametros_activos():
     """Carga los parámetros activos desde el archivo de configuración"""
-    # Primero obtener la ubicación del JSON desde la config
-    if not CONFIG_FILE.exists():
+    # Primero obtener la ubicación del JSON desde la config (compartida con Analisis_singrafico.py)
+    config = leer_config()
+    if not config:
         return None, "No se encontró configuración. Ejecuta primero Analisis_singrafico.py"
 
     try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            ubicacion = config.get("ubicacion_json")
+        ubicacion = config.get("ubicacion_json")
 
         if not ubicacion:
             return None, "No hay ubicación JSON configurada"
@@ -38,9 +41,7 @@ def cargar_parametros_activos():
         if not archivo_params.exists():
             return None, f"No existe el archivo:\n{archivo_params}\n\nConfigura los parámetros activos primero."
 
-        with open(archivo_params, 'r', encoding='utf-8') as f:
-            datos = json.load(f)
-            parametros = datos.get("parametros_activos", [])
+        parametros = leer_json(archivo_params, {}).get("parametros_activos", [])
 
         if not parametros:
             return None, "No hay parámetros activos configurados"
@@ -53,18 +54,9 @@ def cargar_parametros_activos():
 
 def obtener_ruta_historial():
     """Obtiene la ruta del archivo de historial de operaciones"""
-    if not CONFIG_FILE.exists():
-        return None
-
-    try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            ubicacion = config.get("ubicacion_json")
-
-        if ubicacion:
-            return Path(ubicacion) / "historial_operaciones.json"
-    except:
-        pass
+    ubicacion = leer_config().get("ubicacion_json")
+    if ubicacion:
+        return Path(ubicacion) / "historial_operaciones.json"
     return None
 
 
@@ -75,9 +67,7 @@ def cargar_historial_operaciones():
         return []
 
     try:
-        with open(ruta, 'r', encoding='utf-8') as f:
-            datos = json.load(f)
-            return datos.get("operaciones", [])
+        return leer_json(ruta, {}).get("operaciones", [])
     except Exception as e:
         print(f"[ERROR] Error cargando historial: {e}")
         return []
@@ -91,9 +81,7 @@ def guardar_historial_operaciones(operaciones):
         return False
 
     try:
-        datos = {"operaciones": operaciones}
-        with open(ruta, 'w', encoding='utf-8') as f:
-            json.dump(datos, f, indent=2, ensure_ascii=False)
+        escribir_json(ruta, {"operaciones": operaciones})
         return True
     except Exception as e:
         messagebox.showerror("Error", f"Error guardando historial:\n{e}")
@@ -102,49 +90,23 @@ def guardar_historial_operaciones(operaciones):
 
 def obtener_ruta_senales():
     """Obtiene la ruta del archivo de historial de señales"""
-    if not CONFIG_FILE.exists():
-        return None
-
-    try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            ubicacion = config.get("ubicacion_json")
-
-        if ubicacion:
-            return Path(ubicacion) / "historial_senales.json"
-    except:
-        pass
+    ubicacion = leer_config().get("ubicacion_json")
+    if ubicacion:
+        return ruta_diario(ubicacion)
     return None
 
 
 def guardar_ruta_csv(ruta_csv):
     """Guarda la última ruta del CSV en la configuración"""
     try:
-        config = {}
-        if CONFIG_FILE.exists():
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-
-        config["ultima_ruta_csv"] = ruta_csv
-
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        actualizar_config(ultima_ruta_csv=ruta_csv)
     except Exception as e:
         print(f"[WARN] No se pudo guardar ruta CSV: {e}")
 
 
 def cargar_ruta_csv():
     """Carga la última ruta del CSV desde la configuración"""
-    if not CONFIG_FILE.exists():
-        return None
-
-    try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            return config.get("ultima_ruta_csv")
-    except:
-        pass
-    return None
+    return leer_config().get("ultima_ruta_csv")
 
 
 def sincronizar_desde_github():
@@ -185,21 +147,6 @@ def sincronizar_desde_github():
         return False
 
 
-def cargar_historial_senales():
-    """Carga el historial de señales generadas"""
-    ruta = obtener_ruta_senales()
-    if ruta is None or not ruta.exists():
-        return []
-
-    try:
-        with open(ruta, 'r', encoding='utf-8') as f:
-            datos = json.load(f)
-            return datos.get("senales", [])
-    except Exception as e:
-        print(f"[ERROR] Error cargando historial de señales: {e}")
-        return []
-
-
 def guardar_historial_senales(senales_nuevas):
     """Guarda las señales generadas en el historial (evita duplicados por fecha y símbolo)"""
     ruta = obtener_ruta_senales()
@@ -207,55 +154,37 @@ def guardar_historial_senales(senales_nuevas):
         print("[WARN] No hay ubicación configurada para guardar señales.")
         return False
 
+    # Agregar timestamp a cada señal nueva
+    fecha_generacion = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    fecha_hoy = fecha_generacion[:10]  # Solo la fecha (YYYY-MM-DD)
+
+    senales_ok = []
+    for senal in senales_nuevas:
+        if senal.get('estado') == 'OK':
+            senales_ok.append({
+                "fecha_generacion": fecha_generacion,
+                "symbol": senal.get('symbol'),
+                "precio_cierre": senal.get('cierre'),
+                "precio_compra_sugerido": senal.get('precio_compra'),
+                "cant_compra": senal.get('cant_compra'),
+                "opc_compra": senal.get('opc_compra'),
+                "precio_venta_sugerido": senal.get('precio_venta'),
+                "cant_venta": senal.get('cant_venta'),
+                "opc_venta": senal.get('opc_venta'),
+                "acciones_cartera": senal.get('acciones_cartera'),
+                "limite_tipo": senal.get('limite_tipo', 'acciones'),
+                "limite_valor": senal.get('limite_valor', 10)
+            })
+
     try:
-        # Cargar señales existentes
-        senales_existentes = cargar_historial_senales()
-
-        # Agregar timestamp a cada señal nueva
-        fecha_generacion = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        fecha_hoy = fecha_generacion[:10]  # Solo la fecha (YYYY-MM-DD)
-
-        # Crear conjunto de señales existentes para verificar duplicados (fecha + symbol)
-        senales_existentes_keys = set()
-        for sen in senales_existentes:
-            fecha_sen = sen.get("fecha_generacion", "")[:10]
-            symbol_sen = sen.get("symbol", "")
-            senales_existentes_keys.add((fecha_sen, symbol_sen))
-
-        # Contador de señales nuevas agregadas
-        senales_agregadas = 0
-
-        for senal in senales_nuevas:
-            if senal.get('estado') == 'OK':
-                symbol = senal.get('symbol')
-
-                # Verificar si ya existe una señal para esta fecha y símbolo
-                if (fecha_hoy, symbol) in senales_existentes_keys:
-                    print(f"[INFO] Señal duplicada ignorada: {symbol} ({fecha_hoy})")
-                    continue
-
-                nueva_senal = {
-                    "fecha_generacion": fecha_generacion,
-                    "symbol": symbol,
-                    "precio_cierre": senal.get('cierre'),
-                    "precio_compra_sugerido": senal.get('precio_compra'),
-                    "cant_compra": senal.get('cant_compra'),
-                    "opc_compra": senal.get('opc_compra'),
-                    "precio_venta_sugerido": senal.get('precio_venta'),
-                    "cant_venta": senal.get('cant_venta'),
-                    "opc_venta": senal.get('opc_venta'),
-                    "acciones_cartera": senal.get('acciones_cartera'),
-                    "limite_tipo": senal.get('limite_tipo', 'acciones'),
-                    "limite_valor": senal.get('limite_valor', 10)
-                }
-                senales_existentes.append(nueva_senal)
-                senales_existentes_keys.add((fecha_hoy, symbol))
-                senales_agregadas += 1
-
-        # Guardar todas las señales
-        datos = {"senales": senales_existentes}
-        with open(ruta, 'w', encoding='utf-8') as f:
-            json.dump(datos, f, indent=2, ensure_ascii=False)
+        # Solo se agregan al diario las que no existen para esta fecha y símbolo
+        agregadas = agregar_senales(ruta, senales_ok)
+        senales_agregadas = len(agregadas)
+
+        symbols_agregados = {sen["symbol"] for sen in agregadas}
+        for sen in senales_ok:
+            if sen["symbol"] not in symbols_agregados:
+                print(f"[INFO] Señal duplicada ignorada: {sen['symbol']} ({fecha_hoy})")
 
         print(f"[INFO] Señales guardadas: {senales_agregadas} nuevas (ignoradas {len(senales_nuevas) - senales_agregadas} duplicadas)")
         return True
@@ -359,54 +288,37 @@ def administrar_historial():
     frame_historial = tk.LabelFrame(ventana_hist, text="Historial de Operaciones", pady=5, padx=5)
     frame_historial.pack(fill="both", expand=True, padx=10, pady=5)
 
-    # Scrollbars
-    scrollbar_y = tk.Scrollbar(frame_historial, orient="vertical")
-    scrollbar_x = tk.Scrollbar(frame_historial, orient="horizontal")
-
-    # Treeview para historial
+    # Tabla para historial (solo se dibujan las filas visibles)
     cols_hist = ("Fecha", "Symbol", "Tipo", "Precio", "Cantidad", "Total")
-    tree_hist = ttk.Treeview(frame_historial, columns=cols_hist, show="headings",
-                              selectmode="extended",
-                              yscrollcommand=scrollbar_y.set,
-                              xscrollcommand=scrollbar_x.set)
+    anchos = {"Fecha": 100, "Symbol": 80, "Tipo": 70, "Precio": 90, "Cantidad": 70, "Total": 100}
 
-    scrollbar_y.config(command=tree_hist.yview)
-    scrollbar_x.config(command=tree_hist.xview)
+    def formatear_operacion(fila):
+        fecha, symbol, tipo, precio, cantidad, total = fila
+        return (fecha, symbol, tipo.capitalize(), f"${precio:.2f}", cantidad, f"${total:.2f}")
 
-    anchos = {"Fecha": 100, "Symbol": 80, "Tipo": 70, "Precio": 90, "Cantidad": 70, "Total": 100}
-    for col in cols_hist:
-        tree_hist.heading(col, text=col)
-        tree_hist.column(col, width=anchos.get(col, 80), anchor="center")
+    tabla_hist = TablaVirtual(frame_historial, cols_hist, anchos=anchos, formatear=formatear_operacion,
+                              selectmode="extended", con_filtro=True)
 
     def actualizar_historial():
         """Actualiza la vista del historial"""
         nonlocal operaciones
         operaciones = cargar_historial_operaciones()
 
-        for item in tree_hist.get_children():
-            tree_hist.delete(item)
-
-        # Ordenar por symbol alfabéticamente
-        ops_ordenadas = sorted(operaciones, key=lambda x: x.get("ticker_symbol", "").upper())
+        # Ordenar por symbol alfabéticamente (cada fila lleva su índice en operaciones)
+        indices = sorted(range(len(operaciones)), key=lambda i: operaciones[i].get("ticker_symbol", "").upper())
 
-        for op in ops_ordenadas:
+        filas = []
+        for i in indices:
+            op = operaciones[i]
             precio = op.get("precio", 0)
             cantidad = op.get("cantidad", 0)
-            total = precio * cantidad
-            tree_hist.insert("", "end", values=(
-                op.get("fecha", ""),
-                op.get("ticker_symbol", ""),
-                op.get("tipo", "").capitalize(),
-                f"${precio:.2f}",
-                cantidad,
-                f"${total:.2f}"
-            ))
+            filas.append((op.get("fecha", ""), op.get("ticker_symbol", ""), op.get("tipo", ""),
+                          precio, cantidad, precio * cantidad))
+        tabla_hist.establecer_filas(filas, indices)
 
     actualizar_historial()
 
-    scrollbar_y.pack(side="right", fill="y")
-    scrollbar_x.pack(side="bottom", fill="x")
-    tree_hist.pack(fill="both", expand=True)
+    tabla_hist.pack(fill="both", expand=True)
 
     # Frame inferior - Botones
     frame_botones = tk.Frame(ventana_hist, pady=10)
@@ -502,34 +414,14 @@ def administrar_historial():
 
     def eliminar_seleccionados():
         """Elimina las operaciones seleccionadas"""
-        seleccionados = tree_hist.selection()
-        if not seleccionados:
+        indices_eliminar = tabla_hist.seleccion()
+        if not indices_eliminar:
             messagebox.showwarning("Sin selección", "Selecciona operaciones para eliminar")
             return
 
-        if not messagebox.askyesno("Confirmar", f"¿Eliminar {len(seleccionados)} operación(es)?"):
+        if not messagebox.askyesno("Confirmar", f"¿Eliminar {len(indices_eliminar)} operación(es)?"):
             return
 
-        # Obtener índices a eliminar
-        indices_eliminar = []
-        for item in seleccionados:
-            valores = tree_hist.item(item, "values")
-            fecha = valores[0]
-            symbol = valores[1]
-            tipo = valores[2].lower()
-            precio = float(valores[3].replace("$", ""))
-            cantidad = int(valores[4])
-
-            # Buscar en operaciones
-            for i, op in enumerate(operaciones):
-                if (op.get("fecha") == fecha and
-                    op.get("ticker_symbol") == symbol and
-                    op.get("tipo") == tipo and
-                    abs(op.get("precio", 0) - precio) < 0.01 and
-                    op.get("cantidad") == cantidad):
-                    indices_eliminar.append(i)
-                    break
-
         # Eliminar en orden inverso para no afectar índices
         for i in sorted(indices_eliminar, reverse=True):
             operaciones.pop(i)
@@ -550,40 +442,133 @@ def administrar_historial():
     tk.Button(frame_botones, text="Cerrar", command=ventana_hist.destroy).pack(side="right", padx=5)
 
 
-def generar_senales():
-    """Genera señales de compra/venta basadas en parámetros activos y precios descargados"""
-
-    # Verificar que hay un CSV configurado
-    csv_file = entry_ruta.get()
-    if not csv_file:
-        messagebox.showwarning("Sin datos", "Primero selecciona y descarga un CSV de precios")
-        return
-
-    # Obtener ruta del log
-    log_file = os.path.join(os.path.dirname(csv_file), "auto_update_log.csv")
-
-    if not os.path.exists(log_file):
-        messagebox.showwarning("Sin datos", f"No existe el archivo de log:\n{log_file}\n\nDescarga los precios primero.")
-        return
+# Valores por defecto para límites
+LIMITE_TIPO_DEFAULT = "acciones"
+LIMITE_VALOR_DEFAULT = 10.0
+
+
+def calcular_senal(param, cierre, info_cartera, racha):
+    """
+    Señal de compra/venta de un set de parámetros activos para un cierre.
+
+    Args:
+        param: parámetros activos del ticker
+        cierre: precio de cierre del día de la señal
+        info_cartera: {"acciones", "capital_invertido"} del ticker en cartera
+        racha: estado de racha del ticker a ese día (racha_precios), o None
+
+    Returns:
+        Dict de la señal (estado 'OK')
+    """
+    symbol = param.get('ticker_symbol')
+    limite_tipo = param.get('limite_tipo', LIMITE_TIPO_DEFAULT)
+    limite_valor = param.get('limite_valor', LIMITE_VALOR_DEFAULT)
+    acciones_en_cartera = info_cartera.get("acciones", 0)
+    capital_invertido = info_cartera.get("capital_invertido", 0)
+
+    compra_pct = param.get('compra_pct', 0)
+    venta_pct = param.get('venta_pct', 0)
+
+    precio_compra = cierre * (1 + compra_pct / 100)
+    precio_venta = cierre * (1 + venta_pct / 100)
+
+    # Obtener condiciones para compra/venta múltiple
+    promedio_minimos = param.get('promedio_minimos', 0)
+    promedio_maximos = param.get('promedio_maximos', 0)
+    compra_multiple_config = param.get('compra_multiple') or 1
+    venta_multiple_config = param.get('venta_multiple') or 1
+
+    # % acumulado con reinicio en cambio de signo de la variación diaria
+    usar_compra_multiple = False
+    usar_venta_multiple = False
+    acumulado = pct_acumulado(racha)
+
+    if acumulado is not None:
+        # Verificar condición para compra múltiple
+        # Si el % acumulado está por debajo del promedio de mínimos, usar múltiple
+        if promedio_minimos < 0 and acumulado <= promedio_minimos:
+            usar_compra_multiple = True
+
+        # Verificar condición para venta múltiple
+        # Si el % acumulado está por encima del promedio de máximos, usar múltiple
+        if promedio_maximos > 0 and acumulado >= promedio_maximos:
+            usar_venta_multiple = True
+
+    # Aplicar cantidad según condición
+    cant_compra = compra_multiple_config if usar_compra_multiple else 1
+    cant_venta = venta_multiple_config if usar_venta_multiple else 1
+
+    # Determinar opción de compra según tipo de límite
+    if limite_tipo == "acciones":
+        # Límite por número de acciones
+        limite_acciones = int(limite_valor)
+        if acciones_en_cartera >= limite_acciones:
+            opc_compra = "N/A (límite)"
+        else:
+            espacio_disponible = limite_acciones - acciones_en_cartera
+            cant_compra = min(cant_compra, espacio_disponible)
+            opc_compra = "Comprar"
+    else:
+        # Límite por monto invertido
+        limite_monto = float(limite_valor)
+        if capital_invertido >= limite_monto:
+            opc_compra = "N/A (límite $)"
+        else:
+            monto_disponible = limite_monto - capital_invertido
+            # Calcular cuántas acciones se pueden comprar con el monto disponible
+            max_acciones_por_monto = int(monto_disponible / precio_compra) if precio_compra > 0 else 0
+            if max_acciones_por_monto <= 0:
+                opc_compra = "N/A (límite $)"
+            else:
+                cant_compra = min(cant_compra, max_acciones_por_monto)
+                opc_compra = "Comprar"
 
+    # Determinar opción de venta
+    if acciones_en_cartera <= 0:
+        opc_venta = "N/A (sin acciones)"
+        cant_venta = 0
+    else:
+        # Ajustar cantidad si excede las acciones disponibles
+        cant_venta = min(cant_venta, acciones_en_cartera)
+        opc_venta = "Vender"
+
+    return {
+        'symbol': symbol,
+        'cierre': cierre,
+        'precio_compra': precio_compra,
+        'cant_compra': cant_compra,
+        'opc_compra': opc_compra,
+        'precio_venta': precio_venta,
+        'cant_venta': cant_venta,
+        'opc_venta': opc_venta,
+        'acciones_cartera': acciones_en_cartera,
+        'limite_tipo': limite_tipo,
+        'limite_valor': limite_valor,
+        'estado': 'OK'
+    }
+
+
+def senales_del_dia(log_file):
+    """
+    Calcula las señales del último día del log para los parámetros activos.
+    Corre fuera del hilo de Tk (no toca widgets); los errores que hay que
+    mostrar al usuario se lanzan como ValueError.
+    """
     # Cargar parámetros activos
     parametros, error = cargar_parametros_activos()
     if error:
-        messagebox.showerror("Error", error)
-        return
+        raise ValueError(error)
 
     # Cargar estado de cartera
     cartera = calcular_cartera()
 
-    # Cargar precios del log
+    # Cargar precios del log (solo los tickers con parámetros activos)
     try:
-        df_precios = pd.read_csv(log_file, parse_dates=['Date'])
+        df_precios = precios_de_log(log_file, tickers=[p.get('ticker_symbol') for p in parametros])
     except Exception as e:
-        messagebox.showerror("Error", f"Error leyendo archivo de precios:\n{e}")
-        return
+        raise ValueError(f"Error leyendo archivo de precios:\n{e}")
 
     # Obtener el último precio de cierre para cada ticker
-    df_precios['Date'] = pd.to_datetime(df_precios['Date'])
     ultimos_precios = df_precios.sort_values('Date').groupby('Ticker').last().reset_index()
 
     # Crear diccionario de precios
@@ -597,23 +582,20 @@ def generar_senales():
             'low': row['Low']
         }
 
-    # Valores por defecto para límites
-    LIMITE_TIPO_DEFAULT = "acciones"
-    LIMITE_VALOR_DEFAULT = 10.0
+    # Estado de racha de cada ticker (% acumulado), avanzado solo con las barras nuevas del log
+    try:
+        rachas = actualizar_rachas(df_precios, log_file)
+    except Exception as e:
+        print(f"[WARN] Error calculando % acumulado: {e}")
+        rachas = {}
 
     # Calcular señales
     senales = []
     for param in parametros:
         symbol = param.get('ticker_symbol')
 
-        # Leer tipo y valor de límite
-        limite_tipo = param.get('limite_tipo', LIMITE_TIPO_DEFAULT)
-        limite_valor = param.get('limite_valor', LIMITE_VALOR_DEFAULT)
-
         # Obtener estado actual de cartera para este symbol
         info_cartera = cartera.get(symbol, {"acciones": 0, "capital_invertido": 0})
-        acciones_en_cartera = info_cartera.get("acciones", 0)
-        capital_invertido = info_cartera.get("capital_invertido", 0)
 
         if symbol not in precios_dict:
             senales.append({
@@ -626,140 +608,149 @@ def generar_senales():
                 'precio_venta': 'N/A',
                 'cant_venta': '-',
                 'opc_venta': 'N/A',
-                'acciones_cartera': acciones_en_cartera,
-                'limite_tipo': limite_tipo,
-                'limite_valor': limite_valor,
+                'acciones_cartera': info_cartera.get("acciones", 0),
+                'limite_tipo': param.get('limite_tipo', LIMITE_TIPO_DEFAULT),
+                'limite_valor': param.get('limite_valor', LIMITE_VALOR_DEFAULT),
                 'estado': 'Sin datos de precio'
             })
             continue
 
         precio_info = precios_dict[symbol]
-        cierre = precio_info['close']
-        compra_pct = param.get('compra_pct', 0)
-        venta_pct = param.get('venta_pct', 0)
-
-        precio_compra = cierre * (1 + compra_pct / 100)
-        precio_venta = cierre * (1 + venta_pct / 100)
-
-        # Obtener condiciones para compra/venta múltiple
-        promedio_minimos = param.get('promedio_minimos', 0)
-        promedio_maximos = param.get('promedio_maximos', 0)
-        compra_multiple_config = param.get('compra_multiple') or 1
-        venta_multiple_config = param.get('venta_multiple') or 1
-
-        # Calcular % acumulado actual desde el histórico de precios
-        usar_compra_multiple = False
-        usar_venta_multiple = False
-        pct_acumulado = 0  # Para mostrar en debug si es necesario
-
-        # Intentar calcular % acumulado si hay datos históricos
-        if df_precios is not None and symbol in df_precios['Ticker'].values:
-            try:
-                # Obtener precios históricos del ticker
-                hist_ticker = df_precios[df_precios['Ticker'] == symbol].sort_values('Date')
-                if len(hist_ticker) >= 2:
-                    # Calcular % acumulado con reinicio en cambio de signo
-                    # El acumulado se reinicia cuando la variación diaria cambia de dirección
-                    precios_cierre = hist_ticker['Close'].values
-                    precio_referencia = precios_cierre[0]
-                    variacion_diaria_anterior = 0
-
-                    for i in range(1, len(precios_cierre)):
-                        precio_anterior = precios_cierre[i - 1]
-                        precio_actual_iter = precios_cierre[i]
-
-                        # Calcular variación diaria (de ayer a hoy)
-                        variacion_diaria = ((precio_actual_iter - precio_anterior) / precio_anterior) * 100
-
-                        # Detectar cambio de signo en la variación diaria
-                        if variacion_diaria_anterior != 0:
-                            # Si el signo de la variación diaria cambió
-                            if (variacion_diaria_anterior > 0 and variacion_diaria < 0) or \
-                               (variacion_diaria_anterior < 0 and variacion_diaria > 0):
-                                # Reiniciar: el precio de referencia es el día anterior
-                                precio_referencia = precio_anterior
-
-                        variacion_diaria_anterior = variacion_diaria
-
-                    # Calcular % acumulado final desde la última referencia
-                    precio_actual = precios_cierre[-1]
-                    pct_acumulado = ((precio_actual - precio_referencia) / precio_referencia) * 100
-
-                    # Verificar condición para compra múltiple
-                    # Si el % acumulado está por debajo del promedio de mínimos, usar múltiple
-                    if promedio_minimos < 0 and pct_acumulado <= promedio_minimos:
-                        usar_compra_multiple = True
-
-                    # Verificar condición para venta múltiple
-                    # Si el % acumulado está por encima del promedio de máximos, usar múltiple
-                    if promedio_maximos > 0 and pct_acumulado >= promedio_maximos:
-                        usar_venta_multiple = True
-            except Exception as e:
-                print(f"[WARN] Error calculando % acumulado para {symbol}: {e}")
-
-        # Aplicar cantidad según condición
-        cant_compra = compra_multiple_config if usar_compra_multiple else 1
-        cant_venta = venta_multiple_config if usar_venta_multiple else 1
-
-        # Determinar opción de compra según tipo de límite
-        if limite_tipo == "acciones":
-            # Límite por número de acciones
-            limite_acciones = int(limite_valor)
-            if acciones_en_cartera >= limite_acciones:
-                opc_compra = "N/A (límite)"
-            else:
-                espacio_disponible = limite_acciones - acciones_en_cartera
-                cant_compra = min(cant_compra, espacio_disponible)
-                opc_compra = "Comprar"
-        else:
-            # Límite por monto invertido
-            limite_monto = float(limite_valor)
-            if capital_invertido >= limite_monto:
-                opc_compra = "N/A (límite $)"
-            else:
-                monto_disponible = limite_monto - capital_invertido
-                # Calcular cuántas acciones se pueden comprar con el monto disponible
-                max_acciones_por_monto = int(monto_disponible / precio_compra) if precio_compra > 0 else 0
-                if max_acciones_por_monto <= 0:
-                    opc_compra = "N/A (límite $)"
-                else:
-                    cant_compra = min(cant_compra, max_acciones_por_monto)
-                    opc_compra = "Comprar"
+        senal = calcular_senal(param, precio_info['close'], info_cartera, rachas.get(symbol))
+        senal['fecha_precio'] = precio_info['fecha'].strftime('%Y-%m-%d')
+        senales.append(senal)
 
-        # Determinar opción de venta
-        if acciones_en_cartera <= 0:
-            opc_venta = "N/A (sin acciones)"
-            cant_venta = 0
-        else:
-            # Ajustar cantidad si excede las acciones disponibles
-            cant_venta = min(cant_venta, acciones_en_cartera)
-            opc_venta = "Vender"
+    # Guardar señales automáticamente para comparación posterior
+    guardar_historial_senales(senales)
+    return senales
 
-        senales.append({
-            'symbol': symbol,
-            'fecha_precio': precio_info['fecha'].strftime('%Y-%m-%d'),
-            'cierre': cierre,
-            'precio_compra': precio_compra,
-            'cant_compra': cant_compra,
-            'opc_compra': opc_compra,
-            'precio_venta': precio_venta,
-            'cant_venta': cant_venta,
-            'opc_venta': opc_venta,
-            'acciones_cartera': acciones_en_cartera,
-            'limite_tipo': limite_tipo,
-            'limite_valor': limite_valor,
-            'estado': 'OK'
-        })
 
-    # Mostrar ventana con señales
-    mostrar_ventana_senales(senales)
+# Cálculo de señales en curso (generar, regenerar o comparar)
+tarea_senales = None
 
-    # Guardar señales automáticamente para comparación posterior
-    guardar_historial_senales(senales)
+
+def generar_senales():
+    """Genera señales de compra/venta basadas en parámetros activos y precios descargados"""
+    global tarea_senales
+
+    # Verificar que hay un CSV configurado
+    csv_file = entry_ruta.get()
+    if not csv_file:
+        messagebox.showwarning("Sin datos", "Primero selecciona y descarga un CSV de precios")
+        return
+
+    # Obtener ruta del log
+    log_file = os.path.join(os.path.dirname(csv_file), "auto_update_log.csv")
+
+    if not os.path.exists(log_file):
+        messagebox.showwarning("Sin datos", f"No existe el archivo de log:\n{log_file}\n\nDescarga los precios primero.")
+        return
+
+    if en_curso(tarea_senales):
+        label_status.config(text="Ya se están calculando señales...", fg="orange")
+        return
+
+    def al_terminar(senales, error):
+        label_status.config(text="")
+        if error is not None:
+            messagebox.showerror("Error", str(error))
+            return
+        # Mostrar ventana con señales
+        mostrar_ventana_senales(senales)
+
+    label_status.config(text="Calculando señales...", fg="blue")
+    tarea_senales = en_segundo_plano(root, lambda tarea: senales_del_dia(log_file), al_terminar)
+
+
+def senales_en_fecha(df_precios, fecha_seleccionada):
+    """
+    Calcula y guarda las señales de una fecha pasada (misma lógica que las
+    del día). Corre fuera del hilo de Tk; los errores para el usuario se
+    lanzan como ValueError.
+
+    Returns:
+        (señales calculadas, señales nuevas agregadas al diario)
+    """
+    # Cargar parámetros activos
+    parametros, error = cargar_parametros_activos()
+    if error:
+        raise ValueError(error)
+
+    # Cargar estado de cartera
+    cartera = calcular_cartera()
+
+    # Filtrar precios para la fecha seleccionada
+    df_fecha = df_precios[df_precios['Date'].dt.strftime('%Y-%m-%d') == fecha_seleccionada]
+
+    if df_fecha.empty:
+        raise ValueError(f"No hay datos de precios para {fecha_seleccionada}")
+
+    # Crear diccionario de precios para esa fecha
+    precios_dict = {}
+    for _, row in df_fecha.iterrows():
+        precios_dict[row['Ticker']] = {
+            'fecha': row['Date'],
+            'close': row['Close'],
+            'open': row['Open'],
+            'high': row['High'],
+            'low': row['Low']
+        }
+
+    # Estado de racha de cada ticker a esa fecha (% acumulado para compra/venta múltiple)
+    try:
+        rachas = rachas_en_fecha(df_precios, fecha_seleccionada)
+    except Exception as e:
+        print(f"[WARN] Error calculando % acumulado: {e}")
+        rachas = {}
+
+    # Calcular señales para esa fecha (misma lógica que las señales del día)
+    senales = []
+    for param in parametros:
+        symbol = param.get('ticker_symbol')
+        if symbol not in precios_dict:
+            continue
+
+        info_cartera = cartera.get(symbol, {"acciones": 0, "capital_invertido": 0})
+        senales.append(calcular_senal(param, precios_dict[symbol]['close'], info_cartera, rachas.get(symbol)))
+
+    if not senales:
+        return senales, None
+
+    # Guardar señales con la fecha histórica
+    ruta = obtener_ruta_senales()
+    if not ruta:
+        return senales, None
+
+    try:
+        fecha_generacion = fecha_seleccionada + " 16:00:00"  # Hora de cierre de mercado
+
+        nuevas = []
+        for senal in senales:
+            nuevas.append({
+                "fecha_generacion": fecha_generacion,
+                "symbol": senal['symbol'],
+                "precio_cierre": senal['cierre'],
+                "precio_compra_sugerido": senal['precio_compra'],
+                "cant_compra": senal['cant_compra'],
+                "opc_compra": senal['opc_compra'],
+                "precio_venta_sugerido": senal['precio_venta'],
+                "cant_venta": senal['cant_venta'],
+                "opc_venta": senal['opc_venta'],
+                "acciones_cartera": senal['acciones_cartera'],
+                "limite_tipo": senal['limite_tipo'],
+                "limite_valor": senal['limite_valor']
+            })
+
+        # Guardar (el diario ignora las que ya existen para esa fecha y símbolo)
+        return senales, len(agregar_senales(ruta, nuevas))
+
+    except Exception as e:
+        raise ValueError(f"Error guardando señales: {e}")
 
 
 def regenerar_senales_historicas():
     """Permite regenerar señales para una fecha anterior basándose en datos históricos"""
+    global tarea_senales
 
     # Verificar que hay un CSV configurado
     csv_file = entry_ruta.get()
@@ -774,14 +765,24 @@ def regenerar_senales_historicas():
         messagebox.showwarning("Sin datos", f"No existe el archivo de log:\n{log_file}")
         return
 
-    # Cargar precios del log
-    try:
-        df_precios = pd.read_csv(log_file, parse_dates=['Date'])
-        df_precios['Date'] = pd.to_datetime(df_precios['Date'])
-    except Exception as e:
-        messagebox.showerror("Error", f"Error leyendo archivo de precios:\n{e}")
+    if en_curso(tarea_senales):
+        label_status.config(text="Ya se están calculando señales...", fg="orange")
         return
 
+    def al_cargar(df_precios, error):
+        label_status.config(text="")
+        if error is not None:
+            messagebox.showerror("Error", f"Error leyendo archivo de precios:\n{error}")
+            return
+        elegir_fecha_a_regenerar(df_precios)
+
+    # Cargar precios del log
+    label_status.config(text="Leyendo precios del log...", fg="blue")
+    tarea_senales = en_segundo_plano(root, lambda tarea: precios_de_log(log_file), al_cargar)
+
+
+def elegir_fecha_a_regenerar(df_precios):
+    """Ventana para elegir la fecha a regenerar entre las que tiene el log"""
     # Obtener fechas disponibles
     fechas_disponibles = sorted(df_precios['Date'].dt.strftime('%Y-%m-%d').unique(), reverse=True)
 
@@ -810,156 +811,41 @@ def regenerar_senales_historicas():
              font=("Arial", 9), fg="gray").pack(pady=5)
 
     def procesar_fecha():
+        global tarea_senales
         fecha_seleccionada = fecha_var.get()
-        if not fecha_seleccionada:
+        if not fecha_seleccionada or en_curso(tarea_senales):
             return
 
-        # Cargar parámetros activos
-        parametros, error = cargar_parametros_activos()
-        if error:
-            messagebox.showerror("Error", error)
-            return
-
-        # Cargar estado de cartera
-        cartera = calcular_cartera()
-
-        # Filtrar precios para la fecha seleccionada
-        df_fecha = df_precios[df_precios['Date'].dt.strftime('%Y-%m-%d') == fecha_seleccionada]
-
-        if df_fecha.empty:
-            messagebox.showwarning("Sin datos", f"No hay datos de precios para {fecha_seleccionada}")
-            return
-
-        # Crear diccionario de precios para esa fecha
-        precios_dict = {}
-        for _, row in df_fecha.iterrows():
-            precios_dict[row['Ticker']] = {
-                'fecha': row['Date'],
-                'close': row['Close'],
-                'open': row['Open'],
-                'high': row['High'],
-                'low': row['Low']
-            }
-
-        # Valores por defecto para límites
-        LIMITE_TIPO_DEFAULT = "acciones"
-        LIMITE_VALOR_DEFAULT = 10.0
-
-        # Calcular señales para esa fecha
-        senales = []
-        for param in parametros:
-            symbol = param.get('ticker_symbol')
-            limite_tipo = param.get('limite_tipo', LIMITE_TIPO_DEFAULT)
-            limite_valor = param.get('limite_valor', LIMITE_VALOR_DEFAULT)
-
-            info_cartera = cartera.get(symbol, {"acciones": 0, "capital_invertido": 0})
-            acciones_en_cartera = info_cartera.get("acciones", 0)
-
-            if symbol not in precios_dict:
-                continue
-
-            precio_info = precios_dict[symbol]
-            cierre = precio_info['close']
-            compra_pct = param.get('compra_pct', 0)
-            venta_pct = param.get('venta_pct', 0)
-
-            precio_compra = cierre * (1 + compra_pct / 100)
-            precio_venta = cierre * (1 + venta_pct / 100)
-
-            # Usar cantidad 1 para señales históricas (simplificado)
-            cant_compra = 1
-            cant_venta = 1
-
-            # Determinar opción de compra
-            if limite_tipo == "acciones":
-                limite_acciones = int(limite_valor)
-                if acciones_en_cartera >= limite_acciones:
-                    opc_compra = "N/A (límite)"
-                else:
-                    opc_compra = "Comprar"
-            else:
-                opc_compra = "Comprar"
-
-            # Determinar opción de venta
-            if acciones_en_cartera <= 0:
-                opc_venta = "N/A (sin acciones)"
-                cant_venta = 0
-            else:
-                opc_venta = "Vender"
-
-            senales.append({
-                'symbol': symbol,
-                'cierre': cierre,
-                'precio_compra': precio_compra,
-                'cant_compra': cant_compra,
-                'opc_compra': opc_compra,
-                'precio_venta': precio_venta,
-                'cant_venta': cant_venta,
-                'opc_venta': opc_venta,
-                'acciones_cartera': acciones_en_cartera,
-                'limite_tipo': limite_tipo,
-                'limite_valor': limite_valor,
-                'estado': 'OK'
-            })
+        def al_terminar(resultado, error):
+            if btn_regenerar.winfo_exists():
+                btn_regenerar.config(state="normal", text="Regenerar Señales")
+            if error is not None:
+                messagebox.showerror("Error", str(error))
+                return
 
-        if not senales:
-            messagebox.showinfo("Sin señales", "No se pudieron generar señales para esa fecha")
-            return
+            senales, senales_agregadas = resultado
+            if not senales:
+                messagebox.showinfo("Sin señales", "No se pudieron generar señales para esa fecha")
+                return
+            if senales_agregadas is None:
+                return
 
-        # Guardar señales con la fecha histórica
-        ruta = obtener_ruta_senales()
-        if ruta:
-            try:
-                senales_existentes = cargar_historial_senales()
-                fecha_generacion = fecha_seleccionada + " 16:00:00"  # Hora de cierre de mercado
-
-                # Verificar duplicados
-                senales_existentes_keys = set()
-                for sen in senales_existentes:
-                    fecha_sen = sen.get("fecha_generacion", "")[:10]
-                    symbol_sen = sen.get("symbol", "")
-                    senales_existentes_keys.add((fecha_sen, symbol_sen))
-
-                senales_agregadas = 0
-                for senal in senales:
-                    symbol = senal['symbol']
-                    if (fecha_seleccionada, symbol) not in senales_existentes_keys:
-                        nueva_senal = {
-                            "fecha_generacion": fecha_generacion,
-                            "symbol": symbol,
-                            "precio_cierre": senal['cierre'],
-                            "precio_compra_sugerido": senal['precio_compra'],
-                            "cant_compra": senal['cant_compra'],
-                            "opc_compra": senal['opc_compra'],
-                            "precio_venta_sugerido": senal['precio_venta'],
-                            "cant_venta": senal['cant_venta'],
-                            "opc_venta": senal['opc_venta'],
-                            "acciones_cartera": senal['acciones_cartera'],
-                            "limite_tipo": senal['limite_tipo'],
-                            "limite_valor": senal['limite_valor']
-                        }
-                        senales_existentes.append(nueva_senal)
-                        senales_existentes_keys.add((fecha_seleccionada, symbol))
-                        senales_agregadas += 1
-
-                # Guardar
-                with open(ruta, 'w', encoding='utf-8') as f:
-                    json.dump({"senales": senales_existentes}, f, indent=2, ensure_ascii=False)
-
-                ventana_fecha.destroy()
-                messagebox.showinfo("Éxito",
-                    f"Señales regeneradas para {fecha_seleccionada}:\n"
-                    f"- {senales_agregadas} señales nuevas agregadas\n"
-                    f"- {len(senales) - senales_agregadas} duplicadas ignoradas")
+            ventana_fecha.destroy()
+            messagebox.showinfo("Éxito",
+                f"Señales regeneradas para {fecha_seleccionada}:\n"
+                f"- {senales_agregadas} señales nuevas agregadas\n"
+                f"- {len(senales) - senales_agregadas} duplicadas ignoradas")
 
-            except Exception as e:
-                messagebox.showerror("Error", f"Error guardando señales: {e}")
+        btn_regenerar.config(state="disabled", text="Regenerando...")
+        tarea_senales = en_segundo_plano(root, lambda tarea: senales_en_fecha(df_precios, fecha_seleccionada),
+                                         al_terminar)
 
     frame_botones = tk.Frame(ventana_fecha)
     frame_botones.pack(pady=20)
 
-    tk.Button(frame_botones, text="Regenerar Señales", command=procesar_fecha,
-              bg="#28a745", fg="white", font=("Arial", 10, "bold")).pack(side="left", padx=5)
+    btn_regenerar = tk.Button(frame_botones, text="Regenerar Señales", command=procesar_fecha,
+                              bg="#28a745", fg="white", font=("Arial", 10, "bold"))
+    btn_regenerar.pack(side="left", padx=5)
 
     tk.Button(frame_botones, text="Cancelar", command=ventana_fecha.destroy).pack(side="left", padx=5)
 
@@ -985,61 +871,36 @@ def mostrar_ventana_senales(senales):
     frame_tabla = tk.Frame(ventana_senales)
     frame_tabla.pack(fill="both", expand=True, padx=10, pady=5)
 
-    # Scrollbars
-    scrollbar_y = tk.Scrollbar(frame_tabla, orient="vertical")
-    scrollbar_x = tk.Scrollbar(frame_tabla, orient="horizontal")
-
-    # Treeview con nueva estructura
-
     columns = ("Symbol", "Cartera", "Cierre", "P.Compra", "Cant.C", "Opc.Compra", "P.Venta", "Cant.V", "Opc.Venta")
-    tree_senales = ttk.Treeview(frame_tabla, columns=columns, show="headings",
-                                 yscrollcommand=scrollbar_y.set,
-                                 xscrollcommand=scrollbar_x.set)
-
-    scrollbar_y.config(command=tree_senales.yview)
-    scrollbar_x.config(command=tree_senales.xview)
-
-    # Configurar columnas
     anchos = {"Symbol": 70, "Cartera": 60, "Cierre": 85, "P.Compra": 85, "Cant.C": 50,
               "Opc.Compra": 110, "P.Venta": 85, "Cant.V": 50, "Opc.Venta": 120}
 
-    for col in columns:
-        tree_senales.heading(col, text=col)
-        tree_senales.column(col, width=anchos.get(col, 70), anchor="center")
+    def formatear_senal(fila):
+        symbol, cartera, cierre, precio_compra, cant_compra, opc_compra, precio_venta, cant_venta, opc_venta, ok = fila
+        if ok:
+            return (symbol, cartera, f"${cierre:.2f}", f"${precio_compra:.2f}", cant_compra, opc_compra,
+                    f"${precio_venta:.2f}", cant_venta, opc_venta)
+        return (symbol, cartera, cierre, "-", "-", opc_compra, "-", "-", opc_venta)
+
+    tabla_senales = TablaVirtual(frame_tabla, columns, anchos=anchos, ancho_defecto=70,
+                                 formatear=formatear_senal)
 
-    # Insertar datos (ordenados alfabéticamente por symbol)
+    # Filas crudas (ordenadas alfabéticamente por symbol); el formato se aplica al mostrarlas
     senales_ordenadas = sorted(senales, key=lambda x: x.get('symbol', '').upper())
 
+    filas = []
     for senal in senales_ordenadas:
         if senal['estado'] == 'OK':
-            tree_senales.insert("", "end", values=(
-                senal['symbol'],
-                senal['acciones_cartera'],
-                f"${senal['cierre']:.2f}",
-                f"${senal['precio_compra']:.2f}",
-                senal['cant_compra'],
-                senal['opc_compra'],
-                f"${senal['precio_venta']:.2f}",
-                senal['cant_venta'],
-                senal['opc_venta']
-            ))
+            filas.append((senal['symbol'], senal['acciones_cartera'], senal['cierre'],
+                          senal['precio_compra'], senal['cant_compra'], senal['opc_compra'],
+                          senal['precio_venta'], senal['cant_venta'], senal['opc_venta'], True))
         else:
-            tree_senales.insert("", "end", values=(
-                senal['symbol'],
-                senal.get('acciones_cartera', 0),
-                senal['cierre'],
-                "-",
-                "-",
-                senal.get('opc_compra', 'N/A'),
-                "-",
-                "-",
-                senal.get('opc_venta', 'N/A')
-            ))
-
-    # Empaquetar
-    scrollbar_y.pack(side="right", fill="y")
-    scrollbar_x.pack(side="bottom", fill="x")
-    tree_senales.pack(fill="both", expand=True)
+            filas.append((senal['symbol'], senal.get('acciones_cartera', 0), senal['cierre'],
+                          None, None, senal.get('opc_compra', 'N/A'),
+                          None, None, senal.get('opc_venta', 'N/A'), False))
+    tabla_senales.establecer_filas(filas)
+
+    tabla_senales.pack(fill="both", expand=True)
 
     # Frame de botones
     frame_botones = tk.Frame(ventana_senales, pady=10)
@@ -1057,7 +918,8 @@ def mostrar_ventana_senales(senales):
         if not ruta_excel:
             return
 
-        try:
+        # El libro se arma y se guarda fuera del hilo de Tk
+        def escribir_excel(tarea):
             from openpyxl import Workbook
             from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 
@@ -1146,10 +1008,14 @@ def mostrar_ventana_senales(senales):
                 ws.column_dimensions[col].width = 14
 
             wb.save(ruta_excel)
-            messagebox.showinfo("Exportado", f"Señales exportadas a:\n{ruta_excel}")
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al exportar: {e}")
+        def al_terminar(_, error):
+            if error is not None:
+                messagebox.showerror("Error", f"Error al exportar: {error}")
+            else:
+                messagebox.showinfo("Exportado", f"Señales exportadas a:\n{ruta_excel}")
+
+        en_segundo_plano(root, escribir_excel, al_terminar)
 
     tk.Button(frame_botones, text="Exportar a Excel", command=exportar_excel,
               bg="#28a745", fg="white", font=("Arial", 10, "bold")).pack(side="left", padx=5)
@@ -1164,32 +1030,69 @@ def mostrar_ventana_senales(senales):
              font=("Arial", 9), fg="red").pack(anchor="w")
 
 
-def comparar_senales_operaciones():
-    """Abre ventana para comparar señales generadas con operaciones reales"""
-    ruta_senales = obtener_ruta_senales()
-    if ruta_senales is None:
-        messagebox.showerror("Error", "No hay ubicación configurada.\nEjecuta primero Analisis_singrafico.py")
-        return
+def datos_comparacion(ruta_senales, csv_file):
+    """
+    Lee señales, operaciones y los precios del log que las cubren. Corre
+    fuera del hilo de Tk.
 
-    senales = cargar_historial_senales()
+    Returns:
+        (señales ordenadas por symbol, operaciones, DataFrame de precios o None)
+    """
+    # Las señales se leen del diario de a una, ya ordenadas por symbol
+    senales_ordenadas = sorted(leer_senales(ruta_senales), key=lambda x: x.get("symbol", "").upper())
     operaciones = cargar_historial_operaciones()
 
-    if not senales:
-        messagebox.showinfo("Sin datos", "No hay señales guardadas.\nGenera señales primero con el botón 'Generar Señales'.")
-        return
-
     # Cargar datos de precios del log
-    csv_file = entry_ruta.get()
     precios_df = None
-    if csv_file:
+    if csv_file and senales_ordenadas:
         log_file = os.path.join(os.path.dirname(csv_file), "auto_update_log.csv")
         if os.path.exists(log_file):
             try:
-                precios_df = pd.read_csv(log_file, parse_dates=['Date'])
-                precios_df['Date'] = pd.to_datetime(precios_df['Date']).dt.strftime('%Y-%m-%d')
+                # Solo los tickers y el rango de fechas de las señales
+                fechas_senales = [sen.get("fecha_generacion", "")[:10] for sen in senales_ordenadas]
+                fechas_senales = [f for f in fechas_senales if f] or [None]
+                precios_df = precios_de_log(log_file,
+                                            tickers={sen.get("symbol", "") for sen in senales_ordenadas},
+                                            desde=min(fechas_senales), hasta=max(fechas_senales))
+                precios_df['Date'] = precios_df['Date'].dt.strftime('%Y-%m-%d')
             except Exception as e:
                 print(f"[WARN] No se pudo cargar log de precios: {e}")
 
+    return senales_ordenadas, operaciones, precios_df
+
+
+def comparar_senales_operaciones():
+    """Abre ventana para comparar señales generadas con operaciones reales"""
+    global tarea_senales
+
+    ruta_senales = obtener_ruta_senales()
+    if ruta_senales is None:
+        messagebox.showerror("Error", "No hay ubicación configurada.\nEjecuta primero Analisis_singrafico.py")
+        return
+
+    if en_curso(tarea_senales):
+        label_status.config(text="Ya se están calculando señales...", fg="orange")
+        return
+
+    def al_cargar(datos, error):
+        label_status.config(text="")
+        if error is not None:
+            messagebox.showerror("Error", f"Error leyendo señales:\n{error}")
+            return
+
+        senales_ordenadas, operaciones, precios_df = datos
+        if not senales_ordenadas:
+            messagebox.showinfo("Sin datos", "No hay señales guardadas.\nGenera señales primero con el botón 'Generar Señales'.")
+            return
+        mostrar_comparacion(senales_ordenadas, operaciones, precios_df)
+
+    csv_file = entry_ruta.get()
+    label_status.config(text="Leyendo señales y precios...", fg="blue")
+    tarea_senales = en_segundo_plano(root, lambda tarea: datos_comparacion(ruta_senales, csv_file), al_cargar)
+
+
+def mostrar_comparacion(senales_ordenadas, operaciones, precios_df):
+    """Ventana de comparación entre señales y operaciones reales"""
     # Crear ventana
     ventana_comp = tk.Toplevel(root)
     ventana_comp.title("Comparación: Señales vs Operaciones Reales")
@@ -1199,7 +1102,7 @@ def comparar_senales_operaciones():
     frame_info = tk.Frame(ventana_comp, pady=5)
     frame_info.pack(fill="x", padx=10)
 
-    tk.Label(frame_info, text=f"Total señales: {len(senales)}  |  Total operaciones: {len(operaciones)}",
+    tk.Label(frame_info, text=f"Total señales: {len(senales_ordenadas)}  |  Total operaciones: {len(operaciones)}",
              font=("Arial", 10, "bold")).pack(side="left")
 
     # Notebook para pestañas
@@ -1210,133 +1113,106 @@ def comparar_senales_operaciones():
     frame_senales = tk.Frame(notebook)
     notebook.add(frame_senales, text="Señales Generadas")
 
-    # Scrollbars para señales
-    scroll_sen_y = tk.Scrollbar(frame_senales, orient="vertical")
-    scroll_sen_x = tk.Scrollbar(frame_senales, orient="horizontal")
+    # Las tablas guardan filas crudas y formatean solo las filas visibles
+    def precio(valor):
+        return f"${valor:.2f}"
 
-    cols_sen = ("Fecha", "Symbol", "Cierre", "P.Compra", "Cant.C", "Opc.Compra", "P.Venta", "Cant.V", "Opc.Venta", "Cartera")
-    tree_senales = ttk.Treeview(frame_senales, columns=cols_sen, show="headings",
-                                 selectmode="extended",
-                                 yscrollcommand=scroll_sen_y.set, xscrollcommand=scroll_sen_x.set)
-
-    scroll_sen_y.config(command=tree_senales.yview)
-    scroll_sen_x.config(command=tree_senales.xview)
+    def precio_o_guion(valor):
+        return f"${valor:.2f}" if valor > 0 else "-"
 
+    cols_sen = ("Fecha", "Symbol", "Cierre", "P.Compra", "Cant.C", "Opc.Compra", "P.Venta", "Cant.V", "Opc.Venta", "Cartera")
     # Anchos de columna basados en título
     anchos_sen = {"Fecha": 85, "Symbol": 70, "Cierre": 75, "P.Compra": 80, "Cant.C": 55,
                   "Opc.Compra": 85, "P.Venta": 75, "Cant.V": 55, "Opc.Venta": 80, "Cartera": 65}
-    for col in cols_sen:
-        tree_senales.heading(col, text=col)
-        tree_senales.column(col, width=anchos_sen.get(col, 80), anchor="center")
 
-    # Ordenar señales alfabéticamente por symbol
-    senales_ordenadas = sorted(senales, key=lambda x: x.get("symbol", "").upper())
+    def formatear_senal(fila):
+        fecha, symbol, cierre, compra, cant_compra, opc_compra, venta, cant_venta, opc_venta, cartera = fila
+        return (fecha, symbol, precio(cierre), precio(compra), cant_compra, opc_compra,
+                precio(venta), cant_venta, opc_venta, cartera)
 
-    # Diccionario para mapear items del tree a datos de señal (para eliminación precisa)
-    item_to_senal = {}
+    tabla_senales = TablaVirtual(frame_senales, cols_sen, anchos=anchos_sen, formatear=formatear_senal,
+                                 selectmode="extended", con_filtro=True)
 
+    filas_sen = []
+    # Referencia única de cada fila (para eliminación precisa): fecha_completa + symbol + precio_cierre
+    claves_sen = []
     for sen in senales_ordenadas:
         fecha_completa = sen.get("fecha_generacion", "")
-        item_id = tree_senales.insert("", "end", values=(
+        filas_sen.append((
             fecha_completa[:10],  # Solo mostrar fecha
             sen.get("symbol", ""),
-            f"${sen.get('precio_cierre', 0):.2f}",
-            f"${sen.get('precio_compra_sugerido', 0):.2f}",
+            sen.get("precio_cierre", 0),
+            sen.get("precio_compra_sugerido", 0),
             sen.get("cant_compra", "-"),
             sen.get("opc_compra", ""),
-            f"${sen.get('precio_venta_sugerido', 0):.2f}",
+            sen.get("precio_venta_sugerido", 0),
             sen.get("cant_venta", "-"),
             sen.get("opc_venta", ""),
             sen.get("acciones_cartera", 0)
         ))
-        # Guardar referencia única: fecha_completa + symbol + precio_cierre
-        item_to_senal[item_id] = {
-            "fecha_generacion": fecha_completa,
-            "symbol": sen.get("symbol", ""),
-            "precio_cierre": sen.get("precio_cierre", 0)
-        }
-
-    scroll_sen_y.pack(side="right", fill="y")
-    scroll_sen_x.pack(side="bottom", fill="x")
-    tree_senales.pack(fill="both", expand=True)
+        claves_sen.append((fecha_completa, sen.get("symbol", ""), sen.get("precio_cierre", 0)))
+    tabla_senales.establecer_filas(filas_sen, claves_sen)
+    tabla_senales.pack(fill="both", expand=True)
 
     # ===== PESTAÑA 2: OPERACIONES =====
     frame_ops = tk.Frame(notebook)
     notebook.add(frame_ops, text="Operaciones Reales")
 
-    scroll_ops_y = tk.Scrollbar(frame_ops, orient="vertical")
-    scroll_ops_x = tk.Scrollbar(frame_ops, orient="horizontal")
-
     cols_ops = ("Fecha", "Symbol", "Tipo", "Precio", "Cantidad", "Total")
-    tree_ops = ttk.Treeview(frame_ops, columns=cols_ops, show="headings",
-                             yscrollcommand=scroll_ops_y.set, xscrollcommand=scroll_ops_x.set)
 
-    scroll_ops_y.config(command=tree_ops.yview)
-    scroll_ops_x.config(command=tree_ops.xview)
+    def formatear_operacion(fila):
+        fecha, symbol, tipo, precio_op, cantidad, total = fila
+        return (fecha, symbol, tipo.capitalize(), precio(precio_op), cantidad, precio(total))
 
-    for col in cols_ops:
-        tree_ops.heading(col, text=col)
-        tree_ops.column(col, width=100, anchor="center")
+    tabla_ops = TablaVirtual(frame_ops, cols_ops, ancho_defecto=100, formatear=formatear_operacion,
+                             con_filtro=True)
 
     # Ordenar operaciones alfabéticamente por symbol
     ops_ordenadas = sorted(operaciones, key=lambda x: x.get("ticker_symbol", "").upper())
 
+    filas_ops = []
     for op in ops_ordenadas:
-        precio = op.get("precio", 0)
+        precio_op = op.get("precio", 0)
         cantidad = op.get("cantidad", 0)
-        tree_ops.insert("", "end", values=(
-            op.get("fecha", ""),
-            op.get("ticker_symbol", ""),
-            op.get("tipo", "").capitalize(),
-            f"${precio:.2f}",
-            cantidad,
-            f"${precio * cantidad:.2f}"
-        ))
-
-    scroll_ops_y.pack(side="right", fill="y")
-    scroll_ops_x.pack(side="bottom", fill="x")
-    tree_ops.pack(fill="both", expand=True)
+        filas_ops.append((op.get("fecha", ""), op.get("ticker_symbol", ""), op.get("tipo", ""),
+                          precio_op, cantidad, precio_op * cantidad))
+    tabla_ops.establecer_filas(filas_ops)
+    tabla_ops.pack(fill="both", expand=True)
 
     # ===== PESTAÑA 3: COMPARACIÓN =====
     frame_comp = tk.Frame(notebook)
     notebook.add(frame_comp, text="Comparación")
 
-    scroll_comp_y = tk.Scrollbar(frame_comp, orient="vertical")
-    scroll_comp_x = tk.Scrollbar(frame_comp, orient="horizontal")
-
     cols_comp = ("Fecha Señal", "Symbol", "Máximo", "Mínimo", "Cierre", "P.Compra", "P.Venta", "Recomendación", "Fecha Op.", "Tipo Real", "Precio Real", "Seguida")
-    tree_comp = ttk.Treeview(frame_comp, columns=cols_comp, show="headings",
-                              yscrollcommand=scroll_comp_y.set, xscrollcommand=scroll_comp_x.set)
-
-    scroll_comp_y.config(command=tree_comp.yview)
-    scroll_comp_x.config(command=tree_comp.xview)
-
     anchos_comp = {"Fecha Señal": 90, "Symbol": 70, "Máximo": 80, "Mínimo": 80, "Cierre": 80,
                    "P.Compra": 80, "P.Venta": 80, "Recomendación": 95, "Fecha Op.": 90,
                    "Tipo Real": 75, "Precio Real": 85, "Seguida": 70}
-    for col in cols_comp:
-        tree_comp.heading(col, text=col)
-        tree_comp.column(col, width=anchos_comp.get(col, 80), anchor="center")
 
-    # Lista para almacenar datos para gráfico
+    def formatear_comparacion(fila):
+        (fecha_sen, symbol, maximo, minimo, cierre, compra, venta,
+         recomendacion, fecha_op, tipo_real, precio_real, seguida) = fila
+        return (fecha_sen, symbol, precio_o_guion(maximo), precio_o_guion(minimo), precio_o_guion(cierre),
+                precio_o_guion(compra), precio_o_guion(venta), recomendacion, fecha_op, tipo_real,
+                precio_o_guion(precio_real), seguida)
+
+    tabla_comp = TablaVirtual(frame_comp, cols_comp, anchos=anchos_comp, formatear=formatear_comparacion,
+                              con_filtro=True)
+
+    # Datos de cada fila de la comparación (para el gráfico y la exportación)
     datos_grafico = []
 
-    # Analizar comparación
-    for sen in senales_ordenadas:
+    # Analizar comparación: precios del día y operación real de todas las señales de una vez
+    cruces = cruzar_senales(senales_ordenadas, operaciones, precios_df)
+    filas_comp = []
+
+    for sen, cruce in zip(senales_ordenadas, cruces):
         fecha_sen = sen.get("fecha_generacion", "")[:10]
         symbol = sen.get("symbol", "")
 
-        # Buscar precios del día en el log
-        precio_max = 0
-        precio_min = 0
-        precio_cierre = sen.get("precio_cierre", 0)
-
-        if precios_df is not None:
-            precio_dia = precios_df[(precios_df['Date'] == fecha_sen) & (precios_df['Ticker'] == symbol)]
-            if not precio_dia.empty:
-                precio_max = precio_dia['High'].values[0]
-                precio_min = precio_dia['Low'].values[0]
-                precio_cierre = precio_dia['Close'].values[0]
+        # Precios del día en el log
+        precio_max = cruce['maximo']
+        precio_min = cruce['minimo']
+        precio_cierre = cruce['cierre']
 
         precio_compra_sug = sen.get("precio_compra_sugerido", 0)
         precio_venta_sug = sen.get("precio_venta_sugerido", 0)
@@ -1349,22 +1225,8 @@ def comparar_senales_operaciones():
         else:
             recomendacion = "Sin acción"
 
-        # Buscar operación real cercana (mismo día o siguiente)
-        op_encontrada = None
-        for op in operaciones:
-            if op.get("ticker_symbol") == symbol:
-                fecha_op = op.get("fecha", "")
-                # Comparar si la operación fue el mismo día o hasta 2 días después
-                if fecha_op >= fecha_sen:
-                    try:
-                        from datetime import timedelta
-                        fecha_sen_dt = datetime.strptime(fecha_sen, "%Y-%m-%d")
-                        fecha_op_dt = datetime.strptime(fecha_op, "%Y-%m-%d")
-                        if (fecha_op_dt - fecha_sen_dt).days <= 2:
-                            op_encontrada = op
-                            break
-                    except:
-                        pass
+        # Operación real cercana (mismo día o hasta 2 días después)
+        op_encontrada = cruce['operacion']
 
         if op_encontrada:
             tipo_real = op_encontrada.get("tipo", "").capitalize()
@@ -1382,22 +1244,11 @@ def comparar_senales_operaciones():
             fecha_op_str = "-"
             seguida = "Pendiente"
 
-        tree_comp.insert("", "end", values=(
-            fecha_sen,
-            symbol,
-            f"${precio_max:.2f}" if precio_max > 0 else "-",
-            f"${precio_min:.2f}" if precio_min > 0 else "-",
-            f"${precio_cierre:.2f}" if precio_cierre > 0 else "-",
-            f"${precio_compra_sug:.2f}" if precio_compra_sug > 0 else "-",
-            f"${precio_venta_sug:.2f}" if precio_venta_sug > 0 else "-",
-            recomendacion,
-            fecha_op_str,
-            tipo_real,
-            f"${precio_real:.2f}" if precio_real > 0 else "-",
-            seguida
-        ))
+        filas_comp.append((fecha_sen, symbol, precio_max, precio_min, precio_cierre,
+                           precio_compra_sug, precio_venta_sug, recomendacion,
+                           fecha_op_str, tipo_real, precio_real, seguida))
 
-        # Guardar datos para gráfico
+        # Guardar datos para gráfico y exportación
         datos_grafico.append({
             'fecha': fecha_sen,
             'symbol': symbol,
@@ -1406,12 +1257,15 @@ def comparar_senales_operaciones():
             'cierre': precio_cierre,
             'precio_compra': precio_compra_sug,
             'precio_venta': precio_venta_sug,
-            'recomendacion': recomendacion
+            'recomendacion': recomendacion,
+            'fecha_op': fecha_op_str,
+            'tipo_real': tipo_real,
+            'precio_real': precio_real,
+            'seguida': seguida
         })
 
-    scroll_comp_y.pack(side="right", fill="y")
-    scroll_comp_x.pack(side="bottom", fill="x")
-    tree_comp.pack(fill="both", expand=True)
+    tabla_comp.establecer_filas(filas_comp)
+    tabla_comp.pack(fill="both", expand=True)
 
     # Frame de botones
     frame_botones = tk.Frame(ventana_comp, pady=10)
@@ -1429,7 +1283,8 @@ def comparar_senales_operaciones():
         if not ruta_excel:
             return
 
-        try:
+        # El libro se arma y se guarda fuera del hilo de Tk
+        def escribir_excel(tarea):
             from openpyxl import Workbook
             from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 
@@ -1506,34 +1361,12 @@ def comparar_senales_operaciones():
                 fecha_sen = dato['fecha']
                 symbol = dato['symbol']
 
-                # Determinar recomendación
+                # Recomendación y operación real ya cruzadas en la comparación
                 recomendacion = dato['recomendacion']
-
-                # Buscar operación real cercana
-                op_encontrada = None
-                for op in operaciones:
-                    if op.get("ticker_symbol") == symbol:
-                        fecha_op = op.get("fecha", "")
-                        if fecha_op >= fecha_sen:
-                            try:
-                                fecha_sen_dt = datetime.strptime(fecha_sen, "%Y-%m-%d")
-                                fecha_op_dt = datetime.strptime(fecha_op, "%Y-%m-%d")
-                                if (fecha_op_dt - fecha_sen_dt).days <= 2:
-                                    op_encontrada = op
-                                    break
-                            except:
-                                pass
-
-                if op_encontrada:
-                    tipo_real = op_encontrada.get("tipo", "").capitalize()
-                    precio_real = op_encontrada.get("precio", 0)
-                    fecha_op_str = op_encontrada.get("fecha", "")
-                    seguida = "SI" if recomendacion.lower() == tipo_real.lower() else "NO"
-                else:
-                    tipo_real = "-"
-                    precio_real = 0
-                    fecha_op_str = "-"
-                    seguida = "Pendiente"
+                fecha_op_str = dato['fecha_op']
+                tipo_real = dato['tipo_real']
+                precio_real = dato['precio_real']
+                seguida = dato['seguida']
 
                 ws_comp.cell(row=row_idx, column=1, value=fecha_sen).border = border
                 ws_comp.cell(row=row_idx, column=2, value=symbol).border = border
@@ -1562,10 +1395,14 @@ def comparar_senales_operaciones():
                     ws.column_dimensions[col[0].column_letter].width = 14
 
             wb.save(ruta_excel)
-            messagebox.showinfo("Exportado", f"Comparación exportada a:\n{ruta_excel}")
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al exportar: {e}")
+        def al_terminar(_, error):
+            if error is not None:
+                messagebox.showerror("Error", f"Error al exportar: {error}")
+            else:
+                messagebox.showinfo("Exportado", f"Comparación exportada a:\n{ruta_excel}")
+
+        en_segundo_plano(root, escribir_excel, al_terminar)
 
     def limpiar_historial_senales():
         """Limpia el historial de señales"""
@@ -1575,8 +1412,7 @@ def comparar_senales_operaciones():
         ruta = obtener_ruta_senales()
         if ruta and ruta.exists():
             try:
-                with open(ruta, 'w', encoding='utf-8') as f:
-                    json.dump({"senales": []}, f, indent=2)
+                compactar(ruta, descartar=lambda sen: True)
                 messagebox.showinfo("Limpiado", "Historial de señales eliminado.")
                 ventana_comp.destroy()
             except Exception as e:
@@ -1704,52 +1540,39 @@ def comparar_senales_operaciones():
         actualizar_grafico()
 
     def eliminar_senales_seleccionadas():
-        """Elimina las señales seleccionadas en el Treeview (individualmente)"""
-        seleccionados = tree_senales.selection()
-        if not seleccionados:
+        """Elimina las señales seleccionadas en la tabla (individualmente)"""
+        # Clave única de cada señal seleccionada: fecha_generacion completa + symbol + precio_cierre
+        seleccionadas = tabla_senales.seleccion()
+        if not seleccionadas:
             messagebox.showwarning("Sin selección", "Selecciona las señales que deseas eliminar")
             return
 
-        cantidad = len(seleccionados)
+        cantidad = len(seleccionadas)
         if not messagebox.askyesno("Confirmar eliminación",
                                     f"¿Eliminar {cantidad} señal(es) seleccionada(s)?"):
             return
 
-        # Obtener identificadores únicos de cada señal seleccionada
-        # Usamos fecha_generacion completa + symbol + precio_cierre para identificar únicamente
-        senales_a_eliminar = set()
-        for item in seleccionados:
-            if item in item_to_senal:
-                info = item_to_senal[item]
-                # Clave única: fecha_generacion completa + symbol + precio_cierre
-                clave = (info["fecha_generacion"], info["symbol"], info["precio_cierre"])
-                senales_a_eliminar.add(clave)
+        senales_a_eliminar = set(seleccionadas)
 
         # Cargar y filtrar señales
         ruta = obtener_ruta_senales()
         if ruta and os.path.exists(ruta):
             try:
-                senales_actuales = cargar_historial_senales()
-                senales_filtradas = []
-                for sen in senales_actuales:
+                # Reescribir el diario sin las señales eliminadas
+                def es_eliminada(sen):
                     clave_sen = (
                         sen.get("fecha_generacion", ""),
                         sen.get("symbol", ""),
                         sen.get("precio_cierre", 0)
                     )
-                    if clave_sen not in senales_a_eliminar:
-                        senales_filtradas.append(sen)
+                    return clave_sen in senales_a_eliminar
 
-                # Guardar señales filtradas
-                with open(ruta, 'w', encoding='utf-8') as f:
-                    json.dump({"senales": senales_filtradas}, f, indent=2, ensure_ascii=False)
+                nuevas_senales, _ = compactar(ruta, descartar=es_eliminada)
 
-                # Eliminar del Treeview
-                for item in seleccionados:
-                    tree_senales.delete(item)
+                # Eliminar de la tabla
+                tabla_senales.quitar_seleccionadas()
 
                 # Actualizar contador
-                nuevas_senales = len(senales_filtradas)
                 frame_info.winfo_children()[0].config(
                     text=f"Total señales: {nuevas_senales}  |  Total operaciones: {len(operaciones)}")
 
@@ -1790,139 +1613,138 @@ def seleccionar_csv():
         # Guardar la ruta para la próxima vez
         guardar_ruta_csv(ruta)
 
-def actualizar_csv():
-    csv_file = entry_ruta.get()
-    if not csv_file:
-        label_status.config(text="Selecciona primero la ruta del CSV", fg="red")
-        return
+# Actualización en curso (evita lanzar una segunda mientras corre otra)
+tarea_actualizacion = None
 
-    try:
-        print("\n=== INICIO ACTUALIZACIÓN ===")
-
-        print("[1] Descargando datos de Yahoo Finance...")
-        data = yf.download(tickers, period="1d", group_by='ticker', auto_adjust=False)
-        print("[2] Descarga completada.")
-
-        records = []
-        for ticker in tickers:
-            if hasattr(data.columns, "levels") and ticker in data.columns.levels[0]:
-                df = data[ticker].copy()
-                df.reset_index(inplace=True)
-                df.rename(columns={'Adj Close':'Close'}, inplace=True)
-                df['Ticker'] = ticker
-                records.append(df[['Date','Ticker','Open','High','Low','Close']])
-            else:
-                if 'Open' in data.columns and 'High' in data.columns and 'Low' in data.columns and 'Close' in data.columns:
-                    tmp = data.reset_index().copy()
-                    tmp.rename(columns={'Adj Close':'Close'}, inplace=True)
-                    tmp['Ticker'] = ticker
-                    if not tmp.empty:
-                        records.append(tmp[['Date','Ticker','Open','High','Low','Close']])
-                    break
-
-        if not records:
-            print("[X] No se encontraron datos.")
-            label_status.config(text="No hay datos nuevos disponibles hoy.", fg="blue")
-            return
 
-        df_long = pd.concat(records, ignore_index=True)
-        df_long = df_long.loc[:, ~df_long.columns.duplicated()]
-        df_long['Date'] = pd.to_datetime(df_long['Date']).dt.normalize()
+def descargar_y_guardar(csv_file, lista_tickers, tarea):
+    """
+    Descarga el día de `lista_tickers` en lotes y guarda el CSV principal y
+    el log auxiliar. Corre fuera del hilo de Tk (no toca widgets).
 
-        # ===========================
-        # CREAR CSV PRINCIPAL
-        # ===========================
-        if not os.path.exists(csv_file):
-            print("[3] CSV no existe, se creará uno nuevo.")
-        else:
-            print("[3] CSV ya existe, será sobrescrito con la data descargada.")
+    Returns:
+        (filas descargadas, {ticker: motivo} de los que fallaron), o None si
+        no hubo datos o si se detuvo la descarga (no se guarda nada a medias)
+    """
+    print("\n=== INICIO ACTUALIZACIÓN ===")
 
-        print("[5] Creando CSV con la data descargada...")
-        df_long.to_csv(csv_file, index=False, float_format="%.2f")
-        print("[6] CSV guardado correctamente.")
+    print("[1] Descargando datos de Yahoo Finance...")
+    df_long, fallidos = descargar_por_lotes(lista_tickers, periodo="1d", al_progresar=tarea.avisar,
+                                            cancelar=tarea.cancelar)
+    if tarea.cancelada():
+        print("[X] Actualización detenida por el usuario.")
+        return None
+    print("[2] Descarga completada.")
+    for ticker, motivo in fallidos.items():
+        print(f"[WARN] {ticker}: {motivo}")
 
+    if df_long.empty:
+        print("[X] No se encontraron datos.")
+        return None
 
-        # ===========================
-        # ACTUALIZAR LOG AUXILIAR
-        # ===========================
-        log_file = os.path.join(os.path.dirname(csv_file), "auto_update_log.csv")
-        print(f"[7] Actualizando log auxiliar: {log_file}")
+    # ===========================
+    # CREAR CSV PRINCIPAL
+    # ===========================
+    if not os.path.exists(csv_file):
+        print("[3] CSV no existe, se creará uno nuevo.")
+    else:
+        print("[3] CSV ya existe, será sobrescrito con la data descargada.")
 
-        df_long_for_log = df_long.copy()
-        df_long_for_log['Date'] = pd.to_datetime(df_long_for_log['Date']).dt.normalize()
+    print("[5] Creando CSV con la data descargada...")
+    df_long.to_csv(csv_file, index=False, float_format="%.2f")
+    print("[6] CSV guardado correctamente.")
 
-        if os.path.exists(log_file):
-            print("[8] Leyendo log existente...")
-            df_log_existing = pd.read_csv(log_file, parse_dates=['Date'])
-            df_log_existing = df_log_existing.loc[:, ~df_log_existing.columns.duplicated()]
-            df_log_existing['Date'] = pd.to_datetime(df_log_existing['Date']).dt.normalize()
-
-            existing_keys = set(zip(
-                df_log_existing['Date'].dt.strftime('%Y-%m-%d'),
-                df_log_existing['Ticker']
-            ))
-
-            keys_series = df_long_for_log[['Date','Ticker']].apply(
-                lambda r: (r['Date'].strftime('%Y-%m-%d'), r['Ticker']), axis=1
-            )
 
-            mask_new = ~keys_series.isin(existing_keys)
-            df_log_new = df_long_for_log.loc[mask_new].copy()
+    # ===========================
+    # ACTUALIZAR LOG AUXILIAR
+    # ===========================
+    log_file = os.path.join(os.path.dirname(csv_file), "auto_update_log.csv")
+    print(f"[7] Actualizando log auxiliar: {log_file}")
 
-            if not df_log_new.empty:
-                print(f"[9] Agregando {len(df_log_new)} filas nuevas al log.")
-                df_log_to_save = pd.concat([df_log_existing, df_log_new], ignore_index=True)
-            else:
-                print("[9] No hay filas nuevas para agregar al log.")
-                df_log_to_save = df_log_existing.copy()
+    if not os.path.exists(log_file):
+        print("[8] Log no existe. Creándolo desde cero.")
+
+    agregadas, _ = actualizar_log_precios(log_file, df_long)
+    if agregadas:
+        print(f"[9] Agregadas {agregadas} filas nuevas al log.")
+    else:
+        print("[9] No hay filas nuevas para agregar al log.")
+
+    # Liberar memoria
+    gc.collect()
+
+    print("=== FIN ACTUALIZACIÓN ===\n")
+    return len(df_long), fallidos
 
-        else:
-            print("[8] Log no existe. Creándolo desde cero.")
-            df_log_to_save = df_long_for_log.copy()
 
-        print("[10] Guardando log auxiliar...")
-        df_log_to_save.to_csv(log_file, index=False, float_format="%.2f")
-        print("[11] Log guardado correctamente.")
+def actualizar_csv():
+    global tarea_actualizacion
+    csv_file = entry_ruta.get()
+    if not csv_file:
+        label_status.config(text="Selecciona primero la ruta del CSV", fg="red")
+        return
+    if en_curso(tarea_actualizacion):
+        label_status.config(text="Ya hay una actualización en curso...", fg="orange")
+        return
+
+    def al_progresar(terminados, total):
+        label_status.config(text=f"Descargando precios... {terminados}/{total} tickers", fg="blue")
 
-        # Liberar memoria
-        gc.collect()
+    def al_terminar(resultado, error):
+        btn_actualizar.config(state="normal")
+        btn_detener.config(state="disabled")
+        if tarea_actualizacion.cancelada():
+            label_status.config(text="Actualización detenida por el usuario.", fg="orange")
+            return
+        if error is not None:
+            print(f"[ERROR GENERAL] {str(error)}")
+            label_status.config(text=f"Error: {str(error)}", fg="red")
+            return
+        if resultado is None:
+            label_status.config(text="No hay datos nuevos disponibles hoy.", fg="blue")
+            return
 
+        _, fallidos = resultado
         # Hora NY
         now_ny = datetime.now(ZoneInfo("America/New_York"))
         fecha_hora_ny = now_ny.strftime("%Y-%m-%d %H:%M")
-        label_status.config(
-            text=f"CSV actualizado con fecha y hora de Nueva York: {fecha_hora_ny}",
-            fg="blue"
-        )
+        texto = f"CSV actualizado con fecha y hora de Nueva York: {fecha_hora_ny}"
+        if fallidos:
+            texto += f"  (sin datos: {', '.join(sorted(fallidos))})"
+        label_status.config(text=texto, fg="orange" if fallidos else "blue")
 
-        print("=== FIN ACTUALIZACIÓN ===\n")
+        try:
+            mostrar_datos_en_tabla(csv_file)
+        except Exception as e:
+            print(f"[ERROR GENERAL] {str(e)}")
+            label_status.config(text=f"Error: {str(e)}", fg="red")
 
-        mostrar_datos_en_tabla(csv_file)
+    btn_actualizar.config(state="disabled")
+    btn_detener.config(state="normal")
+    label_status.config(text=f"Descargando precios de {len(tickers)} tickers...", fg="blue")
+    lista_tickers = list(tickers)
+    tarea_actualizacion = en_segundo_plano(root, lambda tarea: descargar_y_guardar(csv_file, lista_tickers, tarea),
+                                           al_terminar, al_progresar)
+
+def detener_actualizacion():
+    """Pide a la descarga en curso que no haga más pedidos"""
+    if en_curso(tarea_actualizacion):
+        tarea_actualizacion.detener()
+        label_status.config(text="Deteniendo la actualización...", fg="orange")
 
-    except Exception as e:
-        print(f"[ERROR GENERAL] {str(e)}")
-        label_status.config(text=f"Error: {str(e)}", fg="red")
 
 def mostrar_datos_en_tabla(csv_file):
     df = pd.read_csv(csv_file)
 
-    # Limpiar tabla
-    for row in tree.get_children():
-        tree.delete(row)
-
-    # Insertar filas
-    for _, row in df.iterrows():
-        tree.insert(
-            "", tk.END,
-            values=(
-                row['Date'],
-                row['Ticker'],
-                f"{row['Open']:.2f}",
-                f"{row['High']:.2f}",
-                f"{row['Low']:.2f}",
-                f"{row['Close']:.2f}"
-            )
-        )
+    # Filas crudas por columnas; la tabla formatea solo las visibles
+    tabla_precios.establecer_filas(zip(
+        df['Date'].tolist(),
+        df['Ticker'].tolist(),
+        df['Open'].tolist(),
+        df['High'].tolist(),
+        df['Low'].tolist(),
+        df['Close'].tolist()
+    ))
 
 # Crear ventana principal
 root = tk.Tk()
@@ -1973,20 +1795,22 @@ def agregar_ticker():
     if nuevo in tickers:
         label_status.config(text=f"{nuevo} ya está en la lista.", fg="orange")
         return
-    # Verificación rápida con Yahoo Finance
-    try:
-        df_test = yf.download(nuevo, period="1d", progress=False)
-        if df_test.empty:
-            raise ValueError("No hay datos para este ticker")
-    except Exception:
-        label_status.config(text=f"Ticker inválido: {nuevo}", fg="red")
-        return
+    # Verificación rápida con Yahoo Finance, fuera del hilo de Tk
+    def al_terminar(resultado, error):
+        if error is not None or resultado[0].empty:
+            label_status.config(text=f"Ticker inválido: {nuevo}", fg="red")
+            return
+        if nuevo in tickers:
+            return
+
+        # Si pasa la verificación, se agrega
+        tickers.append(nuevo)
+        listbox_tickers.insert(tk.END, nuevo)
+        entry_nuevo_ticker.delete(0, tk.END)
+        label_status.config(text=f"Ticker agregado: {nuevo}", fg="green")
 
-    # Si pasa la verificación, se agrega
-    tickers.append(nuevo)
-    listbox_tickers.insert(tk.END, nuevo)
-    entry_nuevo_ticker.delete(0, tk.END)
-    label_status.config(text=f"Ticker agregado: {nuevo}", fg="green")
+    label_status.config(text=f"Verificando {nuevo}...", fg="blue")
+    en_segundo_plano(root, lambda tarea: descargar_por_lotes([nuevo], periodo="1d", reintentos=1), al_terminar)
 
 
 def quitar_ticker():
@@ -2020,8 +1844,14 @@ frame_botones_principales = tk.Frame(root)
 frame_botones_principales.pack(pady=5)
 
 # Botón para actualizar CSV manualmente
-tk.Button(frame_botones_principales, text="Actualizar CSV ahora", command=actualizar_csv,
-          bg="lightblue", font=("Arial", 10)).pack(side="left", padx=5)
+btn_actualizar = tk.Button(frame_botones_principales, text="Actualizar CSV ahora", command=actualizar_csv,
+                           bg="lightblue", font=("Arial", 10))
+btn_actualizar.pack(side="left", padx=5)
+
+# Botón para detener la actualización en curso
+btn_detener = tk.Button(frame_botones_principales, text="⏹ Detener", command=detener_actualizacion,
+                        bg="#ff6b6b", fg="white", font=("Arial", 10), state="disabled")
+btn_detener.pack(side="left", padx=5)
 
 # Botón para generar señales
 tk.Button(frame_botones_principales, text="Generar Señales", command=generar_senales,
@@ -2052,17 +1882,20 @@ frame_table = tk.Frame(root)
 frame_table.pack(padx=10, pady=10, fill="both", expand=True)
 
 columns = ("Date", "Ticker", "Open", "High", "Low", "Close")
-tree = ttk.Treeview(frame_table, columns=columns, show="headings")
-for col in columns:
-    tree.heading(col, text=col)
-    tree.column(col, anchor="center", width=80)
-
-# Scrollbars
-scroll_y = ttk.Scrollbar(frame_table, orient="vertical", command=tree.yview)
-scroll_x = ttk.Scrollbar(frame_table, orient="horizontal", command=tree.xview)
-tree.configure(yscrollcommand=scroll_y.set, xscrollcommand=scroll_x.set)
-tree.pack(side="left", fill="both", expand=True)
-scroll_y.pack(side="right", fill="y")
-scroll_x.pack(side="bottom", fill="x")
+tabla_precios = TablaVirtual(
+    frame_table, columns, ancho_defecto=80, con_filtro=True,
+    formatear=lambda fila: (fila[0], fila[1], f"{fila[2]:.2f}", f"{fila[3]:.2f}", f"{fila[4]:.2f}", f"{fila[5]:.2f}")
+)
+tabla_precios.pack(fill="both", expand=True)
+
+
+def on_closing():
+    # Las tareas en curso dejan de hacer pedidos y procesos nuevos
+    for tarea in (tarea_actualizacion, tarea_senales):
+        if en_curso(tarea):
+            tarea.detener()
+    root.destroy()
+
 
+root.protocol("WM_DELETE_WINDOW", on_closing)
 root.mainloop()
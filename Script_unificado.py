@@ -12,13 +12,12 @@ from openpyxl.drawing.image import Image as XLImage
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
+from serie_mercado import leer_csv_precios
+
 # Valores por defecto para el límite
 LIMITE_TIPO = "acciones"
 LIMITE_VALOR = 10.0
 
-# Columnas esperadas (exactas)
-EXPECTED_COLUMNS = ["Fecha", "Último", "Apertura", "Máximo", "Mínimo", "Vol.", "% var."]
-
 
 # =========================
 # Funciones auxiliares
@@ -57,51 +56,6 @@ def create_sqlite_from_df(folder, name, df):
     return db
 
 
-def parse_percent_to_decimal(value):
-    """
-    Convierte distintos formatos de porcentaje a decimal:
-    - "2.05%" -> 0.0205
-    - "2.05"  -> 0.0205  (si se interpreta como porcentaje)
-    - "0.0205" -> 0.0205 (ya está en forma decimal)
-    Regla práctica:
-      * Si contiene '%' -> quitar % y dividir por 100
-      * Si el valor absoluto <= 1 -> se interpreta como decimal (p.ej. 0.0205)
-      * Si el valor absoluto > 1 -> se interpreta como porcentaje y se divide por 100
-    Devuelve float o NaN en caso de fallo.
-    """
-    try:
-        if pd.isna(value):
-            return float("nan")
-        s = str(value).strip().replace('"', '').replace(",", ".")
-        if s == "":
-            return float("nan")
-        if "%" in s:
-            s2 = s.replace("%", "").strip()
-            return float(s2) / 100.0
-        f = float(s)
-        if abs(f) <= 1:
-            # ya es decimal
-            return f
-        else:
-            # por ejemplo 2.05 -> 2.05% -> dividir por 100
-            return f / 100.0
-    except Exception:
-        return float("nan")
-
-
-def to_float_safe(x):
-    """Convierte cadenas numéricas con coma/punto a float, devuelve NaN si falla."""
-    try:
-        if pd.isna(x):
-            return float("nan")
-        s = str(x).strip().replace('"', '').replace(",", ".")
-        if s == "":
-            return float("nan")
-        return float(s)
-    except:
-        return float("nan")
-
-
 # =========================
 # Interfaz Gráfica
 # =========================
@@ -201,82 +155,17 @@ def iniciar_proceso():
         return
 
     # -------------------------
-    # -------------------------
-    # Leer CSV preparado (TAB) y normalizar fechas mixtas
+    # Leer CSV con el lector compartido (parser C, formato de fecha resuelto por archivo,
+    # números y % var. convertidos de forma vectorizada)
     # -------------------------
     try:
-        df = pd.read_csv(INPUT_FILE, sep=";", engine='python', dtype=str)
-
-        # Normalizar nombres columnas (strip)
-        df.columns = [c.strip() for c in df.columns]
-
-        # Limpiar espacios en la columna de fechas
-        df['Fecha'] = df['Fecha'].astype(str).str.strip()
-
-        # Función para convertir fechas mixtas
-        def parse_mixed_dates(date_str):
-            for fmt in ("%d/%m/%Y", "%m/%d/%Y"):
-                try:
-                    return pd.to_datetime(date_str, format=fmt)
-                except:
-                    continue
-            return pd.NaT
-
-        # Aplicar la conversión
-        df['Fecha'] = df['Fecha'].apply(parse_mixed_dates)
-
-        # Eliminar filas donde la fecha no se pudo convertir
-        df = df.dropna(subset=['Fecha'])
-
-        # Ordenar por fecha ascendente
-        df = df.sort_values('Fecha').reset_index(drop=True)
-
+        df = leer_csv_precios(INPUT_FILE)
     except Exception as e:
         messagebox.showerror("Error al leer CSV", f"No se pudo leer el archivo.\n{e}")
         return
 
-    # Verificar columnas esperadas
-    missing = [c for c in EXPECTED_COLUMNS if c not in df.columns]
-    extra = [c for c in df.columns if c not in EXPECTED_COLUMNS]
-    if missing:
-        messagebox.showerror(
-            "Columnas faltantes",
-            f"Faltan las siguientes columnas esperadas en el CSV:\n{missing}\n\n"
-            f"Columnas encontradas: {list(df.columns)}"
-        )
-        return
-
-    # Reordenar/seleccionar exactamente las columnas esperadas
-    df = df[EXPECTED_COLUMNS].copy()
-
-    # -------------------------
-    # Tipo de datos y transformaciones
-    # -------------------------
-    # Fecha -> datetime (día primero)
-    try:
-        df['Fecha'] = pd.to_datetime(df['Fecha'], dayfirst=True, errors='coerce')
-    except Exception:
-        df['Fecha'] = pd.to_datetime(df['Fecha'], dayfirst=True, errors='coerce')
-
-    if df['Fecha'].isna().any():
-        # aviso pero no aborta: convertiré los NaT a cadena vacía para evitar errores
-        # normalmente esto indica que el formato de fecha no es dd/mm/yyyy
-        if messagebox.askyesno("Fechas no convertidas",
-                               "Algunas filas no pudieron convertirse a fecha.\n¿Deseas continuar igual (esas filas quedarán con fecha vacía)?"):
-            df['Fecha'] = df['Fecha'].dt.strftime("%d/%m/%Y")
-            df['Fecha'] = df['Fecha'].fillna("")
-        else:
-            return
-    else:
-        df = df.sort_values("Fecha").reset_index(drop=True)
-        df['Fecha'] = df['Fecha'].dt.strftime("%d/%m/%Y")
-
-    # Columnas numéricas
-    for col in ['Último', 'Apertura', 'Máximo', 'Mínimo', 'Vol.']:
-        df[col] = df[col].apply(to_float_safe)
-
-    # Columna % var. -> decimal (p.ej. 2.05% -> 0.0205)
-    df['% var.'] = df['% var.'].apply(parse_percent_to_decimal)
+    # Fecha -> texto dd/mm/aaaa (ya viene ordenada)
+    df['Fecha'] = df['Fecha'].dt.strftime("%d/%m/%Y")
 
     # -------------------------
     # Crear base de datos SQLite (opcional, pero la dejo)
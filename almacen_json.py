@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lectura y escritura segura de los archivos JSON de estado compartidos por
+Analisis_singrafico.py y DESCARGAR_DATA_AUTOMATICO.py (~/.analisis_config.json,
+parametros_activos.json, historial_operaciones.json...).
+
+- Escritura atómica: archivo temporal en la misma carpeta + fsync + os.replace.
+  Quien lea ve el contenido anterior o el nuevo completo, nunca uno a medio
+  escribir, aunque el programa se cierre a mitad de la escritura.
+- Bloqueo consultivo (<archivo>.lock) mientras se escribe o se hace un ciclo
+  leer → modificar → escribir, para que dos programas no se pisen.
+- Caché de lecturas en memoria: mientras el archivo no cambie (mismo mtime,
+  tamaño e inodo) no se vuelve a leer del disco.
+"""
+
+import copy
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:          # Windows
+    fcntl = None
+    import msvcrt
+
+# Archivo de configuración compartido por las aplicaciones
+CONFIG_FILE = Path.home() / ".analisis_config.json"
+
+# {ruta absoluta: (firma del archivo, datos)}
+_cache_lecturas = {}
+
+
+def _firma(ruta):
+    """(mtime_ns, tamaño, inodo) del archivo, o None si no existe."""
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return estado.st_mtime_ns, estado.st_size, estado.st_ino
+
+
+@contextmanager
+def bloqueo(ruta, espera_max=10.0):
+    """
+    Bloqueo consultivo exclusivo sobre <ruta>.lock (fcntl en Linux/macOS,
+    msvcrt en Windows). Si otro proceso lo tiene, reintenta hasta espera_max
+    segundos y luego lanza TimeoutError.
+    """
+    ruta_lock = str(ruta) + ".lock"
+    fd = os.open(ruta_lock, os.O_RDWR | os.O_CREAT, 0o644)
+    limite = time.monotonic() + espera_max
+    try:
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if time.monotonic() >= limite:
+                    raise TimeoutError(f"No se pudo bloquear {ruta} (en uso por otro programa)")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+def leer_json(ruta, por_defecto=None):
+    """
+    Contenido del JSON (una copia: se puede modificar libremente). Si el
+    archivo no existe devuelve `por_defecto`; si está dañado lanza la
+    excepción de json.
+
+    Mientras el archivo no cambie en disco, se sirve desde la caché.
+    """
+    ruta = os.path.abspath(ruta)
+    firma = _firma(ruta)
+    if firma is None:
+        _cache_lecturas.pop(ruta, None)
+        return copy.deepcopy(por_defecto)
+
+    en_cache = _cache_lecturas.get(ruta)
+    if en_cache is not None and en_cache[0] == firma:
+        return copy.deepcopy(en_cache[1])
+
+    with open(ruta, 'r', encoding='utf-8') as f:
+        datos = json.load(f)
+    _cache_lecturas[ruta] = (firma, datos)
+    return copy.deepcopy(datos)
+
+
+def _escribir(ruta, datos, indent):
+    """Escritura atómica sin tomar el bloqueo (quien llama ya lo tiene)."""
+    carpeta = os.path.dirname(ruta)
+    fd, ruta_tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=carpeta)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(ruta_tmp, ruta)
+    except BaseException:
+        if os.path.exists(ruta_tmp):
+            os.remove(ruta_tmp)
+        raise
+
+    # Que el rename también llegue al disco (no disponible en Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        try:
+            fd_carpeta = os.open(carpeta, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd_carpeta)
+            finally:
+                os.close(fd_carpeta)
+        except OSError:
+            pass
+
+    _cache_lecturas[ruta] = (_firma(ruta), copy.deepcopy(datos))
+
+
+def escribir_json(ruta, datos, indent=2):
+    """Escribe el JSON de forma atómica y con el archivo bloqueado."""
+    ruta = os.path.abspath(ruta)
+    with bloqueo(ruta):
+        _escribir(ruta, datos, indent)
+
+
+def actualizar_json(ruta, modificar, por_defecto=None, indent=2):
+    """
+    Ciclo leer → modificar → escribir con el archivo bloqueado todo el tiempo,
+    para no perder cambios que otro programa haga en medio.
+
+    Args:
+        modificar: función que recibe el contenido actual (o una copia de
+                   `por_defecto` si no existe) y devuelve el nuevo contenido
+
+    Returns:
+        El contenido escrito
+    """
+    ruta = os.path.abspath(ruta)
+    with bloqueo(ruta):
+        datos = modificar(leer_json(ruta, por_defecto))
+        _escribir(ruta, datos, indent)
+    return datos
+
+
+# =========================
+# Configuración compartida (~/.analisis_config.json)
+# =========================
+def leer_config():
+    """Configuración compartida ({} si no existe o no se puede leer)."""
+    try:
+        config = leer_json(CONFIG_FILE, {})
+        return config if isinstance(config, dict) else {}
+    except Exception as e:
+        print(f"[WARN] Error leyendo configuración: {e}")
+        return {}
+
+
+def actualizar_config(**cambios):
+    """Cambia solo las claves indicadas de la configuración, conservando las demás."""
+    def _aplicar(config):
+        if not isinstance(config, dict):
+            config = {}
+        config.update(cambios)
+        return config
+
+    return actualizar_json(CONFIG_FILE, _aplicar, por_defecto={})
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Almacén de precios diarios particionado por ticker y año, para no abrir el
+auto_update_log.csv completo cada vez que se necesitan algunos tickers o
+algunas fechas.
+
+Estructura (carpeta <log>_precios junto al auto_update_log.csv):
+
+    auto_update_log_precios/
+        indice.json          columnas, última fecha/años/filas por ticker,
+                             hasta dónde se importó el CSV
+        AAPL/2025.npz        Date, orden y las columnas numéricas del log
+        AAPL/2026.npz
+        ...
+
+Cada partición es un .npz columnar (el mismo formato de las cachés de
+serie_mercado). `orden` es la posición de la fila en el log, así el
+exportador reproduce el CSV original fila por fila.
+
+El CSV sigue siendo el archivo que sube el workflow de GitHub Actions y que
+llega con git pull. sincronizar_con_log() lo importa de forma incremental:
+si lo que ya se importó no cambió (mismo hash), solo se leen las filas
+agregadas al final; si el CSV se reescribió (correcciones), se reimporta.
+
+Uso:
+    python almacen_precios.py importar auto_update_log.csv
+    python almacen_precios.py exportar auto_update_log.csv [SALIDA.csv]
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from almacen_json import bloqueo, leer_json, escribir_json
+
+# Subir la versión si cambia el formato de las particiones o del índice
+VERSION_ALMACEN = 1
+NOMBRE_INDICE = "indice.json"
+SUFIJO_CARPETA = "_precios"
+
+# Formato de los números del CSV exportado (el mismo del log)
+FORMATO_NUMEROS = "%.2f"
+
+
+def ruta_almacen(log_file):
+    """Carpeta del almacén de un log: auto_update_log.csv → auto_update_log_precios/"""
+    return os.path.splitext(os.path.abspath(log_file))[0] + SUFIJO_CARPETA
+
+
+def _ruta_particion(carpeta, ticker, anio):
+    return os.path.join(carpeta, ticker, f"{anio}.npz")
+
+
+def _indice_vacio():
+    return {"version": VERSION_ALMACEN, "columnas": [], "siguiente_orden": 0, "tickers": {}, "csv": None}
+
+
+def leer_indice(carpeta):
+    """Índice del almacén (vacío si no existe o es de otra versión)."""
+    indice = leer_json(os.path.join(carpeta, NOMBRE_INDICE), None)
+    if not indice or indice.get("version") != VERSION_ALMACEN:
+        return _indice_vacio()
+    return indice
+
+
+def ultimas_fechas(carpeta):
+    """{ticker: Timestamp de la última fecha guardada}"""
+    return {ticker: pd.Timestamp(info["ultima_fecha"])
+            for ticker, info in leer_indice(carpeta)["tickers"].items()}
+
+
+# =========================
+# Particiones
+# =========================
+def _leer_particion(ruta, columnas):
+    """{Date, orden, columnas...} de una partición, o None si no existe."""
+    if not os.path.exists(ruta):
+        return None
+    with np.load(ruta, allow_pickle=False) as datos:
+        n = len(datos["Date"])
+        particion = {"Date": datos["Date"], "orden": datos["orden"]}
+        for col in columnas:
+            # Columnas que aparecieron después de escribir la partición: vacías
+            particion[col] = datos[col] if col in datos.files else np.full(n, np.nan)
+    return particion
+
+
+def _escribir_particion(ruta, particion):
+    """Escribe la partición de forma atómica (temporal + os.replace)."""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **particion)
+        os.replace(temporal, ruta)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+
+
+def _guardar(carpeta, indice, df, corregir):
+    """
+    Mezcla las filas de `df` (Date normalizada, Ticker, columnas numéricas)
+    en sus particiones. Solo se reescriben las particiones que reciben filas.
+    Modifica `indice`; devuelve (agregadas, corregidas).
+    """
+    for col in df.columns:
+        if col not in ("Date", "Ticker") and col not in indice["columnas"]:
+            indice["columnas"].append(col)
+    columnas = indice["columnas"]
+
+    df = df.drop_duplicates(subset=["Date", "Ticker"], keep="first")
+    df = df.reindex(columns=["Date", "Ticker"] + columnas)
+    df["orden"] = np.arange(indice["siguiente_orden"], indice["siguiente_orden"] + len(df))
+
+    agregadas = corregidas = 0
+    df["anio"] = df["Date"].dt.year
+    for (ticker, anio), grupo in df.groupby(["Ticker", "anio"], sort=False):
+        ruta = _ruta_particion(carpeta, ticker, anio)
+        actual = _leer_particion(ruta, columnas)
+        fechas = grupo["Date"].to_numpy(dtype="datetime64[D]")
+
+        corregidas_antes = corregidas
+        if actual is None:
+            nuevas = np.ones(len(grupo), dtype=bool)
+            actual = {"Date": fechas[:0], "orden": np.zeros(0, dtype=np.int64)}
+            actual.update({col: np.zeros(0) for col in columnas})
+        else:
+            posiciones = pd.Index(actual["Date"]).get_indexer(fechas)
+            nuevas = posiciones < 0
+            if corregir and not nuevas.all():
+                # Las fechas que ya están toman los valores nuevos si difieren
+                # (las columnas que no vienen en `df` quedan como estaban)
+                existentes = posiciones[~nuevas]
+                for col in columnas:
+                    valores = grupo[col].to_numpy(dtype=float)[~nuevas]
+                    viejos = actual[col][existentes]
+                    cambia = ~np.isnan(valores) & ~np.isclose(np.round(valores, 2), np.round(viejos, 2),
+                                                              equal_nan=True)
+                    if cambia.any():
+                        actual[col] = actual[col].copy()
+                        actual[col][existentes[cambia]] = valores[cambia]
+                        corregidas += int(cambia.sum())
+
+        particion = {
+            "Date": np.concatenate([actual["Date"], fechas[nuevas]]),
+            "orden": np.concatenate([actual["orden"], grupo["orden"].to_numpy(dtype=np.int64)[nuevas]]),
+        }
+        for col in columnas:
+            particion[col] = np.concatenate([actual[col], grupo[col].to_numpy(dtype=float)[nuevas]])
+        orden_fechas = np.argsort(particion["Date"], kind="stable")
+        particion = {col: valores[orden_fechas] for col, valores in particion.items()}
+        if nuevas.any() or corregidas > corregidas_antes:
+            _escribir_particion(ruta, particion)
+        agregadas += int(nuevas.sum())
+
+        info = indice["tickers"].setdefault(ticker, {"primera_fecha": None, "ultima_fecha": None,
+                                                     "anios": [], "filas": 0})
+        primera = str(particion["Date"][0])
+        ultima = str(particion["Date"][-1])
+        if info["primera_fecha"] is None or primera < info["primera_fecha"]:
+            info["primera_fecha"] = primera
+        if info["ultima_fecha"] is None or ultima > info["ultima_fecha"]:
+            info["ultima_fecha"] = ultima
+        if int(anio) not in info["anios"]:
+            info["anios"] = sorted(info["anios"] + [int(anio)])
+        info["filas"] += int(nuevas.sum())
+
+    indice["siguiente_orden"] += len(df)
+    return agregadas, corregidas
+
+
+def guardar_precios(carpeta, df_nuevos, corregir=False):
+    """
+    Agrega al almacén las filas cuya (fecha, ticker) no esté todavía.
+
+    Args:
+        carpeta: carpeta del almacén (ver ruta_almacen)
+        df_nuevos: DataFrame con Date, Ticker y columnas numéricas
+        corregir: si es True, las filas que ya están toman los valores nuevos
+
+    Returns:
+        (filas agregadas, valores corregidos)
+    """
+    df = _normalizar(df_nuevos)
+    os.makedirs(carpeta, exist_ok=True)
+    with bloqueo(os.path.join(carpeta, "almacen")):
+        indice = leer_indice(carpeta)
+        resultado = _guardar(carpeta, indice, df, corregir)
+        escribir_json(os.path.join(carpeta, NOMBRE_INDICE), indice)
+    return resultado
+
+
+def _normalizar(df):
+    df = df.loc[:, ~df.columns.duplicated()].copy()
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.normalize()
+    df = df[df["Date"].notna()]
+    df["Ticker"] = df["Ticker"].astype(str)
+    return df
+
+
+# =========================
+# Lectura
+# =========================
+def leer_precios(carpeta, tickers=None, desde=None, hasta=None, columnas=None):
+    """
+    Precios del almacén, leyendo solo las particiones necesarias.
+
+    Args:
+        carpeta: carpeta del almacén
+        tickers: lista de tickers (None = todos)
+        desde, hasta: fechas límite inclusive (None = sin límite)
+        columnas: columnas numéricas a devolver (None = todas)
+
+    Returns:
+        DataFrame con Date (datetime), Ticker y las columnas, en el orden en
+        que las filas llegaron al log
+    """
+    indice = leer_indice(carpeta)
+    columnas = list(indice["columnas"] if columnas is None else columnas)
+    desde = pd.Timestamp(desde).normalize() if desde is not None else None
+    hasta = pd.Timestamp(hasta).normalize() if hasta is not None else None
+    tickers = list(indice["tickers"]) if tickers is None else [t for t in tickers if t in indice["tickers"]]
+
+    partes = []
+    for ticker in tickers:
+        for anio in indice["tickers"][ticker]["anios"]:
+            if (desde is not None and anio < desde.year) or (hasta is not None and anio > hasta.year):
+                continue
+            particion = _leer_particion(_ruta_particion(carpeta, ticker, anio), columnas)
+            if particion is None:
+                continue
+            fechas = particion["Date"]
+            dentro = np.ones(len(fechas), dtype=bool)
+            if desde is not None:
+                dentro &= fechas >= np.datetime64(desde.date())
+            if hasta is not None:
+                dentro &= fechas <= np.datetime64(hasta.date())
+            if dentro.any():
+                parte = {col: particion[col][dentro] for col in ["Date", "orden"] + columnas}
+                parte["Ticker"] = ticker
+                partes.append(pd.DataFrame(parte))
+
+    if not partes:
+        return pd.DataFrame({"Date": pd.Series(dtype="datetime64[ns]"), "Ticker": pd.Series(dtype=object),
+                             **{col: pd.Series(dtype=float) for col in columnas}})
+
+    df = pd.concat(partes, ignore_index=True).sort_values("orden", kind="stable")
+    df["Date"] = df["Date"].astype("datetime64[ns]")
+    return df[["Date", "Ticker"] + columnas].reset_index(drop=True)
+
+
+# =========================
+# Sincronización con el CSV
+# =========================
+def _hash_prefijo(ruta, tamano):
+    """Hash de los primeros `tamano` bytes del archivo."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, 'rb') as f:
+        restante = tamano
+        while restante > 0:
+            bloque = f.read(min(1 << 20, restante))
+            if not bloque:
+                break
+            h.update(bloque)
+            restante -= len(bloque)
+    return h.hexdigest()
+
+
+def _leer_log(texto, nombres=None):
+    """DataFrame de un pedazo del CSV (con cabecera si `nombres` es None)."""
+    if nombres is None:
+        df = pd.read_csv(io.BytesIO(texto))
+    else:
+        df = pd.read_csv(io.BytesIO(texto), header=None, names=nombres)
+    return _normalizar(df)
+
+
+def sincronizar_con_log(log_file):
+    """
+    Pone el almacén al día con el auto_update_log.csv y devuelve su carpeta.
+
+    Si el CSV no cambió no se lee. Si solo creció (filas agregadas al final)
+    se importan esas filas. Si se reescribió, se reimporta completo.
+    """
+    log_file = os.path.abspath(log_file)
+    carpeta = ruta_almacen(log_file)
+    os.makedirs(carpeta, exist_ok=True)
+    with bloqueo(os.path.join(carpeta, "almacen")):
+        indice = leer_indice(carpeta)
+        estado = os.stat(log_file)
+        previo = indice.get("csv")
+        if previo and previo["tamano"] == estado.st_size and previo["mtime_ns"] == estado.st_mtime_ns:
+            return carpeta
+
+        with open(log_file, 'rb') as f:
+            cabecera = f.readline()
+        incremental = (previo is not None and previo["cabecera"] == cabecera.decode('utf-8')
+                       and previo["tamano"] <= estado.st_size
+                       and _hash_prefijo(log_file, previo["tamano"]) == previo["hash"])
+
+        if incremental:
+            with open(log_file, 'rb') as f:
+                f.seek(previo["tamano"])
+                cola = f.read()
+            # Una última línea sin salto todavía se está escribiendo
+            fin = cola.rfind(b"\n") + 1
+            cola = cola[:fin]
+            tamano = previo["tamano"] + fin
+            nombres = cabecera.decode('utf-8').rstrip("\r\n").split(",")
+            df = _leer_log(cola, nombres) if cola.strip() else None
+        else:
+            if previo is not None:
+                print(f"[INFO] {os.path.basename(log_file)} se reescribió, se reimporta el almacén")
+            for nombre in os.listdir(carpeta):
+                ruta = os.path.join(carpeta, nombre)
+                if os.path.isdir(ruta):
+                    shutil.rmtree(ruta)
+            indice = _indice_vacio()
+            with open(log_file, 'rb') as f:
+                contenido = f.read()
+            tamano = contenido.rfind(b"\n") + 1
+            df = _leer_log(contenido[:tamano]) if tamano else None
+
+        agregadas = 0
+        if df is not None and not df.empty:
+            agregadas, _ = _guardar(carpeta, indice, df, corregir=False)
+
+        indice["csv"] = {
+            "tamano": tamano,
+            "mtime_ns": estado.st_mtime_ns if tamano == estado.st_size else 0,
+            "hash": _hash_prefijo(log_file, tamano),
+            "cabecera": cabecera.decode('utf-8'),
+        }
+        escribir_json(os.path.join(carpeta, NOMBRE_INDICE), indice)
+        print(f"[INFO] Almacén de precios: {agregadas} filas importadas de {os.path.basename(log_file)}")
+    return carpeta
+
+
+def precios_de_log(log_file, tickers=None, desde=None, hasta=None, columnas=None):
+    """leer_precios sobre el almacén del log, sincronizándolo antes."""
+    return leer_precios(sincronizar_con_log(log_file), tickers, desde, hasta, columnas)
+
+
+# =========================
+# Exportación al CSV anterior
+# =========================
+def exportar_csv(carpeta, ruta_csv):
+    """
+    Escribe el almacén con el formato de auto_update_log.csv (mismas
+    columnas, mismo orden de filas, números con dos decimales), de forma
+    atómica. Devuelve la cantidad de filas.
+    """
+    indice = leer_indice(carpeta)
+    df = leer_precios(carpeta)
+    texto = df.to_csv(None, index=False, float_format=FORMATO_NUMEROS, date_format="%Y-%m-%d",
+                      lineterminator="\n")
+    if indice.get("csv"):
+        # Mismo fin de línea que el CSV importado
+        if indice["csv"]["cabecera"].endswith("\r\n"):
+            texto = texto.replace("\n", "\r\n")
+
+    carpeta_csv = os.path.dirname(os.path.abspath(ruta_csv))
+    fd, temporal = tempfile.mkstemp(prefix=".tmp_", suffix=".csv", dir=carpeta_csv)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline="") as f:
+            f.write(texto)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta_csv)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return len(df)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) not in (2, 3) or argv[0] not in ("importar", "exportar") or (argv[0] == "importar" and len(argv) == 3):
+        print(__doc__)
+        return 1
+
+    log_file = argv[1]
+    if argv[0] == "importar":
+        if not os.path.exists(log_file):
+            print(f"[ERROR] No existe {log_file}")
+            return 1
+        carpeta = sincronizar_con_log(log_file)
+        tickers = leer_indice(carpeta)["tickers"]
+        print(f"[INFO] {carpeta}: {len(tickers)} tickers, {sum(t['filas'] for t in tickers.values())} filas")
+        return 0
+
+    carpeta = ruta_almacen(log_file)
+    if not os.path.exists(os.path.join(carpeta, NOMBRE_INDICE)):
+        print(f"[ERROR] No existe el almacén {carpeta}")
+        return 1
+    salida = argv[2] if len(argv) == 3 else log_file
+    filas = exportar_csv(carpeta, salida)
+    print(f"[INFO] {salida}: {filas} filas exportadas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
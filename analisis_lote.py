@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Análisis por lotes (sin interfaz gráfica) de todos los tickers de una carpeta.
+
+Toma cada archivo Datos_<TICKER>_*.csv, optimiza todas las combinaciones
+ticker × período × objetivo repartidas entre los núcleos de la máquina y
+guarda los resultados en el repositorio de resultados
+(Resultado_de_Analisis.db, igual que el botón "Guardar en JSON") con una
+única escritura atómica al final: si se interrumpe no queda ningún ticker
+guardado a medias.
+
+Uso:
+    python analisis_lote.py CARPETA_CSV
+    python analisis_lote.py CARPETA_CSV --json CARPETA_JSON --procesos 4
+    python analisis_lote.py CARPETA_CSV --periodos completo 6_meses --objetivos rentabilidad
+    python analisis_lote.py CARPETA_CSV --otros-periodos 30 365 01/01/2020-31/12/2022
+
+Sin --json se usa la carpeta configurada en ~/.analisis_config.json (o la
+carpeta de los CSV si no hay configuración).
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from motor_analisis import ParametrosAnalisis, OBJETIVOS
+from optimizador import (ejecutar_combinaciones_archivos, procesos_disponibles, periodo_desde_texto,
+                         PERIODOS, RANGOS_BUSQUEDA)
+from resultados_json import extraer_ticker_symbol
+from resultados_db import abrir_repositorio
+from almacen_json import leer_config
+
+
+def buscar_archivos_tickers(carpeta):
+    """
+    Devuelve [(ruta_csv, nombre_base, ticker_symbol), ...] de los Datos_*.csv
+    de la carpeta, ordenados por nombre. Omite los que no tienen ticker.
+    """
+    archivos = []
+    for ruta in sorted(Path(carpeta).glob("Datos_*.csv")):
+        nombre_base = ruta.stem
+        ticker_symbol = extraer_ticker_symbol(nombre_base)
+        if ticker_symbol is None:
+            print(f"[WARN] No se pudo extraer el ticker de {ruta.name}, se omite")
+            continue
+        archivos.append((str(ruta), nombre_base, ticker_symbol))
+    return archivos
+
+
+def carpeta_json_configurada():
+    """Carpeta del JSON guardada por Analisis_singrafico (o None)"""
+    return leer_config().get("ubicacion_json")
+
+
+def analizar_carpeta(carpeta, carpeta_json=None, procesos=None, periodos=None, objetivos=None,
+                     base=None, otros_periodos=None):
+    """
+    Optimiza todos los tickers de la carpeta y guarda los resultados en el repositorio.
+
+    Args:
+        carpeta: Carpeta con los Datos_<TICKER>_*.csv
+        carpeta_json: Carpeta de los resultados (None = configuración o `carpeta`)
+        procesos: Número de procesos (None = todos los núcleos)
+        periodos: Lista de nombres de PERIODOS (None = todos)
+        objetivos: Lista de OBJETIVOS (None = todos)
+        base: ParametrosAnalisis con suave y límite (None = valores por defecto de la interfaz)
+        otros_periodos: [(nombre, definición), ...] adicionales (ver periodo_desde_texto)
+
+    Returns:
+        dict {nombre_base: {"completo_rentabilidad": resultado, ...}}
+    """
+    archivos = buscar_archivos_tickers(carpeta)
+    if not archivos:
+        print(f"[WARN] No hay archivos Datos_*.csv en {carpeta}")
+        return {}
+
+    periodos_a_analizar = [(nombre, dias) for nombre, dias in PERIODOS
+                           if periodos is None or nombre in periodos]
+    periodos_a_analizar += [(nombre, definicion) for nombre, definicion in (otros_periodos or [])
+                            if nombre not in [n for n, _ in periodos_a_analizar]]
+    objetivos_a_analizar = list(objetivos or OBJETIVOS)
+    if base is None:
+        base = ParametrosAnalisis(compra_pct=-1.6, venta_pct=1.6, ganancia_minima_pct=0.0, suave_pct=0.5)
+    procesos = procesos or procesos_disponibles()
+
+    tareas = [(ruta, nombre_periodo, dias, objetivo)
+              for ruta, _, _ in archivos
+              for objetivo in objetivos_a_analizar
+              for nombre_periodo, dias in periodos_a_analizar]
+    nombres = {ruta: (nombre_base, ticker_symbol) for ruta, nombre_base, ticker_symbol in archivos}
+
+    print(f"[INFO] {len(archivos)} ticker(s), {len(tareas)} combinaciones en {min(procesos, len(tareas))} procesos")
+    inicio = time.time()
+
+    resultados = {}
+    completadas = 0
+    for ruta, nombre_periodo, objetivo, resultado, segundos in ejecutar_combinaciones_archivos(
+            tareas, RANGOS_BUSQUEDA, base, procesos):
+        completadas += 1
+        nombre_base, ticker_symbol = nombres[ruta]
+        if resultado is None:
+            print(f"[WARN] {completadas}/{len(tareas)} {ticker_symbol} {nombre_periodo}/{objetivo}: sin resultado")
+            continue
+        resultados.setdefault(nombre_base, {})[f"{nombre_periodo}_{objetivo}"] = resultado
+        print(f"[INFO] {completadas}/{len(tareas)} {ticker_symbol} {nombre_periodo}/{objetivo}: "
+              f"rentab {resultado['rentabilidad_max']:.2f}% ({segundos:.1f} s)")
+
+    print(f"[INFO] Optimización terminada en {time.time() - inicio:.1f} s")
+
+    if not resultados:
+        print("[WARN] No se obtuvieron resultados, no se guarda nada")
+        return resultados
+
+    carpeta_json = carpeta_json or carpeta_json_configurada() or carpeta
+    repositorio = abrir_repositorio(carpeta_json)
+
+    # Mismo orden que la ejecución secuencial (objetivo y luego período)
+    claves = [f"{nombre_periodo}_{objetivo}" for objetivo in objetivos_a_analizar
+              for nombre_periodo, _ in periodos_a_analizar]
+    por_ticker = {}
+    for ruta, nombre_base, ticker_symbol in archivos:
+        if nombre_base not in resultados:
+            continue
+        periodos_ticker = {clave: resultados[nombre_base][clave]
+                           for clave in claves if clave in resultados[nombre_base]}
+        por_ticker[nombre_base] = (periodos_ticker, ticker_symbol)
+
+    # Todos los tickers en una sola transacción
+    total_nuevos, total_actualizados = repositorio.guardar_tickers(por_ticker)
+
+    print(f"[INFO] Resultados guardados en {repositorio.ruta_db}: "
+          f"{total_nuevos} nuevo(s), {total_actualizados} actualizado(s)")
+
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimiza todos los tickers de una carpeta de CSV")
+    parser.add_argument("carpeta", help="Carpeta con los archivos Datos_<TICKER>_*.csv")
+    parser.add_argument("--json", dest="carpeta_json", default=None,
+                        help="Carpeta de los resultados (por defecto la configurada en la interfaz)")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Número de procesos (por defecto todos los núcleos)")
+    parser.add_argument("--periodos", nargs="+", choices=[nombre for nombre, _ in PERIODOS], default=None)
+    parser.add_argument("--otros-periodos", nargs="+", default=None, metavar="PERIODO",
+                        help="Días (30 365) o rangos dd/mm/aaaa-dd/mm/aaaa adicionales")
+    parser.add_argument("--objetivos", nargs="+", choices=list(OBJETIVOS), default=None)
+    parser.add_argument("--suave", type=float, default=0.5, help="Umbral suave en %% (por defecto 0.5)")
+    parser.add_argument("--limite-tipo", choices=["acciones", "aporte"], default="acciones")
+    parser.add_argument("--limite-valor", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.carpeta):
+        print(f"[ERROR] La carpeta no existe: {args.carpeta}")
+        return 1
+
+    try:
+        otros_periodos = [periodo_desde_texto(texto) for texto in (args.otros_periodos or [])]
+    except ValueError as e:
+        print(f"[ERROR] Período inválido: {e}")
+        return 1
+
+    base = ParametrosAnalisis(
+        compra_pct=-1.6,
+        venta_pct=1.6,
+        ganancia_minima_pct=0.0,
+        suave_pct=args.suave,
+        limite_tipo=args.limite_tipo,
+        limite_valor=args.limite_valor
+    )
+
+    resultados = analizar_carpeta(args.carpeta, args.carpeta_json, args.procesos,
+                                  args.periodos, args.objetivos, base, otros_periodos)
+    return 0 if resultados else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmarks de las piezas críticas del análisis.
+
+Cada benchmark compara la implementación actual con la anterior sobre datos
+sintéticos, verifica que ambas den el mismo resultado e imprime los tiempos.
+
+Uso:
+    python benchmarks.py                 (todos)
+    python benchmarks.py libro_lotes     (uno)
+    python benchmarks.py carga_csv
+    python benchmarks.py log_precios
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from log_precios import actualizar_log_precios, indice_log, ruta_indice
+from motor_analisis import LibroLotes
+from serie_mercado import (leer_csv_precios, parse_percent_to_decimal, to_float_safe,
+                           EXPECTED_COLUMNS, COLUMNAS_NUMERICAS)
+
+
+def _medir(funcion, repeticiones=3):
+    """Mejor tiempo (segundos) de varias ejecuciones y el resultado de la última."""
+    mejor = float("inf")
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+# =========================
+# Libro de lotes
+# =========================
+def _operaciones_alta_rotacion(n, semilla=42):
+    """
+    Serie larga de compras/ventas con límite por aporte alto: la cartera crece
+    a miles de lotes y cada venta revisa los más baratos.
+    """
+    rng = np.random.default_rng(semilla)
+    precios = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    es_compra = rng.random(n) < 0.6
+    n_venta = rng.choice([1, 2, 5], size=n)
+    return precios.tolist(), es_compra.tolist(), n_venta.tolist()
+
+
+def _libro_lista(precios, es_compra, n_venta, ganancia_minima):
+    """Implementación anterior: append + sort en cada compra, recorrido + borrado al frente en cada venta."""
+    precios_en_cartera = []
+    vendidos_total = 0
+    for precio, compra, n in zip(precios, es_compra, n_venta):
+        if compra:
+            precios_en_cartera.append(precio)
+            precios_en_cartera.sort()
+        elif precios_en_cartera:
+            acciones_vendibles = 0
+            for precio_compra in precios_en_cartera:
+                if (precio - precio_compra) / precio_compra >= ganancia_minima:
+                    acciones_vendibles += 1
+                else:
+                    break
+            vendidos = min(n, acciones_vendibles, len(precios_en_cartera))
+            del precios_en_cartera[:vendidos]
+            vendidos_total += vendidos
+    return vendidos_total, len(precios_en_cartera)
+
+
+def _libro_heap(precios, es_compra, n_venta, ganancia_minima):
+    """Implementación actual con LibroLotes."""
+    libro = LibroLotes()
+    vendidos_total = 0
+    for precio, compra, n in zip(precios, es_compra, n_venta):
+        if compra:
+            libro.comprar(precio)
+        elif len(libro):
+            vendidos_total += libro.vender(precio, n, ganancia_minima)
+    return vendidos_total, len(libro)
+
+
+def benchmark_libro_lotes(tamanos=(5000, 20000, 50000), ganancia_minima=0.02):
+    print("[INFO] Libro de lotes (lista ordenada vs LibroLotes)")
+    for n in tamanos:
+        datos = _operaciones_alta_rotacion(n)
+        t_lista, res_lista = _medir(lambda: _libro_lista(*datos, ganancia_minima), repeticiones=1)
+        t_heap, res_heap = _medir(lambda: _libro_heap(*datos, ganancia_minima))
+        if res_lista != res_heap:
+            print(f"[ERROR] Resultados distintos con n={n}: {res_lista} vs {res_heap}")
+            return False
+        print(f"  n={n:>6}  lotes finales={res_heap[1]:>6}  lista={t_lista:8.3f} s  "
+              f"heap={t_heap:8.3f} s  x{t_lista / t_heap:6.1f}")
+    return True
+
+
+# =========================
+# Carga del CSV de precios
+# =========================
+def _escribir_csv_investing(ruta, anios, semilla=7):
+    """CSV sintético con el formato de Investing.com (dd/mm/aaaa, coma decimal, Vol. con K/M)."""
+    rng = np.random.default_rng(semilla)
+    fechas = pd.bdate_range(end="2025-12-31", periods=int(anios * 252))
+    var = rng.normal(0, 0.015, len(fechas))
+    cierre = 50 * np.exp(np.cumsum(var))
+    volumen = rng.lognormal(13, 1.5, len(fechas))
+
+    def _num(valores):
+        return pd.Series(valores).map(lambda v: f"{v:.2f}".replace(".", ","))
+
+    df = pd.DataFrame({
+        "Fecha": fechas.strftime("%d/%m/%Y")[::-1],
+        "Último": _num(cierre)[::-1].values,
+        "Apertura": _num(cierre * (1 + rng.normal(0, 0.005, len(fechas))))[::-1].values,
+        "Máximo": _num(cierre * 1.01)[::-1].values,
+        "Mínimo": _num(cierre * 0.99)[::-1].values,
+        "Vol.": pd.Series(volumen).map(
+            lambda v: f"{v / 1e6:.2f}M".replace(".", ",") if v >= 1e6 else f"{v / 1e3:.2f}K".replace(".", ",")
+        )[::-1].values,
+        "% var.": pd.Series(var * 100).map(lambda v: f"{v:.2f}%".replace(".", ","))[::-1].values,
+    })
+    df.to_csv(ruta, sep=";", index=False)
+    return len(df)
+
+
+def _carga_fila_a_fila(ruta):
+    """Lectura anterior: parser python, fechas y números convertidos celda a celda."""
+    df = pd.read_csv(ruta, sep=";", engine="python", dtype=str)
+    df.columns = [c.strip() for c in df.columns]
+    df = df[EXPECTED_COLUMNS].copy()
+
+    def parse_mixed_dates(date_str):
+        for fmt in ("%d/%m/%Y", "%m/%d/%Y"):
+            try:
+                return pd.to_datetime(date_str, format=fmt)
+            except Exception:
+                continue
+        return pd.NaT
+
+    df['Fecha'] = df['Fecha'].astype(str).str.strip().apply(parse_mixed_dates)
+    df = df.dropna(subset=['Fecha']).sort_values('Fecha', kind='mergesort').reset_index(drop=True)
+    for col in COLUMNAS_NUMERICAS:
+        df[col] = df[col].apply(to_float_safe)
+    df['% var.'] = df['% var.'].apply(parse_percent_to_decimal)
+    return df
+
+
+def benchmark_carga_csv(anios=(10, 40)):
+    print("[INFO] Carga del CSV (parser python fila a fila vs leer_csv_precios)")
+    with tempfile.TemporaryDirectory() as carpeta:
+        for n_anios in anios:
+            ruta = os.path.join(carpeta, f"Datos_BENCH_{n_anios}.csv")
+            filas = _escribir_csv_investing(ruta, n_anios)
+            t_fila, df_fila = _medir(lambda: _carga_fila_a_fila(ruta), repeticiones=1)
+            t_vector, df_vector = _medir(lambda: leer_csv_precios(ruta))
+
+            # El lector anterior no entendía los sufijos K/M: Vol. se compara aparte
+            columnas = [c for c in EXPECTED_COLUMNS if c != 'Vol.']
+            if not df_fila[columnas].equals(df_vector[columnas]):
+                print(f"[ERROR] Resultados distintos con {n_anios} años")
+                return False
+            if df_vector['Vol.'].isna().any():
+                print(f"[ERROR] Vol. sin convertir con {n_anios} años")
+                return False
+            print(f"  {n_anios:>3} años  filas={filas:>6}  fila a fila={t_fila:8.3f} s  "
+                  f"vectorizado={t_vector:8.3f} s  x{t_fila / t_vector:6.1f}")
+    return True
+
+
+# =========================
+# Log de precios diarios
+# =========================
+def _dia_de_precios(fecha, tickers, rng):
+    """Una fila por ticker para `fecha`, como las que devuelve la descarga diaria."""
+    cierre = rng.uniform(10, 500, len(tickers))
+    return pd.DataFrame({
+        "Date": pd.Timestamp(fecha),
+        "Ticker": tickers,
+        "Open": cierre * 0.99,
+        "High": cierre * 1.01,
+        "Low": cierre * 0.98,
+        "Close": cierre,
+    })
+
+
+def _escribir_log(ruta, anios, n_tickers, semilla=11):
+    """auto_update_log.csv sintético (con la columna Close.1 del log real) y el día siguiente."""
+    rng = np.random.default_rng(semilla)
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    fechas = pd.bdate_range(end="2025-12-31", periods=int(anios * 252) + 1)
+    fechas_log = np.repeat(fechas[:-1].to_numpy(), n_tickers)
+    cierre = rng.uniform(10, 500, len(fechas_log))
+    df = pd.DataFrame({
+        "Date": fechas_log,
+        "Ticker": np.tile(tickers, len(fechas) - 1),
+        "Open": cierre * 0.99,
+        "High": cierre * 1.01,
+        "Low": cierre * 0.98,
+        "Close": cierre,
+        "Close.1": cierre,
+    })
+    df.to_csv(ruta, index=False, float_format="%.2f")
+    # El día nuevo trae también un día que ya está (la descarga puede repetirlo)
+    nuevos = pd.concat([_dia_de_precios(fechas[-2], tickers[:20], rng),
+                        _dia_de_precios(fechas[-1], tickers, rng)], ignore_index=True)
+    return len(df), nuevos
+
+
+def _log_reescritura(log_file, df_nuevos):
+    """Actualización anterior: claves con strftime, apply fila a fila y reescritura completa."""
+    df_nuevos_copy = df_nuevos.copy()
+    df_nuevos_copy['Date'] = pd.to_datetime(df_nuevos_copy['Date']).dt.normalize()
+    df_existente = pd.read_csv(log_file, parse_dates=['Date'])
+    df_existente = df_existente.loc[:, ~df_existente.columns.duplicated()]
+    df_existente['Date'] = pd.to_datetime(df_existente['Date']).dt.normalize()
+    existing_keys = set(zip(df_existente['Date'].dt.strftime('%Y-%m-%d'), df_existente['Ticker']))
+    keys_series = df_nuevos_copy[['Date', 'Ticker']].apply(
+        lambda r: (r['Date'].strftime('%Y-%m-%d'), r['Ticker']), axis=1
+    )
+    df_solo_nuevos = df_nuevos_copy.loc[~keys_series.isin(existing_keys)].copy()
+    df_final = pd.concat([df_existente, df_solo_nuevos], ignore_index=True)
+    df_final.to_csv(log_file, index=False, float_format="%.2f")
+    return len(df_solo_nuevos)
+
+
+def _medir_sobre_copia(base, destino, funcion, con_indice, repeticiones=3):
+    """Como _medir, pero cada ejecución parte de una copia nueva del log (y de su índice)."""
+    mejor = float("inf")
+    resultado = None
+    for _ in range(repeticiones):
+        shutil.copy2(base, destino)
+        if os.path.exists(ruta_indice(destino)):
+            os.remove(ruta_indice(destino))
+        if con_indice:
+            shutil.copy2(ruta_indice(base), ruta_indice(destino))
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def benchmark_log_precios(anios=(2, 5), n_tickers=300):
+    print("[INFO] Actualización de auto_update_log.csv (reescritura completa vs append con índice)")
+    with tempfile.TemporaryDirectory() as carpeta:
+        for n_anios in anios:
+            base = os.path.join(carpeta, f"log_{n_anios}.csv")
+            filas, nuevos = _escribir_log(base, n_anios, n_tickers)
+            indice_log(base)
+
+            anterior = os.path.join(carpeta, "anterior.csv")
+            actual = os.path.join(carpeta, "actual.csv")
+            t_anterior, res_anterior = _medir_sobre_copia(
+                base, anterior, lambda: _log_reescritura(anterior, nuevos), False, repeticiones=1)
+            t_frio, _ = _medir_sobre_copia(
+                base, actual, lambda: actualizar_log_precios(actual, nuevos), False)
+            t_append, (res_append, _) = _medir_sobre_copia(
+                base, actual, lambda: actualizar_log_precios(actual, nuevos), True)
+
+            with open(anterior, 'rb') as fa, open(actual, 'rb') as fb:
+                iguales = fa.read() == fb.read()
+            if res_anterior != res_append or not iguales:
+                print(f"[ERROR] Resultados distintos con {n_anios} años: {res_anterior} vs {res_append} filas")
+                return False
+            print(f"  {n_anios:>3} años  filas={filas:>7}  reescritura={t_anterior:7.3f} s  "
+                  f"append sin índice={t_frio:7.3f} s  con índice={t_append:7.3f} s  "
+                  f"x{t_anterior / t_append:6.1f}")
+    return True
+
+
+BENCHMARKS = {
+    "libro_lotes": benchmark_libro_lotes,
+    "carga_csv": benchmark_carga_csv,
+    "log_precios": benchmark_log_precios,
+}
+
+
+def main(argv=None):
+    nombres = (argv if argv is not None else sys.argv[1:]) or list(BENCHMARKS)
+    ok = True
+    for nombre in nombres:
+        if nombre not in BENCHMARKS:
+            print(f"[ERROR] Benchmark desconocido: {nombre} (disponibles: {', '.join(BENCHMARKS)})")
+            return 1
+        ok = BENCHMARKS[nombre]() and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cruce de las señales generadas con los precios del día (auto_update_log.csv)
+y con las operaciones reales, para la ventana de comparación de
+DESCARGAR_DATA_AUTOMATICO.py.
+
+Antes, por cada señal se filtraba todo el log de precios con una máscara y se
+recorrían todas las operaciones parseando fechas (O(señales × (log +
+operaciones))). Acá ambos cruces son merges de pandas:
+
+- Precios: join por (Date, Ticker) contra la primera fila del log de cada par.
+- Operaciones: join por (ticker, fecha) contra la fecha de la señal y los dos
+  días siguientes; de los candidatos se queda la operación que aparece
+  primero en el historial, igual que el recorrido original (incluidas sus
+  reglas para fechas escritas sin ceros).
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Días después de la señal en los que una operación cuenta como "seguirla"
+DIAS_TOLERANCIA = 2
+
+
+def _fecha(texto):
+    """Fecha de un texto YYYY-MM-DD (con el mismo criterio de strptime), o None."""
+    try:
+        return datetime.strptime(texto, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+def _fechas(textos):
+    """
+    (fechas, canónicas): fecha de cada texto (NaT si no se puede leer) y si el
+    texto es exactamente su fecha con ceros (p. ej. "2024-01-05", no "2024-1-5").
+    """
+    fechas = [_fecha(texto) for texto in textos]
+    canonicas = [f is not None and f.strftime("%Y-%m-%d") == texto for f, texto in zip(fechas, textos)]
+    return pd.to_datetime(pd.Series(fechas, dtype=object)), np.array(canonicas, dtype=bool)
+
+
+def cruzar_senales(senales, operaciones, precios_df=None):
+    """
+    Precios del día y operación real de cada señal.
+
+    Args:
+        senales: lista de señales (dicts del diario)
+        operaciones: lista de operaciones (dicts de historial_operaciones.json)
+        precios_df: log de precios con columnas Date (texto YYYY-MM-DD),
+                    Ticker, High, Low y Close, o None
+
+    Returns:
+        Lista alineada con `senales`: por cada una, dict con 'maximo',
+        'minimo', 'cierre' (0 y el cierre de la señal si el log no tiene ese
+        día) y 'operacion' (el dict de la operación encontrada, o None)
+    """
+    if not senales:
+        return []
+
+    tabla = pd.DataFrame({
+        "fecha": [sen.get("fecha_generacion", "")[:10] for sen in senales],
+        "symbol": [sen.get("symbol", "") for sen in senales],
+    })
+    tabla["orden"] = np.arange(len(tabla))
+
+    # ===== Precios del día =====
+    maximo = [0] * len(tabla)
+    minimo = [0] * len(tabla)
+    cierre = [sen.get("precio_cierre", 0) for sen in senales]
+
+    if precios_df is not None and not precios_df.empty:
+        precios = (precios_df[["Date", "Ticker", "High", "Low", "Close"]]
+                   .drop_duplicates(subset=["Date", "Ticker"], keep="first"))
+        con_precio = tabla.merge(precios, left_on=["fecha", "symbol"],
+                                 right_on=["Date", "Ticker"], how="inner")
+        for i, alto, bajo, cerrado in zip(con_precio["orden"], con_precio["High"].tolist(),
+                                          con_precio["Low"].tolist(), con_precio["Close"].tolist()):
+            maximo[i] = alto
+            minimo[i] = bajo
+            cierre[i] = cerrado
+
+    # ===== Operación real cercana =====
+    operacion = [None] * len(tabla)
+
+    if operaciones:
+        ops = pd.DataFrame({
+            "symbol": [op.get("ticker_symbol") for op in operaciones],
+            "fecha_op": [op.get("fecha", "") for op in operaciones],
+        })
+        ops["posicion"] = np.arange(len(ops))
+        ops["dia"], canonicas = _fechas(ops["fecha_op"].tolist())
+        ops = ops[ops["dia"].notna().to_numpy()]
+        canonicas = canonicas[ops["posicion"].to_numpy()]
+
+        tabla["dia_senal"], _ = _fechas(tabla["fecha"].tolist())
+        base = tabla[tabla["dia_senal"].notna()]
+
+        # Fechas con ceros: la señal se repite para el mismo día y cada uno de
+        # los siguientes, y se cruza por (symbol, día) exacto
+        desplazadas = []
+        for dias in range(DIAS_TOLERANCIA + 1):
+            copia = base[["orden", "fecha", "symbol"]].copy()
+            copia["dia"] = base["dia_senal"] + pd.Timedelta(days=dias)
+            desplazadas.append(copia)
+        candidatos = [pd.concat(desplazadas, ignore_index=True).merge(ops[canonicas], on=["symbol", "dia"], how="inner")]
+
+        # Fechas escritas de otra forma ("2024-1-5"): el texto no ordena como la
+        # fecha, así que se aplica la regla original completa (son pocas)
+        if not canonicas.all():
+            otras = base.merge(ops[~canonicas], on="symbol", how="inner")
+            otras = otras[(otras["dia"] - otras["dia_senal"]).dt.days <= DIAS_TOLERANCIA]
+            candidatos.append(otras)
+
+        # Misma condición de texto que el recorrido original (fecha_op >= fecha_senal)
+        candidatos = pd.concat(candidatos, ignore_index=True)
+        candidatos = candidatos[candidatos["fecha_op"] >= candidatos["fecha"]]
+        primeras = candidatos.groupby("orden")["posicion"].min()
+        for i, posicion in zip(primeras.index.tolist(), primeras.tolist()):
+            operacion[i] = operaciones[posicion]
+
+    return [
+        {"maximo": maximo[i], "minimo": minimo[i], "cierre": cierre[i], "operacion": operacion[i]}
+        for i in range(len(tabla))
+    ]
@@ -3,20 +3,34 @@
 Script de descarga automática de precios para ejecutar en la nube (PythonAnywhere, GitHub Actions, etc.)
 Versión headless (sin interfaz gráfica)
 
+Además de los precios del día, rellena los huecos del log: sesiones de los
+últimos DIAS_RELLENO días que faltan porque el cron no corrió o la descarga
+falló.
+
+Uso:
+    python descargar_precios_cloud.py                        (día + huecos recientes)
+    python descargar_precios_cloud.py --solo-rellenar --desde 2025-01-01
+    python descargar_precios_cloud.py --grabar respuestas/   (guarda lo que responde Yahoo)
+    python descargar_precios_cloud.py --reproducir respuestas/ --sin-rellenar   (sin red)
+
 Autor: Sistema de Análisis de Inversiones
 Fecha: 18/12/2025
 """
 
-import yfinance as yf
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from zoneinfo import ZoneInfo
+import argparse
 import os
 import subprocess
 import sys
 import json
 from pathlib import Path
 
+from log_precios import actualizar_log_precios, huecos_log
+from proveedor_precios import descargar_yahoo, descargar_por_lotes, grabar_respuestas, proveedor_grabado
+
 # =============================================================================
 # CONFIGURACIÓN - MODIFICAR SEGÚN TU ENTORNO
 # =============================================================================
@@ -31,6 +45,9 @@ REPO_PATH = os.environ.get("REPO_PATH", ".")
 # Nombre del archivo de log
 LOG_FILENAME = "auto_update_log.csv"
 
+# Días hacia atrás en los que se buscan huecos del log en cada ejecución
+DIAS_RELLENO = int(os.environ.get("DIAS_RELLENO", "30"))
+
 # Configuración de Git
 GIT_COMMIT_MESSAGE = "Actualización automática de precios - {fecha}"
 GIT_BRANCH = "main"
@@ -45,99 +62,123 @@ def log(mensaje):
     print(f"[{timestamp}] {mensaje}")
 
 
-def descargar_precios():
-    """Descarga precios actuales de Yahoo Finance"""
+def descargar_precios(proveedor=descargar_yahoo):
+    """Descarga los precios del día en lotes (proveedor: ver proveedor_precios)"""
     log(f"Descargando precios para {len(TICKERS)} tickers...")
 
     try:
-        data = yf.download(TICKERS, period="1d", group_by='ticker', auto_adjust=False, progress=False)
-
-        if data.empty:
-            log("ERROR: No se recibieron datos de Yahoo Finance")
-            return None
-
-        records = []
-        for ticker in TICKERS:
-            try:
-                if hasattr(data.columns, "levels") and ticker in data.columns.levels[0]:
-                    df = data[ticker].copy()
-                    df.reset_index(inplace=True)
-                    if 'Adj Close' in df.columns:
-                        df.rename(columns={'Adj Close': 'Close'}, inplace=True)
-                    df['Ticker'] = ticker
-                    records.append(df[['Date', 'Ticker', 'Open', 'High', 'Low', 'Close']])
-                else:
-                    # Si solo hay un ticker
-                    if 'Open' in data.columns:
-                        tmp = data.reset_index().copy()
-                        if 'Adj Close' in tmp.columns:
-                            tmp.rename(columns={'Adj Close': 'Close'}, inplace=True)
-                        tmp['Ticker'] = ticker
-                        if not tmp.empty:
-                            records.append(tmp[['Date', 'Ticker', 'Open', 'High', 'Low', 'Close']])
-                        break
-            except Exception as e:
-                log(f"WARN: Error procesando {ticker}: {e}")
-                continue
-
-        if not records:
-            log("ERROR: No se pudieron procesar los datos")
-            return None
-
-        df_long = pd.concat(records, ignore_index=True)
-        df_long = df_long.loc[:, ~df_long.columns.duplicated()]
-        df_long['Date'] = pd.to_datetime(df_long['Date']).dt.normalize()
-
-        log(f"Descargados {len(df_long)} registros")
-        return df_long
-
+        df_long, fallidos = descargar_por_lotes(TICKERS, proveedor, periodo="1d")
     except Exception as e:
         log(f"ERROR: Fallo en la descarga: {e}")
         return None
 
+    for ticker, motivo in fallidos.items():
+        log(f"WARN: {ticker} sin datos del día ({motivo})")
 
-def actualizar_log(df_nuevos):
-    """Actualiza el archivo de log con los nuevos precios"""
-    log_file = os.path.join(REPO_PATH, LOG_FILENAME)
-
-    df_nuevos_copy = df_nuevos.copy()
-    df_nuevos_copy['Date'] = pd.to_datetime(df_nuevos_copy['Date']).dt.normalize()
+    if df_long.empty:
+        log("ERROR: No se recibieron datos de Yahoo Finance")
+        return None
 
-    if os.path.exists(log_file):
-        log(f"Leyendo log existente: {log_file}")
-        df_existente = pd.read_csv(log_file, parse_dates=['Date'])
-        df_existente = df_existente.loc[:, ~df_existente.columns.duplicated()]
-        df_existente['Date'] = pd.to_datetime(df_existente['Date']).dt.normalize()
-
-        # Identificar registros que ya existen
-        existing_keys = set(zip(
-            df_existente['Date'].dt.strftime('%Y-%m-%d'),
-            df_existente['Ticker']
-        ))
-
-        keys_series = df_nuevos_copy[['Date', 'Ticker']].apply(
-            lambda r: (r['Date'].strftime('%Y-%m-%d'), r['Ticker']), axis=1
-        )
+    log(f"Descargados {len(df_long)} registros")
+    return df_long
 
-        mask_new = ~keys_series.isin(existing_keys)
-        df_solo_nuevos = df_nuevos_copy.loc[mask_new].copy()
 
-        if df_solo_nuevos.empty:
-            log("No hay datos nuevos para agregar (ya existen en el log)")
-            return False
+def actualizar_log(df_nuevos):
+    """Agrega al log los precios nuevos (solo las filas que todavía no están)"""
+    log_file = os.path.join(REPO_PATH, LOG_FILENAME)
 
-        log(f"Agregando {len(df_solo_nuevos)} registros nuevos")
-        df_final = pd.concat([df_existente, df_solo_nuevos], ignore_index=True)
+    if os.path.exists(log_file):
+        log(f"Actualizando log existente: {log_file}")
     else:
         log(f"Creando nuevo archivo de log: {log_file}")
-        df_final = df_nuevos_copy.copy()
 
-    # Guardar
-    df_final.to_csv(log_file, index=False, float_format="%.2f")
-    log(f"Log guardado correctamente ({len(df_final)} registros totales)")
+    agregadas, _ = actualizar_log_precios(log_file, df_nuevos)
+    if not agregadas:
+        log("No hay datos nuevos para agregar (ya existen en el log)")
+        return False
+
+    log(f"Log guardado correctamente ({agregadas} registros nuevos agregados)")
     return True
 
 
+def ultima_sesion_cerrada(ahora_ny):
+    """Fecha de la última sesión terminada: hoy después del cierre (16:00 NY), si no ayer"""
+    hoy = pd.Timestamp(ahora_ny.date())
+    return hoy if ahora_ny.hour >= 16 else hoy - pd.Timedelta(days=1)
+
+
+def agrupar_huecos(huecos):
+    """
+    Arma los pedidos de descarga para rellenar los huecos: los tickers cuyos
+    rangos de fechas faltantes se superponen comparten un solo pedido por el
+    rango que los cubre (lo que sobra se descarta al guardar).
+
+    Returns:
+        [(inicio, fin, [tickers]), ...] con fin inclusive
+    """
+    grupos = []
+    for inicio, fin, ticker in sorted((faltan[0], faltan[-1], ticker) for ticker, faltan in huecos.items()):
+        if grupos and inicio <= grupos[-1][1]:
+            grupos[-1][1] = max(grupos[-1][1], fin)
+            grupos[-1][2].append(ticker)
+        else:
+            grupos.append([inicio, fin, [ticker]])
+    return [tuple(grupo) for grupo in grupos]
+
+
+def rellenar_huecos(desde, hasta, proveedor=descargar_yahoo):
+    """
+    Busca las sesiones de mercado que le faltan al log entre `desde` y `hasta`
+    (días sin ejecución del cron, fallas de la descarga), las descarga con la
+    menor cantidad de pedidos por rango y las intercala en orden de fecha.
+
+    Returns:
+        Cantidad de filas agregadas al log
+    """
+    log_file = os.path.join(REPO_PATH, LOG_FILENAME)
+    huecos = huecos_log(log_file, TICKERS, desde, hasta)
+    if not huecos:
+        log(f"Sin huecos en el log entre {desde:%Y-%m-%d} y {hasta:%Y-%m-%d}")
+        return 0
+
+    total = sum(len(faltan) for faltan in huecos.values())
+    log(f"Huecos: {total} sesiones faltantes en {len(huecos)} tickers")
+
+    partes = []
+    for inicio, fin, tickers in agrupar_huecos(huecos):
+        log(f"Descargando {inicio:%Y-%m-%d} a {fin:%Y-%m-%d} para {len(tickers)} tickers...")
+        df, fallidos = descargar_por_lotes(tickers, proveedor, inicio=inicio, fin=fin + pd.Timedelta(days=1))
+        for ticker, motivo in fallidos.items():
+            log(f"WARN: {ticker} sin datos entre {inicio:%Y-%m-%d} y {fin:%Y-%m-%d} ({motivo})")
+        if df.empty:
+            continue
+
+        # Solo las sesiones que le faltaban a cada ticker
+        faltantes = pd.MultiIndex.from_arrays([
+            np.concatenate([huecos[ticker].to_numpy() for ticker in tickers]),
+            np.repeat(tickers, [len(huecos[ticker]) for ticker in tickers]),
+        ])
+        claves = pd.MultiIndex.from_arrays([pd.to_datetime(df['Date']).dt.normalize(), df['Ticker']])
+        partes.append(df[claves.isin(faltantes)])
+
+    df_relleno = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    if df_relleno.empty:
+        log("El proveedor no devolvió datos para los huecos")
+        return 0
+
+    # Dentro de cada fecha, en el orden de TICKERS (como la descarga diaria)
+    posicion = {ticker: i for i, ticker in enumerate(TICKERS)}
+    df_relleno = (df_relleno.assign(_posicion=df_relleno['Ticker'].map(posicion))
+                  .sort_values(['Date', '_posicion'], kind='stable')
+                  .drop(columns='_posicion'))
+
+    agregadas, _ = actualizar_log_precios(log_file, df_relleno, en_orden=True)
+    log(f"Huecos rellenados: {agregadas} filas agregadas al log")
+    if agregadas < total:
+        log(f"WARN: {total - agregadas} sesiones sin datos en el proveedor (cierre no previsto o ticker sin cotización)")
+    return agregadas
+
+
 def ejecutar_git(comando):
     """Ejecuta un comando git y retorna el resultado"""
     try:
@@ -200,8 +241,25 @@ def subir_a_github():
     return True
 
 
-def main():
+def main(argv=None):
     """Función principal"""
+    parser = argparse.ArgumentParser(description="Descarga los precios del día y rellena los huecos del log")
+    parser.add_argument("--desde", default=None, metavar="AAAA-MM-DD",
+                        help=f"Buscar huecos desde esta fecha (por defecto, los últimos {DIAS_RELLENO} días)")
+    parser.add_argument("--solo-rellenar", action="store_true", help="No descargar el día, solo rellenar huecos")
+    parser.add_argument("--sin-rellenar", action="store_true", help="Solo descargar el día (comportamiento anterior)")
+    parser.add_argument("--grabar", default=None, metavar="CARPETA",
+                        help="Guardar las respuestas del proveedor en la carpeta")
+    parser.add_argument("--reproducir", default=None, metavar="CARPETA",
+                        help="Responder desde las grabaciones de la carpeta, sin red")
+    args = parser.parse_args(argv)
+
+    proveedor = descargar_yahoo
+    if args.reproducir:
+        proveedor = proveedor_grabado(args.reproducir)
+    elif args.grabar:
+        proveedor = grabar_respuestas(proveedor, args.grabar)
+
     log("=" * 60)
     log("INICIO - Actualización automática de precios")
     log("=" * 60)
@@ -210,14 +268,26 @@ def main():
     now_ny = datetime.now(ZoneInfo("America/New_York"))
     log(f"Hora actual NY: {now_ny.strftime('%Y-%m-%d %H:%M:%S')}")
 
-    # Descargar precios
-    df_precios = descargar_precios()
-    if df_precios is None:
-        log("FALLO: No se pudieron descargar los precios")
-        sys.exit(1)
-
-    # Actualizar log
-    hubo_cambios = actualizar_log(df_precios)
+    hubo_cambios = False
+    fallo_descarga = False
+
+    # Descargar precios del día
+    if not args.solo_rellenar:
+        df_precios = descargar_precios(proveedor)
+        if df_precios is None:
+            log("FALLO: No se pudieron descargar los precios")
+            fallo_descarga = True
+        else:
+            hubo_cambios = actualizar_log(df_precios)
+
+    # Rellenar huecos de los días anteriores
+    if not args.sin_rellenar:
+        hasta = ultima_sesion_cerrada(now_ny)
+        desde = pd.Timestamp(args.desde) if args.desde else hasta - pd.Timedelta(days=DIAS_RELLENO)
+        try:
+            hubo_cambios = rellenar_huecos(desde, hasta, proveedor) > 0 or hubo_cambios
+        except Exception as e:
+            log(f"WARN: No se pudieron rellenar los huecos: {e}")
 
     # Subir a GitHub si hubo cambios
     if hubo_cambios:
@@ -225,6 +295,9 @@ def main():
             log("FALLO: No se pudo subir a GitHub")
             sys.exit(1)
 
+    if fallo_descarga:
+        sys.exit(1)
+
     log("=" * 60)
     log("FIN - Actualización completada exitosamente")
     log("=" * 60)
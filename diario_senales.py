@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Diario de señales de trading (historial_senales.jsonl).
+
+Reemplaza a historial_senales.json: cada señal es una línea JSON que se
+agrega al final del archivo, sin releer ni reescribir el historial completo.
+Junto al diario se guarda un índice persistente (historial_senales.jsonl.idx)
+con la clave única (fecha, symbol) de cada línea, así verificar duplicados no
+requiere leer las señales.
+
+- Agregar: O(señales nuevas), con el diario bloqueado (almacen_json.bloqueo).
+- Leer: generador que entrega las señales de a una, sin cargar el archivo.
+- Compactar: reescritura atómica que descarta duplicados y las señales que
+  se piden eliminar (es como se borran señales o se limpia el historial).
+
+La primera vez que se usa una carpeta que tiene el historial_senales.json
+anterior, sus señales se migran una sola vez (el JSON queda sin tocar).
+
+Uso:
+    python diario_senales.py compactar CARPETA
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from almacen_json import bloqueo, leer_json
+
+NOMBRE_DIARIO = "historial_senales.jsonl"
+NOMBRE_JSON = "historial_senales.json"
+SUFIJO_INDICE = ".idx"
+
+# {ruta absoluta del diario: (firma del diario, claves)}
+_cache_indices = {}
+
+
+def clave_senal(senal):
+    """Clave única de una señal: (fecha YYYY-MM-DD, symbol)."""
+    return senal.get("fecha_generacion", "")[:10], senal.get("symbol", "")
+
+
+def _firma(ruta):
+    """(mtime_ns, tamaño, inodo) del archivo, o None si no existe."""
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return estado.st_mtime_ns, estado.st_size, estado.st_ino
+
+
+def _linea_indice(clave, fin):
+    return f"{clave[0]}\t{clave[1]}\t{fin}\n"
+
+
+def _fsync_carpeta(carpeta):
+    """Que los rename lleguen al disco (no disponible en Windows)."""
+    if hasattr(os, "O_DIRECTORY"):
+        try:
+            fd = os.open(carpeta, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+
+def _reemplazar(ruta, contenido):
+    """Escribe `contenido` (bytes) en un temporal y lo pone en lugar de `ruta`."""
+    carpeta = os.path.dirname(ruta)
+    fd, ruta_tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".jsonl", dir=carpeta)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(ruta_tmp, ruta)
+    except BaseException:
+        if os.path.exists(ruta_tmp):
+            os.remove(ruta_tmp)
+        raise
+    _fsync_carpeta(carpeta)
+
+
+def _recorrer(ruta):
+    """
+    (señal, offset de fin de línea) de cada línea válida del diario. Las
+    líneas dañadas (p. ej. una escritura cortada) se informan y se saltan.
+    """
+    try:
+        f = open(ruta, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        fin = 0
+        for numero, linea in enumerate(f, 1):
+            fin += len(linea)
+            if not linea.strip():
+                continue
+            try:
+                senal = json.loads(linea)
+            except ValueError:
+                print(f"[WARN] Línea {numero} dañada en {ruta}, se ignora")
+                continue
+            if isinstance(senal, dict):
+                yield senal, fin
+
+
+def _reconstruir_indice(ruta):
+    """Recorre el diario y reescribe el índice. Devuelve el conjunto de claves."""
+    claves = set()
+    lineas = []
+    for senal, fin in _recorrer(ruta):
+        clave = clave_senal(senal)
+        claves.add(clave)
+        lineas.append(_linea_indice(clave, fin))
+    _reemplazar(ruta + SUFIJO_INDICE, "".join(lineas).encode('utf-8'))
+    return claves
+
+
+def _indice(ruta):
+    """
+    Claves (fecha, symbol) del diario. Se leen del índice persistente si está
+    al día (cubre el tamaño actual del diario y no es más viejo que él); si el
+    diario cambió por fuera (sincronización, edición a mano), se reconstruye.
+    Quien llama debe tener el diario bloqueado.
+    """
+    firma_diario = _firma(ruta)
+    en_cache = _cache_indices.get(ruta)
+    if en_cache is not None and en_cache[0] == firma_diario:
+        return en_cache[1]
+
+    tamano = firma_diario[1] if firma_diario else 0
+    firma_indice = _firma(ruta + SUFIJO_INDICE)
+    claves = None
+    if firma_indice is not None and (firma_diario is None or firma_indice[0] >= firma_diario[0]):
+        claves = set()
+        fin = 0
+        with open(ruta + SUFIJO_INDICE, 'r', encoding='utf-8') as f:
+            for linea in f:
+                partes = linea.rstrip("\n").split("\t")
+                if len(partes) != 3:
+                    claves = None
+                    break
+                claves.add((partes[0], partes[1]))
+                fin = int(partes[2])
+        if claves is not None and fin != tamano:
+            claves = None
+
+    if claves is None:
+        if firma_diario is None:
+            claves = set()
+        else:
+            print(f"[INFO] Reconstruyendo índice de {ruta}")
+            claves = _reconstruir_indice(ruta)
+
+    _cache_indices[ruta] = (_firma(ruta), claves)
+    return claves
+
+
+def agregar_senales(ruta, senales):
+    """
+    Agrega al final del diario las señales cuya clave (fecha, symbol) no
+    exista todavía (tampoco se repiten dentro de `senales`).
+
+    Returns:
+        Lista de las señales agregadas
+    """
+    ruta = os.path.abspath(ruta)
+    with bloqueo(ruta):
+        claves = set(_indice(ruta))
+        tamano = os.path.getsize(ruta) if os.path.exists(ruta) else 0
+
+        datos = bytearray()
+        # Si una escritura anterior quedó cortada, empezar en una línea nueva
+        if tamano:
+            with open(ruta, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    datos += b"\n"
+
+        agregadas = []
+        lineas_indice = []
+        for senal in senales:
+            clave = clave_senal(senal)
+            if clave in claves:
+                continue
+            datos += (json.dumps(senal, ensure_ascii=False) + "\n").encode('utf-8')
+            claves.add(clave)
+            agregadas.append(senal)
+            lineas_indice.append(_linea_indice(clave, tamano + len(datos)))
+
+        if not agregadas:
+            return []
+
+        with open(ruta, 'ab') as f:
+            f.write(datos)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(ruta + SUFIJO_INDICE, 'a', encoding='utf-8') as f:
+            f.write("".join(lineas_indice))
+            f.flush()
+            os.fsync(f.fileno())
+
+        _cache_indices[ruta] = (_firma(ruta), claves)
+    return agregadas
+
+
+def leer_senales(ruta):
+    """Generador con las señales del diario, en el orden en que se agregaron."""
+    for senal, _ in _recorrer(os.path.abspath(ruta)):
+        yield senal
+
+
+def contar_senales(ruta):
+    """Cantidad de señales del diario (según el índice, sin leerlas)."""
+    ruta = os.path.abspath(ruta)
+    if not os.path.exists(ruta):
+        return 0
+    with bloqueo(ruta):
+        return len(_indice(ruta))
+
+
+def compactar(ruta, descartar=None):
+    """
+    Reescribe el diario de forma atómica conservando la primera señal de cada
+    clave (fecha, symbol) y quitando las que `descartar(senal)` marque.
+
+    Returns:
+        (señales conservadas, señales quitadas)
+    """
+    ruta = os.path.abspath(ruta)
+    with bloqueo(ruta):
+        claves = set()
+        lineas = []
+        lineas_indice = []
+        fin = 0
+        quitadas = 0
+        for senal, _ in _recorrer(ruta):
+            clave = clave_senal(senal)
+            if clave in claves or (descartar is not None and descartar(senal)):
+                quitadas += 1
+                continue
+            linea = (json.dumps(senal, ensure_ascii=False) + "\n").encode('utf-8')
+            fin += len(linea)
+            claves.add(clave)
+            lineas.append(linea)
+            lineas_indice.append(_linea_indice(clave, fin))
+
+        _reemplazar(ruta, b"".join(lineas))
+        _reemplazar(ruta + SUFIJO_INDICE, "".join(lineas_indice).encode('utf-8'))
+        _cache_indices[ruta] = (_firma(ruta), claves)
+    return len(claves), quitadas
+
+
+def ruta_diario(carpeta):
+    """
+    Ruta del diario de señales de la carpeta. Si todavía no existe y en la
+    carpeta está el historial_senales.json anterior, lo migra.
+    """
+    ruta = Path(carpeta) / NOMBRE_DIARIO
+    ruta_json = Path(carpeta) / NOMBRE_JSON
+    if not ruta.exists() and ruta_json.exists():
+        try:
+            senales = leer_json(ruta_json, {}).get("senales", [])
+            agregadas = agregar_senales(ruta, senales)
+            print(f"[INFO] Migradas {len(agregadas)} señales de {ruta_json} a {ruta}")
+        except Exception as e:
+            print(f"[WARN] No se pudo migrar {ruta_json}: {e}")
+    return ruta
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2 or argv[0] != "compactar":
+        print(__doc__)
+        return 1
+
+    ruta = ruta_diario(argv[1])
+    if not ruta.exists():
+        print(f"[ERROR] No existe {ruta}")
+        return 1
+    conservadas, quitadas = compactar(ruta)
+    print(f"[INFO] {ruta}: {conservadas} señales ({quitadas} duplicadas quitadas)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Actualización del log de precios diarios (auto_update_log.csv) agregando
+solo las filas nuevas al final del archivo.
+
+Antes descargar_precios_cloud.actualizar_log y
+DESCARGAR_DATA_AUTOMATICO.actualizar_csv leían el log completo, armaban un
+set de claves con strftime, calculaban las claves nuevas fila por fila
+(apply con axis=1) y reescribían todo el CSV, que crece todos los días.
+
+Acá:
+
+- Junto al log se guarda un índice compacto de sus claves (fecha, ticker)
+  en <log>.claves.npz: días como enteros y tickers como códigos. Sirve
+  mientras el log tenga el mismo tamaño y mtime; si cambió por fuera
+  (git pull, edición a mano) se reconstruye leyendo solo Date y Ticker.
+- Las filas descargadas se cruzan con el índice en forma vectorizada
+  (anti-join con np.isin sobre una clave entera por fila).
+- Las filas nuevas se agregan al final del archivo con las columnas de su
+  cabecera. El log solo se reescribe completo (de forma atómica) si hay
+  correcciones de filas existentes (corregir=True), columnas nuevas o
+  huecos rellenados que se intercalan por fecha (en_orden=True).
+- huecos_log() compara las fechas de cada ticker con las sesiones de la
+  NYSE (CalendarioNYSE) para encontrar los días que faltan.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (AbstractHolidayCalendar, Holiday, GoodFriday, USLaborDay,
+                                    USMartinLutherKingJr, USMemorialDay, USPresidentsDay,
+                                    USThanksgivingDay, nearest_workday, sunday_to_monday)
+from pandas.tseries.offsets import CustomBusinessDay
+
+from almacen_json import bloqueo
+
+# Subir la versión si cambia el contenido del índice
+VERSION_INDICE = 1
+SUFIJO_INDICE = ".claves.npz"
+
+# Formato de los números del log (el mismo que usaban los to_csv anteriores)
+FORMATO_NUMEROS = "%.2f"
+
+
+def ruta_indice(log_file):
+    """Índice de claves de un log: mismo nombre con el sufijo .claves.npz"""
+    return str(log_file) + SUFIJO_INDICE
+
+
+def _clave_archivo(ruta):
+    """(tamaño, mtime en ns) del log."""
+    estado = os.stat(ruta)
+    return estado.st_size, estado.st_mtime_ns
+
+
+def _dias(fechas):
+    """Días desde 1970-01-01 (int64) de una serie de fechas normalizadas."""
+    return fechas.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64)
+
+
+def _codigos(tickers, lista_tickers):
+    """Posición de cada ticker en `lista_tickers` (-1 si no está)."""
+    return pd.Index(lista_tickers, dtype=object).get_indexer(tickers)
+
+
+def _claves(dias, codigos, lista_tickers):
+    """Clave entera única de cada par (día, código de ticker)."""
+    return dias * (len(lista_tickers) + 1) + codigos
+
+
+def _leer_indice(log_file):
+    """(tickers, días, códigos) del índice si corresponde al log actual, o None."""
+    archivo = ruta_indice(log_file)
+    if not os.path.exists(archivo):
+        return None
+    try:
+        tamano, mtime_ns = _clave_archivo(log_file)
+        with np.load(archivo, allow_pickle=False) as indice:
+            if (int(indice['version']) != VERSION_INDICE
+                    or int(indice['tamano']) != tamano
+                    or int(indice['mtime_ns']) != mtime_ns):
+                return None
+            return indice['tickers'].tolist(), indice['dias'], indice['codigos']
+    except Exception as e:
+        print(f"[WARN] Índice ilegible ({os.path.basename(archivo)}), se reconstruye: {e}")
+        return None
+
+
+def _guardar_indice(log_file, tickers, dias, codigos):
+    """Escribe el índice del log en su estado actual (atómico; si falla solo avisa)."""
+    archivo = ruta_indice(log_file)
+    try:
+        tamano, mtime_ns = _clave_archivo(log_file)
+        fd, temporal = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(archivo)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    version=np.int64(VERSION_INDICE),
+                    tamano=np.int64(tamano),
+                    mtime_ns=np.int64(mtime_ns),
+                    tickers=np.array(tickers, dtype=str),
+                    dias=np.asarray(dias, dtype=np.int64),
+                    codigos=np.asarray(codigos, dtype=np.int32),
+                )
+            os.replace(temporal, archivo)
+        except BaseException:
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            raise
+    except Exception as e:
+        print(f"[WARN] No se pudo guardar el índice de {os.path.basename(str(log_file))}: {e}")
+
+
+def _indice_desde_df(df):
+    """(tickers, días, códigos) de un DataFrame con Date normalizada y Ticker."""
+    validas = df['Date'].notna().to_numpy()
+    tickers_filas = df['Ticker'].astype(str).to_numpy()[validas]
+    lista_tickers = sorted(set(tickers_filas))
+    return lista_tickers, _dias(df['Date'][validas]), _codigos(tickers_filas, lista_tickers)
+
+
+def _leer_fechas(columna):
+    return pd.to_datetime(columna, errors='coerce').dt.normalize()
+
+
+def indice_log(log_file):
+    """
+    (tickers, días, códigos) de las filas del log, desde el índice guardado
+    o reconstruido leyendo solo las columnas Date y Ticker.
+    """
+    indice = _leer_indice(log_file)
+    if indice is not None:
+        return indice
+
+    print(f"[INFO] Reconstruyendo índice de {os.path.basename(str(log_file))}")
+    df = pd.read_csv(log_file, usecols=['Date', 'Ticker'], dtype={'Ticker': str})
+    df['Date'] = _leer_fechas(df['Date'])
+    indice = _indice_desde_df(df)
+    _guardar_indice(log_file, *indice)
+    return indice
+
+
+def _cabecera(log_file):
+    """(columnas de la cabecera, fin de línea, termina en salto de línea)."""
+    with open(log_file, 'rb') as f:
+        primera = f.readline()
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return [], "\n", True
+        f.seek(-1, os.SEEK_END)
+        termina = f.read(1) == b"\n"
+    fin_linea = "\r\n" if primera.endswith(b"\r\n") else "\n"
+    columnas = primera.decode('utf-8').rstrip("\r\n").split(",")
+    return columnas, fin_linea, termina
+
+
+def _texto_csv(df, header, fin_linea):
+    return df.to_csv(None, index=False, header=header, float_format=FORMATO_NUMEROS,
+                     date_format="%Y-%m-%d", lineterminator=fin_linea)
+
+
+def _reemplazar(log_file, texto):
+    """Escribe el log completo en un temporal y lo pone en su lugar."""
+    carpeta = os.path.dirname(os.path.abspath(log_file))
+    fd, temporal = tempfile.mkstemp(prefix=".tmp_", suffix=".csv", dir=carpeta)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline="") as f:
+            f.write(texto)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, log_file)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def _reescribir(log_file, df_nuevos, corregir, fin_linea, en_orden=False):
+    """
+    Camino lento: lee el log completo, corrige las filas existentes (si se
+    pide), agrega las nuevas (intercaladas por fecha si en_orden) y lo
+    reescribe. Devuelve (agregadas, corregidas).
+    """
+    df_existente = pd.read_csv(log_file)
+    df_existente = df_existente.loc[:, ~df_existente.columns.duplicated()]
+    df_existente['Date'] = _leer_fechas(df_existente['Date'])
+
+    claves_existentes = pd.MultiIndex.from_arrays([df_existente['Date'], df_existente['Ticker'].astype(str)])
+    claves_nuevas = pd.MultiIndex.from_arrays([df_nuevos['Date'], df_nuevos['Ticker'].astype(str)])
+    ya_estan = claves_nuevas.isin(claves_existentes)
+
+    corregidas = 0
+    if corregir and ya_estan.any():
+        # Cada fila existente toma los valores descargados de su clave
+        columnas = [c for c in df_nuevos.columns if c in df_existente.columns and c not in ('Date', 'Ticker')]
+        reemplazos = df_nuevos.loc[ya_estan].set_index(['Date', 'Ticker'])[columnas]
+        posiciones = reemplazos.index.get_indexer(claves_existentes)
+        filas = np.flatnonzero(posiciones >= 0)
+        actuales = df_existente.loc[filas, columnas].to_numpy(dtype=float)
+        descargados = reemplazos.to_numpy(dtype=float)[posiciones[filas]]
+        distintas = ~np.isclose(np.round(actuales, 2), np.round(descargados, 2), equal_nan=True).all(axis=1)
+        df_existente.loc[filas[distintas], columnas] = descargados[distintas]
+        corregidas = int(distintas.sum())
+
+    df_solo_nuevos = df_nuevos.loc[~ya_estan]
+    if df_solo_nuevos.empty and not corregidas:
+        return 0, 0
+
+    df_final = pd.concat([df_existente, df_solo_nuevos], ignore_index=True)
+    if en_orden:
+        # Orden estable: en cada fecha, las filas que ya estaban quedan primero
+        df_final = df_final.sort_values('Date', kind='stable')
+    _reemplazar(log_file, _texto_csv(df_final, True, fin_linea))
+    _guardar_indice(log_file, *_indice_desde_df(df_final))
+    return len(df_solo_nuevos), corregidas
+
+
+def actualizar_log_precios(log_file, df_nuevos, corregir=False, en_orden=False):
+    """
+    Agrega al log las filas de `df_nuevos` cuya clave (fecha, ticker) no esté
+    todavía (tampoco se repiten dentro de `df_nuevos`).
+
+    Args:
+        log_file: ruta del auto_update_log.csv (se crea si no existe)
+        df_nuevos: DataFrame con Date, Ticker, Open, High, Low y Close
+        corregir: si es True, las filas que ya están en el log se actualizan
+                  con los valores de `df_nuevos` cuando difieren (reescribe
+                  el log completo)
+        en_orden: si es True y hay filas anteriores a la última fecha del log
+                  (huecos rellenados), se intercalan por fecha en lugar de ir
+                  al final (reescribe el log completo)
+
+    Returns:
+        (filas agregadas, filas corregidas)
+    """
+    df_nuevos = df_nuevos.loc[:, ~df_nuevos.columns.duplicated()].copy()
+    df_nuevos['Date'] = pd.to_datetime(df_nuevos['Date']).dt.normalize()
+    df_nuevos = df_nuevos[df_nuevos['Date'].notna()].copy()
+    df_nuevos['Ticker'] = df_nuevos['Ticker'].astype(str)
+    df_nuevos = df_nuevos.drop_duplicates(subset=['Date', 'Ticker'], keep='first').reset_index(drop=True)
+
+    log_file = os.path.abspath(log_file)
+    with bloqueo(log_file):
+        if not os.path.exists(log_file) or os.path.getsize(log_file) == 0:
+            _reemplazar(log_file, _texto_csv(df_nuevos, True, "\n"))
+            _guardar_indice(log_file, *_indice_desde_df(df_nuevos))
+            return len(df_nuevos), 0
+
+        columnas, fin_linea, termina = _cabecera(log_file)
+        if corregir or any(c not in columnas for c in df_nuevos.columns):
+            return _reescribir(log_file, df_nuevos, corregir, fin_linea)
+
+        # Anti-join vectorizado contra el índice
+        lista_tickers, dias, codigos = indice_log(log_file)
+        dias_nuevos = _dias(df_nuevos['Date'])
+        codigos_nuevos = _codigos(df_nuevos['Ticker'], lista_tickers)
+        es_nueva = (codigos_nuevos < 0) | ~np.isin(_claves(dias_nuevos, codigos_nuevos, lista_tickers),
+                                                   _claves(dias, codigos, lista_tickers))
+        df_solo_nuevos = df_nuevos.loc[es_nueva]
+        if df_solo_nuevos.empty:
+            return 0, 0
+        if en_orden and len(dias) and dias_nuevos[es_nueva].min() < dias.max():
+            return _reescribir(log_file, df_solo_nuevos, False, fin_linea, en_orden=True)
+
+        # Append con las columnas de la cabecera (las que falten quedan vacías)
+        texto = _texto_csv(df_solo_nuevos.reindex(columns=columnas), False, fin_linea)
+        if not termina:
+            texto = fin_linea + texto
+        with open(log_file, 'a', encoding='utf-8', newline="") as f:
+            f.write(texto)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # El índice pasa a cubrir también las filas agregadas
+        todos = sorted(set(lista_tickers) | set(df_solo_nuevos['Ticker']))
+        codigos_viejos = _codigos(lista_tickers, todos)[codigos] if len(codigos) else codigos
+        _guardar_indice(log_file, todos, np.concatenate([dias, dias_nuevos[es_nueva]]),
+                        np.concatenate([codigos_viejos, _codigos(df_solo_nuevos['Ticker'], todos)]))
+        return len(df_solo_nuevos), 0
+
+
+# =========================
+# Huecos del log
+# =========================
+class CalendarioNYSE(AbstractHolidayCalendar):
+    """Feriados de la bolsa de Nueva York (sin los cierres excepcionales)."""
+    rules = [
+        # Si cae sábado no se traslada (el 31/12 la bolsa abre)
+        Holiday("Año Nuevo", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-01-01", observance=nearest_workday),
+        Holiday("Día de la Independencia", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Navidad", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+# Cierres por duelo nacional u otros motivos que no siguen una regla
+CIERRES_ESPECIALES = ["2018-12-05", "2025-01-09"]
+
+
+def sesiones_mercado(desde, hasta):
+    """Días hábiles de la NYSE entre `desde` y `hasta` inclusive."""
+    desde = pd.Timestamp(desde).normalize()
+    hasta = pd.Timestamp(hasta).normalize()
+    if hasta < desde:
+        return pd.DatetimeIndex([])
+    dias = pd.date_range(desde, hasta, freq=CustomBusinessDay(calendar=CalendarioNYSE()))
+    return dias.difference(pd.DatetimeIndex(CIERRES_ESPECIALES))
+
+
+def huecos_log(log_file, tickers, desde, hasta):
+    """
+    Sesiones de mercado entre `desde` y `hasta` que le faltan a cada ticker
+    en el log. Para cada ticker se mira desde su primera fecha en el log (no
+    se buscan huecos antes de que se empezara a descargar); los tickers que
+    no están en el log no se incluyen.
+
+    Returns:
+        {ticker: DatetimeIndex de sesiones faltantes} (solo los que tienen huecos)
+    """
+    sesiones = sesiones_mercado(desde, hasta)
+    if not len(sesiones) or not os.path.exists(log_file):
+        return {}
+    dias_sesion = _dias(pd.Series(sesiones))
+
+    with bloqueo(os.path.abspath(log_file)):
+        lista_tickers, dias, codigos = indice_log(os.path.abspath(log_file))
+
+    huecos = {}
+    for ticker in tickers:
+        codigo = lista_tickers.index(ticker) if ticker in lista_tickers else -1
+        if codigo < 0:
+            continue
+        dias_ticker = dias[codigos == codigo]
+        faltan = (dias_sesion >= dias_ticker.min()) & ~np.isin(dias_sesion, dias_ticker)
+        if faltan.any():
+            huecos[ticker] = sesiones[faltan]
+    return huecos
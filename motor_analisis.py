@@ -0,0 +1,1269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de simulación y optimización de la estrategia de compra/venta por umbrales.
+
+Módulo sin dependencias de Tk: recibe una serie de precios ya parseada
+(serie_mercado.SerieMercado) y un ParametrosAnalisis, y devuelve métricas y,
+opcionalmente, el DataFrame de resultados. Analisis_singrafico.py es un cliente
+de este motor.
+
+Contiene el kernel vectorizado (arrays NumPy) que usa el optimizador y la
+implementación original fila a fila con pandas, que se conserva como modo de
+referencia para verificar que ambos caminos producen exactamente lo mismo.
+"""
+
+import heapq
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Modos de simulación
+MODO_KERNEL = "kernel"
+MODO_REFERENCIA = "referencia"
+
+# Códigos de la columna "Opción" dentro del kernel
+OPCION_NA = 0
+OPCION_COMPRA = 1
+OPCION_VENTA = -1
+NOMBRES_OPCION = np.array(["N/A", "Compra", "Venta"], dtype=object)  # índice = código % 3
+
+
+def calcular_acumulado(var):
+    """
+    Calcula el % acumulado por signos consecutivos: se suma la variación diaria
+    mientras el signo se mantiene y se reinicia cuando cambia.
+
+    Args:
+        var: Secuencia de % var. en decimal (0.0205 = 2.05%)
+
+    Returns:
+        np.ndarray con el % acumulado en decimal
+    """
+    acum = 0
+    prev = 0
+    lst = []
+    for v in list(var):
+        sign = 1 if v > 0 else -1 if v < 0 else 0
+        if sign == prev:
+            acum += v
+        else:
+            acum = v
+        lst.append(acum)
+        prev = sign
+    return np.array(lst, dtype=float)
+
+
+def _rachas(acum_pct, positivas):
+    """
+    Detecta las rachas de % acumulado del mismo signo con al menos 2 días.
+
+    Returns:
+        (inicios, fines, mascara): índices de inicio y fin (exclusivo) de cada
+        racha válida y máscara booleana de los días que pertenecen a una.
+    """
+    n = len(acum_pct)
+    signo = acum_pct > 0 if positivas else acum_pct < 0
+    bordes = np.diff(np.concatenate(([0], signo.astype(np.int8), [0])))
+    inicios = np.flatnonzero(bordes == 1)
+    fines = np.flatnonzero(bordes == -1)  # exclusivo
+
+    validas = (fines - inicios) >= 2
+    inicios = inicios[validas]
+    fines = fines[validas]
+
+    marcas = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(marcas, inicios, 1)
+    np.add.at(marcas, fines, -1)
+    mascara = np.cumsum(marcas[:n]) > 0
+
+    return inicios, fines, mascara
+
+
+class PerfilRachas:
+    """
+    Rachas de % acumulado de una serie y todo lo que se deriva de ellas.
+
+    Nada de esto depende de los parámetros optimizados, así que se calcula una
+    sola vez por serie (SerieMercado.perfil_rachas) y cada evaluación solo hace
+    el trabajo que sí depende de los umbrales.
+
+    Atributos (porcentajes en %, ej: 2.5 = 2.5%):
+        inicios_pos, fines_pos / inicios_neg, fines_neg: Límites de las rachas
+            positivas / negativas de al menos 2 días (fin exclusivo)
+        maximos, minimos: Último valor de cada racha positiva / negativa
+        promedio_maximos, promedio_minimos: Promedio de esos valores (0.0 si no hay)
+        comprar_multiple: Días en racha negativa con % acumulado <= promedio_minimos
+        vender_doble: Días en racha positiva con % acumulado >= promedio_maximos
+    """
+
+    def __init__(self, acum):
+        acum_pct = np.asarray(acum, dtype=float) * 100.0
+        n = len(acum_pct)
+
+        self.inicios_pos, self.fines_pos, en_racha_pos = _rachas(acum_pct, positivas=True)
+        self.inicios_neg, self.fines_neg, en_racha_neg = _rachas(acum_pct, positivas=False)
+        self.maximos = acum_pct[self.fines_pos - 1]
+        self.minimos = acum_pct[self.fines_neg - 1]
+
+        maximos = self.maximos.tolist()
+        minimos = self.minimos.tolist()
+        self.promedio_maximos = sum(maximos) / len(maximos) if maximos else 0.0
+        self.promedio_minimos = sum(minimos) / len(minimos) if minimos else 0.0
+
+        if self.promedio_minimos < 0.0:
+            self.comprar_multiple = en_racha_neg & (acum_pct <= self.promedio_minimos)
+        else:
+            self.comprar_multiple = np.zeros(n, dtype=bool)
+
+        if self.promedio_maximos > 0.0:
+            self.vender_doble = en_racha_pos & (acum_pct >= self.promedio_maximos)
+        else:
+            self.vender_doble = np.zeros(n, dtype=bool)
+
+
+def _limites(limite_tipo, limite_valor):
+    """(max_acciones, max_aporte) según el tipo de límite."""
+    try:
+        if limite_tipo == "acciones":
+            return int(limite_valor), float("inf")
+        return 10, float(limite_valor)
+    except (TypeError, ValueError):
+        return 10, float("inf")
+
+
+class LibroLotes:
+    """
+    Precios de compra de las acciones en cartera, de menor a mayor (min-heap).
+
+    Comprar es O(log n). Vender revisa solo los lotes más baratos que se
+    pueden vender (como mucho n_venta), O(n_venta · log n), en lugar de
+    reordenar la lista completa en cada compra y desplazarla en cada venta.
+    """
+
+    def __init__(self):
+        self._precios = []
+
+    def __len__(self):
+        return len(self._precios)
+
+    def comprar(self, precio):
+        heapq.heappush(self._precios, precio)
+
+    def vender(self, precio, n_venta, ganancia_minima):
+        """
+        Vende hasta n_venta lotes empezando por el más barato, parando en el
+        primero que no alcanza la ganancia mínima. Equivale a contar el prefijo
+        de lotes vendibles de la lista ordenada y vender min(n_venta, vendibles).
+
+        Returns:
+            Número de lotes vendidos
+        """
+        vendidos = 0
+        while vendidos < n_venta and self._precios:
+            precio_compra = self._precios[0]
+            if (precio - precio_compra) / precio_compra < ganancia_minima:
+                break
+            heapq.heappop(self._precios)
+            vendidos += 1
+        return vendidos
+
+
+def simular_estrategia(cierre, var, acum, umbral_compra, umbral_venta, umbral_suave,
+                       ganancia_minima, compra_multiple=None, venta_multiple=None,
+                       limite_tipo="acciones", limite_valor=10.0, perfil=None):
+    """
+    Kernel de simulación sobre arrays ya parseados (sin pandas ni widgets).
+
+    Args:
+        cierre: Array de precios de cierre ("Último")
+        var: Array de % var. en decimal
+        acum: Array de % acumulado en decimal (ver calcular_acumulado)
+        umbral_compra, umbral_venta, umbral_suave: Umbrales en decimal
+        ganancia_minima: Ganancia mínima por acción para vender, en decimal
+        compra_multiple, venta_multiple: N acciones a comprar/vender en rachas
+            extremas (None = desactivado)
+        limite_tipo: "acciones" o "aporte"
+        limite_valor: Máximo de acciones o de aporte acumulado según limite_tipo
+        perfil: PerfilRachas de `acum` ya calculado (None = se calcula aquí)
+
+    Returns:
+        dict con los arrays por día (opcion, movimiento, acciones, precio_operacion,
+        capital_bolsa, capital_acciones, capital_total, aporte, aporte_acumulado,
+        margen, rentabilidad) y las métricas rentab_max, margen_prom,
+        promedio_maximos y promedio_minimos.
+    """
+    cierre = np.asarray(cierre, dtype=float)
+    var = np.asarray(var, dtype=float)
+    acum = np.asarray(acum, dtype=float)
+    n = len(cierre)
+
+    # Opción por día (el orden de las condiciones es el de determinar_opcion)
+    opcion = np.select(
+        [var >= umbral_venta,
+         var <= umbral_compra,
+         (acum >= umbral_venta) & (var >= umbral_suave),
+         (acum <= umbral_compra) & (var <= -umbral_suave)],
+        [OPCION_VENTA, OPCION_COMPRA, OPCION_VENTA, OPCION_COMPRA],
+        default=OPCION_NA
+    )
+
+    # Rachas de % acumulado y condiciones de compra/venta múltiple
+    if perfil is None:
+        perfil = PerfilRachas(acum)
+
+    max_acciones, max_aporte = _limites(limite_tipo, limite_valor)
+    limite_por_acciones = (limite_tipo == "acciones")
+    limite_por_aporte = (limite_tipo == "aporte")
+
+    # Bucle de estado sobre listas de Python (sin iterrows ni Series)
+    acciones = 0
+    capital_bolsa = 0
+    aporte_acumulado = 0
+    libro = LibroLotes()
+
+    movs = [0] * n
+    acts = [0] * n
+    precios_op = [0.0] * n
+    cap_b = [0.0] * n
+    cap_acc = [0.0] * n
+    cap_tot = [0.0] * n
+    aport = [0.0] * n
+    aport_acum = [0.0] * n
+
+    for i, (op, precio, multiple_c, multiple_v) in enumerate(zip(
+            opcion.tolist(), cierre.tolist(), perfil.comprar_multiple.tolist(), perfil.vender_doble.tolist())):
+        movimiento = 0
+        aporte = 0.0
+        precio_operacion = 0.0
+
+        if op == OPCION_COMPRA:
+            n_compra = 1
+            if compra_multiple is not None and multiple_c:
+                n_compra = compra_multiple
+
+            acciones_a_comprar = 0
+            for _ in range(n_compra):
+                if limite_por_acciones:
+                    puede_comprar = acciones < max_acciones
+                else:
+                    puede_comprar = limite_por_aporte and (aporte_acumulado + precio) <= max_aporte
+
+                if not puede_comprar:
+                    break
+
+                acciones_a_comprar += 1
+                if capital_bolsa >= precio:
+                    capital_bolsa -= precio
+                else:
+                    aporte += precio
+                    aporte_acumulado += precio
+                    capital_bolsa += precio
+                    capital_bolsa -= precio
+                acciones += 1
+                libro.comprar(precio)
+
+            movimiento = acciones_a_comprar
+            if movimiento > 0:
+                precio_operacion = -precio
+
+        elif op == OPCION_VENTA and acciones > 0:
+            n_venta = 1
+            if venta_multiple is not None and multiple_v and acciones >= venta_multiple:
+                n_venta = venta_multiple
+
+            # Lotes vendibles: prefijo (desde el más barato) con ganancia suficiente
+            n_venta = libro.vender(precio, n_venta, ganancia_minima)
+
+            if n_venta > 0:
+                capital_bolsa += precio * n_venta
+                acciones -= n_venta
+                movimiento = -n_venta
+                precio_operacion = precio
+
+        movs[i] = movimiento
+        acts[i] = acciones
+        precios_op[i] = precio_operacion
+        cap_b[i] = round(capital_bolsa, 2)
+        cap_acc[i] = round(acciones * precio, 2)
+        cap_tot[i] = round(capital_bolsa + acciones * precio, 2)
+        aport[i] = round(aporte, 2)
+        aport_acum[i] = round(aporte_acumulado, 2)
+
+    # Sin dtype explícito: si nunca hubo operaciones las columnas quedan enteras,
+    # igual que en la referencia (afecta al formato "0%" vs "0.0%")
+    capital_total = np.array(cap_tot)
+    aporte_acumulado_arr = np.array(aport_acum)
+    margen = capital_total - aporte_acumulado_arr
+
+    con_aporte = aporte_acumulado_arr > 0
+    if con_aporte.any():
+        rentabilidad = np.zeros(n, dtype=float)
+        rentabilidad[con_aporte] = margen[con_aporte] / aporte_acumulado_arr[con_aporte] * 100
+    else:
+        rentabilidad = np.zeros(n, dtype=np.int64)
+
+    return {
+        "opcion": opcion,
+        "movimiento": np.array(movs, dtype=np.int64),
+        "acciones": np.array(acts, dtype=np.int64),
+        "precio_operacion": np.array(precios_op, dtype=float),
+        "capital_bolsa": np.array(cap_b),
+        "capital_acciones": np.array(cap_acc),
+        "capital_total": capital_total,
+        "aporte": np.array(aport),
+        "aporte_acumulado": aporte_acumulado_arr,
+        "margen": margen,
+        "rentabilidad": rentabilidad,
+        "rentab_max": rentabilidad.max() if n else float("nan"),
+        "margen_prom": margen.mean() if n else float("nan"),
+        "promedio_maximos": perfil.promedio_maximos,
+        "promedio_minimos": perfil.promedio_minimos,
+    }
+
+
+def redondear(valores, decimales):
+    """
+    Equivalente vectorizado de round(x, decimales) de Python para arrays float.
+
+    np.round escala, redondea y divide, y puede diferir de round() cuando el
+    valor escalado queda muy cerca de .5; esos casos (raros) se recalculan con
+    round() para que el resultado sea idéntico al del kernel escalar.
+    """
+    valores = np.asarray(valores, dtype=float)
+    resultado = np.round(valores, decimales)
+    escalado = valores * 10.0 ** decimales
+    dudosos = np.abs(np.abs(escalado - np.trunc(escalado)) - 0.5) < 1e-6
+    if dudosos.any():
+        resultado[dudosos] = [round(v, decimales) for v in valores[dudosos].tolist()]
+    return resultado
+
+
+def simular_lote(cierre, var, acum, umbral_compra, umbral_venta, umbral_suave,
+                 ganancia_minima, compra_multiple, venta_multiple,
+                 limite_tipo="acciones", limite_valor=10.0, perfil=None):
+    """
+    Simula S candidatos a la vez recorriendo la serie una sola vez.
+
+    Cada candidato tiene su propio estado (acciones, capital_bolsa,
+    aporte_acumulado y libro de lotes ordenado); en cada día se avanzan todos
+    juntos con operaciones sobre arrays. Da las mismas métricas que
+    simular_estrategia aplicado candidato por candidato.
+
+    Args:
+        cierre, var, acum: Arrays de la serie (ver simular_estrategia)
+        umbral_compra, umbral_venta, ganancia_minima: Arrays (S,) en decimal
+        umbral_suave: Escalar en decimal (común a todos los candidatos)
+        compra_multiple, venta_multiple: Arrays (S,) de enteros (0 = desactivado)
+        limite_tipo, limite_valor: Límite común a todos los candidatos
+        perfil: PerfilRachas de `acum` ya calculado (None = se calcula aquí)
+
+    Returns:
+        (rentab_max, margen_prom): arrays (S,)
+    """
+    cierre = np.asarray(cierre, dtype=float)
+    var = np.asarray(var, dtype=float)
+    acum = np.asarray(acum, dtype=float)
+    umbral_compra = np.asarray(umbral_compra, dtype=float)
+    umbral_venta = np.asarray(umbral_venta, dtype=float)
+    ganancia_minima = np.asarray(ganancia_minima, dtype=float)
+    compra_multiple = np.asarray(compra_multiple, dtype=np.int64)
+    venta_multiple = np.asarray(venta_multiple, dtype=np.int64)
+    n = len(cierre)
+    s = len(umbral_compra)
+
+    if n == 0:
+        return np.full(s, np.nan), np.full(s, np.nan)
+
+    # Opción de cada candidato en cada día: matriz (n, S)
+    v = var[:, None]
+    a = acum[:, None]
+    opcion = np.select(
+        [v >= umbral_venta,
+         v <= umbral_compra,
+         (a >= umbral_venta) & (v >= umbral_suave),
+         (a <= umbral_compra) & (v <= -umbral_suave)],
+        [OPCION_VENTA, OPCION_COMPRA, OPCION_VENTA, OPCION_COMPRA],
+        default=OPCION_NA
+    ).astype(np.int8)
+
+    if perfil is None:
+        perfil = PerfilRachas(acum)
+    comprar_multiple, vender_doble = perfil.comprar_multiple, perfil.vender_doble
+    max_acciones, max_aporte = _limites(limite_tipo, limite_valor)
+    limite_por_acciones = (limite_tipo == "acciones")
+    limite_por_aporte = (limite_tipo == "aporte")
+
+    # Capacidad del libro de lotes: nunca hay más lotes que compras posibles
+    max_compra = int(max(1, compra_multiple.max(initial=0)))
+    if limite_por_acciones:
+        capacidad = max(0, max_acciones)
+    else:
+        positivos = cierre[cierre > 0]
+        capacidad = n * max_compra
+        if positivos.size and np.isfinite(max_aporte):
+            capacidad = min(capacidad, int(max_aporte // positivos.min()) + 1)
+    capacidad = max(1, min(capacidad, n * max_compra))
+    max_venta = int(max(1, venta_multiple.max(initial=0)))
+
+    acciones = np.zeros(s, dtype=np.int64)
+    capital = np.zeros(s, dtype=float)
+    aporte_acumulado = np.zeros(s, dtype=float)
+    lotes = np.full((s, capacidad), np.inf)  # ordenados de menor a mayor, relleno con inf
+    columnas = np.arange(capacidad)
+
+    # Solo los días en que algún candidato opera cambian el estado
+    dias_evento = np.flatnonzero((opcion != OPCION_NA).any(axis=1))
+    hist_acciones = np.zeros((s, len(dias_evento) + 1), dtype=np.int64)
+    hist_capital = np.zeros((s, len(dias_evento) + 1), dtype=float)
+    hist_aporte = np.zeros((s, len(dias_evento) + 1), dtype=float)
+
+    usa_multiple_c = compra_multiple > 0
+    usa_multiple_v = venta_multiple > 0
+
+    with np.errstate(invalid="ignore"):
+        for e, t in enumerate(dias_evento.tolist(), start=1):
+            precio = cierre[t]
+            op = opcion[t]
+
+            compra = op == OPCION_COMPRA
+            if compra.any():
+                if comprar_multiple[t]:
+                    n_compra = np.where(usa_multiple_c, compra_multiple, 1)
+                else:
+                    n_compra = np.ones(s, dtype=np.int64)
+                comprados = np.zeros(s, dtype=np.int64)
+                for u in range(int(n_compra[compra].max())):
+                    activos = compra & (u < n_compra)
+                    if limite_por_acciones:
+                        activos &= acciones < max_acciones
+                    elif limite_por_aporte:
+                        activos &= (aporte_acumulado + precio) <= max_aporte
+                    else:
+                        activos[:] = False
+                    if not activos.any():
+                        break
+                    con_capital = activos & (capital >= precio)
+                    sin_capital = activos & ~con_capital
+                    capital[con_capital] -= precio
+                    aporte_acumulado[sin_capital] += precio
+                    capital[sin_capital] = (capital[sin_capital] + precio) - precio
+                    acciones[activos] += 1
+                    comprados[activos] += 1
+
+                filas = np.flatnonzero(comprados)
+                if filas.size:
+                    # Insertar k copias del precio manteniendo el orden
+                    libro = lotes[filas]
+                    k = comprados[filas, None]
+                    pos = (libro < precio).sum(axis=1)[:, None]
+                    origen = np.where(columnas < pos, columnas, columnas - k)
+                    nuevo = np.take_along_axis(libro, np.clip(origen, 0, capacidad - 1), axis=1)
+                    nuevo[(columnas >= pos) & (columnas < pos + k)] = precio
+                    lotes[filas] = nuevo
+
+            venta = (op == OPCION_VENTA) & (acciones > 0)
+            if venta.any():
+                filas = np.flatnonzero(venta)
+                if vender_doble[t]:
+                    n_venta = np.where(usa_multiple_v[filas] & (acciones[filas] >= venta_multiple[filas]),
+                                       venta_multiple[filas], 1)
+                else:
+                    n_venta = np.ones(filas.size, dtype=np.int64)
+
+                # Lotes vendibles: prefijo de lotes (desde el más barato) con ganancia suficiente
+                frente = lotes[filas, :min(max_venta, capacidad)]
+                ok = (precio - frente) / frente >= ganancia_minima[filas, None]
+                vendibles = np.cumprod(ok, axis=1).sum(axis=1)
+
+                vende = vendibles > 0
+                filas = filas[vende]
+                if filas.size:
+                    n_vender = np.minimum(np.minimum(n_venta[vende], vendibles[vende]), acciones[filas])
+                    capital[filas] += precio * n_vender
+                    acciones[filas] -= n_vender
+
+                    libro = lotes[filas]
+                    origen = columnas + n_vender[:, None]
+                    nuevo = np.take_along_axis(libro, np.clip(origen, 0, capacidad - 1), axis=1)
+                    nuevo[origen >= capacidad] = np.inf
+                    lotes[filas] = nuevo
+
+            hist_acciones[:, e] = acciones
+            hist_capital[:, e] = capital
+            hist_aporte[:, e] = aporte_acumulado
+
+    # Estado de cada día = estado tras el último día con operaciones (columna 0 = inicial)
+    indice = np.searchsorted(dias_evento, np.arange(n), side="right")
+    acciones_dia = hist_acciones[:, indice]
+    capital_dia = hist_capital[:, indice]
+    aporte_dia = redondear(hist_aporte[:, indice], 2)
+
+    capital_total = redondear(capital_dia + acciones_dia * cierre, 2)
+    margen = capital_total - aporte_dia
+
+    rentabilidad = np.zeros_like(margen)
+    con_aporte = aporte_dia > 0
+    rentabilidad[con_aporte] = margen[con_aporte] / aporte_dia[con_aporte] * 100
+
+    # Media fila a fila: mismo orden de suma que el kernel escalar (resultado idéntico)
+    margen_prom = np.array([fila.mean() for fila in margen])
+
+    return rentabilidad.max(axis=1), margen_prom
+
+
+def simular_referencia(df, umbral_compra, umbral_venta, umbral_suave, ganancia_minima,
+                       compra_multiple=None, venta_multiple=None,
+                       limite_tipo="acciones", limite_valor=10.0):
+    """
+    Implementación original fila a fila (df.apply / df.iterrows).
+
+    Se conserva sin cambios de lógica como referencia para pruebas de regresión
+    del kernel. Espera un DataFrame con 'Último', '% var.' y '% acumulado'
+    numéricos y agrega las columnas de la simulación.
+
+    Returns:
+        (df, rentab_max, margen_prom)
+    """
+    acum_decimal = df['% acumulado'].astype(float)
+
+    valores_seleccionados = []
+    seq = []
+
+    for idx, v in enumerate(acum_decimal):
+        if v > 0:
+            seq.append(v)
+        else:
+            if len(seq) >= 2:
+                valores_seleccionados.append(seq[-1] * 100.0)
+            seq = []
+    if len(seq) >= 2:
+        valores_seleccionados.append(seq[-1] * 100.0)
+
+    promedio_maximos = sum(valores_seleccionados) / len(valores_seleccionados) if valores_seleccionados else 0.0
+
+    valores_minimos = []
+    seq_neg = []
+
+    for idx, v in enumerate(acum_decimal):
+        if v < 0:
+            seq_neg.append(v)
+        else:
+            if len(seq_neg) >= 2:
+                valores_minimos.append(seq_neg[-1] * 100.0)
+            seq_neg = []
+    if len(seq_neg) >= 2:
+        valores_minimos.append(seq_neg[-1] * 100.0)
+
+    promedio_minimos = sum(valores_minimos) / len(valores_minimos) if valores_minimos else 0.0
+
+    def determinar_opcion(v, a):
+        if v >= umbral_venta:
+            return "Venta"
+        if v <= umbral_compra:
+            return "Compra"
+        if a >= umbral_venta and v >= umbral_suave:
+            return "Venta"
+        if a <= umbral_compra and v <= -umbral_suave:
+            return "Compra"
+        return "N/A"
+
+    df['Opción'] = df.apply(lambda r: determinar_opcion(r['% var.'], r['% acumulado']), axis=1)
+
+    try:
+        if limite_tipo == "acciones":
+            MAX_ACCIONES = int(limite_valor)
+            MAX_APORTE = float("inf")
+        else:
+            MAX_ACCIONES = 10
+            MAX_APORTE = float(limite_valor)
+    except:
+        MAX_ACCIONES = 10
+        MAX_APORTE = float("inf")
+
+    acciones = 0
+    capital_bolsa = 0
+    aporte_acumulado = 0
+
+    movs, acts, cap_b, cap_acc, cap_tot, aport, aport_acum, precios_compra = [], [], [], [], [], [], [], []
+
+    precios_en_cartera = []
+
+    acum_pct = df['% acumulado'].astype(float) * 100.0
+    comprar_multiple = [False] * len(df)
+
+    seq_idxs_neg = []
+    all_negative_sequences = []
+    for idx, v in enumerate(acum_pct):
+        if v < 0:
+            seq_idxs_neg.append(idx)
+        else:
+            if len(seq_idxs_neg) >= 2:
+                all_negative_sequences.append(seq_idxs_neg.copy())
+            seq_idxs_neg = []
+    if len(seq_idxs_neg) >= 2:
+        all_negative_sequences.append(seq_idxs_neg.copy())
+
+    if promedio_minimos < 0.0:
+        for s in all_negative_sequences:
+            for i in s:
+                if acum_pct.iloc[i] <= promedio_minimos:
+                    comprar_multiple[i] = True
+
+    vender_doble = [False] * len(df)
+
+    seq_idxs = []
+    all_positive_sequences = []
+    for idx, v in enumerate(acum_pct):
+        if v > 0:
+            seq_idxs.append(idx)
+        else:
+            if len(seq_idxs) >= 2:
+                all_positive_sequences.append(seq_idxs.copy())
+            seq_idxs = []
+    if len(seq_idxs) >= 2:
+        all_positive_sequences.append(seq_idxs.copy())
+
+    if promedio_maximos > 0.0:
+        for s in all_positive_sequences:
+            for i in s:
+                if acum_pct.iloc[i] >= promedio_maximos:
+                    vender_doble[i] = True
+
+    for idx, row in df.iterrows():
+        opcion = row["Opción"]
+        precio = row["Último"]
+        movimiento = 0
+        aporte = 0.0
+        precio_operacion = 0.0
+
+        if opcion == "Compra":
+            n_compra = 1
+            if compra_multiple is not None and comprar_multiple[idx]:
+                n_compra = compra_multiple
+
+            acciones_a_comprar = 0
+            for _ in range(n_compra):
+                puede_comprar = False
+                if limite_tipo == "acciones" and acciones < MAX_ACCIONES:
+                    puede_comprar = True
+                elif limite_tipo == "aporte" and (aporte_acumulado + precio) <= MAX_APORTE:
+                    puede_comprar = True
+
+                if puede_comprar:
+                    acciones_a_comprar += 1
+                    if capital_bolsa >= precio:
+                        capital_bolsa -= precio
+                    else:
+                        aporte += precio
+                        aporte_acumulado += precio
+                        capital_bolsa += precio
+                        capital_bolsa -= precio
+                    acciones += 1
+                    precios_en_cartera.append(precio)
+                    precios_en_cartera.sort()
+                else:
+                    break
+
+            movimiento = acciones_a_comprar
+            if movimiento > 0:
+                precio_operacion = -precio
+
+        elif opcion == "Venta" and acciones > 0:
+            acciones_vendibles = 0
+            for precio_compra in precios_en_cartera:
+                ganancia_porcentual = (precio - precio_compra) / precio_compra
+                if ganancia_porcentual >= ganancia_minima:
+                    acciones_vendibles += 1
+                else:
+                    break
+
+            if acciones_vendibles > 0:
+                n_venta = 1
+                if venta_multiple is not None and vender_doble[idx] and acciones >= venta_multiple:
+                    n_venta = venta_multiple
+
+                n_venta = min(n_venta, acciones_vendibles, acciones)
+
+                capital_bolsa += precio * n_venta
+                acciones -= n_venta
+                movimiento = -n_venta
+
+                for _ in range(n_venta):
+                    if precios_en_cartera:
+                        precios_en_cartera.pop(0)
+
+                if movimiento < 0:
+                    precio_operacion = precio
+
+        movs.append(movimiento)
+        acts.append(acciones)
+        cap_b.append(round(capital_bolsa, 2))
+        cap_acc.append(round(acciones * precio, 2))
+        cap_tot.append(round(capital_bolsa + acciones * precio, 2))
+        aport.append(round(aporte, 2))
+        aport_acum.append(round(aporte_acumulado, 2))
+        precios_compra.append(precio_operacion)
+
+    df["Movimiento de acciones"] = movs
+    df["Acciones en cartera"] = acts
+    df["Precio de compra"] = precios_compra
+    df["Capital en bolsa"] = cap_b
+    df["Capital en acciones"] = cap_acc
+    df["Capital total"] = cap_tot
+    df["Aporte"] = aport
+    df["Aporte acumulado"] = aport_acum
+
+    df["Margen"] = df["Capital total"] - df["Aporte acumulado"]
+    df["Rentabilidad"] = df.apply(
+        lambda r: (r["Margen"] / r["Aporte acumulado"] * 100) if r["Aporte acumulado"] > 0 else 0, axis=1)
+
+    rentab_max = df["Rentabilidad"].max()
+    margen_prom = df["Margen"].mean()
+
+    return df, rentab_max, margen_prom
+
+
+def ejecutar_simulacion(df, umbral_compra, umbral_venta, umbral_suave, ganancia_minima,
+                        compra_multiple=None, venta_multiple=None,
+                        limite_tipo="acciones", limite_valor=10.0, modo=MODO_KERNEL, perfil=None):
+    """
+    Ejecuta la simulación sobre un DataFrame ya parseado y agrega las columnas
+    de resultado (mismas columnas y tipos en ambos modos).
+
+    Args:
+        df: DataFrame con 'Fecha', 'Último', '% var.' y '% acumulado' numéricos
+        modo: MODO_KERNEL (arrays NumPy) o MODO_REFERENCIA (pandas fila a fila)
+        perfil: PerfilRachas de la serie (solo MODO_KERNEL; la referencia recalcula todo)
+
+    Returns:
+        (df, rentab_max, margen_prom)
+    """
+    if modo == MODO_REFERENCIA:
+        return simular_referencia(df, umbral_compra, umbral_venta, umbral_suave, ganancia_minima,
+                                  compra_multiple, venta_multiple, limite_tipo, limite_valor)
+
+    res = simular_estrategia(
+        df['Último'].to_numpy(dtype=float),
+        df['% var.'].to_numpy(dtype=float),
+        df['% acumulado'].to_numpy(dtype=float),
+        umbral_compra, umbral_venta, umbral_suave, ganancia_minima,
+        compra_multiple, venta_multiple, limite_tipo, limite_valor, perfil
+    )
+
+    df['Opción'] = NOMBRES_OPCION[res["opcion"] % 3]
+    df["Movimiento de acciones"] = res["movimiento"]
+    df["Acciones en cartera"] = res["acciones"]
+    df["Precio de compra"] = res["precio_operacion"]
+    df["Capital en bolsa"] = res["capital_bolsa"]
+    df["Capital en acciones"] = res["capital_acciones"]
+    df["Capital total"] = res["capital_total"]
+    df["Aporte"] = res["aporte"]
+    df["Aporte acumulado"] = res["aporte_acumulado"]
+    df["Margen"] = res["margen"]
+    df["Rentabilidad"] = res["rentabilidad"]
+
+    return df, res["rentab_max"], res["margen_prom"]
+
+
+def verificar_equivalencia(df, **parametros):
+    """
+    Prueba de regresión: ejecuta el kernel y la referencia sobre copias del mismo
+    DataFrame y comprueba que columnas y métricas sean idénticas.
+
+    Args:
+        df: DataFrame parseado (ver ejecutar_simulacion)
+        **parametros: Mismos argumentos que ejecutar_simulacion (sin modo)
+
+    Returns:
+        Lista de diferencias encontradas (vacía si son idénticos)
+    """
+    df_k, rent_k, marg_k = ejecutar_simulacion(df.copy(), modo=MODO_KERNEL, **parametros)
+    df_r, rent_r, marg_r = ejecutar_simulacion(df.copy(), modo=MODO_REFERENCIA, **parametros)
+
+    diferencias = []
+    if list(df_k.columns) != list(df_r.columns):
+        diferencias.append(f"Columnas distintas: {list(df_k.columns)} vs {list(df_r.columns)}")
+    else:
+        for col in df_r.columns:
+            if not df_k[col].equals(df_r[col]):
+                diferencias.append(f"Columna '{col}' distinta")
+
+    if not (rent_k == rent_r or (pd.isna(rent_k) and pd.isna(rent_r))):
+        diferencias.append(f"rentab_max: {rent_k} vs {rent_r}")
+    if not (marg_k == marg_r or (pd.isna(marg_k) and pd.isna(marg_r))):
+        diferencias.append(f"margen_prom: {marg_k} vs {marg_r}")
+
+    return diferencias
+
+
+# =========================
+# API del motor (sin Tk)
+# =========================
+OBJETIVOS = ("rentabilidad", "margen_prom")
+
+# Configuración de differential_evolution usada por el optimizador
+CONFIG_DE = {
+    "strategy": 'best1bin',
+    "maxiter": 100,
+    "popsize": 15,
+    "tol": 0.01,
+    "mutation": (0.5, 1),
+    "recombination": 0.7,
+    "seed": 42,             # Semilla fija para resultados reproducibles
+    "disp": False,
+    "polish": False,        # Desactivar polish para permitir detención limpia
+    "init": 'latinhypercube',
+    "atol": 0,
+}
+
+# Valor devuelto por la función objetivo cuando una evaluación falla
+PENALIZACION = 999999
+
+
+@dataclass(frozen=True)
+class ParametrosAnalisis:
+    """
+    Parámetros de una simulación. Los porcentajes se expresan en % (ej: -1.6),
+    igual que en la interfaz y en el JSON de resultados.
+    """
+    compra_pct: float
+    venta_pct: float
+    ganancia_minima_pct: float
+    suave_pct: float
+    compra_multiple: Optional[int] = None
+    venta_multiple: Optional[int] = None
+    limite_tipo: str = "acciones"
+    limite_valor: float = 10.0
+
+    @classmethod
+    def desde_vector(cls, x, base):
+        """
+        Construye los parámetros a partir del vector del optimizador
+        [compra, venta, ganancia, compra_mult, venta_mult].
+
+        Venta y ganancia mínima se redondean a 0.1% (la precisión con la que la
+        interfaz los mostraba y releía); los múltiplos se redondean a entero y
+        valores <= 1.5 los desactivan. Suave y límite se toman de `base`.
+        """
+        return replace(
+            base,
+            compra_pct=float(x[0]),
+            venta_pct=round(float(x[1]), 1),
+            ganancia_minima_pct=round(float(x[2]), 1),
+            compra_multiple=int(round(x[3])) if x[3] > 1.5 else None,
+            venta_multiple=int(round(x[4])) if x[4] > 1.5 else None,
+        )
+
+    def argumentos_simulacion(self):
+        """Argumentos (en decimal) para simular_estrategia / ejecutar_simulacion."""
+        return dict(
+            umbral_compra=self.compra_pct / 100,
+            umbral_venta=self.venta_pct / 100,
+            umbral_suave=self.suave_pct / 100,
+            ganancia_minima=self.ganancia_minima_pct / 100,
+            compra_multiple=self.compra_multiple,
+            venta_multiple=self.venta_multiple,
+            limite_tipo=self.limite_tipo,
+            limite_valor=self.limite_valor,
+        )
+
+
+class CacheEvaluaciones:
+    """
+    Caché LRU de métricas (rentab_max, margen_prom) por evaluación.
+
+    La clave (ver clave_evaluacion) combina la huella de los datos con los
+    parámetros efectivos, de modo que candidatos distintos del optimizador que
+    producen la misma simulación se calculan una sola vez.
+    """
+
+    def __init__(self, max_entradas=50000):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+    def obtener(self, clave):
+        valor = self._datos.get(clave)
+        if valor is None:
+            self.fallos += 1
+            return None
+        self._datos.move_to_end(clave)
+        self.aciertos += 1
+        return valor
+
+    def guardar(self, clave, valor):
+        self._datos[clave] = valor
+        self._datos.move_to_end(clave)
+        if len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+
+    def reiniciar_contadores(self):
+        self.aciertos = 0
+        self.fallos = 0
+
+    def limpiar(self):
+        self._datos.clear()
+        self.reiniciar_contadores()
+
+    def resumen(self):
+        total = self.aciertos + self.fallos
+        porcentaje = (self.aciertos / total * 100) if total else 0.0
+        return f"{self.aciertos} aciertos, {self.fallos} fallos ({porcentaje:.1f}% aciertos, {len(self)} en caché)"
+
+
+# Caché compartida por las evaluaciones de este proceso
+CACHE_EVALUACIONES = CacheEvaluaciones()
+
+
+def clave_evaluacion(serie, params):
+    """
+    Clave de caché de una evaluación.
+
+    Los umbrales de compra y venta solo se comparan contra los valores de
+    % var. y % acumulado de la serie, así que se reemplazan por su posición en
+    serie.valores_umbral: dos umbrales entre los mismos valores de datos dan la
+    misma simulación. Ganancia mínima llega redondeada a 0.1% y los múltiplos
+    como enteros (ParametrosAnalisis.desde_vector).
+    """
+    valores = serie.valores_umbral
+    return (
+        serie.huella,
+        int(np.searchsorted(valores, params.compra_pct / 100, side='right')),
+        int(np.searchsorted(valores, params.venta_pct / 100, side='left')),
+        float(params.ganancia_minima_pct),
+        float(params.suave_pct),
+        params.compra_multiple,
+        params.venta_multiple,
+        params.limite_tipo,
+        params.limite_valor,
+    )
+
+
+def formatear_resultado(df):
+    """
+    Copia del DataFrame de resultados con Rentabilidad, % var. y % acumulado
+    como texto con '%' (ej: "1.23%"). Solo para mostrar o exportar: el motor y
+    las estadísticas trabajan siempre con los valores numéricos.
+    """
+    df = df.copy()
+    df["Rentabilidad"] = df["Rentabilidad"].round(2).astype(str) + "%"
+    df["% var."] = (df["% var."] * 100).round(2).astype(str) + "%"
+    df["% acumulado"] = (df["% acumulado"] * 100).round(2).astype(str) + "%"
+    return df
+
+
+def evaluar(serie, params, con_df=False, modo=MODO_KERNEL, cache=CACHE_EVALUACIONES):
+    """
+    Simula la estrategia sobre una serie con los parámetros dados.
+
+    Args:
+        serie: SerieMercado (ya filtrada al período)
+        params: ParametrosAnalisis
+        con_df: Si True, incluye el DataFrame de resultados (numérico; ver formatear_resultado)
+        modo: MODO_KERNEL o MODO_REFERENCIA (solo aplica con con_df=True)
+        cache: CacheEvaluaciones para las métricas sin DataFrame (None = sin caché)
+
+    Returns:
+        dict con rentab_max, margen_prom, fecha_inicial, fecha_final (dd/mm/aaaa)
+        y df (None si con_df=False), o None si la serie está vacía
+    """
+    if len(serie) == 0:
+        return None
+
+    argumentos = params.argumentos_simulacion()
+
+    if con_df:
+        df, rentab_max, margen_prom = ejecutar_simulacion(serie.a_dataframe(), modo=modo,
+                                                          perfil=serie.perfil_rachas, **argumentos)
+    else:
+        clave = clave_evaluacion(serie, params)
+        metricas = cache.obtener(clave) if cache is not None else None
+        if metricas is None:
+            res = simular_estrategia(serie.cierre, serie.var, serie.acum, perfil=serie.perfil_rachas,
+                                     **argumentos)
+            metricas = (res["rentab_max"], res["margen_prom"])
+            if cache is not None:
+                cache.guardar(clave, metricas)
+        df = None
+        rentab_max, margen_prom = metricas
+
+    return {
+        "rentab_max": rentab_max,
+        "margen_prom": margen_prom,
+        "fecha_inicial": serie.fecha_inicial.strftime("%d/%m/%Y"),
+        "fecha_final": serie.fecha_final.strftime("%d/%m/%Y"),
+        "df": df,
+    }
+
+
+def valor_objetivo(resultado, objetivo):
+    """Métrica a maximizar según el objetivo ("rentabilidad" o "margen_prom")."""
+    return resultado["margen_prom"] if objetivo == "margen_prom" else resultado["rentab_max"]
+
+
+def funcion_objetivo(x, serie, base, objetivo):
+    """
+    Función objetivo para differential_evolution (a minimizar).
+
+    Es una función de módulo (puede enviarse a procesos worker); cada proceso
+    usa su propia CACHE_EVALUACIONES.
+    """
+    try:
+        resultado = evaluar(serie, ParametrosAnalisis.desde_vector(x, base))
+        if resultado is None:
+            return PENALIZACION
+        return -valor_objetivo(resultado, objetivo)
+    except:
+        return PENALIZACION
+
+
+def funcion_objetivo_lote(x, serie, base, objetivo, cache=CACHE_EVALUACIONES):
+    """
+    Función objetivo vectorizada para differential_evolution(vectorized=True).
+
+    Args:
+        x: Matriz (5, S) con un candidato por columna (formato de scipy)
+
+    Returns:
+        Array (S,) con el valor a minimizar de cada candidato, igual al que
+        devolvería funcion_objetivo candidato por candidato
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    if x.shape[0] != 5:
+        x = x.T
+    n_candidatos = x.shape[1]
+
+    try:
+        if len(serie) == 0:
+            return np.full(n_candidatos, float(PENALIZACION))
+
+        # Mismo redondeo que ParametrosAnalisis.desde_vector
+        compra_pct = x[0]
+        venta_pct = redondear(x[1], 1)
+        ganancia_pct = redondear(x[2], 1)
+        compra_multiple = np.where(x[3] > 1.5, np.rint(x[3]), 0).astype(np.int64)
+        venta_multiple = np.where(x[4] > 1.5, np.rint(x[4]), 0).astype(np.int64)
+
+        # Claves de caché (mismas que clave_evaluacion) y candidatos pendientes
+        valores = serie.valores_umbral
+        idx_compra = np.searchsorted(valores, compra_pct / 100, side='right').tolist()
+        idx_venta = np.searchsorted(valores, venta_pct / 100, side='left').tolist()
+        huella = serie.huella
+        claves = [
+            (huella, idx_compra[j], idx_venta[j], float(ganancia_pct[j]), float(base.suave_pct),
+             int(compra_multiple[j]) or None, int(venta_multiple[j]) or None,
+             base.limite_tipo, base.limite_valor)
+            for j in range(n_candidatos)
+        ]
+        metricas = [cache.obtener(c) if cache is not None else None for c in claves]
+
+        pendientes = {}
+        for j, m in enumerate(metricas):
+            if m is None:
+                pendientes.setdefault(claves[j], j)
+
+        if pendientes:
+            sel = np.array(list(pendientes.values()))
+            rentab_max, margen_prom = simular_lote(
+                serie.cierre, serie.var, serie.acum,
+                umbral_compra=compra_pct[sel] / 100,
+                umbral_venta=venta_pct[sel] / 100,
+                umbral_suave=base.suave_pct / 100,
+                ganancia_minima=ganancia_pct[sel] / 100,
+                compra_multiple=compra_multiple[sel],
+                venta_multiple=venta_multiple[sel],
+                limite_tipo=base.limite_tipo,
+                limite_valor=base.limite_valor,
+                perfil=serie.perfil_rachas
+            )
+            calculadas = {}
+            for k, j in enumerate(sel.tolist()):
+                calculadas[claves[j]] = (rentab_max[k], margen_prom[k])
+                if cache is not None:
+                    cache.guardar(claves[j], calculadas[claves[j]])
+            metricas = [m if m is not None else calculadas[c] for m, c in zip(metricas, claves)]
+
+        indice = 1 if objetivo == "margen_prom" else 0
+        return -np.array([m[indice] for m in metricas], dtype=float)
+    except:
+        return np.full(n_candidatos, float(PENALIZACION))
+
+
+def refinar_optimo(params_optimos, bounds, serie, base, objetivo, n_muestras=30,
+                   umbral_similitud=0.95, detenido=None):
+    """
+    Muestrea alrededor del óptimo encontrado para hallar el centro del rango
+    que produce resultados similares.
+
+    Args:
+        params_optimos: Lista con los parámetros óptimos encontrados [compra, venta, ganancia, compra_mult, venta_mult]
+        bounds: Límites de cada parámetro [(min, max), ...]
+        serie: SerieMercado del período
+        base: ParametrosAnalisis con suave y límite
+        objetivo: "rentabilidad" o "margen_prom"
+        n_muestras: Número de puntos a muestrear alrededor del óptimo
+        umbral_similitud: Porcentaje mínimo del resultado óptimo para considerar similar (0.95 = 95%)
+        detenido: Función sin argumentos que devuelve True si se pidió detener
+
+    Returns:
+        Lista con los parámetros promediados
+    """
+    if detenido is None:
+        detenido = lambda: False
+
+    # Si el análisis fue detenido, retornar los parámetros originales
+    if detenido():
+        return params_optimos
+
+    # Evaluar el resultado óptimo original
+    try:
+        resultado_orig = evaluar(serie, ParametrosAnalisis.desde_vector(params_optimos, base))
+    except:
+        resultado_orig = None
+
+    if resultado_orig is None:
+        return params_optimos  # Si falla, retornar los originales
+
+    metrica_optima = valor_objetivo(resultado_orig, objetivo)
+    umbral_metrica = metrica_optima * umbral_similitud
+
+    # Generar muestras alrededor del óptimo (±10% de cada parámetro)
+    np.random.seed(42)  # Semilla fija para reproducibilidad
+
+    params_similares = [list(params_optimos)]  # Incluir el óptimo original
+
+    for _ in range(n_muestras):
+        # Verificar si el análisis fue detenido
+        if detenido():
+            break
+
+        params_muestra = []
+        for i, (p, (b_min, b_max)) in enumerate(zip(params_optimos, bounds)):
+            # Calcular rango de variación (±10% del valor o ±10% del rango total)
+            rango = max(abs(p) * 0.1, (b_max - b_min) * 0.05)
+
+            # Para parámetros enteros (compra_mult, venta_mult)
+            if i >= 3:
+                nuevo_val = p + np.random.uniform(-1, 1)
+                nuevo_val = max(b_min, min(b_max, nuevo_val))
+            else:
+                nuevo_val = p + np.random.uniform(-rango, rango)
+                nuevo_val = max(b_min, min(b_max, nuevo_val))
+
+            params_muestra.append(nuevo_val)
+
+        # Evaluar esta muestra
+        try:
+            resultado_test = evaluar(serie, ParametrosAnalisis.desde_vector(params_muestra, base))
+
+            if resultado_test is not None:
+                # Si el resultado es similar al óptimo, guardar estos parámetros
+                if valor_objetivo(resultado_test, objetivo) >= umbral_metrica:
+                    params_similares.append(params_muestra)
+        except:
+            continue
+
+    # Calcular promedio de todos los parámetros similares
+    if len(params_similares) > 1:
+        params_promedio = []
+        for i in range(5):
+            valores = [p[i] for p in params_similares]
+            promedio = sum(valores) / len(valores)
+
+            # Redondear parámetros enteros
+            if i >= 3:
+                promedio = round(promedio)
+
+            params_promedio.append(promedio)
+
+        print(f"  → Refinamiento: {len(params_similares)} configuraciones similares encontradas")
+        print(f"  → Parámetros promediados: Compra={params_promedio[0]:.2f}%, Venta={params_promedio[1]:.2f}%")
+
+        return params_promedio
+    else:
+        print(f"  → Refinamiento: Solo el óptimo original cumple el umbral")
+        return params_optimos
+
+
+def calcular_estadisticas(df, perfil=None):
+    """
+    Estadísticas del DataFrame de resultados (% var., operaciones y financieras).
+
+    Args:
+        df: DataFrame devuelto por evaluar(..., con_df=True)
+        perfil: PerfilRachas de la serie simulada (None = se calcula desde df)
+
+    Returns:
+        dict con las claves de estadísticas que guarda el análisis.
+        promedio_maximos / promedio_minimos se guardan en % × 100 (formato
+        histórico del JSON; las vistas los dividen por 100).
+    """
+    if perfil is None:
+        perfil = PerfilRachas(df['% acumulado'].to_numpy(dtype=float))
+
+    promedio_maximos = perfil.promedio_maximos * 100.0
+    promedio_minimos = perfil.promedio_minimos * 100.0
+
+    # % var. y Rentabilidad en % a 2 decimales (los valores que se muestran)
+    var_pct = (df['% var.'] * 100).round(2)
+    rentabilidad = df["Rentabilidad"].round(2)
+
+    # Estadísticas de % variación
+    max_var = var_pct.max()
+    min_var = var_pct.min()
+    fecha_max_var = df.loc[var_pct.idxmax(), 'Fecha']
+    fecha_min_var = df.loc[var_pct.idxmin(), 'Fecha']
+    dif_var = max_var - min_var
+
+    subidas = var_pct[var_pct > 0]
+    max_prom = subidas.mean() if not subidas.empty else 0
+    bajadas = var_pct[var_pct < 0]
+    min_prom = bajadas.mean() if not bajadas.empty else 0
+    dif_prom = max_prom - min_prom
+
+    # Estadísticas de operaciones
+    opc_compra = int((df["Opción"] == "Compra").sum())
+    acciones_compradas = int(df.loc[df["Movimiento de acciones"] > 0, "Movimiento de acciones"].sum())
+    opc_venta = int((df["Opción"] == "Venta").sum())
+    acciones_vendidas = int(-df.loc[df["Movimiento de acciones"] < 0, "Movimiento de acciones"].sum())
+    max_acc_cartera = int(df["Acciones en cartera"].max())
+
+    # Estadísticas financieras
+    max_aporte = float(df["Aporte acumulado"].max())
+    max_margen = float(round(df["Margen"].max(), 2))
+    margen_promedio = float(round(df["Margen"].mean(), 2))
+    max_rentab = float(rentabilidad.max())
+    rentab_promedio = float(rentabilidad.mean())
+    fecha_max_rentab = df.loc[rentabilidad.idxmax(), "Fecha"]
+
+    return {
+        "rentabilidad_max": max_rentab,
+        "margen_promedio": margen_promedio,
+        "promedio_maximos": promedio_maximos,
+        "promedio_minimos": promedio_minimos,
+        "max_var": max_var,
+        "min_var": min_var,
+        "fecha_max_var": fecha_max_var,
+        "fecha_min_var": fecha_min_var,
+        "dif_var": dif_var,
+        "max_prom_var": max_prom,
+        "min_prom_var": min_prom,
+        "dif_prom_var": dif_prom,
+        "opc_compra": opc_compra,
+        "acciones_compradas": acciones_compradas,
+        "opc_venta": opc_venta,
+        "acciones_vendidas": acciones_vendidas,
+        "max_acc_cartera": max_acc_cartera,
+        "max_aporte": max_aporte,
+        "max_margen": max_margen,
+        "rentab_promedio": rentab_promedio,
+        "fecha_max_rentab": fecha_max_rentab
+    }
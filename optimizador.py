@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Optimización con differential_evolution por generaciones completas.
+
+- Modo paralelo: cada generación se reparte en un pool de procesos. La serie de
+  precios y los parámetros base se envían a cada worker una sola vez, al crear
+  el pool; por cada candidato solo viaja el vector de parámetros.
+- Modo lote: toda la generación se simula en una única pasada vectorizada
+  (motor_analisis.funcion_objetivo_lote).
+
+Ambos usan updating='deferred'.
+
+Además, ejecutar_combinaciones reparte combinaciones completas (período ×
+objetivo) entre procesos y entrega cada resultado en cuanto termina.
+"""
+
+import multiprocessing
+import os
+import time
+from datetime import datetime
+
+from scipy.optimize import differential_evolution
+
+from serie_mercado import cargar_serie_csv
+from motor_analisis import (ParametrosAnalisis, evaluar, funcion_objetivo, funcion_objetivo_lote,
+                            refinar_optimo, calcular_estadisticas, CONFIG_DE)
+
+# Períodos estándar del análisis: (nombre, definición). La definición es None
+# (serie completa), días hacia atrás o un rango (desde, hasta); ver SerieMercado.periodo
+PERIODOS = [("completo", None), ("6_meses", 180), ("3_meses", 90)]
+
+# Rangos de búsqueda de [compra, venta, ganancia, compra_mult, venta_mult] cuando se optimizan
+RANGOS_BUSQUEDA = [(-3.0, 0.0), (0.0, 3.0), (1.5, 5.0), (0, 5), (0, 5)]
+
+
+def _fecha_periodo(texto):
+    """'dd/mm/aaaa' → datetime ('' = sin límite)"""
+    texto = texto.strip()
+    return datetime.strptime(texto, "%d/%m/%Y") if texto else None
+
+
+def periodo_desde_texto(texto):
+    """
+    Convierte la definición de un período escrita por el usuario en
+    (nombre, definición) con el mismo formato que PERIODOS:
+      - "30"                      → ("30_dias", 30)
+      - "01/01/2020-31/12/2022"   → ("desde_01-01-2020_hasta_31-12-2022", (desde, hasta))
+      - "01/01/2020-" o "-31/12/2022" para rangos abiertos
+
+    Raises:
+        ValueError: Si el texto no es un número de días ni un rango de fechas válido
+    """
+    texto = texto.strip()
+    if "-" not in texto:
+        dias = int(texto)
+        if dias <= 0:
+            raise ValueError(f"Los días deben ser positivos: {texto}")
+        return f"{dias}_dias", dias
+
+    desde_texto, hasta_texto = texto.split("-", 1)
+    desde, hasta = _fecha_periodo(desde_texto), _fecha_periodo(hasta_texto)
+    if desde is None and hasta is None:
+        raise ValueError(f"Rango sin fechas: {texto}")
+    if desde is not None and hasta is not None and desde > hasta:
+        raise ValueError(f"Rango invertido: {texto}")
+
+    partes = []
+    if desde is not None:
+        partes.append(f"desde_{desde:%d-%m-%Y}")
+    if hasta is not None:
+        partes.append(f"hasta_{hasta:%d-%m-%Y}")
+    return "_".join(partes), (desde, hasta)
+
+
+def periodos_desde_texto(texto):
+    """Lista separada por comas ("30, 365, 01/01/2020-31/12/2022") → [(nombre, definición), ...]"""
+    return [periodo_desde_texto(parte) for parte in texto.split(",") if parte.strip()]
+
+
+# Estado de cada proceso worker (se asigna en _inicializar_worker)
+_serie_worker = None
+_base_worker = None
+_objetivo_worker = None
+
+
+def procesos_disponibles():
+    """Número de núcleos de la máquina (mínimo 1)."""
+    return os.cpu_count() or 1
+
+
+def _inicializar_worker(serie, base, objetivo):
+    """Recibe la serie una única vez por proceso."""
+    global _serie_worker, _base_worker, _objetivo_worker
+    _serie_worker = serie
+    _base_worker = base
+    _objetivo_worker = objetivo
+
+
+def _objetivo_en_worker(x):
+    """Función objetivo evaluada dentro del worker con la serie ya cargada."""
+    return funcion_objetivo(x, _serie_worker, _base_worker, _objetivo_worker)
+
+
+class PoolOptimizacion:
+    """
+    Pool de procesos usable como `workers` de differential_evolution.
+
+    Mientras espera una generación llama periódicamente a `al_esperar` (por
+    ejemplo ventana.update) para que la interfaz siga respondiendo.
+    """
+
+    def __init__(self, serie, base, objetivo, procesos, al_esperar=None, intervalo=0.05):
+        self.procesos = max(1, int(procesos))
+        self.al_esperar = al_esperar
+        self.intervalo = intervalo
+        self.pool = multiprocessing.Pool(
+            self.procesos,
+            initializer=_inicializar_worker,
+            initargs=(serie, base, objetivo)
+        )
+
+    def __call__(self, func, iterable):
+        candidatos = list(iterable)
+        chunksize = max(1, len(candidatos) // (self.procesos * 4))
+        tarea = self.pool.map_async(func, candidatos, chunksize=chunksize)
+        while not tarea.ready():
+            tarea.wait(self.intervalo)
+            if self.al_esperar is not None:
+                self.al_esperar()
+        return tarea.get()
+
+    def cerrar(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.cerrar()
+        else:
+            self.pool.terminate()
+            self.pool.join()
+        return False
+
+
+def optimizar_paralelo(serie, bounds, base, objetivo, procesos, callback=None, al_esperar=None):
+    """
+    Ejecuta differential_evolution con la configuración estándar (CONFIG_DE)
+    evaluando cada generación en `procesos` procesos.
+
+    Args:
+        serie: SerieMercado del período
+        bounds: Límites [(min, max), ...] de [compra, venta, ganancia, compra_mult, venta_mult]
+        base: ParametrosAnalisis con suave y límite
+        objetivo: "rentabilidad" o "margen_prom"
+        procesos: Número de procesos worker
+        callback: callback(xk, convergence) por generación; True detiene la optimización
+        al_esperar: Función llamada mientras se espera cada generación
+
+    Returns:
+        OptimizeResult de scipy
+    """
+    with PoolOptimizacion(serie, base, objetivo, procesos, al_esperar) as pool:
+        return differential_evolution(
+            _objetivo_en_worker,
+            bounds,
+            callback=callback,
+            updating='deferred',
+            workers=pool,
+            **CONFIG_DE
+        )
+
+
+def optimizar_lote(serie, bounds, base, objetivo, callback=None):
+    """
+    Ejecuta differential_evolution evaluando cada generación completa con
+    funcion_objetivo_lote (vectorized=True).
+
+    Args:
+        Iguales a optimizar_paralelo, sin procesos ni al_esperar
+
+    Returns:
+        OptimizeResult de scipy
+    """
+    return differential_evolution(
+        funcion_objetivo_lote,
+        bounds,
+        args=(serie, base, objetivo),
+        callback=callback,
+        updating='deferred',
+        vectorized=True,
+        **CONFIG_DE
+    )
+
+
+# =========================
+# Planificador de combinaciones (período × objetivo)
+# =========================
+# Estado de cada proceso del planificador (se asigna en _inicializar_planificador)
+_serie_planificador = None
+_bounds_planificador = None
+_base_planificador = None
+
+
+def optimizar_combinacion(serie, nombre_periodo, dias, objetivo, bounds, base):
+    """
+    Ejecuta de principio a fin una combinación período/objetivo sin interfaz:
+    recorta la serie, optimiza por lotes, refina el óptimo y re-ejecuta la
+    simulación final con DataFrame y estadísticas.
+
+    Args:
+        serie: SerieMercado completa
+        nombre_periodo: "completo", "6_meses", "3_meses", "30_dias", ...
+        dias: Definición del período: días hacia atrás desde la última fecha,
+              rango (desde, hasta) o None para la serie completa
+        objetivo: "rentabilidad" o "margen_prom"
+        bounds: Límites del optimizador, o None para simular solo con `base`
+        base: ParametrosAnalisis con suave, límite y valores fijos
+
+    Returns:
+        dict con el mismo formato que optimizar_periodo (incluye "objetivo"),
+        o None si el período no tiene datos
+    """
+    serie = serie.periodo(dias)
+    if len(serie) == 0:
+        return None
+
+    if bounds is None:
+        params_finales = base
+        valores = [base.compra_pct, base.venta_pct, base.ganancia_minima_pct,
+                   base.compra_multiple, base.venta_multiple]
+    else:
+        resultado = optimizar_lote(serie, bounds, base, objetivo)
+        params_refinados = refinar_optimo(
+            params_optimos=list(resultado.x),
+            bounds=bounds,
+            serie=serie,
+            base=base,
+            objetivo=objetivo,
+            n_muestras=30,
+            umbral_similitud=0.95
+        )
+        params_finales = ParametrosAnalisis.desde_vector(params_refinados, base)
+        valores = [params_refinados[0], params_refinados[1], params_refinados[2],
+                   params_finales.compra_multiple, params_finales.venta_multiple]
+
+    final = evaluar(serie, params_finales, con_df=True)
+
+    resultado = {
+        "df": final["df"],
+        "compra_pct": valores[0],
+        "venta_pct": valores[1],
+        "ganancia_min": valores[2],
+        "suave_pct": base.suave_pct,
+        "limite_tipo": base.limite_tipo,
+        "limite_valor": base.limite_valor,
+        "compra_mult": valores[3],
+        "venta_mult": valores[4],
+        "fecha_inicial": final["fecha_inicial"],
+        "fecha_final": final["fecha_final"],
+    }
+    resultado.update(calcular_estadisticas(final["df"], serie.perfil_rachas))
+    resultado["objetivo"] = objetivo
+    return resultado
+
+
+def _inicializar_planificador(serie, bounds, base):
+    """Recibe la serie completa una única vez por proceso."""
+    global _serie_planificador, _bounds_planificador, _base_planificador
+    _serie_planificador = serie
+    _bounds_planificador = bounds
+    _base_planificador = base
+
+
+def _combinacion_en_worker(nombre_periodo, dias, objetivo):
+    """Optimiza una combinación dentro del worker y mide su duración."""
+    inicio = time.time()
+    resultado = optimizar_combinacion(_serie_planificador, nombre_periodo, dias, objetivo,
+                                      _bounds_planificador, _base_planificador)
+    return nombre_periodo, objetivo, resultado, time.time() - inicio
+
+
+def _resultados_al_terminar(pool, funcion, tareas, al_esperar=None, detenido=None, intervalo=0.05):
+    """
+    Envía cada tarea (tupla de argumentos de `funcion`) al pool y devuelve
+    (tarea, valor) en orden de finalización; valor es None si la tarea falló.
+
+    Al terminar cierra el pool; si se detiene (o el consumidor abandona el
+    generador) lo termina sin esperar las tareas pendientes.
+    """
+    terminado = False
+    try:
+        pendientes = [(pool.apply_async(funcion, tarea), tarea) for tarea in tareas]
+        while pendientes:
+            listas = [(asincrono, tarea) for asincrono, tarea in pendientes if asincrono.ready()]
+            for asincrono, tarea in listas:
+                pendientes.remove((asincrono, tarea))
+                try:
+                    valor = asincrono.get()
+                except Exception as e:
+                    print(f"[ERROR] Falló la tarea {tarea}: {e}")
+                    valor = None
+                yield tarea, valor
+
+            if detenido is not None and detenido():
+                print(f"[DEBUG] Planificador detenido: {len(pendientes)} combinación(es) canceladas")
+                break
+
+            if pendientes and not listas:
+                pendientes[0][0].wait(intervalo)
+                if al_esperar is not None:
+                    al_esperar()
+        else:
+            terminado = True
+    finally:
+        if terminado:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+
+
+def ejecutar_combinaciones(serie, combinaciones, bounds, base, procesos,
+                           al_esperar=None, detenido=None, intervalo=0.05):
+    """
+    Reparte las combinaciones (período × objetivo) en un pool de procesos y
+    devuelve cada resultado en cuanto termina (generador).
+
+    Args:
+        serie: SerieMercado completa (se envía una vez a cada proceso)
+        combinaciones: Lista de (nombre_periodo, dias, objetivo)
+        bounds: Límites del optimizador, o None para simular solo con `base`
+        base: ParametrosAnalisis con suave, límite y valores fijos
+        procesos: Número máximo de procesos
+        al_esperar: Función llamada mientras no hay resultados nuevos (ej: ventana.update)
+        detenido: Función sin argumentos; si devuelve True se cancelan las pendientes
+        intervalo: Segundos entre consultas
+
+    Yields:
+        (nombre_periodo, objetivo, resultado, segundos), en orden de finalización.
+        resultado es None si el período no tiene datos o la combinación falló.
+    """
+    procesos = max(1, min(int(procesos), len(combinaciones)))
+    pool = multiprocessing.Pool(
+        procesos,
+        initializer=_inicializar_planificador,
+        initargs=(serie, bounds, base)
+    )
+    for (nombre_periodo, _, objetivo), valor in _resultados_al_terminar(
+            pool, _combinacion_en_worker, combinaciones, al_esperar, detenido, intervalo):
+        if valor is None:
+            yield nombre_periodo, objetivo, None, 0.0
+        else:
+            yield valor
+
+
+# =========================
+# Lote de archivos (ticker × período × objetivo)
+# =========================
+# Series ya leídas por cada worker {ruta: SerieMercado}
+_series_worker = {}
+
+
+def _serie_de_archivo(ruta):
+    """Lee el CSV una sola vez por proceso worker."""
+    serie = _series_worker.get(ruta)
+    if serie is None:
+        serie = cargar_serie_csv(ruta)
+        _series_worker[ruta] = serie
+    return serie
+
+
+def _combinacion_archivo_en_worker(ruta, nombre_periodo, dias, objetivo, bounds, base):
+    """Optimiza una combinación de un archivo dentro del worker y mide su duración."""
+    inicio = time.time()
+    resultado = optimizar_combinacion(_serie_de_archivo(ruta), nombre_periodo, dias, objetivo, bounds, base)
+    return resultado, time.time() - inicio
+
+
+def ejecutar_combinaciones_archivos(tareas, bounds, base, procesos, al_esperar=None, detenido=None,
+                                    intervalo=0.05):
+    """
+    Como ejecutar_combinaciones, pero cada tarea indica su archivo CSV.
+
+    Solo viaja la ruta: cada worker lee y parsea cada archivo la primera vez
+    que lo necesita y lo reutiliza para el resto de sus combinaciones.
+
+    Args:
+        tareas: Lista de (ruta_csv, nombre_periodo, dias, objetivo)
+        Resto: iguales a ejecutar_combinaciones
+
+    Yields:
+        (ruta_csv, nombre_periodo, objetivo, resultado, segundos), en orden de finalización.
+        resultado es None si el período no tiene datos o la combinación falló.
+    """
+    procesos = max(1, min(int(procesos), len(tareas)))
+    pool = multiprocessing.Pool(procesos)
+    argumentos = [tarea + (bounds, base) for tarea in tareas]
+    for (ruta, nombre_periodo, _, objetivo, _, _), valor in _resultados_al_terminar(
+            pool, _combinacion_archivo_en_worker, argumentos, al_esperar, detenido, intervalo):
+        resultado, segundos = valor if valor is not None else (None, 0.0)
+        yield ruta, nombre_periodo, objetivo, resultado, segundos
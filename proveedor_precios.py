@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Capa de red para descargar precios diarios.
+
+Un proveedor es cualquier función
+
+    proveedor(tickers, periodo=None, inicio=None, fin=None) -> DataFrame
+
+que devuelve las filas en formato largo (Date, Ticker, Open, High, Low,
+Close), con `fin` exclusivo como en yf.download. descargar_yahoo es el
+proveedor real; los scripts lo reciben como parámetro para poder probarlos
+sin red.
+
+descargar_por_lotes reparte universos grandes de tickers en lotes que se
+bajan en paralelo (con un máximo de hilos), reintenta con espera
+exponencial y aísla los tickers que fallan.
+
+Para probar sin red:
+
+- grabar_respuestas(proveedor, carpeta): envuelve un proveedor y guarda
+  cada respuesta en la carpeta (un CSV por pedido).
+- proveedor_grabado(carpeta): responde los mismos pedidos desde esos CSV,
+  sin conexión. Un pedido que no está grabado lanza LookupError.
+"""
+
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+COLUMNAS_PRECIOS = ['Date', 'Ticker', 'Open', 'High', 'Low', 'Close']
+
+
+# Lotes y reintentos de descargar_por_lotes
+TAM_LOTE = 50
+HILOS = 4
+REINTENTOS = 3
+ESPERA_BASE = 1.0     # segundos antes del primer reintento (se duplica en cada uno)
+TIMEOUT = 10          # segundos por pedido HTTP a Yahoo
+
+
+def descargar_yahoo(tickers, periodo=None, inicio=None, fin=None):
+    """
+    Proveedor de Yahoo Finance. Pide cada ticker con Ticker.history (lo mismo
+    que hace yf.download por dentro, pero sin su estado global compartido,
+    que no admite varias descargas a la vez en hilos). Los tickers que fallan
+    se informan y se omiten; si fallan todos, lanza la última excepción.
+    """
+    import yfinance as yf
+
+    if periodo is None and inicio is None:
+        periodo = "1d"
+    partes = []
+    ultimo_error = None
+    for ticker in tickers:
+        try:
+            historia = yf.Ticker(ticker).history(period=periodo, start=inicio, end=fin, auto_adjust=False,
+                                                 actions=False, timeout=TIMEOUT)
+        except Exception as e:
+            print(f"[WARN] Error descargando {ticker}: {e}")
+            ultimo_error = e
+            continue
+        if historia is None or historia.empty:
+            continue
+        df = historia.reset_index()
+        df['Date'] = pd.to_datetime(df['Date'])
+        if df['Date'].dt.tz is not None:
+            df['Date'] = df['Date'].dt.tz_localize(None)
+        df['Ticker'] = ticker
+        partes.append(df[COLUMNAS_PRECIOS])
+
+    if not partes:
+        if ultimo_error is not None:
+            raise ultimo_error
+        return pd.DataFrame(columns=COLUMNAS_PRECIOS)
+
+    df_long = pd.concat(partes, ignore_index=True)
+    df_long['Date'] = df_long['Date'].dt.normalize()
+    # Los días sin operaciones de un ticker vienen con NaN en todas las columnas
+    return df_long.dropna(subset=['Open', 'High', 'Low', 'Close'], how='all').reset_index(drop=True)
+
+
+# =========================
+# Descarga por lotes
+# =========================
+def _descargar_lote(proveedor, lote, pedido, reintentos, espera_base, cancelar):
+    """
+    Descarga un lote reintentando solo los tickers que faltan, con espera
+    exponencial entre intentos. Si el último intento llega con pedidos que
+    fallaron por excepción, se piden de a uno para que un ticker problemático
+    no arrastre al resto.
+
+    Returns:
+        (lista de DataFrames, {ticker: motivo} de los que no se pudieron bajar)
+    """
+    pendientes = list(lote)
+    partes = []
+    motivos = {}
+    hubo_excepcion = False
+    for intento in range(reintentos + 1):
+        if intento:
+            time.sleep(espera_base * 2 ** (intento - 1) * random.uniform(1.0, 1.5))
+        if cancelar is not None and cancelar.is_set():
+            break
+
+        if intento == reintentos and hubo_excepcion and len(pendientes) > 1:
+            pedidos = [[ticker] for ticker in pendientes]
+        else:
+            pedidos = [pendientes]
+
+        for tickers_pedido in pedidos:
+            try:
+                df = proveedor(tickers_pedido, **pedido)
+            except Exception as e:
+                hubo_excepcion = True
+                for ticker in tickers_pedido:
+                    motivos[ticker] = str(e) or type(e).__name__
+                continue
+            if df is not None and not df.empty:
+                df = df[df['Ticker'].isin(tickers_pedido)]
+                partes.append(df)
+                recibidos = set(df['Ticker'])
+                pendientes = [t for t in pendientes if t not in recibidos]
+            for ticker in tickers_pedido:
+                if ticker in pendientes:
+                    motivos[ticker] = "sin datos"
+
+        if not pendientes:
+            break
+
+    return partes, {ticker: motivos.get(ticker, "cancelado") for ticker in pendientes}
+
+
+def descargar_por_lotes(tickers, proveedor=descargar_yahoo, periodo=None, inicio=None, fin=None,
+                        tam_lote=TAM_LOTE, hilos=HILOS, reintentos=REINTENTOS, espera_base=ESPERA_BASE,
+                        al_progresar=None, cancelar=None):
+    """
+    Descarga muchos tickers repartidos en lotes de `tam_lote`, con hasta
+    `hilos` lotes a la vez. Cada lote reintenta sus tickers fallidos con
+    espera exponencial; un ticker que no se puede bajar no hace fallar a los
+    demás.
+
+    Args:
+        tickers: lista de tickers
+        proveedor: función de descarga (ver el comienzo del módulo)
+        periodo, inicio, fin: se pasan al proveedor
+        al_progresar: función (tickers terminados, total) que se llama al
+                      terminar cada lote, siempre en el hilo que llamó a
+                      descargar_por_lotes (no hace falta sincronizarla)
+        cancelar: threading.Event; si se activa no se hacen más pedidos
+
+    Returns:
+        (DataFrame en formato largo con las filas en el orden de `tickers`,
+         {ticker: motivo} de los que fallaron)
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return pd.DataFrame(columns=COLUMNAS_PRECIOS), {}
+
+    pedido = {"periodo": periodo, "inicio": inicio, "fin": fin}
+    lotes = [tickers[i:i + tam_lote] for i in range(0, len(tickers), tam_lote)]
+    partes = []
+    fallidos = {}
+    terminados = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(hilos, len(lotes)))) as ejecutor:
+        futuros = {ejecutor.submit(_descargar_lote, proveedor, lote, pedido, reintentos, espera_base, cancelar): lote
+                   for lote in lotes}
+        for futuro in as_completed(futuros):
+            partes_lote, fallidos_lote = futuro.result()
+            partes.extend(partes_lote)
+            fallidos.update(fallidos_lote)
+            terminados += len(futuros[futuro])
+            if al_progresar is not None:
+                al_progresar(terminados, len(tickers))
+
+    partes = [parte for parte in partes if not parte.empty]
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS_PRECIOS), fallidos
+
+    posicion = {ticker: i for i, ticker in enumerate(tickers)}
+    df_long = pd.concat(partes, ignore_index=True)
+    df_long = df_long.loc[:, ~df_long.columns.duplicated()]
+    df_long['Date'] = pd.to_datetime(df_long['Date']).dt.normalize()
+    df_long = (df_long.assign(_posicion=df_long['Ticker'].map(posicion))
+               .sort_values(['_posicion', 'Date'], kind='stable')
+               .drop(columns='_posicion')
+               .drop_duplicates(subset=['Date', 'Ticker'], keep='first'))
+    return df_long[COLUMNAS_PRECIOS].reset_index(drop=True), fallidos
+
+
+# =========================
+# Respuestas grabadas
+# =========================
+def _texto_fecha(fecha):
+    return None if fecha is None else pd.Timestamp(fecha).strftime("%Y-%m-%d")
+
+
+def _clave_pedido(tickers, periodo, inicio, fin):
+    """Nombre de archivo de un pedido (los mismos argumentos dan el mismo nombre)."""
+    pedido = json.dumps({"tickers": sorted(tickers), "periodo": periodo,
+                         "inicio": _texto_fecha(inicio), "fin": _texto_fecha(fin)}, sort_keys=True)
+    return hashlib.blake2b(pedido.encode('utf-8'), digest_size=8).hexdigest() + ".csv"
+
+
+def grabar_respuestas(proveedor, carpeta):
+    """Proveedor que llama a `proveedor` y guarda cada respuesta en `carpeta`."""
+    os.makedirs(carpeta, exist_ok=True)
+
+    def proveedor_que_graba(tickers, periodo=None, inicio=None, fin=None):
+        df = proveedor(tickers, periodo=periodo, inicio=inicio, fin=fin)
+        df.to_csv(os.path.join(carpeta, _clave_pedido(tickers, periodo, inicio, fin)), index=False)
+        return df
+
+    return proveedor_que_graba
+
+
+def proveedor_grabado(carpeta):
+    """Proveedor que responde desde las grabaciones de grabar_respuestas."""
+    def proveedor_local(tickers, periodo=None, inicio=None, fin=None):
+        ruta = os.path.join(carpeta, _clave_pedido(tickers, periodo, inicio, fin))
+        if not os.path.exists(ruta):
+            raise LookupError(f"Pedido no grabado: {list(tickers)} periodo={periodo} "
+                              f"inicio={_texto_fecha(inicio)} fin={_texto_fecha(fin)}")
+        df = pd.read_csv(ruta, parse_dates=['Date'])
+        return df.reindex(columns=COLUMNAS_PRECIOS)
+
+    return proveedor_local
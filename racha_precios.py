@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Estado de racha por ticker para el "% acumulado" de las señales.
+
+El % acumulado se mide desde un precio de referencia que se reinicia cada vez
+que la variación diaria cambia de signo (la referencia pasa a ser el cierre
+del día anterior). Antes generar_senales recorría todo el historial de cada
+ticker en un bucle de Python para encontrar esa referencia.
+
+Acá el estado de cada ticker (último cierre, última variación diaria y precio
+de referencia) se guarda en rachas_precios.json junto a auto_update_log.csv y
+se avanza O(1) por cada barra nueva del log. Cada estado guarda además una
+huella (blake2b) de los cierres ya procesados: si el log cambió hacia atrás
+(filas agregadas o corregidas antes de la última fecha procesada), la huella
+no coincide y el ticker se recalcula completo de forma vectorizada.
+
+Para una fecha pasada (regenerar señales históricas) rachas_en_fecha calcula
+el estado de todos los tickers a esa fecha con la misma regla, vectorizada.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from almacen_json import leer_json, escribir_json
+
+NOMBRE_ESTADO = "rachas_precios.json"
+VERSION_ESTADO = 2
+
+
+def ruta_estado(log_file):
+    """Ruta del estado de rachas que acompaña a un auto_update_log.csv."""
+    return os.path.join(os.path.dirname(os.path.abspath(log_file)), NOMBRE_ESTADO)
+
+
+def huella_cierres(cierres):
+    """Huella de los cierres procesados (detecta correcciones hacia atrás)."""
+    datos = np.ascontiguousarray(cierres, dtype=np.float64).tobytes()
+    return hashlib.blake2b(datos, digest_size=16).hexdigest()
+
+
+def _texto_fecha(fecha):
+    return pd.Timestamp(fecha).isoformat()
+
+
+def iniciar_racha(fecha, cierre):
+    """Racha de un ticker con una sola barra."""
+    return {
+        "fecha": _texto_fecha(fecha),
+        "barras": 1,
+        "cierre": float(cierre),
+        "variacion": 0.0,
+        "referencia": float(cierre),
+    }
+
+
+def avanzar_racha(racha, fecha, cierre):
+    """Agrega una barra nueva a la racha (modifica el dict)."""
+    precio_anterior = racha["cierre"]
+    cierre = float(cierre)
+    variacion = ((cierre - precio_anterior) / precio_anterior) * 100
+
+    # Si la variación diaria cambió de signo, la referencia es el día anterior
+    variacion_anterior = racha["variacion"]
+    if (variacion_anterior > 0 and variacion < 0) or (variacion_anterior < 0 and variacion > 0):
+        racha["referencia"] = precio_anterior
+
+    racha["fecha"] = _texto_fecha(fecha)
+    racha["barras"] += 1
+    racha["cierre"] = cierre
+    racha["variacion"] = variacion
+    return racha
+
+
+def racha_desde_cierres(fechas, cierres):
+    """
+    Racha después de recorrer todos los cierres (ordenados por fecha), con la
+    misma regla que avanzar_racha pero vectorizada.
+    """
+    cierres = np.asarray(cierres, dtype=float)
+    racha = iniciar_racha(fechas[-1], cierres[-1])
+    racha["barras"] = len(cierres)
+    if len(cierres) < 2:
+        return racha
+
+    variaciones = ((cierres[1:] - cierres[:-1]) / cierres[:-1]) * 100
+    # Cambio de signo entre la variación i-1 e i → referencia = cierre i
+    # (np.sign de NaN es NaN y no cuenta como cambio, igual que las comparaciones)
+    signos = np.sign(variaciones)
+    cambios = np.flatnonzero(signos[:-1] * signos[1:] < 0)
+    racha["variacion"] = float(variaciones[-1])
+    racha["referencia"] = float(cierres[cambios[-1] + 1]) if len(cambios) else float(cierres[0])
+    return racha
+
+
+def pct_acumulado(racha):
+    """% acumulado desde la referencia, o None si la racha tiene menos de 2 barras."""
+    if racha is None or racha["barras"] < 2:
+        return None
+    return ((racha["cierre"] - racha["referencia"]) / racha["referencia"]) * 100
+
+
+def _por_ticker(df_precios):
+    """{ticker: (fechas, cierres)} ordenados por fecha."""
+    ordenado = df_precios[["Date", "Ticker", "Close"]].sort_values(["Ticker", "Date"], kind="stable")
+    return {
+        ticker: (grupo["Date"].to_numpy(), grupo["Close"].to_numpy(dtype=float))
+        for ticker, grupo in ordenado.groupby("Ticker", sort=False)
+    }
+
+
+def actualizar_rachas(df_precios, log_file):
+    """
+    Rachas de todos los tickers al último día del log, partiendo del estado
+    guardado y avanzando solo con las barras nuevas. Guarda el estado.
+
+    Args:
+        df_precios: log de precios con Date (datetime), Ticker y Close
+        log_file: ruta del auto_update_log.csv (el estado va en su carpeta)
+
+    Returns:
+        {ticker: racha}
+    """
+    ruta = ruta_estado(log_file)
+    try:
+        guardado = leer_json(ruta, {})
+    except Exception as e:
+        print(f"[WARN] Estado de rachas ilegible, se recalcula: {e}")
+        guardado = {}
+    rachas = guardado.get("tickers", {}) if guardado.get("version") == VERSION_ESTADO else {}
+
+    resultado = {}
+    nuevas_barras = 0
+    recalculados = 0
+    for ticker, (fechas, cierres) in _por_ticker(df_precios).items():
+        racha = rachas.get(ticker)
+        if racha is not None:
+            # Barras ya procesadas: deben ser las mismas que dice el estado
+            hasta = np.searchsorted(fechas, np.datetime64(racha["fecha"]), side="right")
+            if hasta != racha["barras"] or racha.get("huella") != huella_cierres(cierres[:hasta]):
+                racha = None
+
+        if racha is None:
+            racha = racha_desde_cierres(fechas, cierres)
+            recalculados += 1
+        else:
+            for fecha, cierre in zip(fechas[hasta:], cierres[hasta:]):
+                avanzar_racha(racha, fecha, cierre)
+                nuevas_barras += 1
+        racha["huella"] = huella_cierres(cierres)
+        resultado[ticker] = racha
+
+    if nuevas_barras or recalculados:
+        # Los tickers que no vinieron en df_precios conservan su estado
+        try:
+            escribir_json(ruta, {"version": VERSION_ESTADO, "tickers": {**rachas, **resultado}})
+        except Exception as e:
+            print(f"[WARN] No se pudo guardar el estado de rachas: {e}")
+    print(f"[INFO] Rachas: {nuevas_barras} barras nuevas, {recalculados} tickers recalculados")
+    return resultado
+
+
+def rachas_en_fecha(df_precios, fecha):
+    """Rachas de todos los tickers usando solo las barras hasta el día `fecha` inclusive."""
+    limite = pd.Timestamp(fecha).normalize() + pd.Timedelta(days=1)
+    resultado = {}
+    for ticker, (fechas, cierres) in _por_ticker(df_precios[df_precios["Date"] < limite]).items():
+        resultado[ticker] = racha_desde_cierres(fechas, cierres)
+    return resultado
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Repositorio SQLite de los resultados de análisis (Resultado_de_Analisis.db).
+
+Reemplaza a Resultado_de_Analisis.json: cada registro (ticker × período ×
+objetivo) es una fila, con los parámetros óptimos en columnas indexadas para
+encontrar duplicados sin recorrer todo el historial, y el registro completo
+guardado como JSON con la misma estructura que tenía en el archivo.
+
+La primera vez que se abre el repositorio de una carpeta que tiene el JSON
+anterior, sus registros (estructura antigua con "periodos", nueva y mixta)
+se migran una sola vez.
+
+Uso:
+    python resultados_db.py migrar CARPETA            (migración explícita)
+    python resultados_db.py exportar CARPETA [JSON]   (vuelca la base al formato JSON)
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from pathlib import Path
+
+from resultados_json import extraer_ticker_symbol, parametros_son_iguales, construir_registro
+from almacen_json import escribir_json
+
+NOMBRE_DB = "Resultado_de_Analisis.db"
+NOMBRE_JSON = "Resultado_de_Analisis.json"
+
+# Estructura del registro en el JSON: "nuevo" = ticker → período → objetivo,
+# "antiguo" = ticker → "periodos" → período (sin objetivo explícito)
+ESTRUCTURA_NUEVA = "nuevo"
+ESTRUCTURA_ANTIGUA = "antiguo"
+
+# Claves de ticker del JSON que no son períodos
+_CLAVES_NO_PERIODO = ("ticker", "fecha_guardado", "periodos", "_ticker_symbol")
+
+# Tolerancia de parametros_son_iguales para los valores numéricos
+_TOLERANCIA = 0.01
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS tickers (
+    ticker TEXT PRIMARY KEY,
+    ticker_symbol TEXT
+);
+
+CREATE TABLE IF NOT EXISTS resultados (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    estructura TEXT NOT NULL,
+    periodo TEXT NOT NULL,
+    objetivo TEXT NOT NULL,
+    clave_objetivo TEXT NOT NULL,
+    compra_pct REAL,
+    venta_pct REAL,
+    ganancia_minima_pct REAL,
+    suave_pct REAL,
+    limite_tipo TEXT,
+    limite_valor REAL,
+    compra_multiple INTEGER,
+    venta_multiple INTEGER,
+    fecha_guardado TEXT,
+    registro TEXT NOT NULL,
+    UNIQUE (ticker, estructura, periodo, clave_objetivo)
+);
+
+CREATE INDEX IF NOT EXISTS idx_resultados_parametros ON resultados (
+    ticker, periodo, objetivo, compra_pct, venta_pct, ganancia_minima_pct, suave_pct,
+    limite_tipo, limite_valor, compra_multiple, venta_multiple
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+# Columnas de parámetros (mismo orden que el índice) y su clave en parametros_optimos
+_COLUMNAS_PARAMETROS = ("compra_pct", "venta_pct", "ganancia_minima_pct", "suave_pct",
+                        "limite_tipo", "limite_valor", "compra_multiple", "venta_multiple")
+
+
+def _separar_periodo_objetivo(clave_periodo):
+    """Nombre del período de una clave "periodo_objetivo" ("completo_rentabilidad" → "completo")."""
+    if "_rentabilidad" in clave_periodo:
+        return clave_periodo.replace("_rentabilidad", "")
+    if "_margen_prom" in clave_periodo:
+        return clave_periodo.replace("_margen_prom", "")
+    return clave_periodo
+
+
+def _objetivo_base(clave_objetivo):
+    """Objetivo de una clave de registro ("rentabilidad_2" → "rentabilidad", "margen_prom" → "margen_prom")."""
+    base, _, sufijo = clave_objetivo.rpartition("_")
+    return base if base and sufijo.isdigit() else clave_objetivo
+
+
+def _valores_parametros(registro):
+    params = registro.get("parametros_optimos", {})
+    return tuple(params.get(col) for col in _COLUMNAS_PARAMETROS)
+
+
+def registros_desde_json(datos_json):
+    """
+    Recorre el JSON de resultados (estructura antigua, nueva o mixta) en el
+    orden del archivo.
+
+    Yields:
+        (ticker, estructura, periodo, clave_objetivo, registro)
+    """
+    for ticker, contenido_ticker in datos_json.items():
+        if not isinstance(contenido_ticker, dict):
+            continue
+
+        periodos_antiguos = contenido_ticker.get("periodos")
+        if isinstance(periodos_antiguos, dict):
+            for periodo, registro in periodos_antiguos.items():
+                if isinstance(registro, dict) and "parametros_optimos" in registro:
+                    yield ticker, ESTRUCTURA_ANTIGUA, periodo, "rentabilidad", registro
+
+        for periodo, contenido_periodo in contenido_ticker.items():
+            if periodo in _CLAVES_NO_PERIODO or not isinstance(contenido_periodo, dict):
+                continue
+            for clave_objetivo, registro in contenido_periodo.items():
+                if isinstance(registro, dict) and "parametros_optimos" in registro:
+                    yield ticker, ESTRUCTURA_NUEVA, periodo, clave_objetivo, registro
+
+
+class RepositorioResultados:
+    """
+    Acceso a Resultado_de_Analisis.db. Cada operación abre y cierra su propia
+    conexión (la interfaz y los procesos de análisis pueden usarla a la vez).
+    """
+
+    def __init__(self, ruta_db):
+        self.ruta_db = Path(ruta_db)
+        with closing(self._conectar()) as conn, conn:
+            conn.executescript(_ESQUEMA)
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.ruta_db, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # -------------------------
+    # Escritura
+    # -------------------------
+    def _guardar_symbol(self, conn, ticker, ticker_symbol):
+        if ticker_symbol:
+            conn.execute("INSERT INTO tickers (ticker, ticker_symbol) VALUES (?, ?) "
+                         "ON CONFLICT(ticker) DO UPDATE SET ticker_symbol = excluded.ticker_symbol",
+                         (ticker, ticker_symbol))
+        else:
+            conn.execute("INSERT OR IGNORE INTO tickers (ticker) VALUES (?)", (ticker,))
+
+    def _insertar(self, conn, ticker, estructura, periodo, clave_objetivo, registro):
+        conn.execute(
+            "INSERT INTO resultados (ticker, estructura, periodo, objetivo, clave_objetivo, "
+            + ", ".join(_COLUMNAS_PARAMETROS) + ", fecha_guardado, registro) "
+            "VALUES (?, ?, ?, ?, ?, " + ", ".join("?" * len(_COLUMNAS_PARAMETROS)) + ", ?, ?)",
+            (ticker, estructura, periodo, _objetivo_base(clave_objetivo), clave_objetivo,
+             *_valores_parametros(registro), registro.get("fecha_guardado", ""),
+             json.dumps(registro, ensure_ascii=False))
+        )
+
+    def _buscar_mismos_parametros(self, conn, ticker, periodo, objetivo, parametros):
+        """
+        id y clave del registro con los mismos parámetros (parametros_son_iguales)
+        del ticker/período/objetivo, o None.
+
+        El índice acota los candidatos por rango sobre cada parámetro (con algo
+        de margen sobre la tolerancia por redondeo); la comparación exacta se
+        hace con parametros_son_iguales sobre esos pocos candidatos.
+        """
+        condiciones = ["ticker = ?", "periodo = ?", "objetivo = ?", "estructura = ?"]
+        argumentos = [ticker, periodo, objetivo, ESTRUCTURA_NUEVA]
+        for col in _COLUMNAS_PARAMETROS:
+            valor = parametros.get(col)
+            if valor is None:
+                condiciones.append(f"{col} IS NULL")
+            elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                condiciones.append(f"{col} BETWEEN ? AND ?")
+                argumentos += [valor - 2 * _TOLERANCIA, valor + 2 * _TOLERANCIA]
+            else:
+                condiciones.append(f"{col} = ?")
+                argumentos.append(valor)
+
+        filas = conn.execute(
+            "SELECT id, clave_objetivo, registro FROM resultados WHERE " + " AND ".join(condiciones)
+            + " ORDER BY id", argumentos
+        ).fetchall()
+        for fila in filas:
+            existente = json.loads(fila["registro"]).get("parametros_optimos", {})
+            if parametros_son_iguales(parametros, existente, _TOLERANCIA):
+                return fila["id"], fila["clave_objetivo"]
+        return None
+
+    def guardar_periodos(self, ticker, periodos, ticker_symbol):
+        """
+        Guarda los resultados de un ticker: un registro con los mismos
+        parámetros que uno existente del mismo período y objetivo lo reemplaza;
+        si los parámetros son distintos se guarda como nuevo (rentabilidad,
+        rentabilidad_2, ...).
+
+        Args:
+            ticker: Clave del ticker (nombre del archivo, ej: "Datos_META_ENE25_NOV25")
+            periodos: {"completo_rentabilidad": resultado, ...}
+            ticker_symbol: Símbolo para Yahoo Finance (o None)
+
+        Returns:
+            (registros_nuevos, registros_actualizados)
+        """
+        return self.guardar_tickers({ticker: (periodos, ticker_symbol)})
+
+    def guardar_tickers(self, resultados):
+        """
+        Igual que guardar_periodos para varios tickers, en una sola
+        transacción: si algo falla no queda guardado ninguno.
+
+        Args:
+            resultados: {ticker: (periodos, ticker_symbol)}
+
+        Returns:
+            (registros_nuevos, registros_actualizados) sumando todos los tickers
+        """
+        registros_nuevos = 0
+        registros_actualizados = 0
+
+        with closing(self._conectar()) as conn, conn:
+            for ticker, (periodos, ticker_symbol) in resultados.items():
+                nuevos, actualizados = self._guardar_periodos_ticker(conn, ticker, periodos, ticker_symbol)
+                registros_nuevos += nuevos
+                registros_actualizados += actualizados
+
+        return registros_nuevos, registros_actualizados
+
+    def _guardar_periodos_ticker(self, conn, ticker, periodos, ticker_symbol):
+        """Pasos de guardar_periodos para un ticker dentro de la transacción `conn`."""
+        registros_nuevos = 0
+        registros_actualizados = 0
+
+        self._guardar_symbol(conn, ticker, ticker_symbol)
+
+        for clave_periodo, datos in periodos.items():
+            objetivo_base = datos.get("objetivo", "rentabilidad")
+            nombre_periodo = _separar_periodo_objetivo(clave_periodo)
+            nuevo_registro = construir_registro(datos, ticker_symbol)
+
+            encontrado = self._buscar_mismos_parametros(
+                conn, ticker, nombre_periodo, objetivo_base, nuevo_registro["parametros_optimos"])
+
+            if encontrado:
+                id_registro, clave_objetivo = encontrado
+                conn.execute(
+                    "UPDATE resultados SET " + ", ".join(f"{col} = ?" for col in _COLUMNAS_PARAMETROS)
+                    + ", fecha_guardado = ?, registro = ? WHERE id = ?",
+                    (*_valores_parametros(nuevo_registro), nuevo_registro["fecha_guardado"],
+                     json.dumps(nuevo_registro, ensure_ascii=False), id_registro)
+                )
+                registros_actualizados += 1
+                print(f"[DEBUG] Actualizado: {ticker}/{nombre_periodo}/{clave_objetivo}")
+            else:
+                # Nombre único para el objetivo dentro del período
+                usadas = {fila[0] for fila in conn.execute(
+                    "SELECT clave_objetivo FROM resultados WHERE ticker = ? AND periodo = ? AND estructura = ?",
+                    (ticker, nombre_periodo, ESTRUCTURA_NUEVA))}
+                clave_objetivo = objetivo_base
+                contador = 2
+                while clave_objetivo in usadas:
+                    clave_objetivo = f"{objetivo_base}_{contador}"
+                    contador += 1
+
+                self._insertar(conn, ticker, ESTRUCTURA_NUEVA, nombre_periodo, clave_objetivo, nuevo_registro)
+                registros_nuevos += 1
+                print(f"[DEBUG] Nuevo registro: {ticker}/{nombre_periodo}/{clave_objetivo}")
+
+        return registros_nuevos, registros_actualizados
+
+    def eliminar(self, ids):
+        """Elimina los registros indicados (y los tickers que quedan sin registros). Devuelve cuántos se eliminaron."""
+        ids = list(ids)
+        if not ids:
+            return 0
+        with closing(self._conectar()) as conn, conn:
+            eliminados = conn.executemany("DELETE FROM resultados WHERE id = ?", [(i,) for i in ids]).rowcount
+            conn.execute("DELETE FROM tickers WHERE ticker NOT IN (SELECT DISTINCT ticker FROM resultados)")
+        return eliminados
+
+    # -------------------------
+    # Lectura
+    # -------------------------
+    def _filas(self, where="", argumentos=()):
+        """
+        Registros como dicts {id, ticker, ticker_symbol, estructura, periodo,
+        clave_objetivo, registro} ordenados como en el JSON: ticker, primero la
+        estructura antigua, luego período y objetivo en orden de alta.
+        """
+        consulta = f"""
+            SELECT r.id, r.ticker, t.ticker_symbol, r.estructura, r.periodo, r.clave_objetivo, r.registro,
+                   MIN(r.id) OVER (PARTITION BY r.ticker) AS orden_ticker,
+                   MIN(r.id) OVER (PARTITION BY r.ticker, r.estructura, r.periodo) AS orden_periodo
+            FROM resultados r LEFT JOIN tickers t ON t.ticker = r.ticker
+            {where}
+            ORDER BY orden_ticker, r.estructura = '{ESTRUCTURA_NUEVA}', orden_periodo, r.id
+        """
+        with closing(self._conectar()) as conn:
+            filas = conn.execute(consulta, argumentos).fetchall()
+        return [{
+            "id": fila["id"],
+            "ticker": fila["ticker"],
+            "ticker_symbol": fila["ticker_symbol"],
+            "estructura": fila["estructura"],
+            "periodo": fila["periodo"],
+            "clave_objetivo": fila["clave_objetivo"],
+            "registro": json.loads(fila["registro"]),
+        } for fila in filas]
+
+    def registros(self, ticker=None):
+        """Registros de un ticker (o de todos) en el orden del JSON (ver _filas)."""
+        if ticker is None:
+            return self._filas()
+        return self._filas("WHERE r.ticker = ?", (ticker,))
+
+    def registros_por_simbolo(self):
+        """Todos los registros ordenados por símbolo y, dentro de cada uno, como en el JSON."""
+        return sorted(self._filas(), key=lambda f: (f["ticker_symbol"] or extraer_ticker_symbol(f["ticker"])
+                                                    or f["ticker"]).upper())
+
+    def hay_registros(self):
+        with closing(self._conectar()) as conn:
+            return conn.execute("SELECT EXISTS (SELECT 1 FROM resultados)").fetchone()[0] == 1
+
+    def a_json(self):
+        """Reconstruye el dict con la estructura de Resultado_de_Analisis.json."""
+        datos_json = {}
+        for fila in self._filas():
+            contenido = datos_json.setdefault(fila["ticker"], {})
+            if fila["ticker_symbol"] and "_ticker_symbol" not in contenido:
+                contenido["_ticker_symbol"] = fila["ticker_symbol"]
+            if fila["estructura"] == ESTRUCTURA_ANTIGUA:
+                contenido.setdefault("periodos", {})[fila["periodo"]] = fila["registro"]
+            else:
+                contenido.setdefault(fila["periodo"], {})[fila["clave_objetivo"]] = fila["registro"]
+        return datos_json
+
+    # -------------------------
+    # Migración desde el JSON
+    # -------------------------
+    def migrado_desde(self):
+        with closing(self._conectar()) as conn:
+            fila = conn.execute("SELECT valor FROM meta WHERE clave = 'migrado_desde'").fetchone()
+        return fila[0] if fila else None
+
+    def migrar_json(self, ruta_json):
+        """
+        Importa Resultado_de_Analisis.json (estructura antigua, nueva o mixta)
+        en una sola transacción. Solo se hace una vez por base: las siguientes
+        llamadas no hacen nada.
+
+        Returns:
+            Número de registros importados (0 si ya estaba migrado)
+        """
+        if self.migrado_desde() is not None:
+            return 0
+
+        with open(ruta_json, 'r', encoding='utf-8') as f:
+            datos_json = json.load(f)
+
+        importados = 0
+        with closing(self._conectar()) as conn, conn:
+            for ticker, contenido in datos_json.items():
+                if isinstance(contenido, dict):
+                    self._guardar_symbol(conn, ticker, contenido.get("_ticker_symbol"))
+            for ticker, estructura, periodo, clave_objetivo, registro in registros_desde_json(datos_json):
+                self._insertar(conn, ticker, estructura, periodo, clave_objetivo, registro)
+                importados += 1
+            conn.execute("INSERT INTO meta (clave, valor) VALUES ('migrado_desde', ?)", (str(ruta_json),))
+
+        print(f"[INFO] Migrados {importados} registro(s) de {ruta_json} a {self.ruta_db}")
+        return importados
+
+
+def abrir_repositorio(carpeta):
+    """
+    Repositorio de resultados de la carpeta. Si la base es nueva y en la
+    carpeta existe Resultado_de_Analisis.json, se migra automáticamente.
+    """
+    repositorio = RepositorioResultados(Path(carpeta) / NOMBRE_DB)
+    ruta_json = Path(carpeta) / NOMBRE_JSON
+    if ruta_json.exists() and repositorio.migrado_desde() is None and not repositorio.hay_registros():
+        try:
+            repositorio.migrar_json(ruta_json)
+        except Exception as e:
+            print(f"[WARN] No se pudo migrar {ruta_json}: {e}")
+    return repositorio
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2 or argv[0] not in ("migrar", "exportar"):
+        print(__doc__)
+        return 1
+
+    carpeta = argv[1]
+    if not os.path.isdir(carpeta):
+        print(f"[ERROR] La carpeta no existe: {carpeta}")
+        return 1
+
+    if argv[0] == "migrar":
+        ruta_json = Path(carpeta) / NOMBRE_JSON
+        if not ruta_json.exists():
+            print(f"[ERROR] No existe {ruta_json}")
+            return 1
+        repositorio = RepositorioResultados(Path(carpeta) / NOMBRE_DB)
+        if repositorio.migrado_desde() is not None:
+            print(f"[INFO] {repositorio.ruta_db} ya fue migrado desde {repositorio.migrado_desde()}")
+        else:
+            repositorio.migrar_json(ruta_json)
+        return 0
+
+    repositorio = abrir_repositorio(carpeta)
+    destino = argv[2] if len(argv) > 2 else str(Path(carpeta) / "Resultado_de_Analisis_exportado.json")
+    escribir_json(destino, repositorio.a_json())
+    print(f"[INFO] Exportado a {destino}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
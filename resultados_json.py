@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Estructura de los registros de resultados (ticker → período → objetivo), la
+misma del antiguo Resultado_de_Analisis.json.
+
+Funciones sin interfaz compartidas por Analisis_singrafico, el análisis por
+lotes (analisis_lote.py) y el repositorio de resultados (resultados_db.py).
+"""
+
+import re
+from datetime import datetime
+
+
+def extraer_ticker_symbol(nombre_archivo):
+    """
+    Extrae el símbolo del ticker de Yahoo Finance desde el nombre del archivo.
+
+    Ejemplos:
+        "Datos_META_ENE25_NOV25" → "META"
+        "Datos_AAPL_ENE25_NOV25" → "AAPL"
+        "Datos_BRK-B_ENE25_NOV25" → "BRK-B"
+        "Datos_QQQ_ENE25_NOV25" → "QQQ"
+
+    Args:
+        nombre_archivo: Nombre del archivo sin extensión (ej: "Datos_META_ENE25_NOV25")
+
+    Returns:
+        str: Símbolo del ticker (ej: "META") o None si no se puede extraer
+    """
+    if not nombre_archivo:
+        return None
+
+    # Patrón: Datos_TICKER_MesAño_MesAño
+    # Donde TICKER puede contener letras, números y guiones (ej: BRK-B)
+    # Y MesAño es 3 letras + 2 dígitos (ej: ENE25, NOV25)
+    patron = r'^Datos_([A-Za-z0-9\-]+)_[A-Za-z]{3}\d{2}_[A-Za-z]{3}\d{2}$'
+
+    match = re.match(patron, nombre_archivo)
+    if match:
+        return match.group(1).upper()
+
+    # Patrón alternativo más flexible: Datos_TICKER_cualquier_cosa
+    patron_alternativo = r'^Datos_([A-Za-z0-9\-]+)_'
+    match_alt = re.match(patron_alternativo, nombre_archivo)
+    if match_alt:
+        return match_alt.group(1).upper()
+
+    # Si no hay patrón "Datos_", intentar extraer el primer segmento antes de "_"
+    partes = nombre_archivo.split('_')
+    if len(partes) >= 2 and partes[0].upper() == "DATOS":
+        return partes[1].upper()
+
+    return None
+
+
+# =========================
+# Funciones de configuración JSON
+# =========================
+
+
+def parametros_son_iguales(params_nuevos, params_existentes, tolerancia=0.01):
+    """Compara si dos conjuntos de parámetros son iguales (con tolerancia para decimales)"""
+    claves_comparar = ["compra_pct", "venta_pct", "ganancia_minima_pct", "suave_pct",
+                       "limite_tipo", "limite_valor", "compra_multiple", "venta_multiple"]
+
+    for clave in claves_comparar:
+        val_nuevo = params_nuevos.get(clave)
+        val_existente = params_existentes.get(clave)
+
+        # Si ambos son None o iguales, continuar
+        if val_nuevo == val_existente:
+            continue
+
+        # Si uno es None y otro no, son diferentes
+        if val_nuevo is None or val_existente is None:
+            return False
+
+        # Para valores numéricos, comparar con tolerancia
+        if isinstance(val_nuevo, (int, float)) and isinstance(val_existente, (int, float)):
+            if abs(val_nuevo - val_existente) > tolerancia:
+                return False
+        else:
+            # Para strings u otros tipos, comparación exacta
+            if val_nuevo != val_existente:
+                return False
+
+    return True
+
+
+def construir_registro(datos, ticker_symbol):
+    """Arma el registro que se guarda en el JSON a partir del resultado de una combinación"""
+    return {
+        "ticker_symbol": ticker_symbol,  # Símbolo para Yahoo Finance (ej: "META")
+        "fecha_guardado": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "fecha_inicial": datos.get("fecha_inicial", ""),
+        "fecha_final": datos.get("fecha_final", ""),
+        "parametros_optimos": {
+            "compra_pct": datos.get("compra_pct", 0),
+            "venta_pct": datos.get("venta_pct", 0),
+            "ganancia_minima_pct": datos.get("ganancia_min", 0),
+            "suave_pct": datos.get("suave_pct", 0),
+            "limite_tipo": datos.get("limite_tipo", "acciones"),
+            "limite_valor": datos.get("limite_valor", 10),
+            "compra_multiple": datos.get("compra_mult"),
+            "venta_multiple": datos.get("venta_mult"),
+            # Condiciones para compra/venta múltiple
+            "promedio_maximos": datos.get("promedio_maximos", 0),
+            "promedio_minimos": datos.get("promedio_minimos", 0)
+        },
+        "metricas": {
+            "rentabilidad_max": datos.get("rentabilidad_max", 0),
+            "margen_promedio": datos.get("margen_promedio", 0),
+            "rentab_promedio": datos.get("rentab_promedio", 0),
+            "max_margen": datos.get("max_margen", 0),
+            "max_aporte": datos.get("max_aporte", 0)
+        },
+        "estadisticas_var": {
+            "max_var": datos.get("max_var", 0),
+            "min_var": datos.get("min_var", 0),
+            "fecha_max_var": datos.get("fecha_max_var", ""),
+            "fecha_min_var": datos.get("fecha_min_var", ""),
+            "dif_var": datos.get("dif_var", 0),
+            "max_prom_var": datos.get("max_prom_var", 0),
+            "min_prom_var": datos.get("min_prom_var", 0),
+            "dif_prom_var": datos.get("dif_prom_var", 0)
+        },
+        "estadisticas_operaciones": {
+            "opc_compra": datos.get("opc_compra", 0),
+            "acciones_compradas": datos.get("acciones_compradas", 0),
+            "opc_venta": datos.get("opc_venta", 0),
+            "acciones_vendidas": datos.get("acciones_vendidas", 0),
+            "max_acc_cartera": datos.get("max_acc_cartera", 0),
+            "fecha_max_rentab": datos.get("fecha_max_rentab", "")
+        }
+    }
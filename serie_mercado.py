@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serie de precios parseada una sola vez por ejecución.
+
+El CSV se lee y se convierte a arrays numéricos ordenados por fecha al iniciar
+el análisis; la optimización (todas las evaluaciones, el refinamiento y la
+re-ejecución final) trabaja sobre este objeto sin volver a leer ni parsear.
+
+Las columnas ya limpias se guardan además en una caché binaria junto al CSV
+(<archivo>.csv.cache.npz), de modo que las siguientes sesiones no vuelven a
+parsear el texto mientras el CSV no cambie.
+"""
+
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from motor_analisis import calcular_acumulado, PerfilRachas
+
+# Columnas esperadas (exactas)
+EXPECTED_COLUMNS = ["Fecha", "Último", "Apertura", "Máximo", "Mínimo", "Vol.", "% var."]
+COLUMNAS_NUMERICAS = ['Último', 'Apertura', 'Máximo', 'Mínimo', 'Vol.']
+
+
+def parse_percent_to_decimal(x):
+    """Convierte valores de porcentaje a decimal"""
+    try:
+        if pd.isna(x):
+            return float("nan")
+        s = str(x).strip().replace(",", ".")
+        if s.endswith("%"):
+            s = s[:-1].strip()
+            if s == "":
+                return float("nan")
+            return float(s) / 100.0
+        try:
+            f = float(s)
+            if abs(f) <= 1:
+                return f
+            else:
+                return f / 100.0
+        except:
+            return float("nan")
+    except Exception:
+        return float("nan")
+
+
+def to_float_safe(x):
+    """Convierte cadenas numéricas con coma/punto a float, devuelve NaN si falla."""
+    try:
+        if pd.isna(x):
+            return float("nan")
+        s = str(x).strip().replace('"', '').replace(",", ".")
+        if s == "":
+            return float("nan")
+        return float(s)
+    except:
+        return float("nan")
+
+
+class SerieMercado:
+    """
+    Serie de precios limpia: fechas ordenadas y columnas numéricas como arrays
+    float, con el % acumulado por signos consecutivos ya calculado.
+
+    Los NaN numéricos se guardan como 0.0 (mismo criterio que el análisis).
+    """
+
+    def __init__(self, fechas, columnas, var, ruta=None, mtime=None):
+        self.ruta = ruta
+        self.mtime = mtime
+        self.fechas = pd.DatetimeIndex(fechas)
+        self.columnas = columnas          # {"Último": array, "Apertura": array, ...}
+        self.var = np.asarray(var, dtype=float)
+        self.acum = calcular_acumulado(self.var.tolist())
+        self._fechas_texto = None
+        self._valores_umbral = None
+        self._perfil_rachas = None
+
+    def __len__(self):
+        return len(self.fechas)
+
+    @property
+    def cierre(self):
+        return self.columnas['Último']
+
+    @property
+    def fecha_inicial(self):
+        return self.fechas.min()
+
+    @property
+    def fecha_final(self):
+        return self.fechas.max()
+
+    @property
+    def huella(self):
+        """Identifica los datos: archivo, fecha de modificación y ventana del período."""
+        if len(self) == 0:
+            return (self.ruta, self.mtime, None, None, 0)
+        return (self.ruta, self.mtime, self.fechas[0].value, self.fechas[-1].value, len(self))
+
+    @property
+    def fechas_texto(self):
+        """Fechas como texto dd/mm/aaaa (se formatean la primera vez que se usan)."""
+        if self._fechas_texto is None:
+            self._fechas_texto = self.fechas.strftime("%d/%m/%Y").tolist()
+        return self._fechas_texto
+
+    @property
+    def valores_umbral(self):
+        """Valores distintos de % var. y % acumulado ordenados (contra ellos se comparan los umbrales)."""
+        if self._valores_umbral is None:
+            self._valores_umbral = np.unique(np.concatenate((self.var, self.acum)))
+        return self._valores_umbral
+
+    @property
+    def perfil_rachas(self):
+        """PerfilRachas del % acumulado (se calcula la primera vez que se usa)."""
+        if self._perfil_rachas is None:
+            self._perfil_rachas = PerfilRachas(self.acum)
+        return self._perfil_rachas
+
+    def ventana(self, desde=None, hasta=None):
+        """
+        Sub-serie entre dos fechas (ambas incluidas; None = sin límite).
+
+        Los límites se buscan por búsqueda binaria sobre las fechas ordenadas y
+        los arrays de la nueva serie son vistas de los de esta (no se copian).
+        """
+        inicio = 0 if desde is None else int(self.fechas.searchsorted(pd.Timestamp(desde), side="left"))
+        fin = len(self) if hasta is None else int(self.fechas.searchsorted(pd.Timestamp(hasta), side="right"))
+        return self.recorte(inicio, fin)
+
+    def recorte(self, inicio, fin):
+        """Sub-serie de las posiciones [inicio, fin) sin copiar los arrays."""
+        if inicio <= 0 and fin >= len(self):
+            return self
+        return SerieMercado(
+            self.fechas[inicio:fin],
+            {col: valores[inicio:fin] for col, valores in self.columnas.items()},
+            self.var[inicio:fin],
+            ruta=self.ruta,
+            mtime=self.mtime
+        )
+
+    def ultimos_dias(self, dias):
+        """Sub-serie con los registros desde (fecha máxima - dias)."""
+        if len(self) == 0:
+            return self
+        return self.ventana(desde=self.fechas[-1] - timedelta(days=dias))
+
+    def periodo(self, definicion):
+        """
+        Sub-serie de un período:
+          - None: la serie completa
+          - número: los últimos N días (ultimos_dias)
+          - (desde, hasta): rango de fechas explícito (ventana)
+        """
+        if definicion is None:
+            return self
+        if isinstance(definicion, (tuple, list)):
+            desde, hasta = definicion
+            return self.ventana(desde, hasta)
+        return self.ultimos_dias(definicion)
+
+    def a_dataframe(self):
+        """DataFrame con el formato que espera la simulación (Fecha como texto dd/mm/aaaa)."""
+        df = pd.DataFrame({'Fecha': self.fechas_texto})
+        for col in COLUMNAS_NUMERICAS:
+            df[col] = self.columnas[col]
+        df['% var.'] = self.var
+        df['% acumulado'] = self.acum
+        return df
+
+
+# =========================
+# Lectura vectorizada del CSV de Investing.com
+# =========================
+# Número válido para float() una vez normalizado (signo, decimales con '.', exponente)
+_PATRON_NUMERO = r'^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$'
+
+# Sufijos de volumen: "12,5K", "3,2M", "1,1B"
+_MULTIPLICADORES_VOLUMEN = {"K": 1e3, "M": 1e6, "B": 1e9}
+
+
+def _texto_a_float(texto):
+    """
+    Convierte una Series de texto ya normalizado a array float (NaN si no es
+    un número). Usa astype(float), que da exactamente el mismo valor que
+    float() de Python (pd.to_numeric puede diferir en el último dígito).
+    """
+    try:
+        return texto.astype(float).to_numpy()
+    except (TypeError, ValueError):
+        validos = texto.str.match(_PATRON_NUMERO, na=False).to_numpy()
+        valores = np.full(len(texto), np.nan)
+        valores[validos] = texto[validos].astype(float).to_numpy()
+        return valores
+
+
+def _normalizar_numero(texto):
+    """
+    Quita comillas y espacios y deja '.' como separador decimal.
+
+    Con un solo separador la coma se toma como decimal ("18,32" → 18.32), igual
+    que to_float_safe. Si aparecen coma y punto, el que está más a la derecha
+    es el decimal y el otro el de miles ("1.234,56" y "1,234.56" → 1234.56).
+    """
+    texto = texto.str.strip().str.replace('"', '', regex=False)
+    ambos = (texto.str.contains(',', regex=False, na=False).to_numpy(dtype=bool)
+             & texto.str.contains('.', regex=False, na=False).to_numpy(dtype=bool))
+
+    if ambos.any():
+        # Posiciones solo en las filas con los dos separadores (casos raros)
+        con_ambos = texto[ambos]
+        coma_decimal = np.zeros(len(texto), dtype=bool)
+        coma_decimal[ambos] = (con_ambos.str.rfind(',') > con_ambos.str.rfind('.')).to_numpy()
+        punto_decimal = ambos & ~coma_decimal
+        texto = texto.copy()
+        texto[coma_decimal] = texto[coma_decimal].str.replace('.', '', regex=False)
+        texto[punto_decimal] = texto[punto_decimal].str.replace(',', '', regex=False)
+
+    return texto.str.replace(',', '.', regex=False)
+
+
+def columna_numerica(columna, con_sufijos=False):
+    """
+    Texto → array float (NaN si falla), vectorizado. Equivale a to_float_safe
+    y además entiende separador de miles y, con con_sufijos=True, los sufijos
+    K/M/B de la columna Vol.
+    """
+    texto = _normalizar_numero(columna.astype(object))
+    multiplicador = np.ones(len(texto))
+
+    if con_sufijos:
+        sufijo = texto.str[-1:].str.upper()
+        for letra, factor in _MULTIPLICADORES_VOLUMEN.items():
+            con_letra = (sufijo == letra).to_numpy()
+            if con_letra.any():
+                multiplicador[con_letra] = factor
+                texto[con_letra] = texto[con_letra].str[:-1].str.strip()
+
+    return _texto_a_float(texto) * multiplicador
+
+
+def columna_porcentaje(columna):
+    """
+    Texto → array de % en decimal, vectorizado. Mismas reglas que
+    parse_percent_to_decimal: con '%' se divide por 100; sin '%' los valores
+    con |x| <= 1 se toman como decimales y el resto como porcentaje.
+    """
+    texto = _normalizar_numero(columna.astype(object))
+    con_signo = texto.str.endswith('%', na=False).to_numpy()
+    texto = texto.str.rstrip('%').str.strip()
+
+    valores = _texto_a_float(texto)
+    como_porcentaje = con_signo | (np.abs(valores) > 1)
+    return np.where(como_porcentaje, valores / 100.0, valores)
+
+
+def columna_fechas(columna):
+    """
+    Convierte la columna Fecha (texto) a datetime decidiendo el formato una
+    vez por archivo:
+      - dd/mm/aaaa si todas las fechas lo cumplen
+      - mm/dd/aaaa si todas cumplen ese y no el anterior
+      - mezcla: cada fila dd/mm y, si no es válida, mm/dd (criterio fila a fila
+        de siempre)
+
+    Returns:
+        (Series datetime64 con NaT en las fechas no reconocidas, formato usado)
+    """
+    texto = columna.astype(object).str.strip()
+    dia_mes = pd.to_datetime(texto, format="%d/%m/%Y", errors="coerce")
+    mes_dia = pd.to_datetime(texto, format="%m/%d/%Y", errors="coerce")
+
+    # Solo cuentan las filas que son fecha en algún formato (el resto queda NaT)
+    reconocidas = dia_mes.notna() | mes_dia.notna()
+    if dia_mes[reconocidas].notna().all():
+        return dia_mes, "%d/%m/%Y"
+    if mes_dia[reconocidas].notna().all():
+        return mes_dia, "%m/%d/%Y"
+    return dia_mes.fillna(mes_dia), "mixto"
+
+
+def leer_csv_precios(ruta):
+    """
+    Lee un CSV de precios exportado de Investing.com (separador ';') con el
+    parser C de pandas y convierte las columnas con operaciones vectorizadas.
+
+    Returns:
+        DataFrame con EXPECTED_COLUMNS: Fecha datetime ordenada (orden estable;
+        se descartan las filas sin fecha válida), columnas numéricas float y
+        % var. en decimal. Los valores no convertibles quedan como NaN.
+
+    Raises:
+        ValueError: Si faltan columnas esperadas
+    """
+    df = pd.read_csv(ruta, sep=";", dtype=str)
+    df.columns = [c.strip() for c in df.columns]
+
+    missing = [c for c in EXPECTED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(missing)}\n"
+                         f"Columnas encontradas: {list(df.columns)}")
+
+    fechas, formato = columna_fechas(df['Fecha'])
+    if formato == "mixto":
+        print(f"[WARN] {os.path.basename(str(ruta))}: fechas dd/mm y mm/dd mezcladas, se resuelven fila a fila")
+
+    resultado = pd.DataFrame({'Fecha': fechas})
+    for col in COLUMNAS_NUMERICAS:
+        resultado[col] = columna_numerica(df[col], con_sufijos=(col == 'Vol.'))
+    resultado['% var.'] = columna_porcentaje(df['% var.'])
+
+    resultado = resultado.dropna(subset=['Fecha'])
+    # Orden estable: si hay fechas repetidas se conserva el orden del archivo
+    return resultado.sort_values('Fecha', kind='mergesort').reset_index(drop=True)
+
+
+# =========================
+# Caché binaria junto al CSV
+# =========================
+# Subir la versión si cambia el contenido o la limpieza de las columnas
+VERSION_CACHE = 1
+SUFIJO_CACHE = ".cache.npz"
+
+
+def ruta_cache(ruta):
+    """Archivo de caché de un CSV: mismo nombre con el sufijo .cache.npz"""
+    return str(ruta) + SUFIJO_CACHE
+
+
+def _hash_archivo(ruta):
+    """Hash del contenido del archivo (blake2b de 128 bits, leído por bloques)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _clave_archivo(ruta):
+    """(ruta absoluta, tamaño, mtime en ns) del CSV."""
+    estado = os.stat(ruta)
+    return os.path.abspath(ruta), estado.st_size, estado.st_mtime_ns
+
+
+def _leer_cache(ruta):
+    """
+    Devuelve (fechas, columnas, var) de la caché si corresponde al CSV actual,
+    o None si no existe, es de otra versión o el CSV cambió.
+
+    Si ruta, tamaño y mtime coinciden se usa directamente. Si no (archivo
+    copiado, movido o solo "tocado") se compara el hash del contenido y, si
+    coincide, se reutiliza y se actualiza la clave.
+    """
+    archivo = ruta_cache(ruta)
+    if not os.path.exists(archivo):
+        return None
+
+    try:
+        ruta_abs, tamano, mtime_ns = _clave_archivo(ruta)
+        # NpzFile es perezoso: cada array se lee del disco al accederlo, así que
+        # una caché obsoleta solo cuesta leer la clave
+        with np.load(archivo, allow_pickle=False) as cache:
+            if int(cache['version']) != VERSION_CACHE:
+                return None
+
+            misma_clave = (str(cache['ruta']) == ruta_abs
+                           and int(cache['tamano']) == tamano
+                           and int(cache['mtime_ns']) == mtime_ns)
+            if not misma_clave:
+                if int(cache['tamano']) != tamano or str(cache['hash']) != _hash_archivo(ruta):
+                    return None
+
+            fechas = cache['Fecha']
+            columnas = {col: cache[col] for col in COLUMNAS_NUMERICAS}
+            var = cache['% var.']
+            hash_contenido = str(cache['hash'])
+    except Exception as e:
+        print(f"[WARN] Caché ilegible ({os.path.basename(archivo)}), se reconstruye: {e}")
+        return None
+
+    if not misma_clave:
+        _guardar_cache(ruta, (ruta_abs, tamano, mtime_ns), hash_contenido, fechas, columnas, var)
+    return fechas, columnas, var
+
+
+def _guardar_cache(ruta, clave, hash_contenido, fechas, columnas, var):
+    """
+    Escribe la caché de forma atómica (archivo temporal + os.replace). `clave`
+    y `hash_contenido` deben tomarse antes de leer el CSV. Si no se puede
+    escribir (carpeta de solo lectura, etc.) solo avisa.
+    """
+    archivo = ruta_cache(ruta)
+    ruta_abs, tamano, mtime_ns = clave
+    try:
+        fd, temporal = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(archivo)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    version=np.int64(VERSION_CACHE),
+                    ruta=np.str_(ruta_abs),
+                    tamano=np.int64(tamano),
+                    mtime_ns=np.int64(mtime_ns),
+                    hash=np.str_(hash_contenido),
+                    Fecha=np.asarray(fechas, dtype="datetime64[ns]"),
+                    **{col: np.asarray(columnas[col], dtype=float) for col in COLUMNAS_NUMERICAS},
+                    **{'% var.': np.asarray(var, dtype=float)}
+                )
+            os.replace(temporal, archivo)
+        except BaseException:
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            raise
+    except Exception as e:
+        print(f"[WARN] No se pudo guardar la caché de {os.path.basename(str(ruta))}: {e}")
+
+
+def cargar_serie_csv(ruta, usar_cache=True):
+    """
+    Lee un CSV de precios (ver leer_csv_precios) y devuelve la SerieMercado.
+    Los valores numéricos no convertibles se guardan como 0.0.
+
+    Con usar_cache=True primero se busca la caché binaria del CSV; si falta o
+    el CSV cambió, se parsea el texto y se reconstruye la caché.
+
+    Raises:
+        ValueError: Si faltan columnas esperadas
+    """
+    try:
+        mtime = os.path.getmtime(ruta)
+    except (TypeError, OSError):
+        mtime = None
+        usar_cache = False
+
+    if usar_cache:
+        desde_cache = _leer_cache(ruta)
+        if desde_cache is not None:
+            fechas, columnas, var = desde_cache
+            return SerieMercado(fechas, columnas, var, ruta=ruta, mtime=mtime)
+        # Clave y hash antes de parsear: si el CSV cambia mientras se lee, la
+        # caché queda con la clave vieja y se reconstruye en la próxima carga
+        clave = _clave_archivo(ruta)
+        hash_contenido = _hash_archivo(ruta)
+
+    df = leer_csv_precios(ruta)
+
+    columnas = {}
+    for col in COLUMNAS_NUMERICAS:
+        valores = df[col].to_numpy(dtype=float)
+        columnas[col] = np.where(np.isnan(valores), 0.0, valores)
+
+    var = df['% var.'].to_numpy(dtype=float)
+    var = np.where(np.isnan(var), 0.0, var)
+
+    if usar_cache:
+        _guardar_cache(ruta, clave, hash_contenido, df['Fecha'].to_numpy(), columnas, var)
+
+    return SerieMercado(df['Fecha'], columnas, var, ruta=ruta, mtime=mtime)
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tabla virtual sobre ttk.Treeview para listados largos (señales, operaciones,
+comparación, resultados guardados, precios descargados).
+
+El Treeview solo tiene tantos items como filas entran en pantalla; al
+desplazarse se reutilizan y se les cargan los valores de las filas que
+corresponden. Así abrir una ventana con años de historial no inserta ni
+formatea miles de filas: los datos quedan en una lista de tuplas "crudas"
+(números y textos sin formatear) y `formatear` se aplica solo a lo visible.
+
+Ordenar (clic en el encabezado) y filtrar trabajan sobre esa lista y una
+lista de índices; la selección se guarda por fila de datos, no por item.
+
+Uso:
+    tabla = TablaVirtual(frame, columnas, anchos={...}, formatear=funcion,
+                         selectmode="extended")
+    tabla.pack(fill="both", expand=True)
+    tabla.establecer_filas(filas, datos)     # datos: lo que devuelve seleccion()
+"""
+
+import numbers
+import tkinter as tk
+from tkinter import ttk
+
+# Modificadores de los eventos de teclado/mouse
+_SHIFT = 0x1
+_CONTROL = 0x4
+
+
+def _clave_orden(valor):
+    """Clave para ordenar valores mezclados: números, luego textos, luego vacíos."""
+    if valor is None:
+        return (2, 0, "")
+    if isinstance(valor, numbers.Number) and not isinstance(valor, bool):
+        if valor != valor:          # NaN
+            return (2, 0, "")
+        return (0, valor, "")
+    return (1, 0, str(valor).upper())
+
+
+class TablaVirtual(tk.Frame):
+    """
+    Treeview con desplazamiento virtual, orden por columna y filtro.
+
+    Args:
+        padre: widget contenedor
+        columnas: nombres de las columnas (también son los encabezados)
+        anchos: {columna: ancho en píxeles}
+        ancho_defecto: ancho de las columnas que no están en `anchos`
+        formatear: función fila cruda → tupla de valores a mostrar
+                   (por defecto se muestra la fila tal cual)
+        selectmode: "browse", "extended" o "none", como en ttk.Treeview
+        con_filtro: muestra un campo "Filtrar:" sobre la tabla
+        al_seleccionar: función sin argumentos llamada al cambiar la selección
+    """
+
+    def __init__(self, padre, columnas, anchos=None, ancho_defecto=80, formatear=None,
+                 selectmode="browse", con_filtro=False, al_seleccionar=None, **kwargs):
+        super().__init__(padre, **kwargs)
+        self.columnas = tuple(columnas)
+        self._formatear = formatear
+        self._al_seleccionar = al_seleccionar
+
+        self._filas = []          # tuplas crudas
+        self._datos = []          # dato asociado a cada fila (para seleccion())
+        self._textos = None       # texto de búsqueda de cada fila (se arma al filtrar)
+        self._vista = []          # índices de filas filtradas y ordenadas
+        self._seleccion = set()   # índices de filas seleccionadas
+        self._ancla = None        # fila desde la que Shift+flechas extiende la selección
+        self._orden = None        # (columna, descendente)
+        self._filtro = ""
+        self._inicio = 0          # posición en la vista de la primera fila visible
+        self._items = []          # items reutilizados del Treeview
+        self._fila_de_item = {}   # item → índice de fila mostrada
+        self._alto_fila = 20      # se miden con la primera fila dibujada
+        self._alto_encabezado = 25
+        self._medido = False
+
+        if con_filtro:
+            frame_filtro = tk.Frame(self)
+            frame_filtro.pack(fill="x", pady=(0, 3))
+            tk.Label(frame_filtro, text="Filtrar:").pack(side="left")
+            self._entry_filtro = tk.Entry(frame_filtro, width=30)
+            self._entry_filtro.pack(side="left", padx=5)
+            self._entry_filtro.bind("<KeyRelease>", lambda e: self.filtrar(self._entry_filtro.get()))
+            self._label_cantidad = tk.Label(frame_filtro, text="", fg="gray")
+            self._label_cantidad.pack(side="left", padx=5)
+        else:
+            self._label_cantidad = None
+
+        self.scroll_y = tk.Scrollbar(self, orient="vertical", command=self._desplazar)
+        self.scroll_x = tk.Scrollbar(self, orient="horizontal")
+        self.tree = ttk.Treeview(self, columns=self.columnas, show="headings",
+                                 selectmode=selectmode, xscrollcommand=self.scroll_x.set)
+        self.scroll_x.config(command=self.tree.xview)
+
+        anchos = anchos or {}
+        for col in self.columnas:
+            self.tree.heading(col, text=col, command=lambda c=col: self._ordenar_por_encabezado(c))
+            self.tree.column(col, width=anchos.get(col, ancho_defecto), anchor="center")
+
+        self.scroll_y.pack(side="right", fill="y")
+        self.scroll_x.pack(side="bottom", fill="x")
+        self.tree.pack(fill="both", expand=True)
+
+        self.tree.bind("<Configure>", self._al_cambiar_tamano)
+        self.tree.bind("<<TreeviewSelect>>", self._sincronizar_seleccion)
+        self.tree.bind("<Button-1>", self._al_hacer_clic)
+        self.tree.bind("<MouseWheel>", self._rueda)
+        self.tree.bind("<Button-4>", lambda e: self._mover(-3))
+        self.tree.bind("<Button-5>", lambda e: self._mover(3))
+        for tecla, paso in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-pagina"),
+                            ("<Next>", "pagina"), ("<Home>", "inicio"), ("<End>", "fin")):
+            self.tree.bind(tecla, lambda e, p=paso: self._mover_foco(p, e))
+
+    # =========================
+    # Datos
+    # =========================
+    def establecer_filas(self, filas, datos=None):
+        """
+        Reemplaza el contenido. `filas` son tuplas crudas (una por fila, en el
+        orden de las columnas); `datos` es lo que seleccion() devuelve por
+        cada fila (por defecto la propia fila).
+        """
+        self._filas = list(filas)
+        self._datos = list(datos) if datos is not None else self._filas
+        self._textos = None
+        self._seleccion.clear()
+        self._ancla = None
+        self._aplicar_vista()
+
+    def cantidad(self):
+        """Cantidad de filas que pasan el filtro."""
+        return len(self._vista)
+
+    def filas_formateadas(self):
+        """Valores a mostrar de todas las filas de la vista (para exportar)."""
+        for i in self._vista:
+            yield self._valores(i)
+
+    def datos_vista(self):
+        """Datos asociados a las filas de la vista, en el orden mostrado."""
+        return [self._datos[i] for i in self._vista]
+
+    # =========================
+    # Orden y filtro
+    # =========================
+    def ordenar(self, columna, descendente=False):
+        """Ordena la vista por una columna (sobre los valores crudos)."""
+        self._orden = (columna, descendente)
+        self._aplicar_vista()
+
+    def _ordenar_por_encabezado(self, columna):
+        descendente = self._orden == (columna, False)
+        self.ordenar(columna, descendente)
+        for col in self.columnas:
+            flecha = (" ▼" if descendente else " ▲") if col == columna else ""
+            self.tree.heading(col, text=col + flecha)
+
+    def filtrar(self, texto):
+        """Deja en la vista las filas que contienen `texto` en alguna columna."""
+        self._filtro = texto.strip().upper()
+        self._aplicar_vista()
+
+    def _aplicar_vista(self):
+        indices = range(len(self._filas))
+        if self._filtro:
+            if self._textos is None:
+                self._textos = ["\t".join("" if v is None else str(v) for v in fila).upper()
+                                for fila in self._filas]
+            indices = [i for i in indices if self._filtro in self._textos[i]]
+        vista = list(indices)
+
+        if self._orden is not None:
+            posicion = self.columnas.index(self._orden[0])
+            vista.sort(key=lambda i: _clave_orden(self._filas[i][posicion]),
+                       reverse=self._orden[1])
+
+        self._vista = vista
+        self._seleccion &= set(vista)
+        self._inicio = 0
+        if self._label_cantidad is not None:
+            self._label_cantidad.config(text=f"{len(vista)} de {len(self._filas)} filas")
+        self._dibujar()
+
+    # =========================
+    # Selección
+    # =========================
+    def seleccion(self):
+        """Datos de las filas seleccionadas, en el orden de la vista."""
+        return [self._datos[i] for i in self._vista if i in self._seleccion]
+
+    def cantidad_seleccionada(self):
+        return len(self._seleccion)
+
+    def seleccionar_todo(self):
+        self._seleccion = set(self._vista)
+        self._dibujar()
+        self._avisar_seleccion()
+
+    def deseleccionar_todo(self):
+        self._seleccion.clear()
+        self._dibujar()
+        self._avisar_seleccion()
+
+    def quitar_seleccionadas(self):
+        """Saca de la tabla las filas seleccionadas (p. ej. después de borrarlas)."""
+        conservar = [i for i in range(len(self._filas)) if i not in self._seleccion]
+        self.establecer_filas([self._filas[i] for i in conservar],
+                              [self._datos[i] for i in conservar])
+        self._avisar_seleccion()
+
+    def _avisar_seleccion(self):
+        if self._al_seleccionar is not None:
+            self._al_seleccionar()
+
+    def _al_hacer_clic(self, event):
+        # Un clic simple sobre una fila reemplaza la selección: el Treeview se
+        # encarga de las filas en pantalla, acá se olvidan las que no lo están
+        if self.tree.identify_region(event.x, event.y) == "cell" and not event.state & (_SHIFT | _CONTROL):
+            self._seleccion &= set(self._fila_de_item.values())
+            self._ancla = self._fila_de_item.get(self.tree.identify_row(event.y))
+
+    def _sincronizar_seleccion(self, event=None):
+        seleccionados = set(self.tree.selection())
+        for item, i in self._fila_de_item.items():
+            if item in seleccionados:
+                self._seleccion.add(i)
+            else:
+                self._seleccion.discard(i)
+        self._avisar_seleccion()
+
+    # =========================
+    # Desplazamiento y dibujo
+    # =========================
+    def _filas_en_pantalla(self):
+        return max(1, (self.tree.winfo_height() - self._alto_encabezado) // self._alto_fila)
+
+    def _medir(self):
+        """Alto real de encabezado y filas (depende de la fuente y la escala)."""
+        if self._items:
+            caja = self.tree.bbox(self._items[0])
+            if caja:
+                self._alto_encabezado, self._alto_fila = caja[1], max(1, caja[3])
+                self._medido = True
+
+    def _al_cambiar_tamano(self, event=None):
+        self._medir()
+        self._dibujar()
+
+    def _mover(self, filas):
+        self._inicio += filas
+        self._dibujar()
+        return "break"
+
+    def _rueda(self, event):
+        pasos = -event.delta // 120 if abs(event.delta) >= 120 else (-1 if event.delta > 0 else 1)
+        return self._mover(3 * pasos)
+
+    def _desplazar(self, accion, cantidad, unidad=None):
+        """Comando de la barra vertical ("moveto" fracción / "scroll" n unidades|páginas)."""
+        if accion == "moveto":
+            self._inicio = int(float(cantidad) * len(self._vista))
+        elif unidad == "pages":
+            self._inicio += int(cantidad) * self._filas_en_pantalla()
+        else:
+            self._inicio += int(cantidad)
+        self._dibujar()
+
+    def _mover_foco(self, paso, event=None):
+        if not self._vista:
+            return "break"
+        en_pantalla = self._filas_en_pantalla()
+        foco = self._fila_de_item.get(self.tree.focus())
+        actual = self._vista.index(foco) if foco in self._vista else self._inicio
+
+        if paso == "inicio":
+            nuevo = 0
+        elif paso == "fin":
+            nuevo = len(self._vista) - 1
+        elif paso == "pagina":
+            nuevo = actual + en_pantalla
+        elif paso == "-pagina":
+            nuevo = actual - en_pantalla
+        else:
+            nuevo = actual + paso
+        nuevo = min(max(nuevo, 0), len(self._vista) - 1)
+
+        if nuevo < self._inicio:
+            self._inicio = nuevo
+        elif nuevo >= self._inicio + en_pantalla:
+            self._inicio = nuevo - en_pantalla + 1
+        # Con Shift (y selección múltiple) se agrega el rango desde el ancla
+        extender = (event is not None and event.state & _SHIFT
+                    and str(self.tree.cget("selectmode")) == "extended")
+        if extender:
+            if self._ancla not in self._vista:
+                self._ancla = self._vista[actual]
+            desde = self._vista.index(self._ancla)
+            self._seleccion.update(self._vista[min(desde, nuevo):max(desde, nuevo) + 1])
+        else:
+            self._ancla = self._vista[nuevo]
+            self._seleccion = {self._vista[nuevo]}
+        self._dibujar()
+        self.tree.focus(self._items[nuevo - self._inicio])
+        self._avisar_seleccion()
+        return "break"
+
+    def _valores(self, i):
+        fila = self._filas[i]
+        return self._formatear(fila) if self._formatear is not None else fila
+
+    def _dibujar(self):
+        total = len(self._vista)
+        en_pantalla = self._filas_en_pantalla()
+        self._inicio = max(0, min(self._inicio, total - en_pantalla))
+        cantidad = min(en_pantalla, total - self._inicio)
+
+        # Crear o quitar items para que haya uno por fila visible
+        while len(self._items) < cantidad:
+            self._items.append(self.tree.insert("", "end"))
+        if len(self._items) > cantidad:
+            self.tree.delete(*self._items[cantidad:])
+            del self._items[cantidad:]
+
+        self._fila_de_item = {}
+        seleccionados = []
+        for item, i in zip(self._items, self._vista[self._inicio:self._inicio + cantidad]):
+            self.tree.item(item, values=self._valores(i))
+            self._fila_de_item[item] = i
+            if i in self._seleccion:
+                seleccionados.append(item)
+        self.tree.selection_set(seleccionados)
+
+        if total:
+            self.scroll_y.set(self._inicio / total, (self._inicio + cantidad) / total)
+        else:
+            self.scroll_y.set(0, 1)
+
+        if not self._medido and self._items:
+            self.after_idle(self._al_cambiar_tamano)
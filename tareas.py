@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trabajos largos de las interfaces Tk en segundo plano.
+
+en_segundo_plano(widget, trabajo, al_terminar, al_progresar) corre
+trabajo(tarea) en un hilo aparte. El trabajo no toca widgets: se comunica
+con la interfaz por una cola que el hilo de Tk revisa con widget.after.
+
+Desde el hilo del trabajo:
+
+- tarea.avisar(*datos): progreso. Llega a al_progresar(*datos) en el hilo
+  de Tk. Un dato None significa "sin cambios". Los avisos que llegan entre
+  dos revisiones se juntan en uno: cada dato queda con su último valor que
+  no es None. Así se llama a al_progresar una sola vez por revisión y el
+  trabajo puede avisar seguido sin pagar un redibujo por aviso.
+- tarea.en_interfaz(funcion, *args): llama a funcion(*args) en el hilo de Tk
+  (resultados parciales, mensajes). Estas llamadas nunca se descartan.
+- tarea.cancelada(): True si alguien llamó a tarea.detener().
+
+Al terminar se llama a al_terminar(resultado, error) en el hilo de Tk, con
+error=None si el trabajo no lanzó excepción.
+
+El trabajo puede a su vez repartir el cálculo en procesos (optimizador.py,
+descargar_por_lotes); el hilo solo evita que la ventana espere.
+"""
+
+import queue
+import threading
+import traceback
+
+# Milisegundos entre revisiones de la cola
+INTERVALO = 100
+
+
+class Tarea:
+    """Trabajo en curso: cola hacia la interfaz y pedido de cancelación."""
+
+    def __init__(self):
+        self.cola = queue.Queue()
+        self.cancelar = threading.Event()
+        self.terminada = False
+
+    def avisar(self, *datos):
+        self.cola.put(("progreso", datos))
+
+    def en_interfaz(self, funcion, *args):
+        self.cola.put(("llamar", (funcion, args)))
+
+    def cancelada(self):
+        return self.cancelar.is_set()
+
+    def detener(self):
+        self.cancelar.set()
+
+    @property
+    def activa(self):
+        return not self.terminada
+
+
+def _juntar_avisos(anterior, datos):
+    """Aviso que resume `anterior` seguido de `datos` (None = sin cambios)."""
+    if anterior is None:
+        return datos
+    largo = max(len(anterior), len(datos))
+    anterior = anterior + (None,) * (largo - len(anterior))
+    datos = datos + (None,) * (largo - len(datos))
+    return tuple(anterior[i] if dato is None else dato for i, dato in enumerate(datos))
+
+
+def _en_hilo_tk(funcion, args):
+    """Llama a funcion(*args) sin que un error corte la revisión de la cola."""
+    try:
+        funcion(*args)
+    except Exception as e:
+        print(f"[ERROR] Error actualizando la interfaz: {e}")
+        traceback.print_exc()
+
+
+def en_curso(tarea):
+    """True si `tarea` (o None) es un trabajo que todavía no terminó."""
+    return tarea is not None and tarea.activa
+
+
+def en_segundo_plano(widget, trabajo, al_terminar=None, al_progresar=None, intervalo=INTERVALO):
+    """
+    Ejecuta trabajo(tarea) en un hilo y devuelve la Tarea.
+
+    Args:
+        widget: cualquier widget de la ventana (se usa su after)
+        trabajo: función que recibe la Tarea y devuelve el resultado
+        al_terminar: al_terminar(resultado, error), en el hilo de Tk
+        al_progresar: recibe lo que el trabajo pase a tarea.avisar(...)
+        intervalo: milisegundos entre revisiones de la cola
+    """
+    tarea = Tarea()
+
+    def correr():
+        try:
+            resultado = trabajo(tarea)
+        except Exception as e:
+            tarea.cola.put(("fin", (None, e)))
+        else:
+            tarea.cola.put(("fin", (resultado, None)))
+
+    def revisar():
+        mensajes = []
+        try:
+            while True:
+                mensajes.append(tarea.cola.get_nowait())
+        except queue.Empty:
+            pass
+
+        # Los avisos de progreso de la tanda se aplican juntos, una sola vez
+        progreso = None
+        for tipo, datos in mensajes:
+            if tipo == "progreso":
+                progreso = _juntar_avisos(progreso, datos)
+            elif tipo == "llamar":
+                _en_hilo_tk(*datos)
+            else:
+                if progreso is not None and al_progresar is not None:
+                    _en_hilo_tk(al_progresar, progreso)
+                tarea.terminada = True
+                if al_terminar is not None:
+                    _en_hilo_tk(al_terminar, datos)
+                return
+
+        if progreso is not None and al_progresar is not None:
+            _en_hilo_tk(al_progresar, progreso)
+        widget.after(intervalo, revisar)
+
+    threading.Thread(target=correr, daemon=True).start()
+    widget.after(intervalo, revisar)
+    return tarea